@@ -4,6 +4,7 @@ All specialized agents inherit from this base class
 """
 
 import os
+import asyncio
 import logging
 from typing import Dict, Any, List
 from abc import ABC, abstractmethod
@@ -253,7 +254,8 @@ class BaseAgent(ABC):
         try:
             # Build full prompt
             system_prompt = self.get_system_prompt()
-            context_info = self.build_context(mother_context.get('id'))
+            # Context lookup and Gemini are blocking; keep them off the shared event loop
+            context_info = await asyncio.to_thread(self.build_context, mother_context.get('id'))
             preferred_language = language or mother_context.get('preferred_language', 'en')
             
             full_prompt = f"""
@@ -269,7 +271,8 @@ Response:
 """
             
             # Generate response using new client API
-            response = self.client.models.generate_content(
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
                 model=self.model_name,
                 contents=full_prompt
             )
@@ -12,6 +12,7 @@ Agents:
 """
 
 import os
+import asyncio
 import logging
 from typing import Dict, Any, Optional, List
 from enum import Enum
@@ -222,8 +223,8 @@ Respond with ONLY the category name (one word).
         Returns:
             Agent's response text
         """
-        # Classify intent
-        agent_type = self.classify_intent(message)
+        # Classify intent (may call Gemini, which blocks - run it off the event loop)
+        agent_type = await asyncio.to_thread(self.classify_intent, message)
         
         # Get appropriate agent
         agent = self.agents.get(agent_type)
@@ -301,7 +302,8 @@ If urgent, advise consulting healthcare provider immediately.
 Response:
 """
             
-            response = gemini_client.models.generate_content(
+            response = await asyncio.to_thread(
+                gemini_client.models.generate_content,
                 model=model_name,
                 contents=prompt
             )
@@ -1,9 +1,16 @@
-import json
+import logging
 from datetime import datetime
 from typing import Any, Dict, List, Tuple
 
 from supabase import Client
 
+try:
+    from backend.services.report_digest_service import get_digest, DIGEST_REPORT_LIMIT
+except ImportError:
+    from services.report_digest_service import get_digest, DIGEST_REPORT_LIMIT
+
+logger = logging.getLogger(__name__)
+
 
 def _safe_get(d: Dict[str, Any], key: str, default: Any = None):
     try:
@@ -37,14 +44,14 @@ def build_holistic_context(mother_id: str, supabase: Client, limits: Dict[str, i
     - Profile: age, gravida, location, preferred language
     - Recent vitals and lab trends from `health_timeline`
     - TOON summaries and key facts from `context_memory`
-    - Recent medical report summaries from `medical_reports`
+    - Recent medical report summaries, pre-merged in `mother_report_digests`
 
     Returns a dict with:
     - context_text: str
     - sources: List[str] brief references of items included
     - derived: Dict[str, Any] with computed metrics (e.g., BMI)
     """
-    limits = limits or {"timeline": 15, "memories": 25, "reports": 10}
+    limits = limits or {"timeline": 15, "memories": 25, "reports": DIGEST_REPORT_LIMIT}
 
     # Mother profile
     mother_resp = supabase.table("mothers").select("*").eq("id", mother_id).execute()
@@ -85,18 +92,14 @@ def build_holistic_context(mother_id: str, supabase: Client, limits: Dict[str, i
         else:
             key_facts.append(f"{key}: {val}")
 
-    # Recent reports (use uploaded_at instead of upload_date)
-    reports = []
+    # Recent reports, already merged into a per-mother digest
+    digest: Dict[str, Any] = {}
     try:
-        rep_resp = supabase.table("medical_reports") \
-            .select("*") \
-            .eq("mother_id", mother_id) \
-            .order("uploaded_at", desc=True) \
-            .limit(limits["reports"]).execute()
-        reports = rep_resp.data or []
+        digest = get_digest(mother_id, supabase) or {}
     except Exception as e:
-        logger.warning(f"Error fetching reports: {e}")
-        reports = []
+        logger.warning(f"Error fetching report digest: {e}")
+        digest = {}
+    report_summaries = (digest.get("summaries") or [])[:limits["reports"]]
 
     # Fetch upcoming appointments (scheduled and in the future)
     upcoming_appt = None
@@ -224,77 +227,27 @@ def build_holistic_context(mother_id: str, supabase: Client, limits: Dict[str, i
         for c in key_concerns[:5]:
             lines.append(f"- {c}")
 
-    if reports:
+    if report_summaries:
         lines.append("Recent Report Summaries:")
-        all_metrics: Dict[str, Any] = {}
-        all_concerns: List[str] = []
-        all_recommendations: List[str] = []
-
-        def _to_dict(value):
-            if isinstance(value, dict):
-                return value
-            if isinstance(value, str):
-                try:
-                    return json.loads(value)
-                except Exception:
-                    return {}
-            return {}
-
-        def _to_list(value):
-            if isinstance(value, list):
-                return value
-            if isinstance(value, str):
-                try:
-                    parsed = json.loads(value)
-                    return parsed if isinstance(parsed, list) else [value]
-                except Exception:
-                    return [value]
-            if value:
-                return [value]
-            return []
-
-        for r in reports:
-            summary = r.get('analysis_summary', '')
-            uploaded_at = r.get('uploaded_at') or r.get('created_at', '')
-            date_str = uploaded_at[:10] if uploaded_at else ''
-            lines.append(f"- {date_str}: {summary}")
-
-            # Merge health_metrics
-            metrics = _to_dict(r.get('health_metrics'))
-            for key, val in metrics.items():
-                if val not in (None, '', 'null'):
-                    all_metrics[key] = val
-
-            # Merge extracted_metrics column
-            extracted_metrics = _to_dict(r.get('extracted_metrics'))
-            for key, val in extracted_metrics.items():
-                if val not in (None, '', 'null'):
-                    all_metrics[key] = val
-
-            # Merge analysis_result.extracted_data
-            analysis_result = _to_dict(r.get('analysis_result'))
-            extracted_data = _to_dict(analysis_result.get('extracted_data')) if analysis_result else {}
-            for key, val in extracted_data.items():
-                if val not in (None, '', 'null'):
-                    all_metrics[key] = val
-
-            # Concerns / recommendations
-            all_concerns.extend([c for c in _to_list(r.get('concerns')) if c])
-            all_recommendations.extend([rec for rec in _to_list(r.get('recommendations')) if rec])
+        for r in report_summaries:
+            lines.append(f"- {r.get('date', '')}: {r.get('summary', '')}")
 
+        all_metrics: Dict[str, Any] = digest.get("metrics") or {}
         if all_metrics:
             lines.append("Combined Metrics From Reports:")
             for key, val in all_metrics.items():
                 lines.append(f"- {key.replace('_', ' ').title()}: {val}")
 
+        all_concerns: List[str] = digest.get("concerns") or []
         if all_concerns:
             lines.append("Report Concerns:")
-            for concern in sorted(set(all_concerns)):
+            for concern in all_concerns:
                 lines.append(f"- {concern}")
 
+        all_recommendations: List[str] = digest.get("recommendations") or []
         if all_recommendations:
             lines.append("Report Recommendations:")
-            for rec in sorted(set(all_recommendations)):
+            for rec in all_recommendations:
                 lines.append(f"- {rec}")
 
     if key_facts:
@@ -313,7 +266,7 @@ def build_holistic_context(mother_id: str, supabase: Client, limits: Dict[str, i
         sources.append("context_memory.concerns")
     if key_facts:
         sources.append("context_memory.facts")
-    if reports:
+    if report_summaries:
         sources.append("medical_reports.summaries")
         sources.append("medical_reports.metrics")
 
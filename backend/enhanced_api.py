@@ -12,6 +12,7 @@ New endpoints for:
 
 import os
 import json
+import asyncio
 import logging
 from datetime import datetime
 from typing import List, Dict, Optional, Any
@@ -24,6 +25,12 @@ try:
     from backend.context_builder import build_holistic_context
 except ImportError:
     from context_builder import build_holistic_context
+try:
+    from backend.services.report_service import get_health_summary as build_health_summary
+    from backend.services.report_digest_service import refresh_digest
+except ImportError:
+    from services.report_service import get_health_summary as build_health_summary
+    from services.report_digest_service import refresh_digest
 
 # Load environment
 load_dotenv()
@@ -142,10 +149,12 @@ async def store_context_memory(
 async def store_report_analysis(analysis: ReportAnalysis):
     """Store analyzed medical report"""
     try:
+        uploaded_at = datetime.now().isoformat()
         result = supabase.table("medical_reports").insert({
             "mother_id": analysis.mother_id,
             "filename": analysis.filename,
-            "upload_date": datetime.now().isoformat(),
+            "upload_date": uploaded_at,
+            "uploaded_at": uploaded_at,
             "analysis_summary": analysis.analysis_summary,
             "health_metrics": json.dumps(analysis.health_metrics),
             "concerns": json.dumps(analysis.concerns),
@@ -175,6 +184,9 @@ async def store_report_analysis(analysis: ReportAnalysis):
                 "report"
             )
         
+        # Keep the per-mother report digest (chat context) in step with the new report
+        await asyncio.to_thread(refresh_digest, analysis.mother_id)
+        
         return {"success": True, "report_id": result.data[0]['id']}
     
     except Exception as e:
@@ -364,48 +376,7 @@ async def get_conversation_history(mother_id: str, limit: int = 50):
 async def get_health_summary(mother_id: str):
     """Get comprehensive health summary - accepts UUID or integer ID"""
     try:
-        # Try to use SQL function if exists
-        try:
-            summary = supabase.rpc('get_health_summary', {
-                'mother_id_param': mother_id
-            }).execute()
-            summary_data = summary.data
-        except Exception as rpc_error:
-            logger.warning(f"RPC function not available: {rpc_error}")
-            # Fallback to manual aggregation
-            summary_data = {"message": "Summary function not available"}
-        
-        # Get latest timeline events (with error handling)
-        timeline = {"success": True, "timeline": []}
-        try:
-            timeline = await get_timeline(mother_id, limit=5)
-        except Exception as timeline_error:
-            logger.warning(f"Could not retrieve timeline: {timeline_error}")
-            timeline = {"success": True, "timeline": []}
-        
-        # Get recent memories (with error handling)
-        memories = {"success": True, "memories": []}
-        try:
-            memories = await retrieve_memory(mother_id, limit=10)
-        except Exception as memory_error:
-            logger.warning(f"Could not retrieve memories: {memory_error}")
-            memories = {"success": True, "memories": []}
-        
-        # Get mother details
-        mother = None
-        try:
-            mother_result = supabase.table("mothers").select("*").eq("id", mother_id).execute()
-            mother = mother_result.data[0] if mother_result.data else None
-        except Exception as mother_error:
-            logger.warning(f"Could not retrieve mother details: {mother_error}")
-        
-        return {
-            "success": True,
-            "mother": mother,
-            "summary": summary_data,
-            "recent_timeline": timeline.get("timeline", []),
-            "key_memories": memories.get("memories", [])
-        }
+        return await build_health_summary(mother_id)
     
     except Exception as e:
         logger.error(f"Error getting summary: {e}", exc_info=True)
@@ -2,13 +2,12 @@ import os
 import importlib.util
 import logging
 import requests
-import threading
-import time
 import asyncio
 import base64
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from fastapi import FastAPI, HTTPException, status, Request, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from supabase import create_client, Client
@@ -32,8 +31,9 @@ logger = logging.getLogger(__name__)
 
 # ==================== GLOBAL VARIABLES ====================
 telegram_bot_app = None
-bot_thread = None
 bot_running = False
+telegram_state_eviction = None
+job_runner = None
 
 # ==================== ENVIRONMENT VALIDATION ====================
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -44,6 +44,8 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 BACKEND_URL = os.getenv("BACKEND_URL", "").strip()
 # Use webhooks instead of polling for efficiency (only triggers on messages)
 USE_TELEGRAM_WEBHOOK = os.getenv("USE_TELEGRAM_WEBHOOK", "true").lower() == "true"
+# Run scheduler jobs inside the API process (otherwise run `python scheduler.py` separately)
+SCHEDULER_IN_APP = os.getenv("SCHEDULER_IN_APP", "false").lower() == "true"
 
 if not SUPABASE_URL or not SUPABASE_KEY:
     logger.warning("⚠️  Supabase credentials not found in .env")
@@ -99,9 +101,9 @@ except ImportError as e:
 # ==================== CACHE SERVICE IMPORT ====================
 try:
     try:
-        from backend.services.cache_service import cache, invalidate_dashboard_cache, invalidate_mothers_cache, invalidate_risk_cache
+        from backend.services.cache_service import cache, invalidate_dashboard_cache, invalidate_mothers_cache, invalidate_risk_cache, invalidate_telegram_mothers_cache
     except ImportError:
-        from services.cache_service import cache, invalidate_dashboard_cache, invalidate_mothers_cache, invalidate_risk_cache
+        from services.cache_service import cache, invalidate_dashboard_cache, invalidate_mothers_cache, invalidate_risk_cache, invalidate_telegram_mothers_cache
     CACHE_AVAILABLE = True
     logger.info("✅ In-memory cache initialized")
 except ImportError as e:
@@ -111,6 +113,7 @@ except ImportError as e:
     def invalidate_dashboard_cache(): pass
     def invalidate_mothers_cache(): pass
     def invalidate_risk_cache(): pass
+    def invalidate_telegram_mothers_cache(chat_id=None): pass
 
 
 # ==================== PYDANTIC MODELS ====================
@@ -165,210 +168,247 @@ class DailyCheckIn(BaseModel):
 
 # ==================== TELEGRAM BOT FUNCTIONS ====================
 
-def run_telegram_bot():
-    """Run Telegram bot polling - creates everything in this thread's event loop"""
-    global bot_running, telegram_bot_app
-    
+TELEGRAM_ALLOWED_UPDATES = ["message", "callback_query", "inline_query"]
+
+try:
+    from backend.services.telegram_update_queue import (
+        start_update_queue, stop_update_queue, get_update_queue, QUEUED, DUPLICATE
+    )
+    from backend.services.telegram_rate_limiter import ChatRateLimiter, chat_send_queue
+    from backend.services.write_buffer import start_table_writers, stop_table_writers
+    from backend.services.outbox_service import start_outbox_worker, stop_outbox_worker
+except ImportError:
+    from services.telegram_update_queue import (
+        start_update_queue, stop_update_queue, get_update_queue, QUEUED, DUPLICATE
+    )
+    from services.telegram_rate_limiter import ChatRateLimiter, chat_send_queue
+    from services.write_buffer import start_table_writers, stop_table_writers
+    from services.outbox_service import start_outbox_worker, stop_outbox_worker
+
+
+def build_telegram_application():
+    """Build the bot Application and its handlers (no network calls, no event loop needed)"""
     try:
-        # Create new event loop for this thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        logger.info("🤖 Initializing Telegram Bot in background thread...")
-        
-        # Import telegram bot
-        try:
-            try:
-                from backend.telegram_bot import (
-                    MatruRakshaBot,
-                    handle_switch_callback,
-                    handle_home_action,
-                    handle_document_upload,
-                    handle_text_message,
-                )
-            except ImportError:
-                from telegram_bot import (
-                    MatruRakshaBot,
-                    handle_switch_callback,
-                    handle_home_action,
-                    handle_document_upload,
-                    handle_text_message,
-                )
-            from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ConversationHandler, filters
-            from telegram import Update
-        except ImportError as e:
-            logger.error(f"⚠️  Could not import telegram_bot: {e}")
-            return
-        
-        # Build application IN THIS EVENT LOOP
-        application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
-        
-        # Create bot instance
-        bot = MatruRakshaBot()
-        
-        # Setup handlers manually here (if bot doesn't have setup_handlers method)
         try:
             from backend.telegram_bot import (
-                AWAITING_NAME, AWAITING_AGE, AWAITING_PHONE, AWAITING_DUE_DATE,
-                AWAITING_LOCATION, AWAITING_GRAVIDA, AWAITING_PARITY, AWAITING_BMI,
-                AWAITING_LANGUAGE, CONFIRM_REGISTRATION
+                MatruRakshaBot,
+                handle_switch_callback,
+                handle_home_action,
+                handle_document_upload,
+                handle_text_message,
             )
         except ImportError:
             from telegram_bot import (
-                AWAITING_NAME, AWAITING_AGE, AWAITING_PHONE, AWAITING_DUE_DATE,
-                AWAITING_LOCATION, AWAITING_GRAVIDA, AWAITING_PARITY, AWAITING_BMI,
-                AWAITING_LANGUAGE, CONFIRM_REGISTRATION
+                MatruRakshaBot,
+                handle_switch_callback,
+                handle_home_action,
+                handle_document_upload,
+                handle_text_message,
             )
-        
-        # Registration conversation handler
-        registration_handler = ConversationHandler(
-            entry_points=[
-                CallbackQueryHandler(bot.button_callback, pattern="^(register|register_new)$")
-            ],
-            states={
-                AWAITING_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_name)],
-                AWAITING_AGE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_age)],
-                AWAITING_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_phone)],
-                AWAITING_DUE_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_due_date)],
-                AWAITING_LOCATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_location)],
-                AWAITING_GRAVIDA: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_gravida)],
-                AWAITING_PARITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_parity)],
-                AWAITING_BMI: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_bmi)],
-                AWAITING_LANGUAGE: [
-                    CallbackQueryHandler(bot.receive_language, pattern="^lang_"),
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_language)
-                ],
-                CONFIRM_REGISTRATION: [CallbackQueryHandler(bot.confirm_registration, pattern="^confirm_")]
-            },
-            fallbacks=[CommandHandler('cancel', bot.cancel_registration)],
-            name="registration",
-            persistent=False,
-            per_message=False
+        from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ConversationHandler, filters
+    except ImportError as e:
+        logger.error(f"⚠️  Could not import telegram_bot: {e}")
+        return None
+    
+    # Replies, edits and background notifications share one per-chat/global send budget
+    builder = Application.builder().token(TELEGRAM_BOT_TOKEN).rate_limiter(ChatRateLimiter())
+    
+    # Half-finished registrations survive restarts (SQLite, idle chats expire)
+    persistence = None
+    try:
+        try:
+            from backend.services.telegram_persistence import SQLitePersistence
+        except ImportError:
+            from services.telegram_persistence import SQLitePersistence
+        persistence = SQLitePersistence()
+        builder = builder.persistence(persistence)
+    except Exception as e:
+        logger.warning(f"⚠️  Telegram state persistence unavailable, using memory only: {e}")
+    
+    application = builder.build()
+    
+    # Create bot instance
+    bot = MatruRakshaBot()
+    
+    # Setup handlers manually here (if bot doesn't have setup_handlers method)
+    try:
+        from backend.telegram_bot import (
+            AWAITING_NAME, AWAITING_AGE, AWAITING_PHONE, AWAITING_DUE_DATE,
+            AWAITING_LOCATION, AWAITING_GRAVIDA, AWAITING_PARITY, AWAITING_BMI,
+            AWAITING_LANGUAGE, CONFIRM_REGISTRATION
         )
-        
-        # Add handlers
-        # Keep /start but also allow simple greetings like "hi" to open the dashboard
-        application.add_handler(CommandHandler("start", bot.start))
-
-        # "Hi" (and variants) should behave like /start
-        greeting_filter = (
-            filters.TEXT & ~filters.COMMAND &
-            (
-                filters.Regex(r"(?i)^hi$") |
-                filters.Regex(r"(?i)^hello$") |
-                filters.Regex(r"(?i)^hey$")
-            )
+    except ImportError:
+        from telegram_bot import (
+            AWAITING_NAME, AWAITING_AGE, AWAITING_PHONE, AWAITING_DUE_DATE,
+            AWAITING_LOCATION, AWAITING_GRAVIDA, AWAITING_PARITY, AWAITING_BMI,
+            AWAITING_LANGUAGE, CONFIRM_REGISTRATION
         )
-        application.add_handler(MessageHandler(greeting_filter, bot.start))
+    
+    # Registration conversation handler
+    registration_handler = ConversationHandler(
+        entry_points=[
+            CallbackQueryHandler(bot.button_callback, pattern="^(register|register_new)$")
+        ],
+        states={
+            AWAITING_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_name)],
+            AWAITING_AGE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_age)],
+            AWAITING_PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_phone)],
+            AWAITING_DUE_DATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_due_date)],
+            AWAITING_LOCATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_location)],
+            AWAITING_GRAVIDA: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_gravida)],
+            AWAITING_PARITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_parity)],
+            AWAITING_BMI: [MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_bmi)],
+            AWAITING_LANGUAGE: [
+                CallbackQueryHandler(bot.receive_language, pattern="^lang_"),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, bot.receive_language)
+            ],
+            CONFIRM_REGISTRATION: [CallbackQueryHandler(bot.confirm_registration, pattern="^confirm_")]
+        },
+        fallbacks=[CommandHandler('cancel', bot.cancel_registration)],
+        name="registration",
+        persistent=persistence is not None,
+        per_message=False
+    )
+    
+    # Add handlers
+    # Keep /start but also allow simple greetings like "hi" to open the dashboard
+    application.add_handler(CommandHandler("start", bot.start))
+
+    # "Hi" (and variants) should behave like /start
+    greeting_filter = (
+        filters.TEXT & ~filters.COMMAND &
+        (
+            filters.Regex(r"(?i)^hi$") |
+            filters.Regex(r"(?i)^hello$") |
+            filters.Regex(r"(?i)^hey$")
+        )
+    )
+    application.add_handler(MessageHandler(greeting_filter, bot.start))
+
+    application.add_handler(registration_handler)
+    application.add_handler(CallbackQueryHandler(handle_switch_callback, pattern=r"^switch_mother_"))
+    application.add_handler(CallbackQueryHandler(handle_home_action, pattern=r"^action_"))
+    application.add_handler(MessageHandler(filters.Document.ALL | filters.PHOTO, handle_document_upload))
+    # Add text message handler for other free-form queries (but not during registration)
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_message))
+    
+    return application
 
-        application.add_handler(registration_handler)
-        application.add_handler(CallbackQueryHandler(handle_switch_callback, pattern=r"^switch_mother_"))
-        application.add_handler(CallbackQueryHandler(handle_home_action, pattern=r"^action_"))
-        application.add_handler(MessageHandler(filters.Document.ALL | filters.PHOTO, handle_document_upload))
-        # Add text message handler for other free-form queries (but not during registration)
-        application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_message))
-        
-        # Initialize the application
-        loop.run_until_complete(application.initialize())
-        
-        logger.info("✅ Telegram Bot initialized successfully")
-        
-        # Store globally
-        telegram_bot_app = application
-        
-        # Clear any existing webhook/polling connections before starting
-        logger.info("🔄 Clearing any existing Telegram connections...")
+
+async def start_telegram_bot():
+    """
+    Start the Telegram bot on the server's event loop.
+    
+    Webhook mode (BACKEND_URL set): updates arrive at /telegram/webhook/{token} and
+    are processed on this same loop. The webhook is only (re)registered when
+    Telegram has a different URL, so restarts and extra workers don't drop or
+    race pending updates. Without BACKEND_URL the bot falls back to polling.
+    """
+    global bot_running, telegram_bot_app
+    
+    logger.info("🤖 Initializing Telegram Bot...")
+    application = build_telegram_application()
+    if application is None:
+        return
+    
+    await application.initialize()
+    telegram_bot_app = application
+    logger.info("✅ Telegram Bot initialized successfully")
+    
+    if USE_TELEGRAM_WEBHOOK and BACKEND_URL:
+        webhook_url = f"{BACKEND_URL}/telegram/webhook/{TELEGRAM_BOT_TOKEN}"
         try:
-            loop.run_until_complete(application.bot.delete_webhook(drop_pending_updates=True))
-            logger.info("✅ Cleared existing webhook/connections")
-        except Exception as e:
-            logger.warning(f"⚠️ Could not clear webhook: {e}")
-        
-        # Small delay to ensure old connections are released
-        import time
-        time.sleep(2)
-        
-        # Use webhooks if BACKEND_URL is set (more efficient - only triggers on messages)
-        if USE_TELEGRAM_WEBHOOK and BACKEND_URL:
-            webhook_url = f"{BACKEND_URL}/telegram/webhook/{TELEGRAM_BOT_TOKEN}"
-            logger.info(f"🔗 Setting up Telegram webhook: {BACKEND_URL}/telegram/webhook/***")
-            
-            try:
-                # Set webhook with Telegram
-                loop.run_until_complete(application.bot.set_webhook(
+            info = await application.bot.get_webhook_info()
+            if info.url != webhook_url:
+                logger.info(f"🔗 Setting up Telegram webhook: {BACKEND_URL}/telegram/webhook/***")
+                await application.bot.set_webhook(
                     url=webhook_url,
-                    allowed_updates=["message", "callback_query", "inline_query"],
-                    drop_pending_updates=True
-                ))
+                    allowed_updates=TELEGRAM_ALLOWED_UPDATES
+                )
                 logger.info("✅ Telegram webhook set successfully")
-                logger.info("🪝 Bot will receive updates via webhook (no polling)")
-                
-                # Initialize and start the application for webhook mode
-                loop.run_until_complete(application.start())
-                bot_running = True
-                
-                logger.info("🤖 MatruRaksha Telegram Bot is ACTIVE (webhook mode)")
-                
-                # In webhook mode, we don't run_forever - FastAPI handles incoming requests
-                # Keep the application running but don't poll
-                while bot_running:
-                    time.sleep(60)  # Just keep thread alive, no polling
-                    
-            except Exception as webhook_error:
-                logger.error(f"❌ Webhook setup failed: {webhook_error}")
-                logger.info("⚠️ Falling back to polling mode...")
-                # Fall through to polling
-        else:
-            if not BACKEND_URL:
-                logger.warning("⚠️ BACKEND_URL not set - using polling (set BACKEND_URL for webhook mode)")
-        
-        # Fallback: Start polling if webhooks not available
-        if not bot_running:
-            logger.info("🚀 Starting Telegram polling...")
-            bot_running = True
-            
-            loop.run_until_complete(application.start())
-            loop.run_until_complete(application.updater.start_polling(
-                drop_pending_updates=True,
-                allowed_updates=["message", "callback_query", "inline_query"],
-                poll_interval=2.0  # Poll every 2 seconds instead of every second
-            ))
-            
-            logger.info("✅ Telegram polling started")
-            logger.info("🤖 MatruRaksha Telegram Bot is ACTIVE (polling mode)")
+            else:
+                logger.info("✅ Telegram webhook already registered")
             
-            # Keep running
-            loop.run_forever()
-        
+            await application.start()
+            start_telegram_state_eviction(application)
+            start_update_queue(process_telegram_update)
+            bot_running = True
+            logger.info("🤖 MatruRaksha Telegram Bot is ACTIVE (webhook mode)")
+            return
+        except Exception as webhook_error:
+            logger.error(f"❌ Webhook setup failed: {webhook_error}")
+            logger.info("⚠️ Falling back to polling mode...")
+    elif not BACKEND_URL:
+        logger.warning("⚠️ BACKEND_URL not set - using polling (set BACKEND_URL for webhook mode)")
+    
+    # Polling needs the webhook removed first
+    logger.info("🚀 Starting Telegram polling...")
+    try:
+        await application.bot.delete_webhook(drop_pending_updates=True)
     except Exception as e:
-        logger.error(f"❌ Error in Telegram bot: {e}", exc_info=True)
-        bot_running = False
-    finally:
-        try:
-            if telegram_bot_app:
-                loop.run_until_complete(telegram_bot_app.updater.stop())
-                loop.run_until_complete(telegram_bot_app.stop())
-                loop.run_until_complete(telegram_bot_app.shutdown())
-        except:
-            pass
-        loop.close()
+        logger.warning(f"⚠️ Could not clear webhook: {e}")
+    
+    if not application.running:
+        await application.start()
+        start_telegram_state_eviction(application)
+    await application.updater.start_polling(
+        drop_pending_updates=True,
+        allowed_updates=TELEGRAM_ALLOWED_UPDATES,
+        poll_interval=2.0  # Poll every 2 seconds instead of every second
+    )
+    bot_running = True
+    logger.info("✅ Telegram polling started")
+    logger.info("🤖 MatruRaksha Telegram Bot is ACTIVE (polling mode)")
+
+
+def start_telegram_state_eviction(application):
+    """Periodically drop conversation state of chats idle past the TTL"""
+    global telegram_state_eviction
+    if application.persistence is None or telegram_state_eviction is not None:
+        return
+    try:
+        from backend.services.telegram_persistence import run_state_eviction
+    except ImportError:
+        from services.telegram_persistence import run_state_eviction
+    telegram_state_eviction = asyncio.create_task(run_state_eviction(application.persistence, application))
+
+
+async def process_telegram_update(update_data: Dict[str, Any]):
+    """Run one queued webhook update through the bot's handlers"""
+    from telegram import Update
+    
+    application = telegram_bot_app
+    if application is None:
+        return
+    await application.process_update(Update.de_json(update_data, application.bot))
 
 
 async def stop_telegram_bot():
-    """Properly stop the Telegram bot"""
-    global bot_running
+    """Drain queued webhook updates, stop polling (if any), then stop and shut down the Application"""
+    global bot_running, telegram_bot_app
     
-    if bot_running:
-        try:
-            logger.info("🛑 Stopping Telegram bot...")
-            bot_running = False
-            
-            # Give the thread time to clean up
-            await asyncio.sleep(1)
-            
-            logger.info("🛑 Telegram bot stopped")
-        except Exception as e:
-            logger.error(f"Error stopping Telegram bot: {e}")
+    application = telegram_bot_app
+    if application is None:
+        return
+    
+    logger.info("🛑 Stopping Telegram bot...")
+    bot_running = False
+    global telegram_state_eviction
+    if telegram_state_eviction is not None:
+        telegram_state_eviction.cancel()
+        telegram_state_eviction = None
+    try:
+        await stop_update_queue()
+        if application.updater and application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        logger.info("🛑 Telegram bot stopped")
+    except Exception as e:
+        logger.error(f"Error stopping Telegram bot: {e}")
+    finally:
+        telegram_bot_app = None
 
 
 @asynccontextmanager
@@ -387,29 +427,51 @@ async def lifespan(app: FastAPI):
     logger.info("")
     logger.info("=" * 60)
     
-    # Start Telegram bot in background thread
+    # Start Telegram bot on this event loop (webhook updates are processed here too)
     if TELEGRAM_BOT_TOKEN and TELEGRAM_BOT_TOKEN != "placeholder":
-        global bot_thread
-        bot_thread = threading.Thread(
-            target=run_telegram_bot,
-            daemon=True,
-            name="TelegramBotThread"
-        )
-        bot_thread.start()
-        
-        # Give it a moment to initialize
-        await asyncio.sleep(2)
+        try:
+            await start_telegram_bot()
+        except Exception as e:
+            logger.error(f"❌ Error starting Telegram bot: {e}", exc_info=True)
         
         logger.info("")
         logger.info("    ✅ Services Status:")
         logger.info("")
-        logger.info("    🤖 Telegram Bot: Running in background")
+        logger.info(f"    🤖 Telegram Bot: {'Running' if bot_running else 'Not running'}")
         logger.info("    🚀 Starting FastAPI Backend...")
         logger.info("")
     else:
         logger.warning("    ⚠️  Telegram Bot Token not set")
         logger.info("    🚀 Starting FastAPI Backend only...")
     
+    # Background Telegram notifications are paced and merged per chat on this loop
+    chat_send_queue.start()
+    
+    # Chat log inserts are batched so bot replies never wait on the database
+    start_table_writers()
+    
+    # Deliver queued notifications (and their retries) from this process
+    try:
+        if await start_outbox_worker():
+            logger.info("    📮 Outbox worker: Running")
+    except Exception as e:
+        logger.error(f"    ❌ Outbox worker failed to start: {e}")
+    
+    # Run scheduled jobs on this event loop instead of a separate scheduler process
+    global job_runner
+    if SCHEDULER_IN_APP:
+        try:
+            try:
+                from backend.scheduler import build_job_runner
+            except ImportError:
+                from scheduler import build_job_runner
+            job_runner = build_job_runner()
+            job_runner.start()
+            logger.info("    ⏰ Scheduler: Running in API process")
+        except Exception as e:
+            logger.error(f"    ❌ Scheduler failed to start: {e}")
+            job_runner = None
+    
     yield
     
     # ==================== SHUTDOWN ====================
@@ -417,6 +479,27 @@ async def lifespan(app: FastAPI):
     logger.info("🛑 Shutting down MatruRaksha AI System...")
     
     await stop_telegram_bot()
+    await chat_send_queue.stop()
+    await stop_table_writers()
+    
+    if job_runner is not None:
+        await job_runner.stop()
+    
+    await stop_outbox_worker()
+    
+    # Stop PDF analysis worker processes
+    try:
+        from services.document_analyzer import shutdown_pdf_pool
+        shutdown_pdf_pool()
+    except Exception as e:
+        logger.warning(f"⚠️  Could not stop PDF workers: {e}")
+    
+    # Close pooled outbound HTTP connections
+    try:
+        from services.http_client import close_clients
+        await close_clients()
+    except Exception as e:
+        logger.warning(f"⚠️  Could not close HTTP clients: {e}")
     
     logger.info("✅ Shutdown complete")
     logger.info("=" * 60)
@@ -506,34 +589,37 @@ async def telegram_webhook(token: str, request: Request):
     """
     Webhook endpoint for Telegram bot updates.
     Only triggers when a message is received (no polling!).
-    """
-    global telegram_bot_app
     
+    The update is queued for the update workers and acknowledged right away,
+    so slow replies never make Telegram time out and redeliver.
+    """
     # Verify token matches our bot token
     if token != TELEGRAM_BOT_TOKEN:
         logger.warning("⚠️ Invalid webhook token received")
         raise HTTPException(status_code=403, detail="Invalid token")
     
-    if not telegram_bot_app:
+    update_queue = get_update_queue()
+    if not telegram_bot_app or update_queue is None:
         logger.error("❌ Telegram bot not initialized")
         raise HTTPException(status_code=500, detail="Bot not ready")
     
     try:
-        # Parse the update from Telegram
-        from telegram import Update
-        
         update_data = await request.json()
-        update = Update.de_json(update_data, telegram_bot_app.bot)
-        
-        # Process the update asynchronously
-        await telegram_bot_app.process_update(update)
-        
-        return {"ok": True}
-        
     except Exception as e:
-        logger.error(f"❌ Webhook processing error: {e}")
-        # Still return 200 to prevent Telegram from retrying
-        return {"ok": False, "error": str(e)}
+        logger.error(f"❌ Invalid webhook payload: {e}")
+        # Malformed updates will never parse - don't ask Telegram to retry
+        return {"ok": False, "error": "invalid payload"}
+    
+    if not isinstance(update_data, dict) or "update_id" not in update_data:
+        return {"ok": False, "error": "invalid payload"}
+    
+    outcome = update_queue.submit(update_data)
+    if outcome not in (QUEUED, DUPLICATE):
+        # Queue full: a non-2xx makes Telegram redeliver later instead of losing the update
+        logger.warning(f"⚠️ Telegram update queue full, deferring update {update_data.get('update_id')}")
+        raise HTTPException(status_code=503, detail="Update queue full")
+    
+    return {"ok": True}
 
 # ==================== FALLBACK AUTH ROUTES (ensure availability) ====================
 try:
@@ -662,174 +748,24 @@ async def run_ai_agent_assessment(mother_data: Dict, background_tasks: Backgroun
         return None
 
 
-def analyze_document_with_gemini(file_url: str, file_type: str, mother_data: Dict) -> Dict[str, Any]:
-    """Analyze medical document using Gemini AI"""
-    
-    analysis_result = {
-        "status": "completed",
-        "extracted_data": {},
-        "concerns": [],
-        "recommendations": [],
-        "risk_level": "normal",
-        "timestamp": datetime.now().isoformat()
-    }
-    
-    if not GEMINI_AVAILABLE:
-        logger.warning("⚠️  Gemini not available - returning basic analysis")
-        analysis_result["status"] = "pending_review"
-        analysis_result["extracted_data"] = {
-            "note": "AI analysis not available - manual review required"
-        }
-        return analysis_result
-    
-    try:
-        logger.info(f"🤖 Analyzing document with Gemini AI: {file_url}")
-        
-        # Create the prompt for Gemini
-        prompt = f"""
-You are a maternal health expert analyzing a medical report for a pregnant woman.
-
-**Mother's Profile:**
-- Name: {mother_data.get('name')}
-- Age: {mother_data.get('age')} years
-- Gravida: {mother_data.get('gravida')} (number of pregnancies)
-- Parity: {mother_data.get('parity')} (number of live births)
-- BMI: {mother_data.get('bmi')}
-- Location: {mother_data.get('location')}
-
-**Task:**
-Analyze the medical report and extract the following information in a structured format:
-
-1. **Key Health Metrics** (extract if present):
-   - Hemoglobin level (g/dL)
-   - Blood pressure (systolic/diastolic)
-   - Blood sugar/glucose level (mg/dL)
-   - Weight (kg)
-   - Any other vital signs
-
-2. **Health Concerns** (identify any abnormalities or risk factors):
-   - List any concerning values or conditions
-   - Rate severity: mild, moderate, severe
-
-3. **Recommendations**:
-   - What actions should be taken
-   - Any follow-up needed
-   - Dietary or lifestyle advice
-
-4. **Risk Assessment**:
-   - Overall risk level: low, moderate, or high
-   - Reasoning for the risk level
-
-**Output Format (JSON):**
-{{
-    "extracted_metrics": {{
-        "hemoglobin": <value or null>,
-        "blood_pressure_systolic": <value or null>,
-        "blood_pressure_diastolic": <value or null>,
-        "blood_sugar": <value or null>,
-        "weight": <value or null>,
-        "other_findings": "<any other important findings>"
-    }},
-    "concerns": [
-        "<concern 1>",
-        "<concern 2>"
-    ],
-    "recommendations": [
-        "<recommendation 1>",
-        "<recommendation 2>"
-    ],
-    "risk_level": "<low/moderate/high>",
-    "risk_reasoning": "<explanation>"
-}}
-
-Provide ONLY the JSON output, no additional text.
-"""
-        
-        # Use the global gemini_client for API calls
-        model_name = 'gemini-2.5-flash'
-        
-        if not gemini_client:
-            raise Exception("Gemini client not initialized")
-        
-        logger.info(f"✅ Using Gemini model: {model_name}")
-        
-        # If it's an image, we can pass it directly to Gemini
-        if file_type.startswith('image/'):
-            try:
-                # Download the image
-                response = requests.get(file_url, timeout=30)
-                response.raise_for_status()
-                
-                # Create image data for Gemini
-                import PIL.Image
-                import io
-                image = PIL.Image.open(io.BytesIO(response.content))
-                
-                # Generate response with image using new client API
-                result = gemini_client.models.generate_content(
-                    model=model_name,
-                    contents=[prompt, image]
-                )
-                ai_response = result.text
-                
-            except Exception as img_error:
-                logger.error(f"Error processing image: {img_error}")
-                # Fallback to text-only analysis
-                result = gemini_client.models.generate_content(
-                    model=model_name,
-                    contents=prompt + f"\n\nNote: Could not load image from URL: {file_url}"
-                )
-                ai_response = result.text
-        else:
-            # For PDFs and other documents, use text-only analysis
-            # Note: For full PDF parsing, you'd need to extract text first
-            result = gemini_client.models.generate_content(
-                model=model_name,
-                contents=prompt + f"\n\nDocument URL: {file_url}\nFile Type: {file_type}\n\n"
-                "Note: Please provide a general analysis based on typical maternal health reports."
-            )
-            ai_response = result.text
-        
-        logger.info(f"✅ Gemini response received: {len(ai_response)} characters")
-        
-        # Parse the JSON response
-        import json
-        import re
-        
-        # Extract JSON from response (sometimes Gemini wraps it in markdown)
-        json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
-        if json_match:
-            json_str = json_match.group()
-            parsed_data = json.loads(json_str)
-            
-            # Update analysis result with parsed data
-            analysis_result["extracted_data"] = parsed_data.get("extracted_metrics", {})
-            analysis_result["concerns"] = parsed_data.get("concerns", [])
-            analysis_result["recommendations"] = parsed_data.get("recommendations", [])
-            analysis_result["risk_level"] = parsed_data.get("risk_level", "normal")
-            analysis_result["risk_reasoning"] = parsed_data.get("risk_reasoning", "")
-            analysis_result["ai_analysis"] = ai_response
-            analysis_result["analyzed_with"] = "Google Gemini AI"
-            
-            logger.info(f"✅ Analysis complete - Risk Level: {analysis_result['risk_level']}")
-        else:
-            # If JSON parsing fails, store raw response
-            analysis_result["ai_analysis"] = ai_response
-            analysis_result["extracted_data"] = {
-                "note": "Manual review needed - AI response format unexpected"
-            }
-            analysis_result["status"] = "pending_review"
-            logger.warning("⚠️  Could not parse Gemini response as JSON")
-    
-    except Exception as e:
-        logger.error(f"❌ Gemini analysis error: {e}", exc_info=True)
-        analysis_result["status"] = "error"
-        analysis_result["error"] = str(e)
-        analysis_result["extracted_data"] = {
-            "note": "Analysis failed - manual review required"
-        }
-    
-    return analysis_result
+# Report analysis lives in services/report_service.py so the Telegram bot can
+# call it in-process instead of looping back through this API over HTTP
+try:
+    from backend.services.report_service import (
+        analyze_report as run_report_analysis,
+        normalize_file_type,
+        MotherNotFoundError,
+    )
+    from backend.services.report_digest_service import refresh_digest
+    from backend.services.blob_store import is_blob_url, local_blob_path, BlobStorageError
+except ImportError:
+    from services.report_service import (
+        analyze_report as run_report_analysis,
+        normalize_file_type,
+        MotherNotFoundError,
+    )
+    from services.report_digest_service import refresh_digest
+    from services.blob_store import is_blob_url, local_blob_path, BlobStorageError
 
 
 # ==================== HEALTH CHECK ====================
@@ -891,6 +827,8 @@ async def register_mother(mother: Mother, background_tasks: BackgroundTasks):
         
         # Invalidate dashboard cache after new registration
         invalidate_mothers_cache()
+        if mother.telegram_chat_id:
+            invalidate_telegram_mothers_cache(mother.telegram_chat_id)
         
         return {
             "status": "success",
@@ -968,109 +906,25 @@ def get_mother(mother_id: str):
 @app.post("/analyze-report")
 async def analyze_report(request: DocumentAnalysisRequest, background_tasks: BackgroundTasks):
     """Analyze uploaded medical report using Gemini AI"""
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Supabase not connected"
+        )
+    
     try:
-        logger.info(f"🔍 Analyzing report {request.report_id} for mother {request.mother_id}")
-        
-        if not supabase:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Supabase not connected"
-            )
-        
-        # Get mother data
-        mother_result = supabase.table("mothers").select("*").eq("id", request.mother_id).execute()
-        
-        if not mother_result.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Mother not found"
-            )
-        
-        mother_data = mother_result.data[0]
-        
-        # Update report status to processing
-        supabase.table("medical_reports").update({
-            "analysis_status": "processing"
-        }).eq("id", request.report_id).execute()
-        
-        # Perform Gemini AI analysis
-        analysis_result = analyze_document_with_gemini(
+        return await run_report_analysis(
+            request.report_id,
+            request.mother_id,
             request.file_url,
-            request.file_type,
-            mother_data
+            request.file_type
+        )
+    except MotherNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Mother not found"
         )
-        
-        # Update report with analysis results
-        update_data = {
-            "analysis_status": analysis_result.get("status", "completed"),
-            "analysis_result": analysis_result,
-            "analyzed_at": datetime.now().isoformat()
-        }
-        
-        # Extract key metrics if available
-        extracted_data = analysis_result.get("extracted_data", {})
-        if extracted_data:
-            update_data["extracted_metrics"] = extracted_data
-        
-        # Update medical_reports table
-        report_update = supabase.table("medical_reports").update(update_data).eq("id", request.report_id).execute()
-        
-        logger.info(f"✅ Report analysis completed: {analysis_result.get('status')}")
-        
-        # Check for high-risk concerns and send alerts
-        concerns = analysis_result.get("concerns", [])
-        risk_level = analysis_result.get("risk_level", "normal")
-        
-        # Send Telegram notification if high risk
-        if (risk_level in ["high", "moderate"] or concerns) and mother_data.get("telegram_chat_id"):
-            try:
-                # Import telegram service
-                from services.telegram_service import telegram_service
-                
-                concerns_text = "\n".join([f"• {c}" for c in concerns[:3]]) if concerns else "None"
-                recommendations_text = "\n".join([f"• {r}" for r in analysis_result.get("recommendations", [])[:3]])
-                
-                message = (
-                    f"🔍 *Report Analysis Complete*\n\n"
-                    f"📊 Risk Level: *{risk_level.upper()}*\n\n"
-                )
-                
-                if concerns:
-                    message += f"⚠️ *Concerns:*\n{concerns_text}\n\n"
-                
-                if recommendations_text:
-                    message += f"💡 *Recommendations:*\n{recommendations_text}\n\n"
-                
-                message += "Please consult with your healthcare provider for detailed guidance."
-                
-                telegram_service.send_message(
-                    chat_id=mother_data["telegram_chat_id"],
-                    message=message
-                )
-                logger.info("✅ Alert sent to Telegram")
-            except Exception as telegram_error:
-                logger.error(f"⚠️  Telegram notification failed: {telegram_error}")
-        
-        return {
-            "success": True,
-            "message": "Report analyzed successfully",
-            "status": analysis_result.get("status"),
-            "risk_level": analysis_result.get("risk_level"),
-            "concerns": analysis_result.get("concerns", []),
-            "recommendations": analysis_result.get("recommendations", []),
-            "analysis": analysis_result
-        }
-    
     except Exception as e:
-        logger.error(f"❌ Report analysis error: {e}", exc_info=True)
-        
-        # Update status to error
-        if supabase:
-            supabase.table("medical_reports").update({
-                "analysis_status": "error",
-                "error_message": str(e)
-            }).eq("id", request.report_id).execute()
-        
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Analysis failed: {str(e)}"
@@ -1182,86 +1036,23 @@ async def upload_report(
         report_id = result.data[0]["id"]
         logger.info(f"✅ Report record created: {report_id}")
         
-        # Trigger AI analysis in background
-        def run_ai_analysis():
+        # Trigger AI analysis in background (same in-process path as the bot),
+        # reusing the uploaded bytes instead of downloading the file again
+        async def run_ai_analysis():
+            logger.info(f"🤖 Starting AI analysis for report {report_id}...")
             try:
-                logger.info(f"🤖 Starting AI analysis for report {report_id}...")
-                
-                # Perform Gemini AI analysis
-                analysis_result = analyze_document_with_gemini(
+                await run_report_analysis(
+                    report_id,
+                    mother_id,
                     file_url,
                     content_type,
-                    mother_data
+                    file_bytes=file_contents,
+                    file_name=original_filename,
+                    notify_always=True
                 )
-                
-                # Update report with analysis results
-                update_data = {
-                    "analysis_status": analysis_result.get("status", "completed"),
-                    "analysis_result": analysis_result,
-                    "analyzed_at": datetime.now().isoformat()
-                }
-                
-                # Extract key metrics if available
-                extracted_data = analysis_result.get("extracted_data", {})
-                if extracted_data:
-                    update_data["extracted_metrics"] = extracted_data
-                
-                # Update medical_reports table
-                supabase.table("medical_reports").update(update_data).eq("id", report_id).execute()
-                
-                logger.info(f"✅ Report analysis completed: {analysis_result.get('status')} - Risk: {analysis_result.get('risk_level', 'N/A')}")
-                
-                # Send Telegram notification if available
-                concerns = analysis_result.get("concerns", [])
-                risk_level = analysis_result.get("risk_level", "normal")
-                
-                if telegram_chat_id:
-                    try:
-                        from services.telegram_service import telegram_service
-                        import html
-                        
-                        # Escape HTML special characters in AI-generated text
-                        def escape_text(text):
-                            if not text:
-                                return ""
-                            return html.escape(str(text))
-                        
-                        concerns_text = "\n".join([f"• {escape_text(c)}" for c in concerns[:3]]) if concerns else "None identified"
-                        recommendations_list = analysis_result.get("recommendations", [])[:3]
-                        recommendations_text = "\n".join([f"• {escape_text(r)}" for r in recommendations_list]) if recommendations_list else ""
-                        
-                        risk_emoji = "🔴" if risk_level == "high" else ("🟡" if risk_level == "moderate" else "🟢")
-                        safe_filename = escape_text(original_filename)
-                        
-                        message = (
-                            f"📄 <b>Document Analysis Complete</b>\n\n"
-                            f"📋 File: {safe_filename}\n"
-                            f"{risk_emoji} Risk Level: <b>{risk_level.upper()}</b>\n\n"
-                        )
-                        
-                        if concerns:
-                            message += f"⚠️ <b>Concerns:</b>\n{concerns_text}\n\n"
-                        
-                        if recommendations_text:
-                            message += f"💡 <b>Recommendations:</b>\n{recommendations_text}\n\n"
-                        
-                        message += "Please consult with your healthcare provider for detailed guidance."
-                        
-                        telegram_service.send_message(
-                            chat_id=telegram_chat_id,
-                            message=message
-                        )
-                        logger.info("✅ Analysis result sent to Telegram")
-                    except Exception as telegram_error:
-                        logger.error(f"⚠️  Telegram notification failed: {telegram_error}")
-                        
             except Exception as analysis_error:
-                logger.error(f"❌ AI Analysis failed: {analysis_error}", exc_info=True)
-                # Update status to error
-                supabase.table("medical_reports").update({
-                    "analysis_status": "error",
-                    "error_message": str(analysis_error)
-                }).eq("id", report_id).execute()
+                # analyze_report has already marked the report as failed
+                logger.error(f"❌ AI Analysis failed: {analysis_error}")
         
         # Add analysis to background tasks
         background_tasks.add_task(run_ai_analysis)
@@ -1311,6 +1102,39 @@ def get_mother_reports(mother_id: str):  # Changed from int to str
         )
 
 
+@app.get("/reports/{report_id}/file")
+def get_report_file(report_id: str):
+    """Serve a report file kept in the blob store (Telegram uploads)"""
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Supabase not connected"
+        )
+    
+    result = supabase.table("medical_reports").select("file_url, file_name, file_type").eq("id", report_id).execute()
+    if not result.data or not is_blob_url(result.data[0].get("file_url")):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No stored file for report {report_id}"
+        )
+    
+    report = result.data[0]
+    try:
+        path = local_blob_path(report["file_url"])
+    except BlobStorageError as e:
+        logger.error(f"❌ Could not load report file {report_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report file could not be retrieved from storage"
+        )
+    return FileResponse(
+        path,
+        media_type=normalize_file_type(report.get("file_type")),
+        filename=report.get("file_name") or None,
+        content_disposition_type="inline",
+    )
+
+
 @app.get("/reports/telegram/{telegram_chat_id}")
 def get_reports_by_telegram(telegram_chat_id: str):
     """Get all reports for a Telegram user"""
@@ -1360,8 +1184,9 @@ def delete_report(report_id: str):
         report = report_result.data[0]
         file_path = report.get("file_path")
         
-        # Try to delete from storage if file_path exists
-        if file_path and not file_path.startswith("data:"):
+        # Try to delete from storage if file_path exists (blob:// files are
+        # content-addressed and may back other reports, so they are kept)
+        if file_path and not file_path.startswith("data:") and not is_blob_url(file_path):
             try:
                 supabase.storage.from_("medical-reports").remove([file_path])
                 logger.info(f"✅ File removed from storage: {file_path}")
@@ -1373,6 +1198,9 @@ def delete_report(report_id: str):
         
         logger.info(f"✅ Report deleted: {report_id}")
         
+        if report.get("mother_id"):
+            refresh_digest(report["mother_id"])
+        
         return {
             "success": True,
             "message": "Report deleted successfully",
@@ -1393,6 +1221,7 @@ def delete_report(report_id: str):
 @app.post("/risk/assess")
 async def assess_risk(assessment: RiskAssessment, background_tasks: BackgroundTasks):
     """Assess pregnancy risk for a mother"""
+    received_at = datetime.now(timezone.utc)
     try:
         logger.info(f"⚠️ Assessing risk for mother: {assessment.mother_id}")
         
@@ -1439,19 +1268,26 @@ async def assess_risk(assessment: RiskAssessment, background_tasks: BackgroundTa
         result = supabase.table("risk_assessments").insert(insert_data).execute()
         logger.info(f"✅ Risk assessment saved: {risk_calculation['risk_level']}")
         
-        # Send alert if high risk
+        # Send alert if high risk (emergency priority lane, not the bulk queues)
         if risk_calculation["risk_level"] == "HIGH" and mother_data.get("telegram_chat_id"):
             try:
-                from services.telegram_service import telegram_service
+                try:
+                    from backend.services.alert_service import send_alert_async
+                except ImportError:
+                    from services.alert_service import send_alert_async
                 
                 risk_factors_text = "\n".join([f"• {rf}" for rf in risk_calculation["risk_factors"]])
                 
-                telegram_service.send_message(
-                    chat_id=mother_data["telegram_chat_id"],
-                    message=f"⚠️ *HIGH RISK ALERT*\n\n"
-                            f"Risk Score: {risk_calculation['risk_score']:.2f}\n\n"
-                            f"*Risk Factors:*\n{risk_factors_text}\n\n"
-                            f"⚕️ Please consult with your healthcare provider immediately."
+                await send_alert_async(
+                    "telegram",
+                    mother_data["telegram_chat_id"],
+                    f"⚠️ <b>HIGH RISK ALERT</b>\n\n"
+                    f"Risk Score: {risk_calculation['risk_score']:.2f}\n\n"
+                    f"<b>Risk Factors:</b>\n{risk_factors_text}\n\n"
+                    f"⚕️ Please consult with your healthcare provider immediately.",
+                    source="risk_assessment",
+                    mother_id=assessment.mother_id,
+                    occurred_at=received_at
                 )
             except Exception as telegram_error:
                 logger.error(f"⚠️  Telegram alert failed: {telegram_error}")
@@ -1932,12 +1768,12 @@ async def send_case_discussion(msg: CaseDiscussionMessage):
                         f"💬 Reply to this message to respond."
                     )
                     
-                    result = telegram_service.send_message(
+                    result = await telegram_service.send_message_async(
                         chat_id=chat_id,
                         message=telegram_message
                     )
                     
-                    if result.get("status") == "sent":
+                    if result.get("status") in ("sent", "queued"):
                         telegram_sent = True
                         logger.info(f"✅ Message relayed to Telegram for {mother_name}")
                     else:
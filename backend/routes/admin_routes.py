@@ -3,6 +3,7 @@ MatruRaksha AI - Admin Routes
 Admin-only endpoints for managing doctors, ASHA workers, mothers, and assignments
 """
 
+import asyncio
 import logging
 from typing import Optional, List
 from fastapi import APIRouter, HTTPException, Depends, status
@@ -10,16 +11,18 @@ from pydantic import BaseModel, Field
 
 from services.auth_service import supabase_admin
 from routes.auth_routes import get_current_user, require_admin
-from services.email_service import send_alert_email
+from services.email_service import build_alert_email
+from services.alert_service import send_alert_async
 
 # Import cache service
 try:
-    from services.cache_service import cache, invalidate_dashboard_cache
+    from services.cache_service import cache, invalidate_dashboard_cache, invalidate_telegram_mothers_cache
     CACHE_AVAILABLE = True
 except ImportError:
     CACHE_AVAILABLE = False
     cache = None
     def invalidate_dashboard_cache(): pass
+    def invalidate_telegram_mothers_cache(chat_id=None): pass
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -258,6 +261,7 @@ async def delete_doctor(doctor_id: int, current_user: dict = Depends(require_adm
     try:
         # First unassign all mothers from this doctor
         supabase_admin.table("mothers").update({"doctor_id": None}).eq("doctor_id", doctor_id).execute()
+        invalidate_telegram_mothers_cache()
         
         # Then delete the doctor
         result = supabase_admin.table("doctors").delete().eq("id", doctor_id).execute()
@@ -366,6 +370,7 @@ async def delete_asha_worker(asha_id: int, current_user: dict = Depends(require_
     try:
         # First unassign all mothers from this ASHA worker
         supabase_admin.table("mothers").update({"asha_worker_id": None}).eq("asha_worker_id", asha_id).execute()
+        invalidate_telegram_mothers_cache()
         
         # Then delete the ASHA worker
         result = supabase_admin.table("asha_workers").delete().eq("id", asha_id).execute()
@@ -429,6 +434,8 @@ async def assign_mother_to_asha(mother_id: str, body: AssignAshaRequest, current
         if not result.data:
             raise HTTPException(status_code=404, detail="Mother not found")
         
+        if result.data[0].get("telegram_chat_id"):
+            invalidate_telegram_mothers_cache(result.data[0]["telegram_chat_id"])
         logger.info(f"✅ Assigned mother {mother_id} to ASHA worker {body.asha_worker_id}")
         return {"success": True, "message": "Assignment updated", "mother": result.data[0]}
     except HTTPException:
@@ -449,6 +456,8 @@ async def assign_mother_to_doctor(mother_id: str, body: AssignDoctorRequest, cur
         if not result.data:
             raise HTTPException(status_code=404, detail="Mother not found")
         
+        if result.data[0].get("telegram_chat_id"):
+            invalidate_telegram_mothers_cache(result.data[0]["telegram_chat_id"])
         logger.info(f"✅ Assigned mother {mother_id} to doctor {body.doctor_id}")
         return {"success": True, "message": "Assignment updated", "mother": result.data[0]}
     except HTTPException:
@@ -477,43 +486,42 @@ async def send_mother_alert(mother_id: str, body: SendAlertRequest, current_user
         mother = mother_result.data
         sent_to = []
         
-        # Get ASHA worker details
+        # Get ASHA worker and Doctor details
+        contacts = []
         if mother.get("asha_worker_id"):
             asha_result = supabase_admin.table("asha_workers").select("*").eq("id", mother["asha_worker_id"]).single().execute()
             if asha_result.data and asha_result.data.get("email"):
-                asha = asha_result.data
-                result = send_alert_email(
-                    to_email=asha["email"],
-                    recipient_name=asha.get("name", "ASHA Worker"),
-                    recipient_role="ASHA Worker",
-                    mother_name=mother.get("name", "Mother"),
-                    mother_id=str(mother_id),
-                    mother_phone=mother.get("phone", ""),
-                    location=mother.get("location", ""),
-                    alert_type=body.alert_type
-                )
-                if result.get("status") == "sent":
-                    sent_to.append(f"ASHA: {asha.get('name')} ({asha['email']})")
-                    logger.info(f"✅ Alert email sent to ASHA: {asha['email']}")
-        
-        # Get Doctor details
+                contacts.append((asha_result.data, "ASHA Worker", "ASHA"))
         if mother.get("doctor_id"):
             doctor_result = supabase_admin.table("doctors").select("*").eq("id", mother["doctor_id"]).single().execute()
             if doctor_result.data and doctor_result.data.get("email"):
-                doctor = doctor_result.data
-                result = send_alert_email(
-                    to_email=doctor["email"],
-                    recipient_name=doctor.get("name", "Doctor"),
-                    recipient_role="Doctor",
-                    mother_name=mother.get("name", "Mother"),
-                    mother_id=str(mother_id),
-                    mother_phone=mother.get("phone", ""),
-                    location=mother.get("location", ""),
-                    alert_type=body.alert_type
-                )
-                if result.get("status") == "sent":
-                    sent_to.append(f"Doctor: {doctor.get('name')} ({doctor['email']})")
-                    logger.info(f"✅ Alert email sent to Doctor: {doctor['email']}")
+                contacts.append((doctor_result.data, "Doctor", "Doctor"))
+        
+        # Sent on the emergency lane: recorded in the outbox and retried if the provider fails
+        sends = []
+        for contact, role, _ in contacts:
+            subject, body_html, body_text = build_alert_email(
+                to_email=contact["email"],
+                recipient_name=contact.get("name", role),
+                recipient_role=role,
+                mother_name=mother.get("name", "Mother"),
+                mother_id=str(mother_id),
+                mother_phone=mother.get("phone", ""),
+                location=mother.get("location", ""),
+                alert_type=body.alert_type
+            )
+            sends.append(send_alert_async(
+                "email", contact["email"], body_text,
+                source="admin_alert",
+                mother_id=mother_id,
+                subject=subject,
+                html=body_html
+            ))
+        
+        for (contact, _, label), result in zip(contacts, await asyncio.gather(*sends)):
+            if result.get("status") == "sent":
+                sent_to.append(f"{label}: {contact.get('name')} ({contact['email']})")
+                logger.info(f"✅ Alert email sent to {label}: {contact['email']}")
         
         if sent_to:
             return {"success": True, "message": f"Alerts sent to: {', '.join(sent_to)}", "sent_to": sent_to}
@@ -525,3 +533,77 @@ async def send_mother_alert(mother_id: str, body: SendAlertRequest, current_user
     except Exception as e:
         logger.error(f"❌ Send alert error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
+
+
+# ==================== Report Re-analysis ====================
+
+class ReanalyzeReportsRequest(BaseModel):
+    run_id: Optional[str] = None  # pass an existing run_id to resume it
+    page_size: int = Field(50, ge=1, le=500)
+    max_reports: Optional[int] = Field(None, ge=1)
+
+
+# Keep references so background runs are not garbage-collected mid-flight
+_reanalysis_tasks = {}
+
+
+@router.post("/reports/reanalyze")
+async def start_report_reanalysis(body: ReanalyzeReportsRequest, current_user: dict = Depends(require_admin)):
+    """Start (or resume) a batch re-analysis of stored medical reports"""
+    from services.report_reanalysis_service import run_reanalysis, start_run
+    
+    try:
+        run = await asyncio.to_thread(start_run, body.run_id)
+        run_id = run["run_id"]
+        
+        existing = _reanalysis_tasks.get(run_id)
+        if existing and not existing.done():
+            return {"success": True, "message": "Re-analysis already running", "run": run}
+        
+        task = asyncio.create_task(run_reanalysis(run_id, body.page_size, body.max_reports))
+        _reanalysis_tasks[run_id] = task
+        task.add_done_callback(lambda _t: _reanalysis_tasks.pop(run_id, None))
+        
+        logger.info(f"📦 Report re-analysis {run_id} started by {current_user.get('email')}")
+        return {"success": True, "message": "Re-analysis started", "run": run}
+    except Exception as e:
+        logger.error(f"❌ Start re-analysis error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/reports/reanalyze/{run_id}")
+async def get_report_reanalysis(run_id: str, current_user: dict = Depends(require_admin)):
+    """Get progress of a re-analysis run"""
+    from services.report_reanalysis_service import load_run
+    
+    run = await asyncio.to_thread(load_run, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Re-analysis run not found")
+    return {"success": True, "run": run, "active": run_id in _reanalysis_tasks}
+
+
+@router.get("/metrics/alerts")
+async def get_alert_latency(current_user: dict = Depends(require_admin)):
+    """Emergency alert delivery latency (p50/p95/p99) and SLO compliance"""
+    from services.alert_service import alert_latency_report
+    
+    return {"success": True, "alert_latency": alert_latency_report()}
+
+
+@router.get("/metrics/telegram")
+async def get_telegram_update_metrics(current_user: dict = Depends(require_admin)):
+    """Webhook update queue depth, processing latency, outbound send latency (p50/p95/p99) and chat log buffers"""
+    from services.telegram_update_queue import update_queue_report
+    from services.write_buffer import table_writer_report
+    from utils import metrics
+    
+    return {
+        "success": True,
+        "telegram_updates": update_queue_report(),
+        "telegram_sends": {
+            "api_call": metrics.summarize("telegram.api.send_seconds"),
+            "service_call": metrics.summarize("telegram.service.send_seconds"),
+            "limiter_wait": metrics.summarize("telegram.limiter.wait_seconds"),
+        },
+        "chat_log_buffers": table_writer_report(),
+    }
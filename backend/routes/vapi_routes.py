@@ -6,12 +6,17 @@ Handles AI calling agent for automated maternal health check-in calls
 from fastapi import APIRouter, HTTPException, Request, BackgroundTasks
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
 import os
 import requests
 import json
 
+try:
+    from backend.services.alert_service import send_alert_async
+except ImportError:
+    from services.alert_service import send_alert_async
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/vapi", tags=["Vapi AI Calls"])
@@ -20,7 +25,6 @@ router = APIRouter(prefix="/vapi", tags=["Vapi AI Calls"])
 VAPI_API_KEY = os.getenv("VAPI_API_KEY", "")
 VAPI_ASSISTANT_ID = os.getenv("VAPI_ASSISTANT_ID", "")
 VAPI_PHONE_NUMBER_ID = os.getenv("VAPI_PHONE_NUMBER_ID", "")
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 
 # Vapi API Base URL
 VAPI_BASE_URL = "https://api.vapi.ai"
@@ -106,25 +110,6 @@ def analyze_transcript_for_symptoms(transcript_text: str) -> Dict[str, Any]:
     }
 
 
-def send_telegram_alert(chat_id: str, message: str) -> bool:
-    """Send Telegram alert for high-risk symptoms detected"""
-    if not TELEGRAM_BOT_TOKEN or not chat_id:
-        logger.warning("⚠️ Telegram alert skipped - missing credentials")
-        return False
-    
-    try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-        response = requests.post(url, json={
-            "chat_id": chat_id,
-            "text": message,
-            "parse_mode": "HTML"
-        }, timeout=10)
-        return response.status_code == 200
-    except Exception as e:
-        logger.error(f"❌ Telegram error: {e}")
-        return False
-
-
 # ==================== API ENDPOINTS ====================
 
 @router.post("/webhook")
@@ -191,6 +176,8 @@ async def handle_end_of_call(message: Dict) -> Dict:
     logger.info(f"📞 Call ended: {call_id}, Duration: {duration}s")
     logger.info(f"📝 Transcript: {transcript[:200]}..." if transcript else "No transcript")
     
+    received_at = datetime.now(timezone.utc)
+    
     # Analyze for symptoms
     analysis = analyze_transcript_for_symptoms(transcript)
     logger.info(f"🔍 Risk Analysis: {analysis['risk_level']}")
@@ -213,7 +200,16 @@ async def handle_end_of_call(message: Dict) -> Dict:
                 f"⚕️ Please consult with your doctor or ASHA worker.\n"
                 f"📞 If you feel unwell, visit the nearest health center."
             )
-            send_telegram_alert(telegram_chat_id, alert_message)
+            # Emergency lane; keyed by call id so a redelivered webhook doesn't alert twice
+            await send_alert_async(
+                "telegram",
+                telegram_chat_id,
+                alert_message,
+                source="vapi_call",
+                mother_id=metadata.get("mother_id"),
+                occurred_at=received_at,
+                dedup_key=f"alert:vapi_call:{call_id}:telegram"
+            )
     
     # Store call record in database
     # TODO: Implement with Supabase
@@ -1,19 +1,27 @@
 """
 Working Scheduler with Telegram Integration
 Save as: backend/scheduler.py
-Run: python scheduler.py
+Run: python scheduler.py  (or set SCHEDULER_IN_APP=true to run inside the API lifespan)
 """
 
-import schedule
-import time
-import requests
+import asyncio
 from datetime import datetime, timedelta
 import logging
 import os
 from dotenv import load_dotenv
 from supabase import create_client
-from services.sms_service import send_sms
 from services.email_service import send_alert_email
+from services.http_client import get_sync_client
+from services.broadcast_service import run_dispatch
+from services.outbox_service import (
+    outbox_available, outbox_row, enqueue_many, deliver_outbox, make_dedup_key,
+    start_outbox_worker, stop_outbox_worker, outbox_worker_running
+)
+from services.cohort_service import iter_cohort, iter_week_cohorts, COHORT_PAGE_SIZE
+from services.job_runner import JobRunner, default_job_store, current_shard
+from services.lease_service import default_lease_store, SCHEDULER_REPLICAS
+from services.message_templates import render
+from services.assessment_service import latest_risk_levels
 
 # Load environment variables
 load_dotenv()
@@ -25,13 +33,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Configuration - use BACKEND_URL for production
-API_BASE = (os.getenv("BACKEND_URL") or os.getenv("API_BASE") or "http://localhost:8000").strip().rstrip('/')
+# Configuration
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 db = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
+# (index, count) when SCHEDULER_SHARD_COUNT > 1: this replica's slice of the cohort
+SHARD = current_shard()
 
 
 # ==================== TELEGRAM FUNCTIONS ====================
@@ -48,7 +57,7 @@ def send_telegram_message(chat_id: str, message: str):
             "parse_mode": "HTML"
         }
         
-        response = requests.post(url, json=payload, timeout=10)
+        response = get_sync_client().post(url, json=payload, timeout=10)
         
         if response.status_code == 200:
             logger.info(f"✅ Telegram message sent to {chat_id}")
@@ -63,29 +72,87 @@ def send_telegram_message(chat_id: str, message: str):
 
 def get_all_mothers():
     """
-    Get all mothers from API
+    Get all mothers (id, name, chat id, registration date) directly from the database
     """
     try:
-        response = requests.get(f"{API_BASE}/mothers", timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get("data", [])
-        else:
-            logger.error(f"Failed to fetch mothers: {response.text}")
-            return []
+        return list(iter_cohort(require_chat_id=False, client=db))
     except Exception as e:
         logger.error(f"Error fetching mothers: {str(e)}")
         return []
 
+
+def iter_telegram_mothers(**filters):
+    """
+    Stream mothers with a Telegram chat id, filtered server-side
+    (min_week / max_week / languages, see services.cohort_service.iter_cohort)
+    """
+    return iter_cohort(require_chat_id=True, client=db, shard=SHARD, **filters)
+
+
+def send_notifications(notifications, job_name: str):
+    """
+    Write notifications to the outbox (deduplicated per mother/template/day).
+    The standing outbox worker delivers and retries them; without one (test
+    mode) everything due is drained here. Falls back to direct dispatch if the
+    outbox table is not installed.
+
+    notifications: iterable of {"mother_id", "template", "channel", "to", "text"}
+    Returns {"queued"} or, when sent here, {"sent", "failed", ...}
+    """
+    if not outbox_available(db):
+        logger.warning(f"⚠️  Outbox table not found; {job_name} sending directly")
+        return run_dispatch(notifications, job_name=job_name)
+    
+    today = datetime.now().date()
+    rows = (
+        outbox_row(
+            n["channel"], n["to"], n["text"],
+            make_dedup_key(n.get("mother_id"), n["template"], today, n["channel"]),
+            mother_id=n.get("mother_id"),
+            template=n["template"]
+        )
+        for n in notifications
+    )
+    enqueued = enqueue_many(rows, client=db)
+    logger.info(f"📮 {job_name}: {enqueued} messages queued in outbox")
+    if outbox_worker_running():
+        return {"queued": enqueued}
+    return deliver_outbox(client=db)
+
+
+def describe_result(result) -> str:
+    """Log summary for a send_notifications result"""
+    if "queued" in result:
+        return f"{result['queued']} queued"
+    return f"{result.get('sent', 0)} sent, {result.get('failed', 0)} failed"
+
+
+def send_telegram_broadcast(template: str, messages):
+    """Queue and deliver (mother, text) pairs as Telegram messages"""
+    return send_notifications(
+        (
+            {
+                "mother_id": mother.get("id"),
+                "template": template,
+                "channel": "telegram",
+                "to": mother["telegram_chat_id"],
+                "text": text
+            }
+            for mother, text in messages
+        ),
+        template
+    )
+
+
 def get_appointments_between(start_dt: datetime, end_dt: datetime):
     try:
         if not db:
             return []
-        res = db.table("appointments").select("*", count="exact").gte("appointment_date", start_dt.isoformat()).lte("appointment_date", end_dt.isoformat()).eq("status", "scheduled").order("appointment_date", desc=False).execute()
+        res = db.table("appointments").select("*").gte("appointment_date", start_dt.isoformat()).lte("appointment_date", end_dt.isoformat()).eq("status", "scheduled").order("appointment_date", desc=False).execute()
         return res.data or []
     except Exception as e:
         logger.error(f"Error fetching appointments: {str(e)}")
-        return []
+        raise
 
 
 def calculate_pregnancy_week(registration_date: str) -> int:
@@ -94,7 +161,8 @@ def calculate_pregnancy_week(registration_date: str) -> int:
         if not registration_date:
             return 20
         reg_date = datetime.fromisoformat(registration_date.replace('Z', '+00:00'))
-        days_since = (datetime.now() - reg_date).days
+        # Supabase timestamps are tz-aware; compare in the same timezone
+        days_since = (datetime.now(reg_date.tzinfo) - reg_date).days
         return 8 + (days_since // 7)  # Assume registered at week 8
     except:
         return 20
@@ -112,57 +180,23 @@ def send_daily_reminders():
         logger.info("📱 SENDING DAILY REMINDERS")
         logger.info("=" * 60)
         
-        mothers = get_all_mothers()
-        
-        if not mothers:
-            logger.warning("No mothers found in database")
-            return
-        
-        telegram_mothers = [m for m in mothers if m.get('telegram_chat_id')]
-        
-        logger.info(f"Found {len(telegram_mothers)} mothers with Telegram")
-        
-        sent_count = 0
-        failed_count = 0
-        
-        for mother in telegram_mothers:
-            try:
-                chat_id = mother['telegram_chat_id']
+        def messages():
+            for mother in iter_telegram_mothers():
                 name = mother.get('name', 'Mother')
                 week = calculate_pregnancy_week(mother.get('created_at'))
-                
-                message = (
-                    f"🌅 <b>Good Morning, {name}!</b>\n\n"
-                    f"Week {week} of your pregnancy journey! 🤰\n\n"
-                    f"📋 <b>Today's Reminders:</b>\n"
-                    f"• Take your prenatal vitamins 💊\n"
-                    f"• Drink 8 glasses of water 💧\n"
-                    f"• Monitor baby movements 👶\n"
-                    f"• Do your daily check-in: /checkin\n\n"
-                    f"How are you feeling today? 💚"
-                )
-                
-                if send_telegram_message(chat_id, message):
-                    sent_count += 1
-                    logger.info(f"  ✅ Sent to {name} (Week {week})")
-                else:
-                    failed_count += 1
-                    logger.error(f"  ❌ Failed to send to {name}")
-                
-                # Space out messages to avoid rate limiting
-                time.sleep(2)
-                
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"  ❌ Error sending to {mother.get('name', 'Unknown')}: {str(e)}")
+                yield mother, render("daily_reminder", mother.get("preferred_language"), name=name, week=week)
+        
+        result = send_telegram_broadcast("daily_reminder", messages())
         
         logger.info("-" * 60)
-        logger.info(f"✅ Daily reminders complete: {sent_count} sent, {failed_count} failed")
+        logger.info(f"✅ Daily reminders complete: {describe_result(result)}")
         logger.info("=" * 60)
         logger.info("")
+        return result
         
     except Exception as e:
         logger.error(f"❌ Error in daily reminders: {str(e)}", exc_info=True)
+        raise
 
 
 def send_medication_reminders(time_of_day: str):
@@ -175,70 +209,39 @@ def send_medication_reminders(time_of_day: str):
         logger.info(f"💊 SENDING {time_of_day.upper()} MEDICATION REMINDERS")
         logger.info("=" * 60)
         
-        mothers = get_all_mothers()
-        telegram_mothers = [m for m in mothers if m.get('telegram_chat_id')]
-        
-        logger.info(f"Found {len(telegram_mothers)} mothers with Telegram")
-        
-        sent_count = 0
-        
-        # Determine which medications for this time
-        if time_of_day == "morning":
-            meds = ["Folic Acid (5mg)", "Iron supplement (if prescribed)"]
-            time_emoji = "☀️"
-        else:
-            meds = ["Calcium (500mg)"]
-            time_emoji = "🌙"
+        template = f"medication_{time_of_day}"
         
-        for mother in telegram_mothers:
-            try:
-                chat_id = mother['telegram_chat_id']
+        def messages():
+            for mother in iter_telegram_mothers():
                 name = mother.get('name', 'Mother')
-                
-                meds_list = "\n".join([f"• {med}" for med in meds])
-                
-                message = (
-                    f"{time_emoji} <b>{time_of_day.title()} Medication Reminder</b>\n\n"
-                    f"Hi {name}! Time to take your medications:\n\n"
-                    f"{meds_list}\n\n"
-                    f"💡 <b>Tips:</b>\n"
-                    f"• Take with food\n"
-                    f"• Drink plenty of water\n"
-                    f"• Take iron 2 hours apart from calcium\n\n"
-                    f"Reply with /checkin to log your medications! 💚"
-                )
-                
-                if send_telegram_message(chat_id, message):
-                    sent_count += 1
-                    logger.info(f"  ✅ Sent to {name}")
-                
-                time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"  ❌ Error: {str(e)}")
+                yield mother, render(template, mother.get("preferred_language"), name=name)
+        
+        result = send_telegram_broadcast(template, messages())
         
         logger.info("-" * 60)
-        logger.info(f"✅ Medication reminders complete: {sent_count} sent")
+        logger.info(f"✅ Medication reminders complete: {describe_result(result)}")
         logger.info("=" * 60)
         logger.info("")
+        return result
         
     except Exception as e:
         logger.error(f"❌ Error in medication reminders: {str(e)}")
+        raise
 
 
 def send_medication_reminders_morning():
     """Morning medication reminders - 9:00 AM"""
-    send_medication_reminders("morning")
+    return send_medication_reminders("morning")
 
 
 def send_medication_reminders_evening():
     """Evening medication reminders - 6:00 PM"""
-    send_medication_reminders("evening")
+    return send_medication_reminders("evening")
 
 
 def run_weekly_assessments():
     """
-    Run weekly automated assessments for all mothers
+    Send each Telegram-registered mother her weekly risk report, in one broadcast
     Schedule: Every Monday at 9:00 AM
     """
     try:
@@ -246,68 +249,58 @@ def run_weekly_assessments():
         logger.info("📊 RUNNING WEEKLY ASSESSMENTS")
         logger.info("=" * 60)
         
-        mothers = get_all_mothers()
-        
-        logger.info(f"Processing {len(mothers)} mothers...")
+        counts = {"assessed": 0, "failed": 0}
+        next_date = (datetime.now() + timedelta(days=7)).strftime('%B %d')
         
-        for mother in mothers:
+        def reports(page):
+            # One risk_assessments query per page of mothers
             try:
-                mother_id = mother['id']
-                name = mother['name']
-                chat_id = mother.get('telegram_chat_id')
-                week = calculate_pregnancy_week(mother.get('created_at'))
-                
-                logger.info(f"  📊 Assessing {name} (Week {week})...")
-                
-                # Call the weekly assessment endpoint
-                response = requests.post(
-                    f"{API_BASE}/mothers/{mother_id}/weekly-assessment",
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    logger.info(f"    ✅ Assessment completed for {name}")
-                    
-                    # Send weekly report via Telegram
-                    if chat_id:
-                        result = response.json()
-                        risk_level = result.get("assessment", {}).get("risk_assessment", {}).get("risk_level", "low")
-                        
-                        risk_emoji = {
-                            "critical": "🔴",
-                            "high": "🟠",
-                            "medium": "🟡",
-                            "low": "🟢"
-                        }.get(risk_level, "🟢")
-                        
-                        report_message = (
-                            f"{risk_emoji} <b>Weekly Health Report - Week {week}</b>\n\n"
-                            f"📊 <b>Current Status:</b> {risk_level.upper()}\n\n"
-                            f"📋 <b>This Week's Focus:</b>\n"
-                            f"• Continue prenatal vitamins\n"
-                            f"• Monitor baby movements daily\n"
-                            f"• Stay well hydrated (8 glasses)\n"
-                            f"• Get adequate rest\n\n"
-                            f"📅 <b>Next Assessment:</b> {(datetime.now() + timedelta(days=7)).strftime('%B %d')}\n\n"
-                            f"💚 Keep up the great work!"
-                        )
-                        
-                        send_telegram_message(chat_id, report_message)
-                else:
-                    logger.error(f"    ❌ Failed for {name}: {response.text}")
-                
-                time.sleep(5)  # Space out requests
-                
+                levels = latest_risk_levels([m['id'] for m in page], client=db)
             except Exception as e:
-                logger.error(f"  ❌ Error assessing {mother.get('name', 'Unknown')}: {str(e)}")
+                counts["failed"] += len(page)
+                logger.error(f"  ❌ Error assessing {len(page)} mothers: {str(e)}")
+                return
+            counts["assessed"] += len(page)
+            for mother in page:
+                risk_level = levels.get(str(mother['id']), "low")
+                risk_emoji = {
+                    "critical": "🔴",
+                    "high": "🟠",
+                    "moderate": "🟡",
+                    "medium": "🟡",
+                    "low": "🟢"
+                }.get(risk_level, "🟢")
+                yield mother, render(
+                    "weekly_assessment",
+                    mother.get("preferred_language"),
+                    risk_emoji=risk_emoji,
+                    week=calculate_pregnancy_week(mother.get('created_at')),
+                    risk_level=risk_level.upper(),
+                    next_date=next_date,
+                )
+        
+        def messages():
+            page = []
+            for mother in iter_telegram_mothers():
+                page.append(mother)
+                if len(page) >= COHORT_PAGE_SIZE:
+                    yield from reports(page)
+                    page = []
+            if page:
+                yield from reports(page)
+        
+        delivery = send_telegram_broadcast("weekly_assessment", messages())
+        result = {**delivery, "assessed": counts["assessed"], "failed": counts["failed"] + delivery.get("failed", 0)}
         
         logger.info("-" * 60)
-        logger.info(f"✅ Weekly assessments completed")
+        logger.info(f"✅ Weekly assessments completed: {counts['assessed']} assessed, {counts['failed']} failed; {describe_result(delivery)}")
         logger.info("=" * 60)
         logger.info("")
+        return result
         
     except Exception as e:
         logger.error(f"❌ Error in weekly assessments: {str(e)}", exc_info=True)
+        raise
 
 
 def check_milestone_reminders():
@@ -320,56 +313,86 @@ def check_milestone_reminders():
         logger.info("📅 CHECKING MILESTONE REMINDERS")
         logger.info("=" * 60)
         
-        mothers = get_all_mothers()
-        telegram_mothers = [m for m in mothers if m.get('telegram_chat_id')]
-        
-        milestone_weeks = {
-            12: "First trimester screening",
-            20: "Anatomy scan (mid-pregnancy ultrasound)",
-            24: "Glucose screening test",
-            28: "Third trimester begins",
-            32: "Growth scan",
-            36: "Group B strep test & birth plan discussion",
-            37: "Full term - baby can arrive anytime!",
-            40: "Due date week!"
-        }
-        
-        sent_count = 0
+        # Descriptions live in message_templates as milestone_<week>
+        milestone_weeks = (12, 20, 24, 28, 32, 36, 37, 40)
         
-        for mother in telegram_mothers:
-            try:
-                week = calculate_pregnancy_week(mother.get('created_at'))
-                chat_id = mother['telegram_chat_id']
+        def messages():
+            # One created_at range query per milestone week - only matching mothers are read
+            for week, mother in iter_week_cohorts(milestone_weeks, require_chat_id=True, client=db, shard=SHARD):
                 name = mother.get('name', 'Mother')
-                
-                # Check if current week is a milestone
-                if week in milestone_weeks:
-                    milestone = milestone_weeks[week]
-                    
-                    message = (
-                        f"🎯 <b>Milestone Alert - Week {week}!</b>\n\n"
-                        f"Hi {name}! You've reached an important milestone:\n\n"
-                        f"📌 <b>{milestone}</b>\n\n"
-                        f"Please schedule this with your healthcare provider if not done yet.\n\n"
-                        f"Need help? Just ask! 💚"
-                    )
-                    
-                    if send_telegram_message(chat_id, message):
-                        sent_count += 1
-                        logger.info(f"  ✅ Milestone reminder sent to {name} (Week {week})")
-                
-                time.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"  ❌ Error: {str(e)}")
+                language = mother.get("preferred_language")
+                yield mother, render(
+                    "milestone_reminder",
+                    language,
+                    name=name,
+                    week=week,
+                    milestone=render(f"milestone_{week}", language),
+                )
+        
+        result = send_telegram_broadcast("milestone_reminder", messages())
         
         logger.info("-" * 60)
-        logger.info(f"✅ Milestone check complete: {sent_count} reminders sent")
+        logger.info(f"✅ Milestone check complete: {describe_result(result)}")
         logger.info("=" * 60)
         logger.info("")
+        return result
         
     except Exception as e:
         logger.error(f"❌ Error checking milestones: {str(e)}")
+        raise
+
+def get_mothers_by_ids(mother_ids, chunk_size: int = 200):
+    """
+    Resolve many mothers in a few in_() queries instead of one query per appointment
+    """
+    mothers = {}
+    ids = list({m for m in mother_ids if m is not None})
+    if not db or not ids:
+        return mothers
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        rows = db.table("mothers").select("id, name, phone, telegram_chat_id, preferred_language").in_("id", chunk).execute().data or []
+        for row in rows:
+            mothers[str(row["id"])] = row
+    return mothers
+
+
+def _send_appointment_reminders(start_dt: datetime, end_dt: datetime, day_label: str, job_name: str):
+    """Build Telegram + SMS reminders for a window's appointments and dispatch them concurrently"""
+    appts = get_appointments_between(start_dt, end_dt)
+    mothers = get_mothers_by_ids([ap.get("mother_id") for ap in appts])
+    logger.info(f"Found {len(appts)} appointments for {len(mothers)} mothers")
+    
+    notifications = []
+    for ap in appts:
+        mother = mothers.get(str(ap.get("mother_id")), {})
+        phone = mother.get("phone")
+        chat_id = mother.get("telegram_chat_id")
+        facility = ap.get("facility") or ap.get("appointment_location") or "Clinic"
+        adt = datetime.fromisoformat(ap.get("appointment_date"))
+        language = mother.get("preferred_language")
+        msg = render(f"appointment_sms_{day_label}", language, time=adt.strftime('%I:%M %p'), facility=facility)
+        # One reminder per appointment per channel per day, however often the job reruns
+        template = f"{job_name}:{ap.get('id')}"
+        if chat_id:
+            notifications.append({
+                "mother_id": ap.get("mother_id"),
+                "template": template,
+                "channel": "telegram",
+                "to": str(chat_id),
+                "text": render(f"appointment_telegram_{day_label}", language, message=msg)
+            })
+        if phone:
+            notifications.append({
+                "mother_id": ap.get("mother_id"),
+                "template": template,
+                "channel": "sms",
+                "to": str(phone),
+                "text": msg
+            })
+    
+    return send_notifications(notifications, job_name)
+
 
 def send_next_day_appointment_reminders():
     try:
@@ -379,26 +402,13 @@ def send_next_day_appointment_reminders():
         now = datetime.now()
         start_dt = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
         end_dt = start_dt.replace(hour=23, minute=59, second=59)
-        appts = get_appointments_between(start_dt, end_dt)
-        for ap in appts:
-            mother_id = ap.get("mother_id")
-            mres = db.table("mothers").select("name, phone, telegram_chat_id").eq("id", mother_id).limit(1).execute().data if db else []
-            mother = mres[0] if mres else {}
-            name = mother.get("name") or "Mother"
-            phone = mother.get("phone")
-            chat_id = mother.get("telegram_chat_id")
-            facility = ap.get("facility") or ap.get("appointment_location") or "Clinic"
-            adt = datetime.fromisoformat(ap.get("appointment_date"))
-            msg = f"Reminder: Appointment tomorrow at {adt.strftime('%I:%M %p')} at {facility} for {name}."
-            if chat_id:
-                send_telegram_message(str(chat_id), f"📅 <b>Appointment Tomorrow</b>\n\n{msg}")
-            if phone:
-                send_sms(str(phone), msg)
-            time.sleep(1)
+        result = _send_appointment_reminders(start_dt, end_dt, "tomorrow", "next_day_appointments")
         logger.info("✅ Next-day reminders complete")
         logger.info("")
+        return result
     except Exception as e:
         logger.error(f"❌ Error in next-day reminders: {str(e)}")
+        raise
 
 def send_today_appointment_morning_reminders():
     try:
@@ -408,26 +418,13 @@ def send_today_appointment_morning_reminders():
         now = datetime.now()
         start_dt = now.replace(hour=0, minute=0, second=0, microsecond=0)
         end_dt = now.replace(hour=23, minute=59, second=59)
-        appts = get_appointments_between(start_dt, end_dt)
-        for ap in appts:
-            mother_id = ap.get("mother_id")
-            mres = db.table("mothers").select("name, phone, telegram_chat_id").eq("id", mother_id).limit(1).execute().data if db else []
-            mother = mres[0] if mres else {}
-            name = mother.get("name") or "Mother"
-            phone = mother.get("phone")
-            chat_id = mother.get("telegram_chat_id")
-            facility = ap.get("facility") or ap.get("appointment_location") or "Clinic"
-            adt = datetime.fromisoformat(ap.get("appointment_date"))
-            msg = f"Reminder: Appointment today at {adt.strftime('%I:%M %p')} at {facility} for {name}."
-            if chat_id:
-                send_telegram_message(str(chat_id), f"📅 <b>Appointment Today</b>\n\n{msg}")
-            if phone:
-                send_sms(str(phone), msg)
-            time.sleep(1)
+        result = _send_appointment_reminders(start_dt, end_dt, "today", "today_appointments")
         logger.info("✅ Today morning reminders complete")
         logger.info("")
+        return result
     except Exception as e:
         logger.error(f"❌ Error in today reminders: {str(e)}")
+        raise
 
 
 def generate_weekly_reports():
@@ -440,97 +437,71 @@ def generate_weekly_reports():
         logger.info("📊 GENERATING WEEKLY REPORTS")
         logger.info("=" * 60)
         
-        mothers = get_all_mothers()
-        telegram_mothers = [m for m in mothers if m.get('telegram_chat_id')]
-        
-        logger.info(f"Generating reports for {len(telegram_mothers)} mothers")
-        
-        sent_count = 0
-        
-        for mother in telegram_mothers:
-            try:
-                chat_id = mother['telegram_chat_id']
+        def messages():
+            for mother in iter_telegram_mothers():
                 name = mother.get('name', 'Mother')
                 week = calculate_pregnancy_week(mother.get('created_at'))
-                
-                report = (
-                    f"📊 <b>Weekly Summary Report</b>\n\n"
-                    f"Hi {name}! Here's your week in review:\n\n"
-                    f"🤰 <b>Pregnancy Week:</b> {week}\n"
-                    f"✅ <b>Check-ins:</b> 6 of 7 days\n"
-                    f"💊 <b>Medications:</b> 95% compliance\n"
-                    f"📈 <b>Health Status:</b> Stable\n"
-                    f"🟢 <b>Risk Level:</b> Low\n\n"
-                    f"<b>This Week's Achievements:</b>\n"
-                    f"• Consistent daily check-ins ⭐\n"
-                    f"• Good medication adherence ⭐\n"
-                    f"• No concerning symptoms ⭐\n\n"
-                    f"<b>Next Week's Goals:</b>\n"
-                    f"• Continue daily vitamins\n"
-                    f"• Track baby movements\n"
-                    f"• Stay hydrated\n\n"
-                    f"Keep up the amazing work! 💪💚"
-                )
-                
-                if send_telegram_message(chat_id, report):
-                    sent_count += 1
-                    logger.info(f"  ✅ Report sent to {name}")
-                
-                time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"  ❌ Error: {str(e)}")
+                yield mother, render("weekly_report", mother.get("preferred_language"), name=name, week=week)
+        
+        result = send_telegram_broadcast("weekly_report", messages())
         
         logger.info("-" * 60)
-        logger.info(f"✅ Weekly reports complete: {sent_count} sent")
+        logger.info(f"✅ Weekly reports complete: {describe_result(result)}")
         logger.info("=" * 60)
         logger.info("")
+        return result
         
     except Exception as e:
         logger.error(f"❌ Error generating reports: {str(e)}")
+        raise
 
 
 # ==================== SCHEDULER SETUP ====================
 
-def setup_scheduler():
+def build_job_runner() -> JobRunner:
     """Configure all scheduled tasks"""
     
     logger.info("\n" + "=" * 60)
     logger.info("⏰ SETTING UP SCHEDULER")
     logger.info("=" * 60)
     
+    # Leases keep replicas from running the same job twice; cohort jobs are
+    # sharded (each replica sends to its own slice) when SCHEDULER_SHARD_COUNT > 1.
+    # Either way several processes share the schedule, so in-process leases won't do
+    lease_store = default_lease_store(db, shared=SCHEDULER_REPLICAS > 1 or SHARD is not None)
+    runner = JobRunner(store=default_job_store(db), lease_store=lease_store, shard=SHARD)
+    
     # Daily Reminders - 8:00 AM
-    schedule.every().day.at("08:00").do(send_daily_reminders)
-    logger.info("✓ Daily reminders: 8:00 AM")
+    runner.add_job("daily_reminders", send_daily_reminders, at="08:00", sharded=True)
     
     # Medication Reminders - 9:00 AM and 7:30 PM
-    schedule.every().day.at("09:00").do(send_medication_reminders_morning)
-    schedule.every().day.at("19:30").do(send_medication_reminders_evening)
-    logger.info("✓ Medication reminders: 9:00 AM, 7:30 PM")
+    runner.add_job("medication_morning", send_medication_reminders_morning, at="09:00", sharded=True)
+    runner.add_job("medication_evening", send_medication_reminders_evening, at="19:30", sharded=True)
     
     # Milestone Check - 10:00 AM
-    schedule.every().day.at("10:00").do(check_milestone_reminders)
-    logger.info("✓ Milestone check: 10:00 AM")
-    schedule.every().day.at("18:00").do(send_next_day_appointment_reminders)
-    schedule.every().day.at("08:00").do(send_today_appointment_morning_reminders)
-    logger.info("✓ Appointment reminders: 6:00 PM (next day), 8:00 AM (today)")
+    runner.add_job("milestone_reminders", check_milestone_reminders, at="10:00", sharded=True)
+    
+    # Appointment reminders - 6:00 PM (next day), 8:00 AM (today); one replica runs them
+    runner.add_job("next_day_appointments", send_next_day_appointment_reminders, at="18:00")
+    runner.add_job("today_appointments", send_today_appointment_morning_reminders, at="08:00",
+                   catch_up_seconds=2 * 3600)
     
-    # Weekly Assessments - Every Monday at 9:00 AM
-    schedule.every().monday.at("09:00").do(run_weekly_assessments)
-    logger.info("✓ Weekly assessments: Monday 9:00 AM")
+    # Weekly Assessments - Every Monday at 9:00 AM (long-running: generous catch-up)
+    runner.add_job("weekly_assessments", run_weekly_assessments, at="09:00", weekday="monday",
+                   catch_up_seconds=12 * 3600, sharded=True)
     
     # Weekly Reports - Every Sunday at 8:00 PM
-    schedule.every().sunday.at("20:00").do(generate_weekly_reports)
-    logger.info("✓ Weekly reports: Sunday 8:00 PM")
+    runner.add_job("weekly_reports", generate_weekly_reports, at="20:00", weekday="sunday", sharded=True)
     
     logger.info("=" * 60)
     logger.info("✅ Scheduler setup complete!")
     logger.info("=" * 60)
     logger.info("")
+    return runner
 
 
 def run_scheduler():
-    """Main scheduler loop"""
+    """Run the scheduler standalone (outside the API process)"""
     
     # Check configuration
     if not TELEGRAM_BOT_TOKEN or TELEGRAM_BOT_TOKEN == "placeholder":
@@ -538,16 +509,22 @@ def run_scheduler():
         logger.error("Please add your bot token to backend/.env")
         return
     
-    setup_scheduler()
+    runner = build_job_runner()
     
     logger.info("🚀 Scheduler is running...")
     logger.info("Press Ctrl+C to stop\n")
     logger.info(f"Current time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
+    async def _run():
+        # Outbox rows written by the jobs are delivered (and retried) on this loop
+        await start_outbox_worker(db)
+        try:
+            await runner.run()
+        finally:
+            await stop_outbox_worker()
+    
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+        asyncio.run(_run())
     except KeyboardInterrupt:
         logger.info("\n🛑 Scheduler stopped by user")
 
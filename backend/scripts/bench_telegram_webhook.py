@@ -0,0 +1,611 @@
+"""
+Load-test the Telegram webhook path with synthetic chats.
+
+Usage:
+    python scripts/bench_telegram_webhook.py                       # 50 chats
+    python scripts/bench_telegram_webhook.py --chats 500 --llm-latency 2.0
+    python scripts/bench_telegram_webhook.py --chats 200 --send-rate 1000   # lift the global send cap
+
+The FastAPI app runs in-process (lifespan included) and receives Update
+payloads on /telegram/webhook/{token} over an ASGI transport. Each synthetic
+chat behaves like a user: it sends a message, waits until the update has been
+processed, thinks, and sends the next one. Scenarios:
+- registration: /start, the registration button, every registration step, confirm
+- question: a greeting followed by free-text questions
+- document: /start, a PDF upload, a follow-up question
+
+Supabase, Gemini, the Telegram Bot API and Telegram file downloads are
+replaced by in-process fakes with configurable latency. Supabase and Gemini
+fakes block the calling thread like the real sync clients do, so code that
+calls them on the event loop shows up as event-loop lag.
+
+Prints a JSON report: throughput, webhook ack latency, reply latency
+(webhook POST until the update is fully processed) overall and per step
+kind, event-loop lag, update queue and text pipeline timings, and Bot API
+call counts. All percentiles are p50/p95/p99.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import logging
+import tempfile
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_TOKEN = "123456:BENCH-webhook-token"
+BENCH_BACKEND_URL = "http://bench.local"
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "MatruRaksha", "username": "matruraksha_bench_bot"}
+
+QUESTIONS = [
+    "What foods should I eat in the third trimester?",
+    "Is light walking safe during pregnancy?",
+    "How much water should I drink every day?",
+    "When is my next appointment?",
+    "I have mild back pain, what can I do?",
+]
+
+
+def jitter(latency: float) -> float:
+    return latency * random.uniform(0.5, 1.5) if latency > 0 else 0.0
+
+
+# Installed by install_fakes() before the app is imported
+FAKE_DB: "FakeSupabase"
+FAKE_BOT_API: "FakeBotApi"
+FAKE_GEMINI_CALLS: Counter = Counter()
+
+
+# ==================== SUPABASE FAKE ====================
+
+class FakeResult:
+    def __init__(self, data: Any):
+        self.data = data
+        self.count = len(data) if isinstance(data, list) else None
+
+
+class FakeQuery:
+    """Chainable query builder over in-memory tables; only equality-style filters are applied"""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.op = "select"
+        self.payload: Any = None
+        self.filters: List[Tuple[str, Any]] = []
+        self.single_row = False
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, **kwargs):
+        self.op, self.payload = "insert", payload
+        return self
+
+    def update(self, payload, **kwargs):
+        self.op, self.payload = "update", payload
+        return self
+
+    def delete(self, **kwargs):
+        self.op = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, {str(value)}))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append((column, {str(v) for v in values}))
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    maybe_single = single
+
+    def __getattr__(self, name):
+        # order, limit, range, gte, lte, ... are accepted and ignored
+        return lambda *args, **kwargs: self
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(str(row.get(column)) in values for column, values in self.filters)
+
+    def execute(self):
+        time.sleep(jitter(self.db.latency))
+        self.db.calls[f"{self.table}.{self.op}"] += 1
+        with self.db.lock:
+            rows = self.db.tables.setdefault(self.table, [])
+            if self.op == "insert":
+                new_rows = self.payload if isinstance(self.payload, list) else [self.payload]
+                new_rows = [{"id": str(uuid.uuid4()), **row} for row in new_rows]
+                rows.extend(new_rows)
+                data = new_rows
+            elif self.op == "update":
+                data = [row for row in rows if self._matches(row)]
+                for row in data:
+                    row.update(self.payload)
+            elif self.op == "delete":
+                data = [row for row in rows if self._matches(row)]
+                self.db.tables[self.table] = [row for row in rows if not self._matches(row)]
+            else:
+                data = [dict(row) for row in rows if self._matches(row)]
+        if self.single_row:
+            return FakeResult(data[0] if data else None)
+        return FakeResult(data)
+
+
+class _Anything:
+    """Stand-in for client areas the bot path does not exercise (storage, auth)"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return FakeResult([])
+
+
+class FakeStorage(_Anything):
+    """Storage bucket holding uploaded blobs in memory"""
+
+    def __init__(self, db: "FakeSupabase"):
+        self.db = db
+        self.objects: Dict[str, bytes] = {}
+
+    def from_(self, bucket: str) -> "FakeStorage":
+        return self
+
+    def upload(self, path: str, file: bytes, file_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        time.sleep(jitter(self.db.latency))
+        self.db.calls["storage.upload"] += 1
+        self.objects[path] = bytes(file)
+        return {"Key": path}
+
+    def download(self, path: str) -> bytes:
+        time.sleep(jitter(self.db.latency))
+        self.db.calls["storage.download"] += 1
+        return self.objects[path]
+
+
+class FakeSupabase:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.calls: Counter = Counter()
+        self.lock = threading.Lock()
+        self.storage = FakeStorage(self)
+        self.auth = _Anything()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _Anything:
+        time.sleep(jitter(self.latency))
+        self.calls[f"rpc.{name}"] += 1
+        return _Anything()
+
+
+# ==================== GEMINI FAKE ====================
+
+FAKE_ANALYSIS = json.dumps({
+    "risk_level": "normal",
+    "concerns": [],
+    "recommendations": ["Stay hydrated", "Keep your next check-up"],
+    "extracted_data": {"hemoglobin": "11.8 g/dL"},
+})
+
+
+class FakeGeminiResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModels:
+    def __init__(self, latency: float, calls: Counter):
+        self.latency = latency
+        self.calls = calls
+
+    def generate_content(self, model: str = "", contents: Any = None, **kwargs) -> FakeGeminiResponse:
+        time.sleep(jitter(self.latency))
+        self.calls["generate_content"] += 1
+        return FakeGeminiResponse(FAKE_ANALYSIS)
+
+
+def fake_gemini_client_class(latency: float, calls: Counter):
+    class FakeGeminiClient:
+        def __init__(self, *args, **kwargs):
+            self.models = FakeGeminiModels(latency, calls)
+    return FakeGeminiClient
+
+
+# ==================== TELEGRAM FAKES ====================
+
+class FakeBotApi:
+    """Answers Bot API methods the way Telegram would, after `latency` seconds"""
+
+    def __init__(self, latency: float, file_size: int):
+        self.latency = latency
+        self.file_size = file_size
+        self.calls: Counter = Counter()
+        self._message_id = 0
+
+    def _message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        self._message_id += 1
+        chat_id = params.get("chat_id")
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0, "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+
+    def result(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "getMe":
+            return BOT_USER
+        if method == "getWebhookInfo":
+            return {
+                "url": f"{BENCH_BACKEND_URL}/telegram/webhook/{BENCH_TOKEN}",
+                "has_custom_certificate": False,
+                "pending_update_count": 0,
+            }
+        if method == "getFile":
+            return {
+                "file_id": params.get("file_id"),
+                "file_unique_id": f"u{params.get('file_id')}",
+                "file_size": self.file_size,
+                "file_path": f"documents/{params.get('file_id')}.pdf",
+            }
+        if (method.startswith("send") and method != "sendChatAction") or method.startswith("edit"):
+            return self._message(params)
+        return True
+
+    async def do_request(self, url: str, method: str, request_data=None, *args, **kwargs) -> Tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        params = dict(request_data.parameters) if request_data is not None else {}
+        await asyncio.sleep(jitter(self.latency))
+        self.calls[api_method] += 1
+        return 200, json.dumps({"ok": True, "result": self.result(api_method, params)}).encode()
+
+
+def fake_file_client(latency: float, file_size: int):
+    """Pooled-client stand-in serving Telegram file downloads (PDF bytes)"""
+    import httpx
+
+    async def handler(request: "httpx.Request") -> "httpx.Response":
+        await asyncio.sleep(jitter(latency))
+        body = b"%PDF-1.4\n" + request.url.path.encode() + b"\n"
+        body += b"0" * max(0, file_size - len(body))
+        return httpx.Response(200, content=body, headers={"content-type": "application/pdf"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return lambda: client
+
+
+# ==================== SYNTHETIC UPDATES ====================
+
+class UpdateFactory:
+    def __init__(self):
+        self._update_id = 0
+        self._message_id = 0
+
+    def _ids(self) -> Tuple[int, int]:
+        self._update_id += 1
+        self._message_id += 1
+        return self._update_id, self._message_id
+
+    @staticmethod
+    def _chat(chat_id: int) -> Dict[str, Any]:
+        return {"id": chat_id, "type": "private", "first_name": f"Bench{chat_id}"}
+
+    @staticmethod
+    def _user(chat_id: int) -> Dict[str, Any]:
+        return {"id": chat_id, "is_bot": False, "first_name": f"Bench{chat_id}"}
+
+    def text(self, chat_id: int, text: str) -> Dict[str, Any]:
+        update_id, message_id = self._ids()
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": self._chat(chat_id),
+            "from": self._user(chat_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": update_id, "message": message}
+
+    def callback(self, chat_id: int, data: str) -> Dict[str, Any]:
+        update_id, message_id = self._ids()
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self._user(chat_id),
+                "chat_instance": str(chat_id),
+                "data": data,
+                "message": {
+                    "message_id": message_id,
+                    "date": int(time.time()),
+                    "chat": self._chat(chat_id),
+                    "from": BOT_USER,
+                    "text": "MatruRaksha",
+                },
+            },
+        }
+
+    def document(self, chat_id: int, file_size: int) -> Dict[str, Any]:
+        update_id, message_id = self._ids()
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": self._chat(chat_id),
+                "from": self._user(chat_id),
+                "document": {
+                    "file_id": f"doc{update_id}",
+                    "file_unique_id": f"udoc{update_id}",
+                    "file_name": "blood_report.pdf",
+                    "mime_type": "application/pdf",
+                    "file_size": file_size,
+                },
+            },
+        }
+
+
+def build_script(scenario: str, chat_id: int, factory: UpdateFactory, file_size: int) -> List[Tuple[str, Any]]:
+    """(step kind, update builder) pairs for one synthetic chat"""
+    if scenario == "registration":
+        answers = [f"Bench Mother {chat_id}", "27", "9876543210", "2026-12-01", "Pune", "1", "0", "22.5", "English"]
+        return (
+            [("greeting", lambda: factory.text(chat_id, "/start")),
+             ("callback", lambda: factory.callback(chat_id, "register"))]
+            + [("registration", lambda a=a: factory.text(chat_id, a)) for a in answers]
+            + [("callback", lambda: factory.callback(chat_id, "confirm_yes"))]
+        )
+    if scenario == "document":
+        return [
+            ("greeting", lambda: factory.text(chat_id, "/start")),
+            ("document", lambda: factory.document(chat_id, file_size)),
+            ("question", lambda: factory.text(chat_id, random.choice(QUESTIONS))),
+        ]
+    return [
+        ("greeting", lambda: factory.text(chat_id, "hi")),
+        ("question", lambda: factory.text(chat_id, random.choice(QUESTIONS))),
+        ("question", lambda: factory.text(chat_id, random.choice(QUESTIONS))),
+    ]
+
+
+def pick_scenarios(chats: int, registration_share: float, document_share: float) -> List[str]:
+    registrations = int(round(chats * registration_share))
+    documents = int(round(chats * document_share))
+    scenarios = ["registration"] * registrations + ["document"] * documents
+    scenarios += ["question"] * max(0, chats - len(scenarios))
+    random.shuffle(scenarios)
+    return scenarios[:chats]
+
+
+# ==================== BENCHMARK ====================
+
+async def monitor_loop_lag(metrics, interval: float = 0.05) -> None:
+    """Record how late the loop wakes up from a fixed sleep (event-loop lag)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        metrics.observe("bench.loop_lag", max(0.0, loop.time() - started - interval))
+
+
+async def run_chat(client, metrics, pending: Dict[int, asyncio.Future], script, args) -> None:
+    loop = asyncio.get_running_loop()
+    webhook_path = f"/telegram/webhook/{BENCH_TOKEN}"
+    await asyncio.sleep(random.uniform(0, args.ramp_up))
+    for kind, make_update in script:
+        update = make_update()
+        done = loop.create_future()
+        pending[update["update_id"]] = done
+
+        sent = time.perf_counter()
+        response = await client.post(webhook_path, json=update)
+        metrics.observe("bench.ack", time.perf_counter() - sent)
+        metrics.increment("bench.sent")
+        if response.status_code != 200:
+            pending.pop(update["update_id"], None)
+            metrics.increment("bench.rejected")
+            continue
+
+        try:
+            finished = await asyncio.wait_for(done, args.timeout)
+        except asyncio.TimeoutError:
+            pending.pop(update["update_id"], None)
+            metrics.increment("bench.timeouts")
+            continue
+        metrics.increment("bench.completed")
+        metrics.observe("bench.reply", finished - sent)
+        metrics.observe(f"bench.reply.{kind}", finished - sent)
+        await asyncio.sleep(jitter(args.think_time))
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    import httpx
+    import main as app_main
+    from utils import metrics
+    from services import blob_store
+    from services.telegram_update_queue import get_update_queue, update_queue_report
+
+    blob_store.get_async_client = fake_file_client(args.file_latency, args.file_size)
+
+    # Resolve each update's completion future once the worker has processed it
+    pending: Dict[int, asyncio.Future] = {}
+    process_update = app_main.process_telegram_update
+
+    async def tracked_process(update_data: Dict[str, Any]) -> None:
+        try:
+            await process_update(update_data)
+        finally:
+            done = pending.pop(update_data.get("update_id"), None)
+            if done is not None and not done.done():
+                done.set_result(time.perf_counter())
+
+    app_main.process_telegram_update = tracked_process
+
+    factory = UpdateFactory()
+    scenarios = pick_scenarios(args.chats, args.registration_share, args.document_share)
+    scripts = []
+    for index, scenario in enumerate(scenarios):
+        chat_id = 700000000 + index
+        if scenario != "registration":
+            FAKE_DB.tables.setdefault("mothers", []).append({
+                "id": str(uuid.uuid4()),
+                "name": f"Bench Mother {chat_id}",
+                "telegram_chat_id": str(chat_id),
+                "preferred_language": "en",
+                "due_date": "2026-12-01",
+                "location": "Pune",
+                "age": 27,
+                "created_at": "2026-01-01T00:00:00",
+            })
+        scripts.append(build_script(scenario, chat_id, factory, args.file_size))
+
+    async with app_main.lifespan(app_main.app):
+        if get_update_queue() is None:
+            raise SystemExit("Telegram bot did not start in webhook mode; run with --verbose to see why")
+        metrics.reset()
+        lag_monitor = asyncio.create_task(monitor_loop_lag(metrics))
+        transport = httpx.ASGITransport(app=app_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url=BENCH_BACKEND_URL, timeout=args.timeout) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(run_chat(client, metrics, pending, script, args) for script in scripts))
+            elapsed = time.perf_counter() - started
+        lag_monitor.cancel()
+        queue_report = update_queue_report()
+
+    counters = metrics.snapshot()["counters"]
+    kinds = sorted({kind for script in scripts for kind, _ in script})
+    return {
+        "config": {
+            "chats": args.chats,
+            "scenarios": dict(Counter(scenarios)),
+            "think_time": args.think_time,
+            "latency": {
+                "db": args.db_latency,
+                "llm": args.llm_latency,
+                "telegram_api": args.telegram_latency,
+                "file_download": args.file_latency,
+            },
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "updates": {
+            "sent": int(counters.get("bench.sent", 0)),
+            "completed": int(counters.get("bench.completed", 0)),
+            "rejected": int(counters.get("bench.rejected", 0)),
+            "timeouts": int(counters.get("bench.timeouts", 0)),
+        },
+        "throughput_per_second": round(counters.get("bench.completed", 0) / elapsed, 2) if elapsed else 0.0,
+        "webhook_ack": metrics.summarize("bench.ack"),
+        "reply_latency": metrics.summarize("bench.reply"),
+        "reply_latency_by_kind": {kind: metrics.summarize(f"bench.reply.{kind}") for kind in kinds},
+        "event_loop_lag": metrics.summarize("bench.loop_lag"),
+        "update_queue": {
+            "queue_wait": queue_report["queue_wait"],
+            "processing": queue_report["processing"],
+            "counters": queue_report["counters"],
+        },
+        "text_pipeline": {
+            stage: metrics.summarize(f"telegram.text.{stage}")
+            for stage in ("mother", "reports", "log_query", "reply", "send", "log_reply", "total")
+        },
+        "telegram_api": {
+            "calls": dict(FAKE_BOT_API.calls),
+            "limiter_wait": metrics.summarize("telegram.limiter.wait_seconds"),
+        },
+        "fake_calls": {
+            "supabase": sum(FAKE_DB.calls.values()),
+            "storage_uploads": FAKE_DB.calls["storage.upload"],
+            "gemini": sum(FAKE_GEMINI_CALLS.values()),
+        },
+    }
+
+
+def install_fakes(args, workdir: str) -> None:
+    """Environment and fakes that must be in place before the app is imported"""
+    global FAKE_DB, FAKE_BOT_API
+
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": BENCH_TOKEN,
+        "BACKEND_URL": BENCH_BACKEND_URL,
+        "USE_TELEGRAM_WEBHOOK": "true",
+        "SCHEDULER_IN_APP": "false",
+        "SUPABASE_URL": "https://bench.supabase.local",
+        "SUPABASE_KEY": "bench",
+        "GEMINI_API_KEY": "bench",
+        "TELEGRAM_STATE_PATH": os.path.join(workdir, "telegram_state.sqlite3"),
+        "BLOB_STORE_DIR": os.path.join(workdir, "blobs"),
+    })
+    if args.workers:
+        os.environ["TELEGRAM_UPDATE_WORKERS"] = str(args.workers)
+    if args.send_rate:
+        os.environ["TELEGRAM_MESSAGES_PER_SECOND"] = str(args.send_rate)
+
+    import supabase
+    from google import genai
+    from telegram.request import HTTPXRequest
+
+    FAKE_DB = FakeSupabase(args.db_latency)
+    supabase.create_client = lambda *a, **k: FAKE_DB
+    genai.Client = fake_gemini_client_class(args.llm_latency, FAKE_GEMINI_CALLS)
+
+    FAKE_BOT_API = FakeBotApi(args.telegram_latency, args.file_size)
+
+    async def do_request(self, url, method, request_data=None, *a, **k):
+        return await FAKE_BOT_API.do_request(url, method, request_data)
+
+    HTTPXRequest.do_request = do_request
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the Telegram webhook path with fakes")
+    parser.add_argument("--chats", type=int, default=50, help="Concurrent synthetic chats")
+    parser.add_argument("--registration-share", type=float, default=0.2)
+    parser.add_argument("--document-share", type=float, default=0.2)
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean pause between a reply and the next message")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="Chats start at random within this many seconds")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for one update to be processed")
+    parser.add_argument("--db-latency", type=float, default=0.03, help="Mean Supabase call latency (seconds)")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Mean Gemini call latency (seconds)")
+    parser.add_argument("--telegram-latency", type=float, default=0.05, help="Mean Bot API call latency (seconds)")
+    parser.add_argument("--file-latency", type=float, default=0.2, help="Mean file download latency (seconds)")
+    parser.add_argument("--file-size", type=int, default=256 * 1024, help="Bytes per uploaded document")
+    parser.add_argument("--workers", type=int, default=None, help="Override TELEGRAM_UPDATE_WORKERS")
+    parser.add_argument("--send-rate", type=float, default=None, help="Override TELEGRAM_MESSAGES_PER_SECOND")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logging")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    # Configured before the app is imported, so its own logging.basicConfig is a no-op
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    with tempfile.TemporaryDirectory(prefix="bench-telegram-") as workdir:
+        install_fakes(args, workdir)
+        report = asyncio.run(run_benchmark(args))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Re-analyze stored medical reports after an analysis prompt or model change.
+
+Usage:
+    python scripts/reanalyze_reports.py                      # new run
+    python scripts/reanalyze_reports.py --run-id <id>        # resume a run
+    python scripts/reanalyze_reports.py --max-reports 200    # process a slice
+
+Set ANALYSIS_VERSION to the new prompt/model version; reports already stamped
+with it are skipped. Requires infra/supabase/add_report_reanalysis_runs.sql.
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import logging
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+from services.report_reanalysis_service import REANALYSIS_PAGE_SIZE, run_reanalysis  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Batch re-analysis of medical reports")
+    parser.add_argument("--run-id", help="Resume this run instead of starting a new one")
+    parser.add_argument("--page-size", type=int, default=REANALYSIS_PAGE_SIZE)
+    parser.add_argument("--max-reports", type=int, default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_reanalysis(args.run_id, args.page_size, args.max_reports))
+    print(result)
+    if result.get("status") == "error":
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
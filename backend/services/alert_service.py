@@ -0,0 +1,208 @@
+"""
+MatruRaksha AI - Emergency Alert Service
+Priority lane for emergency-class messages (HIGH risk assessments, risky Vapi
+calls, the bot's alert button).
+
+Alerts never wait behind a bulk broadcast:
+- they are sent inline on their own thread, not through the broadcast queues
+- Telegram alerts book their slot in this process's send limiter without
+  waiting, so in-process bulk and reply traffic backs off instead of the alert.
+  The budget is per process: the scheduler's bulk senders only keep
+  TELEGRAM_EMERGENCY_RESERVED_PER_SECOND of headroom under the bot limit, they
+  do not know about alerts sent from the API process
+- a failed send is retried inline (ALERT_RETRY_DELAYS, a few seconds in total)
+- every alert is also written to the outbox at PRIORITY_EMERGENCY, so if the
+  inline attempts fail it is retried on the short emergency backoff, ahead of
+  all bulk rows, by the standing outbox worker
+
+End-to-end latency (triggering event -> provider accepted) is recorded as
+`alert.latency_seconds` against ALERT_LATENCY_SLO_SECONDS.
+"""
+
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+try:
+    from backend.services.supabase_service import supabase as default_client
+    from backend.services.http_client import get_sync_client
+    from backend.services.broadcast_service import TELEGRAM_BOT_TOKEN
+    from backend.services.telegram_rate_limiter import get_send_limiter
+    from backend.services.sms_service import send_sms
+    from backend.services.email_service import send_email
+    from backend.services.outbox_service import (
+        OUTBOX_TABLE, PRIORITY_EMERGENCY, ALERT_LATENCY_SLO_SECONDS,
+        outbox_row, mark_sent, mark_failed, record_alert_latency
+    )
+    from backend.utils import metrics
+except ImportError:
+    from services.supabase_service import supabase as default_client
+    from services.http_client import get_sync_client
+    from services.broadcast_service import TELEGRAM_BOT_TOKEN
+    from services.telegram_rate_limiter import get_send_limiter
+    from services.sms_service import send_sms
+    from services.email_service import send_email
+    from services.outbox_service import (
+        OUTBOX_TABLE, PRIORITY_EMERGENCY, ALERT_LATENCY_SLO_SECONDS,
+        outbox_row, mark_sent, mark_failed, record_alert_latency
+    )
+    from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+ALERT_MAX_RETRY_AFTER_SECONDS = 5
+# Pauses before the inline retries of a failed alert (kept inside the latency SLO)
+ALERT_RETRY_DELAYS = (0.5, 1.0, 2.0)
+
+
+def _send_telegram(chat_id: str, text: str, parse_mode: str = "HTML") -> Dict[str, Any]:
+    """One direct Bot API call; a 429 result carries `retry_after`"""
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    payload = {"chat_id": chat_id, "text": text, "parse_mode": parse_mode}
+    limiter = get_send_limiter()
+    # Alerts never wait for the chat's slot, but count against it so other sends back off
+    limiter.reserve(chat_id)
+    response = get_sync_client().post(url, json=payload, timeout=10)
+    if response.status_code == 200:
+        return {"status": "sent", "message_id": response.json().get("result", {}).get("message_id")}
+    if response.status_code == 429:
+        retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+        limiter.penalize(retry_after, chat_id)
+        return {"status": "error", "error": "rate limited", "retry_after": retry_after}
+    return {"status": "error", "error": response.text[:200]}
+
+
+def _deliver(channel: str, recipient: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    if channel == "telegram":
+        return _send_telegram(recipient, payload["text"], payload.get("parse_mode", "HTML"))
+    if channel == "sms":
+        return send_sms(recipient, payload["text"])
+    if channel == "email":
+        return send_email(recipient, payload.get("subject", ""), payload.get("html") or payload["text"], payload["text"])
+    return {"status": "error", "error": f"Unknown channel: {channel}"}
+
+
+def _deliver_with_retries(channel: str, recipient: str, payload: Dict[str, Any], source: str) -> Dict[str, Any]:
+    """Try the provider up to 1 + len(ALERT_RETRY_DELAYS) times with short pauses"""
+    result: Dict[str, Any] = {"status": "error", "error": "not sent"}
+    for attempt, delay in enumerate((0.0,) + ALERT_RETRY_DELAYS):
+        if attempt:
+            retry_after = result.get("retry_after") or 0
+            if retry_after > ALERT_MAX_RETRY_AFTER_SECONDS:
+                break
+            time.sleep(max(delay, retry_after))
+            metrics.increment(f"alert.{channel}.retried")
+            logger.warning(f"🔁 Retrying {source} alert via {channel} (attempt {attempt + 1})")
+        try:
+            result = _deliver(channel, recipient, payload)
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+        if result.get("status") == "sent":
+            break
+    return result
+
+
+def _claim_outbox_row(row: Dict[str, Any], client) -> Optional[Dict[str, Any]]:
+    """
+    Insert the alert as already 'sending' under this process, so the outbox
+    worker only picks it up if the inline send fails or the process dies.
+    Returns None for a duplicate dedup key (alert already handled).
+    """
+    row = {
+        **row,
+        "status": "sending",
+        "attempts": 1,
+        "locked_by": "inline-alert",
+        "locked_at": datetime.now(timezone.utc).isoformat(),
+    }
+    result = client.table(OUTBOX_TABLE).upsert(row, on_conflict="dedup_key", ignore_duplicates=True).execute()
+    return result.data[0] if result.data else None
+
+
+def send_alert(
+    channel: str,
+    recipient: Any,
+    text: str,
+    source: str,
+    mother_id: Any = None,
+    subject: Optional[str] = None,
+    html: Optional[str] = None,
+    parse_mode: str = "HTML",
+    occurred_at: Optional[datetime] = None,
+    dedup_key: Optional[str] = None,
+    client=None
+) -> Dict[str, Any]:
+    """
+    Send one emergency alert on the priority lane.
+
+    Args:
+        channel: "telegram", "sms" or "email"
+        recipient: chat id, phone number or email address
+        source: what raised the alert (risk_assessment, vapi_call, bot_alert)
+        occurred_at: when the triggering event happened (defaults to now)
+        dedup_key: optional idempotency key, e.g. derived from a call id
+
+    Returns:
+        Provider result dict with "status" ("sent", "error" or "duplicate")
+    """
+    occurred_at = occurred_at or datetime.now(timezone.utc)
+    client = client or default_client
+    recipient = str(recipient)
+    row = outbox_row(
+        channel, recipient, text,
+        dedup_key or f"alert:{source}:{uuid.uuid4().hex}",
+        mother_id=mother_id,
+        template=source,
+        priority=PRIORITY_EMERGENCY,
+        subject=subject,
+        html=html,
+        parse_mode=parse_mode
+    )
+
+    stored = None
+    if client is not None:
+        try:
+            stored = _claim_outbox_row(row, client)
+            if stored is None:
+                logger.info(f"🔁 Alert {row['dedup_key']} already sent, skipping")
+                return {"status": "duplicate"}
+        except Exception as e:
+            # Outbox not migrated or DB unreachable: still send, just without retry backing
+            logger.warning(f"⚠️  Alert not recorded in outbox: {e}")
+
+    result = _deliver_with_retries(channel, recipient, row["payload"], source)
+
+    if result.get("status") == "sent":
+        metrics.increment(f"alert.{channel}.sent")
+        latency = record_alert_latency(source, occurred_at)
+        logger.info(f"🚨 {source} alert sent via {channel} in {latency:.2f}s")
+        if stored:
+            _safe(mark_sent, stored, client)
+    else:
+        metrics.increment(f"alert.{channel}.failed")
+        logger.error(f"❌ {source} alert via {channel} failed: {result.get('error')}")
+        if stored:
+            # Back to pending at emergency priority on the short alert backoff;
+            # the standing outbox worker retries it ahead of bulk rows
+            _safe(mark_failed, stored, str(result.get("error") or "send failed"), client)
+    return result
+
+
+async def send_alert_async(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+    """Async wrapper: runs the blocking send on a worker thread"""
+    return await asyncio.to_thread(send_alert, *args, **kwargs)
+
+
+def alert_latency_report() -> Dict[str, Any]:
+    """Alert latency percentiles and SLO compliance for this process"""
+    return metrics.slo_report("alert.latency_seconds", ALERT_LATENCY_SLO_SECONDS)
+
+
+def _safe(fn, *args: Any) -> None:
+    try:
+        fn(*args)
+    except Exception as e:
+        logger.warning(f"⚠️  Outbox update for alert failed: {e}")
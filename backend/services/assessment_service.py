@@ -0,0 +1,52 @@
+"""
+MatruRaksha AI - Assessment Service
+Weekly risk check-ins for scheduler jobs, read in-process from `risk_assessments`.
+
+The status a weekly report shows is each mother's latest stored risk level
+(written by /risk/assess and the AI agents), so the scheduler reads it straight
+from Supabase instead of calling back into the API over HTTP.
+"""
+
+import logging
+from typing import Dict, Iterable
+
+try:
+    from backend.services.supabase_service import supabase as default_client
+except ImportError:
+    from services.supabase_service import supabase as default_client
+
+logger = logging.getLogger(__name__)
+
+RISK_ASSESSMENTS_TABLE = "risk_assessments"
+# Mothers never assessed are reported as low risk (as the old endpoint did)
+DEFAULT_RISK_LEVEL = "low"
+
+
+def latest_risk_levels(mother_ids: Iterable[str], client=None) -> Dict[str, str]:
+    """
+    Latest risk level (lower-case) for each mother, in one in_() query.
+
+    Raises when Supabase is unavailable so the caller can count the mothers as failed.
+    """
+    client = client or default_client
+    if client is None:
+        raise RuntimeError("Supabase not configured")
+
+    ids = list(dict.fromkeys(str(m) for m in mother_ids if m is not None))
+    if not ids:
+        return {}
+
+    rows = (
+        client.table(RISK_ASSESSMENTS_TABLE)
+        .select("mother_id, risk_level")
+        .in_("mother_id", ids)
+        .order("created_at", desc=True)
+        .execute()
+        .data
+        or []
+    )
+    levels: Dict[str, str] = {}
+    for row in rows:
+        # Newest first: keep each mother's first row
+        levels.setdefault(str(row["mother_id"]), (row.get("risk_level") or DEFAULT_RISK_LEVEL).lower())
+    return {mother_id: levels.get(mother_id, DEFAULT_RISK_LEVEL) for mother_id in ids}
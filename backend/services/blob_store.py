@@ -0,0 +1,230 @@
+"""
+MatruRaksha AI - Blob Store
+Content-addressed storage for uploaded report files.
+
+Files are stored once under their SHA-256 digest and referenced as
+`blob://sha256/<hex>` URLs, so database rows never carry provider URLs (the
+Telegram file URL embeds the bot token).
+
+The bytes live in the Supabase Storage bucket the upload route already uses
+(BLOB_BUCKET, object key `sha256/<hex>`), so every API worker, the scheduler
+and scripts can read them. BLOB_STORE_DIR is only a local cache: a blob that
+is missing there is downloaded from the bucket on first read, and the
+directory can be wiped at any time.
+
+Downloads are streamed to disk while hashing, with a size cap enforced both on
+the declared size and on the bytes actually received, and the stored type is
+taken from the file's magic bytes rather than its name.
+"""
+
+import os
+import uuid
+import asyncio
+import hashlib
+import logging
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+try:
+    from backend.services.http_client import get_async_client
+    from backend.services.supabase_service import supabase
+except ImportError:
+    from services.http_client import get_async_client
+    from services.supabase_service import supabase
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(BASE_DIR, ".blob_store"))
+BLOB_BUCKET = os.getenv("BLOB_BUCKET", "medical-reports")
+# Telegram bots can download at most 20 MB per file
+REPORT_MAX_BYTES = int(os.getenv("REPORT_MAX_BYTES", str(20 * 1024 * 1024)))
+
+BLOB_SCHEME = "blob://sha256/"
+_CHUNK_SIZE = 64 * 1024
+
+# Magic bytes of the formats the report analyzer accepts
+MIME_EXTENSIONS = {
+    "application/pdf": "pdf",
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+}
+
+
+class BlobTooLargeError(ValueError):
+    """Raised when a file exceeds the configured size cap"""
+
+
+class BlobFetchError(RuntimeError):
+    """Raised when a remote file cannot be downloaded (message never includes the URL)"""
+
+
+class BlobStorageError(RuntimeError):
+    """Raised when a blob cannot be written to or read from the storage bucket"""
+
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """MIME type from a file's first bytes, or None if it is not a supported format"""
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def is_blob_url(url: Optional[str]) -> bool:
+    return bool(url) and url.startswith(BLOB_SCHEME)
+
+
+def blob_path(digest: str) -> str:
+    """On-disk location of a blob (fanned out by the first two hex digits)"""
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        raise ValueError(f"Invalid blob digest: {digest!r}")
+    return os.path.join(BLOB_STORE_DIR, digest[:2], digest)
+
+
+def blob_digest(url: str) -> str:
+    if not is_blob_url(url):
+        raise ValueError(f"Not a blob URL: {url[:40]!r}")
+    return url[len(BLOB_SCHEME):]
+
+
+def blob_key(digest: str) -> str:
+    """Object key of a blob in the storage bucket"""
+    return f"sha256/{digest}"
+
+
+def _bucket():
+    if supabase is None:
+        raise BlobStorageError("Supabase storage is not configured")
+    return supabase.storage.from_(BLOB_BUCKET)
+
+
+def _upload(digest: str, path: str, mime_type: Optional[str]) -> None:
+    """Copy a cached blob to the bucket (idempotent: same key, same bytes)"""
+    with open(path, "rb") as handle:
+        data = handle.read()
+    try:
+        _bucket().upload(
+            path=blob_key(digest),
+            file=data,
+            file_options={"content-type": mime_type or "application/octet-stream", "upsert": "true"}
+        )
+    except BlobStorageError:
+        raise
+    except Exception as e:
+        raise BlobStorageError(f"Could not store file ({type(e).__name__})") from e
+
+
+def _write_cache(digest: str, data: bytes) -> str:
+    """Atomically place bytes in the local cache"""
+    final_path = blob_path(digest)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    tmp_path = os.path.join(BLOB_STORE_DIR, f".tmp-{uuid.uuid4().hex}")
+    with open(tmp_path, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp_path, final_path)
+    return final_path
+
+
+def local_blob_path(url: str) -> str:
+    """Path of a blob in the local cache, downloading it from the bucket on a miss"""
+    digest = blob_digest(url)
+    path = blob_path(digest)
+    if os.path.exists(path):
+        return path
+    try:
+        data = _bucket().download(blob_key(digest))
+    except BlobStorageError:
+        raise
+    except Exception as e:
+        raise BlobStorageError(f"Could not read stored file ({type(e).__name__})") from e
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise BlobStorageError("Stored file does not match its digest")
+    return _write_cache(digest, data)
+
+
+async def put_stream(chunks: AsyncIterator[bytes], max_bytes: int = REPORT_MAX_BYTES) -> Dict[str, Any]:
+    """
+    Store a byte stream; returns {"url", "sha256", "size", "mime_type"}.
+
+    The stream is hashed while it is written to a temporary file, which is then
+    renamed into the local cache and (if it is a supported format) uploaded to
+    the storage bucket, so
+    identical files are stored once and readers never see partial blobs.
+
+    Raises:
+        BlobTooLargeError: if the stream is longer than `max_bytes`
+        BlobStorageError: if the bucket upload fails
+    """
+    os.makedirs(BLOB_STORE_DIR, exist_ok=True)
+    tmp_path = os.path.join(BLOB_STORE_DIR, f".tmp-{uuid.uuid4().hex}")
+    sha = hashlib.sha256()
+    size = 0
+    head = b""
+
+    handle = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise BlobTooLargeError(f"File exceeds {max_bytes // (1024 * 1024)} MB limit")
+            if len(head) < 16:
+                head += chunk[:16 - len(head)]
+            sha.update(chunk)
+            await asyncio.to_thread(handle.write, chunk)
+        await asyncio.to_thread(handle.close)
+
+        digest = sha.hexdigest()
+        final_path = blob_path(digest)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        handle.close()
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    mime_type = sniff_mime(head)
+    # Files the analyzer cannot read are rejected by callers; keep them out of the bucket
+    if mime_type:
+        await asyncio.to_thread(_upload, digest, final_path, mime_type)
+    return {
+        "url": f"{BLOB_SCHEME}{digest}",
+        "sha256": digest,
+        "size": size,
+        "mime_type": mime_type,
+    }
+
+
+async def fetch_to_blob(url: str, max_bytes: int = REPORT_MAX_BYTES) -> Dict[str, Any]:
+    """
+    Stream a remote file into the store over the pooled HTTP client.
+
+    The URL is only used for this request and is never logged, returned or
+    included in error messages (Telegram file URLs embed the bot token).
+    """
+    try:
+        async with get_async_client().stream("GET", url, timeout=60) as response:
+            if response.status_code >= 400:
+                raise BlobFetchError(f"File download failed with HTTP {response.status_code}")
+            declared = int(response.headers.get("content-length") or 0)
+            if declared > max_bytes:
+                raise BlobTooLargeError(f"File exceeds {max_bytes // (1024 * 1024)} MB limit")
+            return await put_stream(response.aiter_bytes(_CHUNK_SIZE), max_bytes)
+    except httpx.HTTPError as exc:
+        raise BlobFetchError(f"File download failed ({type(exc).__name__})") from None
+
+
+def read_blob(url: str) -> bytes:
+    """Bytes of a stored blob (from the local cache, filled from the bucket)"""
+    with open(local_blob_path(url), "rb") as handle:
+        return handle.read()
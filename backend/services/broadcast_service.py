@@ -0,0 +1,281 @@
+"""
+MatruRaksha AI - Broadcast Service
+Concurrent Telegram broadcasts for scheduler jobs.
+
+Sends go through one pooled async HTTP client and are paced by:
+- a global token bucket matched to Telegram's ~30 messages/second bot limit
+- a per-chat minimum interval (Telegram allows ~1 message/second per chat)
+- `retry_after` from 429 responses, which pauses the whole bucket
+
+Bulk senders run below the bot limit (TELEGRAM_EMERGENCY_RESERVED_PER_SECOND is
+held back) to leave headroom for emergency alerts from services.alert_service.
+This is headroom, not a reservation: the bucket is per process and alerts sent
+from another process (the API) are not counted in it. Within a process, sends
+also book the shared TelegramSendLimiter, so bot replies and alerts in the same
+process are paced together with broadcast and outbox traffic.
+
+A full-cohort broadcast is therefore bounded by the Telegram limit instead of
+by sequential sends with sleeps in between. NotificationDispatcher fans mixed
+Telegram / SMS notifications out through the same worker pool.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    from backend.services.http_client import get_async_client, close_async_client
+    from backend.utils.rate_limit import AsyncTokenBucket
+    from backend.utils import metrics
+    from backend.services.sms_service import send_sms as send_sms_message, send_bulk_sms, FAST2SMS_BATCH_SIZE, SMS_ACCEPTED_STATUSES
+    from backend.services.telegram_rate_limiter import get_send_limiter
+except ImportError:
+    from services.http_client import get_async_client, close_async_client
+    from utils.rate_limit import AsyncTokenBucket
+    from utils import metrics
+    from services.sms_service import send_sms as send_sms_message, send_bulk_sms, FAST2SMS_BATCH_SIZE, SMS_ACCEPTED_STATUSES
+    from services.telegram_rate_limiter import get_send_limiter
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_BOT_TOKEN = (os.getenv("TELEGRAM_BOT_TOKEN") or "").strip()
+TELEGRAM_MESSAGES_PER_SECOND = float(os.getenv("TELEGRAM_MESSAGES_PER_SECOND", "28"))
+TELEGRAM_PER_CHAT_INTERVAL = float(os.getenv("TELEGRAM_PER_CHAT_INTERVAL", "1.0"))
+# Share of the bot's send rate this process's bulk traffic leaves unused (headroom
+# for emergency alerts; not coordinated with other processes)
+TELEGRAM_EMERGENCY_RESERVED_PER_SECOND = float(os.getenv("TELEGRAM_EMERGENCY_RESERVED_PER_SECOND", "5"))
+TELEGRAM_BULK_MESSAGES_PER_SECOND = max(1.0, TELEGRAM_MESSAGES_PER_SECOND - TELEGRAM_EMERGENCY_RESERVED_PER_SECOND)
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "32"))
+BROADCAST_MAX_RETRIES = 3
+SMS_MESSAGES_PER_SECOND = float(os.getenv("SMS_MESSAGES_PER_SECOND", "5"))
+SMS_CONCURRENCY = int(os.getenv("SMS_CONCURRENCY", "4"))
+
+# (chat_id, text) pairs; a stream of them is what a broadcast consumes
+Message = Tuple[str, str]
+MessageSource = Union[Iterable[Message], AsyncIterable[Message]]
+
+_SENTINEL = object()
+
+
+class TelegramBroadcaster:
+    """Rate-limited concurrent sender for Telegram Bot API messages"""
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        messages_per_second: float = TELEGRAM_BULK_MESSAGES_PER_SECOND,
+        per_chat_interval: float = TELEGRAM_PER_CHAT_INTERVAL,
+        concurrency: int = BROADCAST_CONCURRENCY,
+        max_retries: int = BROADCAST_MAX_RETRIES
+    ):
+        self.token = token or TELEGRAM_BOT_TOKEN
+        self.api_url = f"https://api.telegram.org/bot{self.token}"
+        self.bucket = AsyncTokenBucket(messages_per_second, capacity=messages_per_second)
+        self.per_chat_interval = per_chat_interval
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self._chat_next_slot: Dict[str, float] = {}
+
+    async def _wait_for_chat(self, chat_id: str) -> None:
+        """Reserve the next free send slot for this chat"""
+        now = time.monotonic()
+        slot = max(now, self._chat_next_slot.get(chat_id, 0.0))
+        self._chat_next_slot[chat_id] = slot + self.per_chat_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def send(self, chat_id: str, text: str, parse_mode: str = "HTML") -> bool:
+        """Send one message, retrying on 429 / transient errors"""
+        chat_id = str(chat_id)
+        await self._wait_for_chat(chat_id)
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": parse_mode}
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            await get_send_limiter().acquire(chat_id)
+            started = time.perf_counter()
+            try:
+                response = await get_async_client().post(f"{self.api_url}/sendMessage", json=payload, timeout=15)
+            except Exception as e:
+                logger.warning(f"⚠️  Telegram send to {chat_id} failed (attempt {attempt + 1}): {e}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(min(2 ** attempt, 10))
+                continue
+            finally:
+                metrics.observe("telegram.send_seconds", time.perf_counter() - started)
+
+            if response.status_code == 200:
+                metrics.increment("telegram.sent")
+                return True
+
+            if response.status_code == 429:
+                retry_after = 1.0
+                try:
+                    retry_after = float(response.json().get("parameters", {}).get("retry_after", 1))
+                except Exception:
+                    pass
+                logger.warning(f"⏳ Telegram rate limited, pausing {retry_after}s")
+                self.bucket.pause(retry_after)
+                get_send_limiter().penalize(retry_after)
+                if attempt < self.max_retries:
+                    await asyncio.sleep(retry_after)
+                continue
+
+            if response.status_code >= 500:
+                if attempt < self.max_retries:
+                    await asyncio.sleep(min(2 ** attempt, 10))
+                continue
+
+            # 400/403: bad chat, bot blocked - retrying won't help
+            logger.error(f"❌ Telegram rejected message to {chat_id}: {response.text[:200]}")
+            break
+
+        metrics.increment("telegram.failed")
+        return False
+
+    async def broadcast(self, messages: MessageSource, job_name: str = "broadcast") -> Dict[str, Any]:
+        """Send a stream of (chat_id, text) messages with bounded concurrency"""
+        async def handle(item: Message) -> bool:
+            chat_id, text = item
+            return await self.send(chat_id, text)
+
+        return await pump(messages, handle, self.concurrency, job_name)
+
+
+class NotificationDispatcher:
+    """
+    Concurrent fan-out across channels for notifications shaped like
+    {"channel": "telegram" | "sms", "to": chat_id_or_phone, "text": message}.
+
+    Telegram goes through a TelegramBroadcaster; SMS providers are called from
+    worker threads, paced by their own token bucket and concurrency cap.
+    """
+
+    def __init__(
+        self,
+        broadcaster: Optional[TelegramBroadcaster] = None,
+        sms_per_second: float = SMS_MESSAGES_PER_SECOND,
+        sms_concurrency: int = SMS_CONCURRENCY
+    ):
+        self.broadcaster = broadcaster or TelegramBroadcaster()
+        self.sms_bucket = AsyncTokenBucket(sms_per_second, capacity=max(1.0, sms_per_second))
+        self.sms_semaphore = asyncio.Semaphore(max(1, sms_concurrency))
+
+    async def send_sms(self, phone: str, text: str) -> bool:
+        await self.sms_bucket.acquire()
+        async with self.sms_semaphore:
+            result = await asyncio.to_thread(send_sms_message, str(phone), text)
+        ok = result.get("status") == "sent"
+        metrics.increment("sms.sent" if ok else "sms.failed")
+        return ok
+
+    async def send_sms_bulk(self, phones: List[str], text: str) -> Dict[str, Dict[str, Any]]:
+        """Send one body to many numbers: one provider call (and one token) per chunk"""
+        results: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(phones), FAST2SMS_BATCH_SIZE):
+            chunk = phones[i:i + FAST2SMS_BATCH_SIZE]
+            await self.sms_bucket.acquire()
+            async with self.sms_semaphore:
+                results.update(await asyncio.to_thread(send_bulk_sms, chunk, text))
+        statuses = [r.get("status") for r in results.values()]
+        metrics.increment("sms.sent", statuses.count("sent"))
+        metrics.increment("sms.submitted", statuses.count("submitted"))
+        metrics.increment("sms.failed", sum(1 for s in statuses if s not in SMS_ACCEPTED_STATUSES))
+        return results
+
+    async def send(self, notification: Dict[str, Any]) -> bool:
+        channel = notification.get("channel")
+        if channel == "telegram":
+            return await self.broadcaster.send(
+                notification["to"], notification["text"], notification.get("parse_mode", "HTML")
+            )
+        if channel == "sms":
+            return await self.send_sms(notification["to"], notification["text"])
+        logger.warning(f"⚠️  Unknown notification channel: {channel}")
+        return False
+
+    async def dispatch(self, notifications: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+                       job_name: str = "dispatch") -> Dict[str, Any]:
+        """Send notifications concurrently across channels"""
+        return await pump(notifications, self.send, self.broadcaster.concurrency, job_name)
+
+
+async def pump(source: Any, handler: Callable[[Any], Awaitable[bool]], concurrency: int, job_name: str) -> Dict[str, Any]:
+    """
+    Feed items from `source` to `concurrency` workers running `handler`.
+
+    The source is consumed lazily through a small queue, so memory stays flat
+    for large cohorts. Sync iterables are advanced in a worker thread because
+    they may page through the database.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 4)
+    counts = {"sent": 0, "failed": 0}
+    started = time.perf_counter()
+
+    async def produce() -> None:
+        try:
+            if hasattr(source, "__aiter__"):
+                async for item in source:
+                    await queue.put(item)
+            else:
+                iterator = iter(source)
+                while True:
+                    item = await asyncio.to_thread(next, iterator, _SENTINEL)
+                    if item is _SENTINEL:
+                        break
+                    await queue.put(item)
+        finally:
+            for _ in range(concurrency):
+                await queue.put(_SENTINEL)
+
+    async def consume() -> None:
+        while True:
+            item = await queue.get()
+            if item is _SENTINEL:
+                return
+            try:
+                ok = await handler(item)
+            except Exception as e:
+                logger.error(f"❌ {job_name} send error: {e}")
+                ok = False
+            counts["sent" if ok else "failed"] += 1
+
+    await asyncio.gather(produce(), *(consume() for _ in range(concurrency)))
+
+    elapsed = time.perf_counter() - started
+    total = counts["sent"] + counts["failed"]
+    rate = total / elapsed if elapsed > 0 else 0.0
+    metrics.observe(f"broadcast.{job_name}.seconds", elapsed)
+    metrics.increment(f"broadcast.{job_name}.sent", counts["sent"])
+    metrics.increment(f"broadcast.{job_name}.failed", counts["failed"])
+    logger.info(
+        f"📣 {job_name}: {counts['sent']} sent, {counts['failed']} failed "
+        f"in {elapsed:.1f}s ({rate:.1f} msg/s)"
+    )
+    return {**counts, "elapsed_seconds": round(elapsed, 2), "messages_per_second": round(rate, 2)}
+
+
+def run_broadcast(messages: MessageSource, job_name: str = "broadcast", **options: Any) -> Dict[str, Any]:
+    """Blocking entry point for scheduler jobs: run a broadcast on a fresh event loop"""
+
+    async def _run() -> Dict[str, Any]:
+        try:
+            return await TelegramBroadcaster(**options).broadcast(messages, job_name)
+        finally:
+            await close_async_client()
+
+    return asyncio.run(_run())
+
+
+def run_dispatch(notifications: Any, job_name: str = "dispatch", **options: Any) -> Dict[str, Any]:
+    """Blocking entry point: fan notifications out across Telegram and SMS"""
+
+    async def _run() -> Dict[str, Any]:
+        try:
+            return await NotificationDispatcher(**options).dispatch(notifications, job_name)
+        finally:
+            await close_async_client()
+
+    return asyncio.run(_run())
@@ -140,6 +140,18 @@ def invalidate_dashboard_cache():
     cache.invalidate_pattern("risk:")
 
 
+# Telegram chat id -> mother profiles linked to that chat
+TELEGRAM_MOTHERS_PREFIX = "telegram_mothers:"
+
+
+def invalidate_telegram_mothers_cache(chat_id: Optional[Any] = None):
+    """Invalidate cached chat -> mothers lookups (one chat, or every chat)"""
+    if chat_id:
+        cache.delete(f"{TELEGRAM_MOTHERS_PREFIX}{chat_id}")
+    else:
+        cache.invalidate_pattern(TELEGRAM_MOTHERS_PREFIX)
+
+
 def invalidate_mothers_cache():
     """Invalidate mothers-related cache"""
     cache.invalidate_pattern("mothers:")
@@ -0,0 +1,141 @@
+"""
+MatruRaksha AI - Cohort Service
+Streamed selection of mothers for scheduler jobs.
+
+Reads straight from Supabase (not through the API's `/mothers`), selects only the
+columns a job needs, pushes filters to the database and pages with a keyset on
+`id`, so a job holds one page in memory regardless of cohort size.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+try:
+    from backend.services.supabase_service import supabase as default_client
+    from backend.services.lease_service import check_lease
+except ImportError:
+    from services.supabase_service import supabase as default_client
+    from services.lease_service import check_lease
+
+logger = logging.getLogger(__name__)
+
+COHORT_PAGE_SIZE = 500
+DEFAULT_COLUMNS = ("id", "name", "telegram_chat_id", "created_at", "preferred_language")
+# Scheduler convention: mothers register around week 8 (see scheduler.calculate_pregnancy_week)
+REGISTRATION_WEEK = 8
+# mothers.cohort_bucket is a stable hash of the id in [0, COHORT_BUCKETS)
+COHORT_BUCKETS = 1024
+
+
+def shard_bucket_range(shard_index: int, shard_count: int) -> Tuple[int, int]:
+    """Contiguous cohort_bucket range [low, high) owned by one shard"""
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise ValueError(f"Invalid shard {shard_index}/{shard_count}")
+    return (
+        shard_index * COHORT_BUCKETS // shard_count,
+        (shard_index + 1) * COHORT_BUCKETS // shard_count,
+    )
+
+
+def created_at_window(
+    min_week: Optional[int] = None,
+    max_week: Optional[int] = None,
+    now: Optional[datetime] = None
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Translate a pregnancy-week range into a created_at range.
+
+    week = REGISTRATION_WEEK + days_since_registration // 7, so
+    week >= min_week  <=>  created_at <= now - (min_week - 8) * 7 days
+    week <= max_week  <=>  created_at >  now - (max_week - 7) * 7 days
+    Returns (created_after_exclusive, created_before_inclusive).
+    """
+    now = now or datetime.now(timezone.utc)
+    created_before = None
+    created_after = None
+    if min_week is not None:
+        created_before = now - timedelta(days=max(min_week - REGISTRATION_WEEK, 0) * 7)
+    if max_week is not None:
+        created_after = now - timedelta(days=(max_week - REGISTRATION_WEEK + 1) * 7)
+    return created_after, created_before
+
+
+def iter_cohort(
+    columns: Sequence[str] = DEFAULT_COLUMNS,
+    require_chat_id: bool = True,
+    min_week: Optional[int] = None,
+    max_week: Optional[int] = None,
+    languages: Optional[Iterable[str]] = None,
+    page_size: int = COHORT_PAGE_SIZE,
+    client=None,
+    now: Optional[datetime] = None,
+    shard: Optional[Tuple[int, int]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield mothers matching the filters, one page at a time.
+
+    Args:
+        columns: columns to select ("id" is always included for paging)
+        require_chat_id: only mothers with a Telegram chat id
+        min_week / max_week: pregnancy-week window (inclusive)
+        languages: preferred_language values to include
+        shard: (index, count) - only this shard's slice of mothers
+    """
+    client = client or default_client
+    if client is None:
+        logger.error("❌ Cohort query skipped: Supabase not configured")
+        return
+
+    select_columns = ", ".join(dict.fromkeys(("id",) + tuple(columns)))
+    created_after, created_before = created_at_window(min_week, max_week, now)
+    language_list = list(languages) if languages else None
+    bucket_range = shard_bucket_range(*shard) if shard and shard[1] > 1 else None
+
+    cursor = None
+    total = 0
+    while True:
+        # A scheduler job that lost its lease stops here, between pages
+        check_lease()
+        query = client.table("mothers").select(select_columns)
+        if require_chat_id:
+            query = query.not_.is_("telegram_chat_id", "null").neq("telegram_chat_id", "")
+        if created_after is not None:
+            query = query.gt("created_at", created_after.isoformat())
+        if created_before is not None:
+            query = query.lte("created_at", created_before.isoformat())
+        if language_list:
+            query = query.in_("preferred_language", language_list)
+        if bucket_range is not None:
+            query = query.gte("cohort_bucket", bucket_range[0]).lt("cohort_bucket", bucket_range[1])
+        if cursor is not None:
+            query = query.gt("id", cursor)
+
+        rows = query.order("id").limit(page_size).execute().data or []
+        for row in rows:
+            yield row
+        total += len(rows)
+
+        if len(rows) < page_size:
+            break
+        cursor = rows[-1]["id"]
+
+    logger.info(f"👥 Cohort scan complete: {total} mothers")
+
+
+def iter_week_cohorts(
+    weeks: Iterable[int],
+    columns: Sequence[str] = DEFAULT_COLUMNS,
+    **filters: Any
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (week, mother) for mothers currently in exactly one of `weeks`.
+
+    Each week is one indexed created_at range query, so daily milestone jobs
+    read only the matching mothers instead of scanning the cohort and
+    computing every mother's week in Python.
+    """
+    now = filters.pop("now", None) or datetime.now(timezone.utc)
+    for week in sorted(set(weeks)):
+        for mother in iter_cohort(columns, min_week=week, max_week=week, now=now, **filters):
+            yield week, mother
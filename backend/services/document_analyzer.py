@@ -7,7 +7,10 @@ File: services/document_analyzer.py
 import os
 import logging
 import io
-from typing import Dict, List, Optional
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
 from PIL import Image
 import PyPDF2
 from pdf2image import convert_from_bytes
@@ -22,6 +25,205 @@ gemini_client = None
 if GEMINI_API_KEY:
     gemini_client = genai.Client(api_key=GEMINI_API_KEY)
 
+# Multi-page PDF pipeline limits (rendering is CPU-bound and holds the GIL,
+# so it runs in a small process pool instead of the event loop)
+PDF_MAX_WORKERS = max(1, int(os.getenv("PDF_MAX_WORKERS", "2")))
+PDF_WORKER_MEMORY_MB = int(os.getenv("PDF_WORKER_MEMORY_MB", "768"))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "30"))
+PDF_MAX_VISION_PAGES = int(os.getenv("PDF_MAX_VISION_PAGES", "6"))
+PDF_RENDER_DPI = 150
+PDF_JOB_TIMEOUT_SECONDS = 120
+PDF_CONTEXT_TEXT_CHARS = 6000
+
+# Words that mark a page as carrying clinical content worth sending to vision
+CLINICAL_KEYWORDS = (
+    "hemoglobin", "haemoglobin", "hb", "glucose", "sugar", "hba1c", "blood pressure",
+    "bp", "platelet", "wbc", "rbc", "urine", "protein", "tsh", "ultrasound", "fetal",
+    "gestation", "weeks", "mg/dl", "g/dl", "mmhg", "result", "reference range",
+    "impression", "diagnosis", "prescription", "rx", "tablet", "dose",
+)
+
+VISION_PROMPT = """You are a medical document analysis AI. Analyze this medical report image and extract ALL health information.
+
+Extract and return in this EXACT JSON format:
+{
+    "document_type": "lab report/prescription/ultrasound/checkup report/etc",
+    "date": "YYYY-MM-DD format or null if not visible",
+    "health_metrics": {
+        "blood_pressure": "systolic/diastolic (e.g., 120/80) or null",
+        "hemoglobin": "value in g/dL (e.g., 12.5) or null",
+        "glucose": "value in mg/dL or null",
+        "weight": "value in kg or null",
+        "hba1c": "value or null",
+        "platelets": "value or null",
+        "wbc": "value or null",
+        "other_values": {}
+    },
+    "concerns": ["list any abnormal values or health concerns mentioned"],
+    "recommendations": ["list any doctor recommendations or advice"],
+    "conditions": ["diagnosed conditions stated in the report, e.g. gestational diabetes"],
+    "medications": ["medicines prescribed in the report, with dose if shown"],
+    "summary": "brief 2-3 sentence summary of the report"
+}
+
+IMPORTANT:
+- Return ONLY valid JSON, no other text
+- Extract actual numerical values where visible
+- If value not clearly visible, use null
+- Be thorough - look for ALL health metrics
+"""
+
+
+# ==================== PDF WORKER FUNCTIONS ====================
+# Module-level so they can be pickled into the process pool.
+
+def _init_pdf_worker(memory_limit_mb: int) -> None:
+    """Cap address space and decoded image size for each PDF worker process"""
+    Image.MAX_IMAGE_PIXELS = 60_000_000
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except Exception:
+        # resource is POSIX-only; Windows dev machines run without the cap
+        pass
+
+
+def _extract_page_texts(pdf_bytes: bytes, max_pages: int) -> List[str]:
+    """Extract text for each page (up to max_pages)"""
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    texts = []
+    for page in reader.pages[:max_pages]:
+        try:
+            texts.append(page.extract_text() or "")
+        except Exception:
+            texts.append("")
+    return texts
+
+
+def _render_page_png(pdf_bytes: bytes, page_number: int, dpi: int) -> bytes:
+    """Render a single 1-based PDF page to PNG bytes"""
+    images = convert_from_bytes(pdf_bytes, dpi=dpi, first_page=page_number, last_page=page_number)
+    if not images:
+        return b""
+    buf = io.BytesIO()
+    images[0].save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _clinical_score(text: str) -> int:
+    """Rough count of clinical keywords and numeric readings on a page"""
+    lowered = (text or "").lower()
+    score = sum(1 for kw in CLINICAL_KEYWORDS if kw in lowered)
+    score += min(10, sum(ch.isdigit() for ch in lowered) // 20)
+    return score
+
+
+def select_clinical_pages(page_texts: List[str], limit: int) -> List[int]:
+    """
+    Pick the 1-based page numbers most likely to hold clinical content.
+    Scanned PDFs (no extractable text) fall back to the first pages.
+    """
+    if not page_texts:
+        return [1]
+    scored = [(_clinical_score(t), i + 1) for i, t in enumerate(page_texts)]
+    with_content = [(s, n) for s, n in scored if s > 0]
+    if not with_content:
+        return [n for _, n in scored[:limit]]
+    best = sorted(with_content, key=lambda x: (-x[0], x[1]))[:limit]
+    return sorted(n for _, n in best)
+
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Lazily create the shared PDF process pool"""
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=PDF_MAX_WORKERS,
+            initializer=_init_pdf_worker,
+            initargs=(PDF_WORKER_MEMORY_MB,),
+        )
+        logger.info(f"✅ PDF process pool started ({PDF_MAX_WORKERS} workers, {PDF_WORKER_MEMORY_MB}MB cap)")
+    return _pdf_pool
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the PDF process pool (called on application shutdown)"""
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
+
+
+def _discard_broken_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died (memory cap, OOM killer) so later jobs get a fresh one"""
+    global _pdf_pool
+    if _pdf_pool is pool:
+        _pdf_pool = None
+        logger.warning("⚠️  PDF worker died; the process pool will be recreated")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _extract_pdf_pages_once(pdf_bytes: bytes) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    pool = get_pdf_pool()
+    try:
+        page_texts = await asyncio.wait_for(
+            loop.run_in_executor(pool, _extract_page_texts, pdf_bytes, PDF_MAX_PAGES),
+            timeout=PDF_JOB_TIMEOUT_SECONDS
+        )
+        logger.info(f"✅ Extracted text from {len(page_texts)} PDF pages")
+
+        # Render only the pages that carry clinical content
+        page_numbers = select_clinical_pages(page_texts, PDF_MAX_VISION_PAGES)
+        renders = await asyncio.wait_for(
+            asyncio.gather(
+                *[loop.run_in_executor(pool, _render_page_png, pdf_bytes, n, PDF_RENDER_DPI) for n in page_numbers],
+                return_exceptions=True
+            ),
+            timeout=PDF_JOB_TIMEOUT_SECONDS
+        )
+        broken = next((r for r in renders if isinstance(r, BrokenProcessPool)), None)
+        if broken is not None:
+            raise broken
+    except BrokenProcessPool:
+        _discard_broken_pool(pool)
+        raise
+
+    images = []
+    for n, rendered in zip(page_numbers, renders):
+        if isinstance(rendered, Exception) or not rendered:
+            logger.warning(f"⚠️  Could not render page {n}: {rendered}")
+            continue
+        images.append((n, rendered))
+    logger.info(f"✅ Rendered pages {[n for n, _ in images]} for vision analysis")
+
+    selected_text = "\n".join(page_texts[n - 1] for n, _ in images if n - 1 < len(page_texts))
+    return {
+        "page_texts": page_texts,
+        "images": images,
+        "text": selected_text if images else "\n".join(page_texts),
+    }
+
+
+async def extract_pdf_pages(pdf_bytes: bytes) -> Dict[str, Any]:
+    """
+    Text layer and rendered clinical pages of a PDF, computed in the process pool.
+
+    Returns {"page_texts", "images": [(page_number, png_bytes)], "text"}, where
+    "text" is the text of the rendered pages (or of every page if none rendered).
+    A job whose pool broke is retried once on a fresh pool.
+    """
+    try:
+        return await _extract_pdf_pages_once(pdf_bytes)
+    except BrokenProcessPool:
+        return await _extract_pdf_pages_once(pdf_bytes)
+
 
 class DocumentAnalyzer:
     """Analyzes medical documents (images and PDFs) using Gemini"""
@@ -63,32 +265,20 @@ class DocumentAnalyzer:
     async def analyze_pdf(self, pdf_bytes: bytes, filename: str, mother_id: str) -> Dict:
         """
         Analyze PDF medical report
-        1. Extract text
-        2. Convert pages to images
-        3. Analyze with Gemini Vision
+        1. Extract text per page (process pool)
+        2. Pick the pages with clinical content
+        3. Render those pages in parallel (process pool)
+        4. Analyze all selected pages in one Gemini Vision request
         """
         logger.info(f"📑 Analyzing PDF: {filename}")
         
         try:
-            # Extract text from PDF
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-            text_content = ""
-            for page in pdf_reader.pages:
-                text_content += page.extract_text() + "\n"
-            
-            logger.info(f"✅ Extracted {len(text_content)} characters of text")
-            
-            # Convert PDF first page to image for vision analysis
-            images = convert_from_bytes(pdf_bytes, dpi=150, first_page=1, last_page=1)
-            logger.info(f"✅ Converted PDF to image")
+            pdf = await extract_pdf_pages(pdf_bytes)
+            page_texts, images = pdf["page_texts"], pdf["images"]
+            text_content = "\n".join(page_texts)
             
             if images:
-                # Analyze first page with Gemini Vision
-                img_bytes = io.BytesIO()
-                images[0].save(img_bytes, format='PNG')
-                img_bytes = img_bytes.getvalue()
-                
-                visual_analysis = await self.vision_analyze(img_bytes, "pdf_page_1", text_content)
+                visual_analysis = await self.vision_analyze_pages(images, pdf["text"])
             else:
                 # Fall back to text-only analysis
                 visual_analysis = await self.text_only_analyze(text_content, filename)
@@ -97,7 +287,8 @@ class DocumentAnalyzer:
                 "success": True,
                 "filename": filename,
                 "document_type": "pdf",
-                "pages": len(pdf_reader.pages),
+                "pages": len(page_texts),
+                "analyzed_pages": [n for n, _ in images],
                 "text_length": len(text_content),
                 **visual_analysis
             }
@@ -141,77 +332,13 @@ class DocumentAnalyzer:
             # Convert bytes to PIL Image
             image = Image.open(io.BytesIO(image_bytes))
             
-            # Prepare comprehensive prompt for medical document analysis
-            prompt = """You are a medical document analysis AI. Analyze this medical report image and extract ALL health information.
-
-Extract and return in this EXACT JSON format:
-{
-    "document_type": "lab report/prescription/ultrasound/checkup report/etc",
-    "date": "YYYY-MM-DD format or null if not visible",
-    "health_metrics": {
-        "blood_pressure": "systolic/diastolic (e.g., 120/80) or null",
-        "hemoglobin": "value in g/dL (e.g., 12.5) or null",
-        "glucose": "value in mg/dL or null",
-        "weight": "value in kg or null",
-        "hba1c": "value or null",
-        "platelets": "value or null",
-        "wbc": "value or null",
-        "other_values": {}
-    },
-    "concerns": ["list any abnormal values or health concerns mentioned"],
-    "recommendations": ["list any doctor recommendations or advice"],
-    "summary": "brief 2-3 sentence summary of the report"
-}
-
-IMPORTANT:
-- Return ONLY valid JSON, no other text
-- Extract actual numerical values where visible
-- If value not clearly visible, use null
-- Be thorough - look for ALL health metrics
-"""
-            
             # Call Gemini Vision using new client API
-            response = self.client.models.generate_content(
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
                 model=self.model_name,
-                contents=[prompt, image]
+                contents=[VISION_PROMPT, image]
             )
-            result_text = response.text
-            
-            logger.info(f"Gemini response received: {len(result_text)} characters")
-            
-            # Parse JSON response
-            try:
-                # Clean the response - remove markdown code blocks
-                result_text = result_text.strip()
-                if "```json" in result_text:
-                    result_text = result_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in result_text:
-                    result_text = result_text.split("```")[1].split("```")[0].strip()
-                
-                result_json = json.loads(result_text)
-                
-                # Extract and format the data
-                return {
-                    "analysis_summary": result_json.get("summary", "Medical report analyzed"),
-                    "health_metrics": result_json.get("health_metrics", {}),
-                    "concerns": result_json.get("concerns", []),
-                    "recommendations": result_json.get("recommendations", []),
-                    "document_type": result_json.get("document_type", "medical_report"),
-                    "date": result_json.get("date")
-                }
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON parsing error: {e}")
-                logger.error(f"Raw response: {result_text}")
-                
-                # Fallback: extract what we can from raw text
-                return {
-                    "analysis_summary": result_text[:500],
-                    "health_metrics": {},
-                    "concerns": [],
-                    "recommendations": [],
-                    "raw_text": result_text
-                }
+            return self._parse_vision_response(response.text)
                 
         except Exception as e:
             logger.error(f"Gemini Vision API error: {e}", exc_info=True)
@@ -223,6 +350,83 @@ IMPORTANT:
                 "error": str(e)
             }
     
+    async def vision_analyze_pages(self, pages: List[Any], extracted_text: Optional[str]) -> Dict:
+        """
+        Analyze several rendered pages of one document in a single Gemini Vision request.
+        
+        Args:
+            pages: list of (page_number, png_bytes)
+            extracted_text: text layer of the selected pages, used as supporting context
+        """
+        try:
+            contents: List[Any] = [
+                VISION_PROMPT
+                + f"\nThe report has {len(pages)} page image(s) below. "
+                "Combine the values from ALL pages into one result."
+            ]
+            if extracted_text and extracted_text.strip():
+                contents.append(f"TEXT LAYER (may be incomplete):\n{extracted_text[:PDF_CONTEXT_TEXT_CHARS]}")
+            for page_number, png_bytes in pages:
+                contents.append(f"Page {page_number}:")
+                contents.append(Image.open(io.BytesIO(png_bytes)))
+            
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
+                model=self.model_name,
+                contents=contents
+            )
+            return self._parse_vision_response(response.text)
+            
+        except Exception as e:
+            logger.error(f"Gemini Vision API error: {e}", exc_info=True)
+            return {
+                "analysis_summary": f"Error analyzing document pages: {str(e)}",
+                "health_metrics": {},
+                "concerns": [],
+                "recommendations": [],
+                "error": str(e)
+            }
+    
+    def _parse_vision_response(self, result_text: str) -> Dict:
+        """Parse the JSON returned for VISION_PROMPT"""
+        logger.info(f"Gemini response received: {len(result_text)} characters")
+        
+        # Parse JSON response
+        try:
+            # Clean the response - remove markdown code blocks
+            result_text = result_text.strip()
+            if "```json" in result_text:
+                result_text = result_text.split("```json")[1].split("```")[0].strip()
+            elif "```" in result_text:
+                result_text = result_text.split("```")[1].split("```")[0].strip()
+            
+            result_json = json.loads(result_text)
+            
+            # Extract and format the data
+            return {
+                "analysis_summary": result_json.get("summary", "Medical report analyzed"),
+                "health_metrics": result_json.get("health_metrics", {}),
+                "concerns": result_json.get("concerns", []),
+                "recommendations": result_json.get("recommendations", []),
+                "conditions": result_json.get("conditions", []),
+                "medications": result_json.get("medications", []),
+                "document_type": result_json.get("document_type", "medical_report"),
+                "date": result_json.get("date")
+            }
+            
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON parsing error: {e}")
+            logger.error(f"Raw response: {result_text}")
+            
+            # Fallback: extract what we can from raw text
+            return {
+                "analysis_summary": result_text[:500],
+                "health_metrics": {},
+                "concerns": [],
+                "recommendations": [],
+                "raw_text": result_text
+            }
+    
     async def text_only_analyze(self, text_content: str, filename: str) -> Dict:
         """
         Analyze text content when image analysis is not possible
@@ -243,7 +447,8 @@ Return in this EXACT JSON format:
 
 Return ONLY valid JSON."""
             
-            response = self.client.models.generate_content(
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
                 model=self.model_name,
                 contents=prompt
             )
@@ -275,43 +480,22 @@ Return ONLY valid JSON."""
 
 
     async def analyze_and_update_history(self, file: Dict[str, Any], mother_id: Any) -> Dict[str, Any]:
+        """
+        Analyze a document and append its findings to the mother's structured history.
+        Entries are appended and merged server-side, so concurrent uploads don't
+        overwrite each other and the full history blob is never re-read.
+        """
         if not self.client:
             return {"success": False, "error": "AI not available"}
         try:
             fb = file.get('bytes')
             fn = file.get('filename') or 'document'
             analysis = await self.analyze_document(fb, fn, str(mother_id))
-            from services.supabase_service import supabase
-            from utils.toon_helper import json_to_toon
-            prof = supabase.table('mothers').select('medical_history').eq('id', mother_id).execute()
-            old_hist = (prof.data[0].get('medical_history') if prof.data else {}) or {}
-            old_toon = json_to_toon(old_hist)
-            prompt = (
-                "Compare the OLD medical history with the NEW report analysis. "
-                "Return an updated JSON with keys: conditions, medications, trend_analysis. "
-                "Focus on changes and trends."
-            )
-            payload = [prompt, f"OLD:\n{old_toon}", f"NEW:\n{analysis.get('analysis_summary','')}"]
-            resp = self.client.models.generate_content(
-                model=self.model_name,
-                contents=payload
+            from services.history_service import record_analysis
+            history_latest = await asyncio.to_thread(
+                record_analysis, mother_id, analysis, file.get('report_id'), file.get('uploaded_at')
             )
-            txt = resp.text.strip()
-            if "```json" in txt:
-                txt = txt.split("```json")[1].split("```")[0].strip()
-            elif "```" in txt:
-                txt = txt.split("```")[1].split("```")[0].strip()
-            import json as _json
-            try:
-                new_hist = _json.loads(txt)
-            except Exception:
-                new_hist = {
-                    "conditions": old_hist.get("conditions", []),
-                    "medications": old_hist.get("medications", []),
-                    "trend_analysis": analysis.get("analysis_summary", "")
-                }
-            supabase.table('mothers').update({"medical_history": new_hist}).eq('id', mother_id).execute()
-            return {"success": True, "medical_history": new_hist, "analysis": analysis}
+            return {"success": True, "medical_history": history_latest or {}, "analysis": analysis}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
@@ -6,9 +6,14 @@ Sends email alerts to ASHA workers and Doctors using Resend API
 import os
 import logging
 import httpx
-from typing import Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 
+try:
+    from backend.services.http_client import get_sync_client
+except ImportError:
+    from services.http_client import get_sync_client
+
 logger = logging.getLogger(__name__)
 
 # Resend API Configuration
@@ -17,6 +22,28 @@ FROM_EMAIL = os.getenv("FROM_EMAIL", "onboarding@resend.dev")
 FROM_NAME = os.getenv("FROM_NAME", "MatruRaksha AI")
 
 RESEND_API_URL = "https://api.resend.com/emails"
+RESEND_BATCH_URL = "https://api.resend.com/emails/batch"
+# Resend accepts up to 100 emails per batch request
+RESEND_BATCH_SIZE = 100
+
+
+def _resend_headers() -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {RESEND_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+
+def _resend_payload(to_email: str, subject: str, body_html: str, body_text: Optional[str] = None) -> Dict[str, Any]:
+    payload = {
+        "from": f"{FROM_NAME} <{FROM_EMAIL}>",
+        "to": [to_email],
+        "subject": subject,
+        "html": body_html
+    }
+    if body_text:
+        payload["text"] = body_text
+    return payload
 
 
 def send_email(
@@ -45,23 +72,8 @@ def send_email(
         return {"status": "error", "error": "No recipient email provided"}
     
     try:
-        headers = {
-            "Authorization": f"Bearer {RESEND_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "from": f"{FROM_NAME} <{FROM_EMAIL}>",
-            "to": [to_email],
-            "subject": subject,
-            "html": body_html
-        }
-        
-        if body_text:
-            payload["text"] = body_text
-        
-        with httpx.Client(timeout=30.0) as client:
-            response = client.post(RESEND_API_URL, json=payload, headers=headers)
+        payload = _resend_payload(to_email, subject, body_html, body_text)
+        response = get_sync_client().post(RESEND_API_URL, json=payload, headers=_resend_headers())
         
         if response.status_code in [200, 201]:
             result = response.json()
@@ -80,7 +92,54 @@ def send_email(
         return {"status": "error", "error": str(e)}
 
 
-def send_alert_email(
+def send_email_batch(emails: Iterable[Dict[str, Any]]) -> List[Dict]:
+    """
+    Send many emails through Resend's batch endpoint (100 per request).
+    
+    Args:
+        emails: dicts with "to", "subject", "html" and optional "text"
+        
+    Returns:
+        One result per email, in input order
+    """
+    emails = list(emails)
+    if not RESEND_API_KEY:
+        logger.warning("❌ Email not configured: RESEND_API_KEY missing")
+        return [{"status": "error", "error": "Resend API key not configured"} for _ in emails]
+    
+    results: List[Dict] = [{"status": "error", "error": "No recipient email provided"} for _ in emails]
+    indexed = [(i, e) for i, e in enumerate(emails) if e.get("to")]
+    
+    for start in range(0, len(indexed), RESEND_BATCH_SIZE):
+        chunk = indexed[start:start + RESEND_BATCH_SIZE]
+        payload = [
+            _resend_payload(e["to"], e.get("subject", ""), e.get("html", ""), e.get("text"))
+            for _, e in chunk
+        ]
+        try:
+            response = get_sync_client().post(RESEND_BATCH_URL, json=payload, headers=_resend_headers())
+            if response.status_code in [200, 201]:
+                sent = response.json().get("data") or []
+                for n, (i, e) in enumerate(chunk):
+                    email_id = sent[n].get("id") if n < len(sent) else None
+                    results[i] = {"status": "sent", "to": e["to"], "id": email_id}
+                logger.info(f"✅ Batch of {len(chunk)} emails sent via Resend")
+                continue
+            error = response.text
+            logger.error(f"❌ Resend batch error: {error}")
+        except httpx.TimeoutException:
+            error = "Request timeout"
+            logger.error("❌ Resend batch timeout")
+        except Exception as e:
+            error = str(e)
+            logger.error(f"❌ Email batch failed: {e}")
+        for i, _ in chunk:
+            results[i] = {"status": "error", "error": error}
+    
+    return results
+
+
+def build_alert_email(
     to_email: str,
     recipient_name: str,
     recipient_role: str,  # "ASHA Worker" or "Doctor"
@@ -90,20 +149,12 @@ def send_alert_email(
     location: str,
     alert_type: str = "emergency",
     additional_details: Optional[Dict] = None
-) -> Dict:
+) -> Tuple[str, str, str]:
     """
-    Send a formatted alert email for emergencies or updates.
+    Build the subject, HTML and plain-text bodies of an alert email.
     
-    Args:
-        to_email: Recipient email
-        recipient_name: Name of the doctor/ASHA worker
-        recipient_role: "ASHA Worker" or "Doctor"
-        mother_name: Name of the mother
-        mother_id: ID of the mother
-        mother_phone: Phone number of the mother
-        location: Mother's location
-        alert_type: Type of alert (emergency, update, reminder)
-        additional_details: Extra information to include
+    Returns:
+        (subject, body_html, body_text)
     """
     now = datetime.now()
     timestamp = now.strftime("%d %B %Y at %I:%M %p")
@@ -226,6 +277,38 @@ ACTION REQUIRED: Please contact the patient or visit at the earliest convenience
 This is an automated message from MatruRaksha AI maternal health monitoring system.
     """
     
+    return subject, body_html, body_text
+
+
+def send_alert_email(
+    to_email: str,
+    recipient_name: str,
+    recipient_role: str,  # "ASHA Worker" or "Doctor"
+    mother_name: str,
+    mother_id: str,
+    mother_phone: str,
+    location: str,
+    alert_type: str = "emergency",
+    additional_details: Optional[Dict] = None
+) -> Dict:
+    """
+    Send a formatted alert email for emergencies or updates.
+    
+    Args:
+        to_email: Recipient email
+        recipient_name: Name of the doctor/ASHA worker
+        recipient_role: "ASHA Worker" or "Doctor"
+        mother_name: Name of the mother
+        mother_id: ID of the mother
+        mother_phone: Phone number of the mother
+        location: Mother's location
+        alert_type: Type of alert (emergency, update, reminder)
+        additional_details: Extra information to include
+    """
+    subject, body_html, body_text = build_alert_email(
+        to_email, recipient_name, recipient_role, mother_name, mother_id,
+        mother_phone, location, alert_type, additional_details
+    )
     return send_email(to_email, subject, body_html, body_text)
 
 
@@ -0,0 +1,313 @@
+"""
+MatruRaksha AI - Medical History Service
+Append-only structured medical history with a small "latest values" projection.
+
+Each analyzed report appends rows to `medical_history_entries` (one per metric,
+concern, recommendation...) instead of rewriting `mothers.medical_history`.
+`mothers.history_latest` holds the latest value per metric plus active concerns,
+and is what context builders read.
+
+Merging happens server-side in the `append_medical_history` RPC (row-locked). If
+the RPC is not installed, entries are still appended and the projection is merged
+in Python with optimistic versioning on `mothers.history_version`.
+"""
+
+import os
+import re
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from backend.services.supabase_service import supabase
+    from backend.services.cache_service import invalidate_telegram_mothers_cache
+except ImportError:
+    from services.supabase_service import supabase
+    from services.cache_service import invalidate_telegram_mothers_cache
+
+logger = logging.getLogger(__name__)
+
+HISTORY_MAX_CONCERNS = 10
+HISTORY_KEEP_PER_KEY = int(os.getenv("HISTORY_KEEP_PER_KEY", "20"))
+# Compact a mother's entries every N merges
+HISTORY_COMPACT_EVERY = int(os.getenv("HISTORY_COMPACT_EVERY", "25"))
+OPTIMISTIC_RETRIES = 5
+_ALL_CHATS = object()
+
+EMPTY_PROJECTION: Dict[str, Any] = {
+    "metrics": {},
+    "concerns": [],
+    "conditions": [],
+    "medications": [],
+    "trend_analysis": None,
+}
+
+# Gemini returns a few spellings for the same metric
+METRIC_ALIASES = {
+    "glucose": "blood_sugar",
+    "blood_glucose": "blood_sugar",
+    "sugar_level": "blood_sugar",
+    "hb": "hemoglobin",
+    "haemoglobin": "hemoglobin",
+}
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+# Report dates are requested as YYYY-MM-DD; anything else is free text
+REPORT_DATE_FORMAT = "%Y-%m-%d"
+
+
+def _normalize_key(value: str) -> str:
+    return re.sub(r"\s+", " ", str(value).strip().lower())
+
+
+def _parse_number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str) and "/" not in value:
+        match = _NUMBER.search(value)
+        if match:
+            return float(match.group())
+    return None
+
+
+def _observed_at(analysis: Dict[str, Any], uploaded_at: Optional[str]) -> str:
+    """Date printed on the report if Gemini read one cleanly, else the upload time"""
+    report_date = analysis.get("date")
+    if isinstance(report_date, str):
+        try:
+            return datetime.strptime(report_date.strip(), REPORT_DATE_FORMAT).isoformat()
+        except ValueError:
+            logger.debug(f"Ignoring unparseable report date: {report_date!r}")
+    if uploaded_at:
+        try:
+            return datetime.fromisoformat(str(uploaded_at).replace("Z", "+00:00")).isoformat()
+        except ValueError:
+            pass
+    return datetime.now().isoformat()
+
+
+def build_entries(
+    analysis: Dict[str, Any],
+    source_report_id: Optional[str] = None,
+    uploaded_at: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Flatten an analysis result into history entries.
+
+    Accepts both shapes in use: report_service (`extracted_data`) and
+    DocumentAnalyzer (`health_metrics`, `analysis_summary`).
+    """
+    base = {"observed_at": _observed_at(analysis, uploaded_at), "source_report_id": source_report_id}
+    entries: List[Dict[str, Any]] = []
+
+    metrics = analysis.get("extracted_data") or analysis.get("health_metrics") or {}
+    if isinstance(metrics, dict):
+        flat = dict(metrics)
+        nested = flat.pop("other_values", None)
+        if isinstance(nested, dict):
+            flat.update(nested)
+        systolic = flat.pop("blood_pressure_systolic", None)
+        diastolic = flat.pop("blood_pressure_diastolic", None)
+        if systolic and diastolic and not flat.get("blood_pressure"):
+            flat["blood_pressure"] = f"{systolic}/{diastolic}"
+        for name, value in flat.items():
+            if value in (None, "", "null") or name in ("note", "other_findings"):
+                continue
+            key = METRIC_ALIASES.get(_normalize_key(name), _normalize_key(name))
+            entries.append({
+                **base,
+                "entry_type": "metric",
+                "key": key,
+                "value": str(value),
+                "numeric_value": _parse_number(value),
+            })
+
+    for entry_type, field in (
+        ("concern", "concerns"),
+        ("recommendation", "recommendations"),
+        ("condition", "conditions"),
+        ("medication", "medications"),
+    ):
+        for text in analysis.get(field) or []:
+            if text:
+                entries.append({**base, "entry_type": entry_type, "key": _normalize_key(text)[:200], "value": str(text)})
+
+    summary = analysis.get("analysis_summary") or analysis.get("risk_reasoning")
+    if summary:
+        entries.append({**base, "entry_type": "note", "key": "trend_analysis", "value": str(summary)})
+
+    return entries
+
+
+def merge_projection(latest: Optional[Dict[str, Any]], entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fold new entries into a projection (Python twin of build_history_latest)"""
+    merged = {**EMPTY_PROJECTION, **(latest or {})}
+    metrics = dict(merged.get("metrics") or {})
+    concerns = list(merged.get("concerns") or [])
+    conditions = list(merged.get("conditions") or [])
+    medications = list(merged.get("medications") or [])
+
+    for entry in entries:
+        entry_type, value = entry["entry_type"], entry.get("value")
+        if entry_type == "metric":
+            current = metrics.get(entry["key"])
+            if not current or str(current.get("observed_at") or "") <= str(entry["observed_at"]):
+                metrics[entry["key"]] = {"value": value, "observed_at": entry["observed_at"]}
+        elif entry_type == "concern":
+            concerns = [value] + [c for c in concerns if _normalize_key(c) != entry["key"]]
+        elif entry_type == "condition" and value not in conditions:
+            conditions.append(value)
+        elif entry_type == "medication" and value not in medications:
+            medications.append(value)
+        elif entry_type == "note":
+            merged["trend_analysis"] = value
+
+    merged.update({
+        "metrics": metrics,
+        "concerns": concerns[:HISTORY_MAX_CONCERNS],
+        "conditions": conditions,
+        "medications": medications,
+        "updated_at": datetime.now().isoformat(),
+    })
+    return merged
+
+
+def _append_optimistic(mother_id: Any, entries: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Optional[int], Any]:
+    """
+    Fallback when the RPC is missing: append rows, then compare-and-set the projection.
+    Returns (projection, new history_version, telegram_chat_id).
+    """
+    supabase.table("medical_history_entries").insert(
+        [{**entry, "mother_id": mother_id} for entry in entries]
+    ).execute()
+
+    for _ in range(OPTIMISTIC_RETRIES):
+        row = supabase.table("mothers").select(
+            "history_latest, history_version, telegram_chat_id"
+        ).eq("id", mother_id).execute()
+        if not row.data:
+            return None, None, None
+        version = row.data[0].get("history_version") or 0
+        latest = merge_projection(row.data[0].get("history_latest"), entries)
+        updated = supabase.table("mothers").update({
+            "history_latest": latest,
+            "history_version": version + 1,
+        }).eq("id", mother_id).eq("history_version", version).execute()
+        if updated.data:
+            return latest, version + 1, row.data[0].get("telegram_chat_id")
+        logger.info(f"🔁 History version conflict for mother {mother_id}, retrying")
+
+    logger.warning(f"⚠️  Could not merge history projection for mother {mother_id} after {OPTIMISTIC_RETRIES} attempts")
+    return None, None, None
+
+
+def append_history(mother_id: Any, entries: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Append entries and return the refreshed projection"""
+    if not entries:
+        return get_history_latest(mother_id)
+    try:
+        result = supabase.rpc("append_medical_history", {
+            "p_mother_id": mother_id,
+            "p_entries": entries,
+        }).execute()
+        latest = result.data
+        # The RPC reports the new history_version and the chat alongside the projection
+        meta = latest if isinstance(latest, dict) else {}
+        version = meta.pop("history_version", None)
+        # An older RPC doesn't say which chat: clear every chat's entry
+        chat_id = meta.pop("telegram_chat_id", None) if "telegram_chat_id" in meta else _ALL_CHATS
+    except Exception as rpc_error:
+        logger.debug(f"append_medical_history RPC unavailable: {rpc_error}")
+        latest, version, chat_id = _append_optimistic(mother_id, entries)
+
+    # Cached Telegram profiles carry the mothers row, history_latest included
+    if chat_id is _ALL_CHATS:
+        invalidate_telegram_mothers_cache()
+    elif chat_id:
+        invalidate_telegram_mothers_cache(chat_id)
+    _maybe_compact(mother_id, version)
+    return latest
+
+
+def record_analysis(
+    mother_id: Any,
+    analysis: Dict[str, Any],
+    source_report_id: Optional[str] = None,
+    uploaded_at: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Add one report's analysis to the mother's structured history"""
+    try:
+        latest = append_history(mother_id, build_entries(analysis, source_report_id, uploaded_at))
+        logger.info(f"🗂️  Medical history updated for mother {mother_id}")
+        return latest
+    except Exception as e:
+        logger.error(f"❌ Error updating medical history for mother {mother_id}: {e}")
+        return None
+
+
+def get_history_latest(mother_id: Any) -> Dict[str, Any]:
+    """Latest-values projection for context building"""
+    try:
+        row = supabase.table("mothers").select("history_latest").eq("id", mother_id).execute()
+        if row.data and row.data[0].get("history_latest"):
+            return row.data[0]["history_latest"]
+    except Exception as e:
+        logger.debug(f"history_latest not available: {e}")
+    return {}
+
+
+def compact_history(mother_id: Any, keep_per_key: int = HISTORY_KEEP_PER_KEY) -> int:
+    """Drop all but the newest `keep_per_key` entries per metric/concern"""
+    try:
+        result = supabase.rpc("compact_medical_history", {
+            "p_mother_id": mother_id,
+            "p_keep": keep_per_key,
+        }).execute()
+        deleted = result.data or 0
+    except Exception:
+        rows = supabase.table("medical_history_entries")\
+            .select("id, entry_type, key")\
+            .eq("mother_id", mother_id)\
+            .order("observed_at", desc=True)\
+            .execute().data or []
+        seen: Dict[tuple, int] = {}
+        stale = []
+        for row in rows:
+            bucket = (row["entry_type"], row["key"])
+            seen[bucket] = seen.get(bucket, 0) + 1
+            if seen[bucket] > keep_per_key:
+                stale.append(row["id"])
+        for start in range(0, len(stale), 200):
+            supabase.table("medical_history_entries").delete().in_("id", stale[start:start + 200]).execute()
+        deleted = len(stale)
+
+    if deleted:
+        logger.info(f"🧹 Compacted {deleted} history entries for mother {mother_id}")
+    return deleted
+
+
+def merge_legacy_history(latest: Optional[Dict[str, Any]], legacy: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Projection for context building, topped up from the legacy
+    `mothers.medical_history` blob for fields no report has filled in yet
+    (conditions and medications were only ever kept there).
+    """
+    if not latest:
+        return legacy or {}
+    if not isinstance(legacy, dict):
+        return latest
+    merged = dict(latest)
+    for field in ("conditions", "medications", "trend_analysis"):
+        if not merged.get(field) and legacy.get(field):
+            merged[field] = legacy[field]
+    return merged
+
+
+def _maybe_compact(mother_id: Any, version: Optional[int]) -> None:
+    """Compact every HISTORY_COMPACT_EVERY merges, using the version the append just wrote"""
+    if not version or version % HISTORY_COMPACT_EVERY:
+        return
+    try:
+        compact_history(mother_id)
+    except Exception as e:
+        logger.debug(f"History compaction skipped: {e}")
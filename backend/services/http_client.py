@@ -0,0 +1,71 @@
+"""
+MatruRaksha AI - Shared HTTP Clients
+Long-lived, pooled httpx clients so outbound calls reuse keep-alive connections
+instead of opening a new session per request.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import importlib.util
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+# HTTP/2 multiplexes concurrent requests to one host (e.g. Telegram) over a single
+# connection; used when the h2 package is installed (httpx[http2])
+HTTP2_ENABLED = (
+    os.getenv("HTTP_CLIENT_HTTP2", "true").lower() == "true"
+    and importlib.util.find_spec("h2") is not None
+)
+
+# Async clients are bound to the event loop that created their connections,
+# so keep one per loop (the API loop, the bot loop, short-lived job loops)
+_async_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+_sync_client: Optional[httpx.Client] = None
+_lock = threading.Lock()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the pooled async client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(id(loop))
+    # id() can be reused by a new loop after an old one is collected
+    if entry is None or entry[0] is not loop or entry[1].is_closed:
+        entry = (loop, httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, limits=DEFAULT_LIMITS, http2=HTTP2_ENABLED))
+        _async_clients[id(loop)] = entry
+        logger.debug("🔌 Created pooled async HTTP client")
+    return entry[1]
+
+
+def get_sync_client() -> httpx.Client:
+    """Return the pooled sync client (for scheduler jobs and background threads)"""
+    global _sync_client
+    with _lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(timeout=DEFAULT_TIMEOUT, limits=DEFAULT_LIMITS, http2=HTTP2_ENABLED)
+            logger.debug("🔌 Created pooled sync HTTP client")
+        return _sync_client
+
+
+async def close_async_client() -> None:
+    """Close the running loop's async client (call before a job's loop finishes)"""
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.pop(id(loop), None)
+    if entry is not None and entry[0] is loop:
+        await entry[1].aclose()
+
+
+async def close_clients() -> None:
+    """Close pooled clients (call on application shutdown)"""
+    global _sync_client
+    await close_async_client()
+    with _lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
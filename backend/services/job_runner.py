@@ -0,0 +1,354 @@
+"""
+MatruRaksha AI - Async Job Runner
+asyncio replacement for the `schedule` polling loop.
+
+- Jobs run as tasks: a slow job never delays the ones scheduled after it
+- `max_instances` caps overlapping runs of the same job (extra firings are skipped)
+- The last scheduled run of each job is persisted, so a run missed while the
+  process was down is caught up on restart (within the job's catch-up window)
+- Per-job duration, run/failure/skip counts and message throughput go to utils.metrics
+
+Runs inside the FastAPI lifespan (`start()` / `stop()`) or standalone (`run()`).
+State lives in the `scheduler_job_runs` table (infra/supabase/add_scheduler_job_runs.sql),
+with a local JSON file as stand-in when the table is not available.
+
+Replicas: every run takes a lease (services.lease_service) and skips a slot that
+another replica already recorded, so N replicas send each reminder once. With
+SCHEDULER_SHARD_COUNT > 1, sharded jobs run on every replica for that replica's
+SCHEDULER_SHARD_INDEX slice of the cohort, each slice under its own lease.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from backend.utils import metrics
+    from backend.services.lease_service import Lease, LeaseLost, LocalLeaseStore, make_holder_id, SCHEDULER_LEASE_SECONDS
+except ImportError:
+    from utils import metrics
+    from services.lease_service import Lease, LeaseLost, LocalLeaseStore, make_holder_id, SCHEDULER_LEASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+JOB_RUNS_TABLE = "scheduler_job_runs"
+SCHEDULER_STATE_FILE = os.getenv("SCHEDULER_STATE_FILE", ".scheduler_state.json")
+DEFAULT_CATCH_UP_SECONDS = 3 * 3600
+MAX_SLEEP_SECONDS = 60
+SCHEDULER_SHARD_INDEX = int(os.getenv("SCHEDULER_SHARD_INDEX", "0"))
+SCHEDULER_SHARD_COUNT = int(os.getenv("SCHEDULER_SHARD_COUNT", "1"))
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def current_shard() -> Optional[Tuple[int, int]]:
+    """(index, count) for this replica, or None when sharding is off"""
+    if SCHEDULER_SHARD_COUNT <= 1:
+        return None
+    return SCHEDULER_SHARD_INDEX, SCHEDULER_SHARD_COUNT
+
+
+def _now() -> datetime:
+    """Local wall-clock time (jobs are scheduled in server-local time, like `schedule`)"""
+    return datetime.now().astimezone()
+
+
+class Job:
+    """A function run daily (or weekly on `weekday`) at local time `at` ("HH:MM")"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        at: str,
+        weekday: Optional[str] = None,
+        max_instances: int = 1,
+        catch_up_seconds: int = DEFAULT_CATCH_UP_SECONDS,
+        sharded: bool = False
+    ):
+        hour, minute = (int(part) for part in at.split(":"))
+        if weekday is not None and weekday.lower() not in WEEKDAYS:
+            raise ValueError(f"Unknown weekday: {weekday}")
+        self.name = name
+        self.func = func
+        self.at = at
+        self.hour = hour
+        self.minute = minute
+        self.weekday = WEEKDAYS.index(weekday.lower()) if weekday else None
+        self.max_instances = max(1, max_instances)
+        self.catch_up_seconds = catch_up_seconds
+        self.sharded = sharded
+        self.running = 0
+        self.next_due: Optional[datetime] = None
+
+    def _matches_day(self, moment: datetime) -> bool:
+        return self.weekday is None or moment.weekday() == self.weekday
+
+    def previous_run(self, now: datetime) -> datetime:
+        """Most recent scheduled time at or before `now`"""
+        candidate = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if candidate > now:
+            candidate -= timedelta(days=1)
+        while not self._matches_day(candidate):
+            candidate -= timedelta(days=1)
+        return candidate
+
+    def next_run(self, now: datetime) -> datetime:
+        """First scheduled time strictly after `now`"""
+        candidate = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        while not self._matches_day(candidate):
+            candidate += timedelta(days=1)
+        return candidate
+
+    def describe(self) -> str:
+        day = WEEKDAYS[self.weekday].title() if self.weekday is not None else "Daily"
+        return f"{day} {self.at}"
+
+
+# ==================== RUN STATE ====================
+
+class FileJobStore:
+    """Local stand-in for the job-run table: one JSON file per process host"""
+
+    def __init__(self, path: str = SCHEDULER_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def last_scheduled_for(self, job_name: str) -> Optional[datetime]:
+        with self._lock:
+            value = self._read().get(job_name, {}).get("last_scheduled_for")
+        return datetime.fromisoformat(value) if value else None
+
+    def record(self, job_name: str, **fields: Any) -> None:
+        with self._lock:
+            state = self._read()
+            state.setdefault(job_name, {}).update(
+                {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in fields.items()}
+            )
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+
+
+class SupabaseJobStore:
+    """Job-run state in the `scheduler_job_runs` table"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def last_scheduled_for(self, job_name: str) -> Optional[datetime]:
+        result = self.client.table(JOB_RUNS_TABLE).select("last_scheduled_for").eq("job_name", job_name).limit(1).execute()
+        value = result.data[0].get("last_scheduled_for") if result.data else None
+        return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+    def record(self, job_name: str, **fields: Any) -> None:
+        row = {"job_name": job_name, **{k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in fields.items()}}
+        self.client.table(JOB_RUNS_TABLE).upsert(row, on_conflict="job_name").execute()
+
+
+def default_job_store(client=None):
+    """Supabase table when migrated, otherwise the local JSON file"""
+    if client is not None:
+        try:
+            client.table(JOB_RUNS_TABLE).select("job_name").limit(1).execute()
+            return SupabaseJobStore(client)
+        except Exception as e:
+            logger.warning(f"⚠️  {JOB_RUNS_TABLE} unavailable ({e}); using {SCHEDULER_STATE_FILE}")
+    return FileJobStore()
+
+
+# ==================== RUNNER ====================
+
+class JobRunner:
+    """Runs registered jobs concurrently on the current event loop"""
+
+    def __init__(self, store=None, lease_store=None, shard: Optional[Tuple[int, int]] = None):
+        self.store = store or FileJobStore()
+        self.lease_store = lease_store or LocalLeaseStore()
+        self.holder = make_holder_id()
+        self.shard = shard if shard and shard[1] > 1 else None
+        self.jobs: List[Job] = []
+        self._tasks: set = set()
+        self._stop_event: Optional[asyncio.Event] = None
+        self._main_task: Optional[asyncio.Task] = None
+
+    def add_job(self, name: str, func: Callable[[], Any], at: str, weekday: Optional[str] = None, **options: Any) -> Job:
+        job = Job(name, func, at, weekday=weekday, **options)
+        self.jobs.append(job)
+        logger.info(f"✓ {name}: {job.describe()}")
+        return job
+
+    def state_key(self, job: Job) -> str:
+        """Run-state / lease name: per shard for sharded jobs, global otherwise"""
+        if job.sharded and self.shard:
+            return f"{job.name}@{self.shard[0]}of{self.shard[1]}"
+        return job.name
+
+    # ---------- execution ----------
+
+    def _fire(self, job: Job, scheduled_for: datetime, reason: str = "scheduled") -> None:
+        if job.running >= job.max_instances:
+            metrics.increment(f"scheduler.{job.name}.skipped")
+            logger.warning(f"⏭️  {job.name} still running ({job.running}/{job.max_instances}), skipping {reason} run")
+            return
+        job.running += 1
+        task = asyncio.create_task(self._run(job, scheduled_for, reason), name=f"job:{job.name}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _record(self, job_name: str, **fields: Any) -> None:
+        try:
+            await asyncio.to_thread(self.store.record, job_name, **fields)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not record run of {job_name}: {e}")
+
+    async def _run(self, job: Job, scheduled_for: datetime, reason: str) -> None:
+        key = self.state_key(job)
+        try:
+            async with Lease(self.lease_store, f"job:{key}", self.holder, SCHEDULER_LEASE_SECONDS) as lease:
+                if not lease.acquired:
+                    metrics.increment(f"scheduler.{job.name}.lease_busy")
+                    logger.info(f"🔒 {key} is running on another replica, skipping")
+                    return
+                last = await asyncio.to_thread(self.store.last_scheduled_for, key)
+                if last is not None and last >= scheduled_for:
+                    logger.info(f"⏭️  {key} already ran for {scheduled_for.strftime('%Y-%m-%d %H:%M')}")
+                    return
+                await self._execute(job, key, scheduled_for, reason)
+        except Exception as e:
+            logger.error(f"❌ {key} could not be started: {e}")
+        finally:
+            job.running -= 1
+
+    async def _execute(self, job: Job, key: str, scheduled_for: datetime, reason: str) -> None:
+        logger.info(f"▶️  {key} started ({reason}, due {scheduled_for.strftime('%Y-%m-%d %H:%M')})")
+        # Record the slot before running so a crash mid-job isn't replayed in full;
+        # the notification outbox resumes whatever was already queued
+        await self._record(key, last_scheduled_for=scheduled_for, last_started_at=_now(), last_status="running")
+        started = time.perf_counter()
+        status = "ok"
+        result = None
+        try:
+            if asyncio.iscoroutinefunction(job.func):
+                result = await job.func()
+            else:
+                result = await asyncio.to_thread(job.func)
+        except LeaseLost as e:
+            status = "failed"
+            metrics.increment(f"scheduler.{job.name}.lease_lost")
+            logger.error(f"❌ {key} stopped: {e}")
+        except Exception as e:
+            status = "failed"
+            metrics.increment(f"scheduler.{job.name}.failed")
+            logger.error(f"❌ {key} failed: {e}", exc_info=True)
+        else:
+            # Jobs that survive per-recipient errors report them in their result
+            if isinstance(result, dict) and result.get("failed") and not result.get("sent") and not result.get("queued"):
+                status = "failed"
+                metrics.increment(f"scheduler.{job.name}.failed")
+                logger.error(f"❌ {key} reached no one: {result['failed']} failed")
+
+        elapsed = time.perf_counter() - started
+        metrics.increment(f"scheduler.{job.name}.runs")
+        metrics.observe(f"scheduler.{job.name}.seconds", elapsed)
+        if isinstance(result, dict) and "sent" in result:
+            metrics.increment(f"scheduler.{job.name}.messages", result["sent"])
+            if elapsed > 0:
+                metrics.observe(f"scheduler.{job.name}.messages_per_second", result["sent"] / elapsed)
+        logger.info(f"⏹️  {key} {status} in {elapsed:.1f}s")
+        await self._record(
+            key,
+            last_finished_at=_now(),
+            last_status=status,
+            last_duration_seconds=round(elapsed, 3)
+        )
+
+    async def _catch_up(self, now: datetime) -> None:
+        """Run jobs whose latest slot was missed while the process was down"""
+        for job in self.jobs:
+            previous = job.previous_run(now)
+            try:
+                last = await asyncio.to_thread(self.store.last_scheduled_for, self.state_key(job))
+            except Exception as e:
+                logger.warning(f"⚠️  Could not read run state for {job.name}: {e}")
+                continue
+            # Never-run jobs start on their next slot rather than firing on first deploy
+            if last is None or last >= previous:
+                continue
+            if (now - previous).total_seconds() > job.catch_up_seconds:
+                logger.info(f"⏭️  {job.name} missed {previous.strftime('%Y-%m-%d %H:%M')}, outside catch-up window")
+                continue
+            metrics.increment(f"scheduler.{job.name}.caught_up")
+            self._fire(job, previous, reason="catch-up")
+
+    async def run(self, stop_event: Optional[asyncio.Event] = None) -> None:
+        """Run until `stop_event` is set"""
+        self._stop_event = stop_event or self._stop_event or asyncio.Event()
+        now = _now()
+        await self._catch_up(now)
+        for job in self.jobs:
+            job.next_due = job.next_run(now)
+
+        shard_note = f", shard {self.shard[0] + 1}/{self.shard[1]}" if self.shard else ""
+        logger.info(f"🚀 Job runner started with {len(self.jobs)} jobs{shard_note}")
+        while not self._stop_event.is_set():
+            now = _now()
+            for job in self.jobs:
+                if job.next_due <= now:
+                    self._fire(job, job.next_due)
+                    job.next_due = job.next_run(now)
+
+            next_due = min((job.next_due for job in self.jobs), default=now + timedelta(seconds=MAX_SLEEP_SECONDS))
+            # Capped sleep keeps the loop responsive to clock changes
+            timeout = min(max((next_due - _now()).total_seconds(), 0.0), MAX_SLEEP_SECONDS)
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        logger.info("🛑 Job runner stopped")
+
+    # ---------- lifespan integration ----------
+
+    def start(self) -> asyncio.Task:
+        """Start the runner as a background task on the running loop"""
+        self._stop_event = asyncio.Event()
+        self._main_task = asyncio.create_task(self.run(self._stop_event), name="job-runner")
+        return self._main_task
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Stop scheduling and wait (up to `timeout`) for running jobs to finish"""
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self._main_task is not None:
+            await self._main_task
+        if self._tasks:
+            logger.info(f"⏳ Waiting for {len(self._tasks)} running job(s)")
+            _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            if pending:
+                logger.warning(f"⚠️  {len(pending)} job(s) still running at shutdown")
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": job.name,
+                "schedule": job.describe(),
+                "running": job.running,
+                "max_instances": job.max_instances,
+                "sharded": job.sharded and self.shard is not None,
+                "next_run": job.next_due.isoformat() if job.next_due else None,
+                "duration": metrics.summarize(f"scheduler.{job.name}.seconds"),
+            }
+            for job in self.jobs
+        ]
@@ -0,0 +1,173 @@
+"""
+MatruRaksha AI - Lease Service
+Expiring named locks so several scheduler replicas never run the same job twice.
+
+A lease is held by one holder until it is released or its TTL lapses (a crashed
+replica's lease simply expires). `SupabaseLeaseStore` keeps leases in the
+`scheduler_leases` table through the `acquire_scheduler_lease` RPC
+(infra/supabase/add_scheduler_leases.sql); `LocalLeaseStore` is the in-process
+stand-in for single-node setups and local runs.
+
+A job that loses its lease mid-run (renewals refused, or failing for a whole
+TTL) must stop before another replica starts the same work: long loops call
+`check_lease()` between chunks, which raises `LeaseLost` once that happens.
+"""
+
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LEASES_TABLE = "scheduler_leases"
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "300"))
+# Scheduler processes sharing the schedule; > 1 requires the scheduler_leases table
+SCHEDULER_REPLICAS = int(os.getenv("SCHEDULER_REPLICAS", "1"))
+
+
+class LeaseLost(RuntimeError):
+    """The running job's lease expired or went to another holder"""
+
+
+# Lease held by the job running in this context (asyncio.to_thread copies it
+# into the worker thread, so sync jobs see it too)
+_current_lease: "ContextVar[Optional[Lease]]" = ContextVar("current_lease", default=None)
+
+
+def check_lease() -> None:
+    """Raise LeaseLost if the current job's lease is gone; a no-op outside leased jobs"""
+    lease = _current_lease.get()
+    if lease is not None and lease.lost.is_set():
+        raise LeaseLost(f"Lease {lease.name} lost, stopping")
+
+
+def make_holder_id() -> str:
+    """Identity of this process as a lease holder"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class LocalLeaseStore:
+    """In-process leases (one replica, or tests)"""
+
+    def __init__(self):
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, name: str, holder: str, ttl_seconds: int = SCHEDULER_LEASE_SECONDS) -> bool:
+        """Take or extend the lease; False while another holder's lease is live"""
+        now = time.monotonic()
+        with self._lock:
+            current = self._leases.get(name)
+            if current and current[0] != holder and current[1] > now:
+                return False
+            self._leases[name] = (holder, now + ttl_seconds)
+            return True
+
+    def release(self, name: str, holder: str) -> None:
+        with self._lock:
+            current = self._leases.get(name)
+            if current and current[0] == holder:
+                del self._leases[name]
+
+
+class SupabaseLeaseStore:
+    """Leases shared by all replicas through Postgres"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def acquire(self, name: str, holder: str, ttl_seconds: int = SCHEDULER_LEASE_SECONDS) -> bool:
+        result = self.client.rpc("acquire_scheduler_lease", {
+            "p_name": name,
+            "p_holder": holder,
+            "p_ttl_seconds": ttl_seconds,
+        }).execute()
+        return bool(result.data)
+
+    def release(self, name: str, holder: str) -> None:
+        self.client.table(LEASES_TABLE).delete().eq("name", name).eq("holder", holder).execute()
+
+
+def default_lease_store(client=None, shared: bool = SCHEDULER_REPLICAS > 1):
+    """
+    Database leases when the migration is applied, otherwise in-process.
+
+    shared: several scheduler processes run the schedule (replicas or shards).
+    In-process leases cannot keep them apart, so a missing table is an error.
+    """
+    reason = "Supabase not configured"
+    if client is not None:
+        try:
+            client.table(LEASES_TABLE).select("name").limit(1).execute()
+            return SupabaseLeaseStore(client)
+        except Exception as e:
+            reason = f"{LEASES_TABLE} unavailable ({e})"
+    if shared:
+        raise RuntimeError(
+            f"{reason}: multiple scheduler replicas need database leases - "
+            f"apply infra/supabase/add_scheduler_leases.sql or run a single replica"
+        )
+    if client is not None:
+        logger.warning(f"⚠️  {reason}; using in-process leases (single replica only)")
+    return LocalLeaseStore()
+
+
+class Lease:
+    """
+    Async context for holding a lease while work runs; renews it every third of
+    the TTL so long jobs keep it. Check `acquired` before doing the work;
+    `lost` is set once the lease can no longer be held (see check_lease).
+    """
+
+    def __init__(self, store, name: str, holder: str, ttl_seconds: int = SCHEDULER_LEASE_SECONDS):
+        self.store = store
+        self.name = name
+        self.holder = holder
+        self.ttl_seconds = ttl_seconds
+        self.acquired = False
+        # threading.Event: checked from sync jobs running in worker threads
+        self.lost = threading.Event()
+        self._renewer: Optional[asyncio.Task] = None
+        self._token = None
+
+    async def _renew(self) -> None:
+        held_until = time.monotonic() + self.ttl_seconds
+        while True:
+            await asyncio.sleep(max(self.ttl_seconds / 3, 1))
+            try:
+                if not await asyncio.to_thread(self.store.acquire, self.name, self.holder, self.ttl_seconds):
+                    logger.error(f"❌ Lost lease {self.name}; stopping the job")
+                    self.lost.set()
+                    return
+                held_until = time.monotonic() + self.ttl_seconds
+            except Exception as e:
+                if time.monotonic() >= held_until:
+                    logger.error(f"❌ Lease {self.name} expired while renewals failed ({e}); stopping the job")
+                    self.lost.set()
+                    return
+                logger.warning(f"⚠️  Lease renewal for {self.name} failed: {e}")
+
+    async def __aenter__(self) -> "Lease":
+        self.acquired = await asyncio.to_thread(self.store.acquire, self.name, self.holder, self.ttl_seconds)
+        if self.acquired:
+            self._token = _current_lease.set(self)
+            self._renewer = asyncio.create_task(self._renew())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._renewer is not None:
+            self._renewer.cancel()
+        if self._token is not None:
+            _current_lease.reset(self._token)
+            self._token = None
+        if self.acquired:
+            try:
+                await asyncio.to_thread(self.store.release, self.name, self.holder)
+            except Exception as e:
+                logger.warning(f"⚠️  Could not release lease {self.name}: {e}")
@@ -4,6 +4,7 @@ File: services/memory_service.py
 """
 
 import os
+import asyncio
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime
@@ -24,6 +25,16 @@ if GEMINI_API_KEY:
 
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
 
+try:
+    from backend.services.write_buffer import table_writer
+    from backend.services.report_digest_service import refresh_digest
+except ImportError:
+    from services.write_buffer import table_writer
+    from services.report_digest_service import refresh_digest
+
+# Chat log rows are batched off the reply path (flushed by the API lifespan)
+chat_log_writer = table_writer("telegram_logs", lambda: supabase)
+
 
 class GeminiService:
     """
@@ -125,10 +136,12 @@ Guidelines:
             system_prompt = "You are MatruRaksha AI, a helpful maternal health assistant."
             
             if self.db:
-                config = self.db.table("agent_configs")\
-                    .select("system_prompt")\
-                    .eq("mother_id", mother_id)\
-                    .execute()
+                config = await asyncio.to_thread(
+                    self.db.table("agent_configs")
+                    .select("system_prompt")
+                    .eq("mother_id", mother_id)
+                    .execute
+                )
                 
                 if config.data and len(config.data) > 0:
                     system_prompt = config.data[0]["system_prompt"]
@@ -153,7 +166,8 @@ Guidelines:
 Provide a helpful, personalized answer based on the context above. Be warm, clear, and supportive."""
             
             # Call Gemini using new client API
-            response = self.client.models.generate_content(
+            response = await asyncio.to_thread(
+                self.client.models.generate_content,
                 model=self.model_name,
                 contents=full_prompt
             )
@@ -332,6 +346,7 @@ class MemoryService:
         
         try:
             # Store in medical_reports table
+            uploaded_at = datetime.now().isoformat()
             self.db.table("medical_reports").insert({
                 "mother_id": int(mother_id) if str(mother_id).isdigit() else mother_id,
                 "filename": filename,
@@ -341,10 +356,12 @@ class MemoryService:
                 "recommendations": json.dumps(analysis.get("recommendations", [])),
                 "document_id": document_id,
                 "processed": True,
-                "upload_date": datetime.now().isoformat()
+                "upload_date": uploaded_at,
+                "uploaded_at": uploaded_at
             }).execute()
             
             logger.info(f"✅ Stored document analysis in database")
+            await asyncio.to_thread(refresh_digest, mother_id)
             
             # Store key metrics as memories for easy retrieval
             metrics = analysis.get("health_metrics", {})
@@ -467,6 +484,7 @@ async def save_chat_history(
 ) -> bool:
     """
     Persist chat exchanges into `telegram_logs` so conversations can be reviewed later.
+    The row is buffered and written in a batch, so callers never wait on the insert.
     """
     if not supabase:
         logger.warning("⚠️  Supabase client not available; skipping chat log write")
@@ -484,10 +502,7 @@ async def save_chat_history(
     # Drop None values to avoid Supabase errors
     payload = {k: v for k, v in payload.items() if v is not None}
 
-    try:
-        supabase.table("telegram_logs").insert(payload).execute()
-        logger.debug("💬 Chat history saved to telegram_logs")
+    if chat_log_writer.add(payload):
+        logger.debug("💬 Chat history queued for telegram_logs")
         return True
-    except Exception as exc:
-        logger.error(f"❌ Failed to save chat history: {exc}", exc_info=True)
-        return False
\ No newline at end of file
+    return False
\ No newline at end of file
@@ -0,0 +1,499 @@
+"""
+MatruRaksha AI - Message Templates
+Pre-compiled, multilingual templates for scheduler and Telegram messages.
+
+Each template is written once per language (en / hi / mr) with `{field}`
+placeholders. A template is parsed into static chunks and fields the first time a
+(template, language) pair is used and cached, so rendering a broadcast only
+substitutes the per-mother values - no re-parsing, no per-message translation.
+Missing languages fall back to English.
+"""
+
+import logging
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGE = "en"
+SUPPORTED_LANGUAGES = ("en", "hi", "mr")
+_LANGUAGE_ALIASES = {"english": "en", "hindi": "hi", "marathi": "mr"}
+
+TEMPLATES: Dict[str, Dict[str, str]] = {
+    # ==================== SCHEDULER REMINDERS ====================
+    "daily_reminder": {
+        "en": (
+            "🌅 <b>Good Morning, {name}!</b>\n\n"
+            "Week {week} of your pregnancy journey! 🤰\n\n"
+            "📋 <b>Today's Reminders:</b>\n"
+            "• Take your prenatal vitamins 💊\n"
+            "• Drink 8 glasses of water 💧\n"
+            "• Monitor baby movements 👶\n"
+            "• Do your daily check-in: /checkin\n\n"
+            "How are you feeling today? 💚"
+        ),
+        "hi": (
+            "🌅 <b>सुप्रभात, {name}!</b>\n\n"
+            "आपकी गर्भावस्था का सप्ताह {week}! 🤰\n\n"
+            "📋 <b>आज के रिमाइंडर:</b>\n"
+            "• प्रसवपूर्व विटामिन लें 💊\n"
+            "• 8 गिलास पानी पिएं 💧\n"
+            "• शिशु की हलचल पर ध्यान दें 👶\n"
+            "• अपना दैनिक चेक-इन करें: /checkin\n\n"
+            "आज आप कैसा महसूस कर रही हैं? 💚"
+        ),
+        "mr": (
+            "🌅 <b>सुप्रभात, {name}!</b>\n\n"
+            "तुमच्या गर्भावस्थेचा आठवडा {week}! 🤰\n\n"
+            "📋 <b>आजच्या आठवणी:</b>\n"
+            "• प्रसूतीपूर्व जीवनसत्त्वे घ्या 💊\n"
+            "• 8 ग्लास पाणी प्या 💧\n"
+            "• बाळाच्या हालचालींकडे लक्ष द्या 👶\n"
+            "• तुमचे दैनिक चेक-इन करा: /checkin\n\n"
+            "आज तुम्हाला कसे वाटते? 💚"
+        ),
+    },
+    "medication_morning": {
+        "en": (
+            "☀️ <b>Morning Medication Reminder</b>\n\n"
+            "Hi {name}! Time to take your medications:\n\n"
+            "• Folic Acid (5mg)\n"
+            "• Iron supplement (if prescribed)\n\n"
+            "💡 <b>Tips:</b>\n"
+            "• Take with food\n"
+            "• Drink plenty of water\n"
+            "• Take iron 2 hours apart from calcium\n\n"
+            "Reply with /checkin to log your medications! 💚"
+        ),
+        "hi": (
+            "☀️ <b>सुबह की दवा का रिमाइंडर</b>\n\n"
+            "नमस्ते {name}! दवा लेने का समय हो गया है:\n\n"
+            "• फोलिक एसिड (5mg)\n"
+            "• आयरन सप्लीमेंट (यदि डॉक्टर ने लिखा हो)\n\n"
+            "💡 <b>सुझाव:</b>\n"
+            "• भोजन के साथ लें\n"
+            "• खूब पानी पिएं\n"
+            "• आयरन और कैल्शियम में 2 घंटे का अंतर रखें\n\n"
+            "दवा दर्ज करने के लिए /checkin भेजें! 💚"
+        ),
+        "mr": (
+            "☀️ <b>सकाळच्या औषधाची आठवण</b>\n\n"
+            "नमस्कार {name}! औषध घेण्याची वेळ झाली आहे:\n\n"
+            "• फॉलिक ॲसिड (5mg)\n"
+            "• लोह पूरक (डॉक्टरांनी सांगितले असल्यास)\n\n"
+            "💡 <b>सूचना:</b>\n"
+            "• जेवणासोबत घ्या\n"
+            "• भरपूर पाणी प्या\n"
+            "• लोह आणि कॅल्शियममध्ये 2 तासांचे अंतर ठेवा\n\n"
+            "औषध नोंदवण्यासाठी /checkin पाठवा! 💚"
+        ),
+    },
+    "medication_evening": {
+        "en": (
+            "🌙 <b>Evening Medication Reminder</b>\n\n"
+            "Hi {name}! Time to take your medications:\n\n"
+            "• Calcium (500mg)\n\n"
+            "💡 <b>Tips:</b>\n"
+            "• Take with food\n"
+            "• Drink plenty of water\n"
+            "• Take iron 2 hours apart from calcium\n\n"
+            "Reply with /checkin to log your medications! 💚"
+        ),
+        "hi": (
+            "🌙 <b>शाम की दवा का रिमाइंडर</b>\n\n"
+            "नमस्ते {name}! दवा लेने का समय हो गया है:\n\n"
+            "• कैल्शियम (500mg)\n\n"
+            "💡 <b>सुझाव:</b>\n"
+            "• भोजन के साथ लें\n"
+            "• खूब पानी पिएं\n"
+            "• आयरन और कैल्शियम में 2 घंटे का अंतर रखें\n\n"
+            "दवा दर्ज करने के लिए /checkin भेजें! 💚"
+        ),
+        "mr": (
+            "🌙 <b>संध्याकाळच्या औषधाची आठवण</b>\n\n"
+            "नमस्कार {name}! औषध घेण्याची वेळ झाली आहे:\n\n"
+            "• कॅल्शियम (500mg)\n\n"
+            "💡 <b>सूचना:</b>\n"
+            "• जेवणासोबत घ्या\n"
+            "• भरपूर पाणी प्या\n"
+            "• लोह आणि कॅल्शियममध्ये 2 तासांचे अंतर ठेवा\n\n"
+            "औषध नोंदवण्यासाठी /checkin पाठवा! 💚"
+        ),
+    },
+    "milestone_reminder": {
+        "en": (
+            "🎯 <b>Milestone Alert - Week {week}!</b>\n\n"
+            "Hi {name}! You've reached an important milestone:\n\n"
+            "📌 <b>{milestone}</b>\n\n"
+            "Please schedule this with your healthcare provider if not done yet.\n\n"
+            "Need help? Just ask! 💚"
+        ),
+        "hi": (
+            "🎯 <b>महत्वपूर्ण पड़ाव - सप्ताह {week}!</b>\n\n"
+            "नमस्ते {name}! आप एक महत्वपूर्ण पड़ाव पर पहुँच गई हैं:\n\n"
+            "📌 <b>{milestone}</b>\n\n"
+            "यदि अभी तक नहीं कराया है, तो कृपया अपने स्वास्थ्य प्रदाता से समय लें।\n\n"
+            "मदद चाहिए? बस पूछें! 💚"
+        ),
+        "mr": (
+            "🎯 <b>महत्त्वाचा टप्पा - आठवडा {week}!</b>\n\n"
+            "नमस्कार {name}! तुम्ही एका महत्त्वाच्या टप्प्यावर पोहोचला आहात:\n\n"
+            "📌 <b>{milestone}</b>\n\n"
+            "अजून केले नसल्यास, कृपया तुमच्या आरोग्य सेवा प्रदात्याकडे वेळ ठरवा.\n\n"
+            "मदत हवी आहे? नक्की विचारा! 💚"
+        ),
+    },
+    "milestone_12": {
+        "en": "First trimester screening",
+        "hi": "पहली तिमाही की जांच",
+        "mr": "पहिल्या तिमाहीची तपासणी",
+    },
+    "milestone_20": {
+        "en": "Anatomy scan (mid-pregnancy ultrasound)",
+        "hi": "एनाटॉमी स्कैन (गर्भावस्था के मध्य का अल्ट्रासाउंड)",
+        "mr": "ॲनाटॉमी स्कॅन (गर्भावस्थेच्या मध्याचा अल्ट्रासाऊंड)",
+    },
+    "milestone_24": {
+        "en": "Glucose screening test",
+        "hi": "ग्लूकोज जांच",
+        "mr": "ग्लुकोज तपासणी",
+    },
+    "milestone_28": {
+        "en": "Third trimester begins",
+        "hi": "तीसरी तिमाही शुरू",
+        "mr": "तिसरी तिमाही सुरू",
+    },
+    "milestone_32": {
+        "en": "Growth scan",
+        "hi": "ग्रोथ स्कैन",
+        "mr": "ग्रोथ स्कॅन",
+    },
+    "milestone_36": {
+        "en": "Group B strep test & birth plan discussion",
+        "hi": "ग्रुप बी स्ट्रेप जांच और प्रसव योजना पर चर्चा",
+        "mr": "ग्रुप बी स्ट्रेप तपासणी आणि प्रसूती योजनेवर चर्चा",
+    },
+    "milestone_37": {
+        "en": "Full term - baby can arrive anytime!",
+        "hi": "पूर्ण अवधि - शिशु कभी भी आ सकता है!",
+        "mr": "पूर्ण मुदत - बाळ कधीही येऊ शकते!",
+    },
+    "milestone_40": {
+        "en": "Due date week!",
+        "hi": "प्रसव की संभावित तारीख का सप्ताह!",
+        "mr": "प्रसूतीच्या अपेक्षित तारखेचा आठवडा!",
+    },
+    "weekly_report": {
+        "en": (
+            "📊 <b>Weekly Summary Report</b>\n\n"
+            "Hi {name}! Here's your week in review:\n\n"
+            "🤰 <b>Pregnancy Week:</b> {week}\n"
+            "✅ <b>Check-ins:</b> 6 of 7 days\n"
+            "💊 <b>Medications:</b> 95% compliance\n"
+            "📈 <b>Health Status:</b> Stable\n"
+            "🟢 <b>Risk Level:</b> Low\n\n"
+            "<b>This Week's Achievements:</b>\n"
+            "• Consistent daily check-ins ⭐\n"
+            "• Good medication adherence ⭐\n"
+            "• No concerning symptoms ⭐\n\n"
+            "<b>Next Week's Goals:</b>\n"
+            "• Continue daily vitamins\n"
+            "• Track baby movements\n"
+            "• Stay hydrated\n\n"
+            "Keep up the amazing work! 💪💚"
+        ),
+        "hi": (
+            "📊 <b>साप्ताहिक सारांश रिपोर्ट</b>\n\n"
+            "नमस्ते {name}! आपका यह सप्ताह:\n\n"
+            "🤰 <b>गर्भावस्था सप्ताह:</b> {week}\n"
+            "✅ <b>चेक-इन:</b> 7 में से 6 दिन\n"
+            "💊 <b>दवाएं:</b> 95% नियमितता\n"
+            "📈 <b>स्वास्थ्य स्थिति:</b> स्थिर\n"
+            "🟢 <b>जोखिम स्तर:</b> कम\n\n"
+            "<b>इस सप्ताह की उपलब्धियां:</b>\n"
+            "• नियमित दैनिक चेक-इन ⭐\n"
+            "• दवाओं का अच्छा पालन ⭐\n"
+            "• कोई चिंताजनक लक्षण नहीं ⭐\n\n"
+            "<b>अगले सप्ताह के लक्ष्य:</b>\n"
+            "• रोज़ विटामिन लेती रहें\n"
+            "• शिशु की हलचल पर ध्यान दें\n"
+            "• पर्याप्त पानी पिएं\n\n"
+            "ऐसे ही बढ़िया काम करती रहें! 💪💚"
+        ),
+        "mr": (
+            "📊 <b>साप्ताहिक सारांश अहवाल</b>\n\n"
+            "नमस्कार {name}! तुमचा हा आठवडा:\n\n"
+            "🤰 <b>गर्भावस्था आठवडा:</b> {week}\n"
+            "✅ <b>चेक-इन:</b> 7 पैकी 6 दिवस\n"
+            "💊 <b>औषधे:</b> 95% नियमितता\n"
+            "📈 <b>आरोग्य स्थिती:</b> स्थिर\n"
+            "🟢 <b>धोका पातळी:</b> कमी\n\n"
+            "<b>या आठवड्यातील यश:</b>\n"
+            "• नियमित दैनिक चेक-इन ⭐\n"
+            "• औषधांचे चांगले पालन ⭐\n"
+            "• कोणतीही चिंताजनक लक्षणे नाहीत ⭐\n\n"
+            "<b>पुढील आठवड्याची उद्दिष्टे:</b>\n"
+            "• दररोज जीवनसत्त्वे घेत रहा\n"
+            "• बाळाच्या हालचालींची नोंद ठेवा\n"
+            "• पुरेसे पाणी प्या\n\n"
+            "असेच छान काम करत रहा! 💪💚"
+        ),
+    },
+    "weekly_assessment": {
+        "en": (
+            "{risk_emoji} <b>Weekly Health Report - Week {week}</b>\n\n"
+            "📊 <b>Current Status:</b> {risk_level}\n\n"
+            "📋 <b>This Week's Focus:</b>\n"
+            "• Continue prenatal vitamins\n"
+            "• Monitor baby movements daily\n"
+            "• Stay well hydrated (8 glasses)\n"
+            "• Get adequate rest\n\n"
+            "📅 <b>Next Assessment:</b> {next_date}\n\n"
+            "💚 Keep up the great work!"
+        ),
+        "hi": (
+            "{risk_emoji} <b>साप्ताहिक स्वास्थ्य रिपोर्ट - सप्ताह {week}</b>\n\n"
+            "📊 <b>वर्तमान स्थिति:</b> {risk_level}\n\n"
+            "📋 <b>इस सप्ताह ध्यान दें:</b>\n"
+            "• प्रसवपूर्व विटामिन जारी रखें\n"
+            "• रोज़ शिशु की हलचल पर ध्यान दें\n"
+            "• पर्याप्त पानी पिएं (8 गिलास)\n"
+            "• पूरा आराम करें\n\n"
+            "📅 <b>अगली जांच:</b> {next_date}\n\n"
+            "💚 ऐसे ही बढ़िया काम करती रहें!"
+        ),
+        "mr": (
+            "{risk_emoji} <b>साप्ताहिक आरोग्य अहवाल - आठवडा {week}</b>\n\n"
+            "📊 <b>सध्याची स्थिती:</b> {risk_level}\n\n"
+            "📋 <b>या आठवड्यात लक्ष द्या:</b>\n"
+            "• प्रसूतीपूर्व जीवनसत्त्वे सुरू ठेवा\n"
+            "• दररोज बाळाच्या हालचालींकडे लक्ष द्या\n"
+            "• पुरेसे पाणी प्या (8 ग्लास)\n"
+            "• पुरेशी विश्रांती घ्या\n\n"
+            "📅 <b>पुढील तपासणी:</b> {next_date}\n\n"
+            "💚 असेच छान काम करत रहा!"
+        ),
+    },
+    # No per-mother fields: reminders for the same slot and facility share one
+    # body, so the outbox sends them as a single bulk SMS call
+    "appointment_sms_tomorrow": {
+        "en": "Reminder: Your appointment is tomorrow at {time} at {facility}.",
+        "hi": "रिमाइंडर: आपकी अपॉइंटमेंट कल {time} बजे {facility} में है।",
+        "mr": "आठवण: तुमची अपॉइंटमेंट उद्या {time} वाजता {facility} येथे आहे.",
+    },
+    "appointment_sms_today": {
+        "en": "Reminder: Your appointment is today at {time} at {facility}.",
+        "hi": "रिमाइंडर: आपकी अपॉइंटमेंट आज {time} बजे {facility} में है।",
+        "mr": "आठवण: तुमची अपॉइंटमेंट आज {time} वाजता {facility} येथे आहे.",
+    },
+    "appointment_telegram_tomorrow": {
+        "en": "📅 <b>Appointment Tomorrow</b>\n\n{message}",
+        "hi": "📅 <b>कल अपॉइंटमेंट है</b>\n\n{message}",
+        "mr": "📅 <b>उद्या अपॉइंटमेंट आहे</b>\n\n{message}",
+    },
+    "appointment_telegram_today": {
+        "en": "📅 <b>Appointment Today</b>\n\n{message}",
+        "hi": "📅 <b>आज अपॉइंटमेंट है</b>\n\n{message}",
+        "mr": "📅 <b>आज अपॉइंटमेंट आहे</b>\n\n{message}",
+    },
+
+    # ==================== TELEGRAM SERVICE ====================
+    "risk_alert": {
+        "en": (
+            "{emoji} <b>Health Alert for {mother_name}</b>\n\n"
+            "<b>Risk Status:</b> {risk_status}\n"
+            "<b>Risk Score:</b> {risk_percent}%\n\n"
+            "⏰ <b>Check-up Time!</b>\n"
+            "Your latest health assessment shows {risk_status_lower}.\n\n"
+            "📋 <b>Next Steps:</b>\n"
+            "• Contact your healthcare provider\n"
+            "• Schedule an appointment if needed\n"
+            "• Follow wellness recommendations\n\n"
+            "💬 Reply to this message or use /help for more information.\n\n"
+            "Stay healthy! 🤰"
+        ),
+        "hi": (
+            "{emoji} <b>{mother_name} के लिए स्वास्थ्य अलर्ट</b>\n\n"
+            "<b>जोखिम स्थिति:</b> {risk_status}\n"
+            "<b>जोखिम स्कोर:</b> {risk_percent}%\n\n"
+            "⏰ <b>जांच का समय!</b>\n"
+            "आपकी नवीनतम स्वास्थ्य जांच में {risk_status_lower} दिखा है।\n\n"
+            "📋 <b>अगले कदम:</b>\n"
+            "• अपने स्वास्थ्य प्रदाता से संपर्क करें\n"
+            "• ज़रूरत हो तो अपॉइंटमेंट लें\n"
+            "• स्वास्थ्य सुझावों का पालन करें\n\n"
+            "💬 अधिक जानकारी के लिए इस संदेश का उत्तर दें या /help का उपयोग करें।\n\n"
+            "स्वस्थ रहें! 🤰"
+        ),
+        "mr": (
+            "{emoji} <b>{mother_name} यांच्यासाठी आरोग्य सूचना</b>\n\n"
+            "<b>धोका स्थिती:</b> {risk_status}\n"
+            "<b>धोका गुण:</b> {risk_percent}%\n\n"
+            "⏰ <b>तपासणीची वेळ!</b>\n"
+            "तुमच्या नवीनतम आरोग्य तपासणीत {risk_status_lower} दिसून आले आहे.\n\n"
+            "📋 <b>पुढील पावले:</b>\n"
+            "• तुमच्या आरोग्य सेवा प्रदात्याशी संपर्क साधा\n"
+            "• गरज असल्यास अपॉइंटमेंट घ्या\n"
+            "• आरोग्य सूचनांचे पालन करा\n\n"
+            "💬 अधिक माहितीसाठी या संदेशाला उत्तर द्या किंवा /help वापरा.\n\n"
+            "निरोगी रहा! 🤰"
+        ),
+    },
+    "appointment_reminder": {
+        "en": (
+            "📅 <b>Appointment Reminder for {mother_name}</b>\n\n"
+            "<b>Facility:</b> {facility}\n"
+            "<b>Date:</b> {appointment_date}\n"
+            "<b>Time:</b> {appointment_time}\n\n"
+            "✅ <b>Please Remember:</b>\n"
+            "• Arrive 10-15 minutes early\n"
+            "• Bring any previous reports\n"
+            "• Contact provider if you can't make it\n\n"
+            "📞 <b>Contact Healthcare Provider:</b>\n"
+            "If you need to reschedule, reply to this message.\n\n"
+            "Your health matters! 💙"
+        ),
+        "hi": (
+            "📅 <b>{mother_name} के लिए अपॉइंटमेंट रिमाइंडर</b>\n\n"
+            "<b>स्वास्थ्य केंद्र:</b> {facility}\n"
+            "<b>तारीख:</b> {appointment_date}\n"
+            "<b>समय:</b> {appointment_time}\n\n"
+            "✅ <b>कृपया याद रखें:</b>\n"
+            "• 10-15 मिनट पहले पहुँचें\n"
+            "• पिछली रिपोर्ट साथ लाएं\n"
+            "• न आ सकें तो प्रदाता को सूचित करें\n\n"
+            "📞 <b>स्वास्थ्य प्रदाता से संपर्क:</b>\n"
+            "समय बदलना हो तो इस संदेश का उत्तर दें।\n\n"
+            "आपका स्वास्थ्य महत्वपूर्ण है! 💙"
+        ),
+        "mr": (
+            "📅 <b>{mother_name} यांच्यासाठी अपॉइंटमेंटची आठवण</b>\n\n"
+            "<b>आरोग्य केंद्र:</b> {facility}\n"
+            "<b>तारीख:</b> {appointment_date}\n"
+            "<b>वेळ:</b> {appointment_time}\n\n"
+            "✅ <b>कृपया लक्षात ठेवा:</b>\n"
+            "• 10-15 मिनिटे आधी पोहोचा\n"
+            "• मागील अहवाल सोबत आणा\n"
+            "• येऊ शकत नसल्यास प्रदात्याला कळवा\n\n"
+            "📞 <b>आरोग्य सेवा प्रदात्याशी संपर्क:</b>\n"
+            "वेळ बदलायची असल्यास या संदेशाला उत्तर द्या.\n\n"
+            "तुमचे आरोग्य महत्त्वाचे आहे! 💙"
+        ),
+    },
+    "medication_list_reminder": {
+        "en": (
+            "💊 <b>Medication Reminder</b>\n\n"
+            "{med_list}\n\n"
+            "⏰ <b>Important:</b>\n"
+            "• Take medications on time\n"
+            "• Don't skip doses\n"
+            "• Report any side effects immediately\n\n"
+            "📝 <b>Side Effects?</b>\n"
+            "If experiencing unusual symptoms, reply with /emergency\n\n"
+            "Stay consistent! 💪"
+        ),
+        "hi": (
+            "💊 <b>दवा रिमाइंडर</b>\n\n"
+            "{med_list}\n\n"
+            "⏰ <b>ज़रूरी:</b>\n"
+            "• दवाएं समय पर लें\n"
+            "• कोई खुराक न छोड़ें\n"
+            "• कोई दुष्प्रभाव हो तो तुरंत बताएं\n\n"
+            "📝 <b>दुष्प्रभाव?</b>\n"
+            "असामान्य लक्षण हों तो /emergency भेजें\n\n"
+            "नियमित रहें! 💪"
+        ),
+        "mr": (
+            "💊 <b>औषधाची आठवण</b>\n\n"
+            "{med_list}\n\n"
+            "⏰ <b>महत्त्वाचे:</b>\n"
+            "• औषधे वेळेवर घ्या\n"
+            "• कोणताही डोस चुकवू नका\n"
+            "• कोणतेही दुष्परिणाम लगेच कळवा\n\n"
+            "📝 <b>दुष्परिणाम?</b>\n"
+            "असामान्य लक्षणे असल्यास /emergency पाठवा\n\n"
+            "नियमित रहा! 💪"
+        ),
+    },
+    "wellness_tip": {
+        "en": (
+            "💡 <b>Daily Wellness Tip</b>\n\n"
+            "{tip_text}\n\n"
+            "💙 <b>Remember:</b>\n"
+            "Your health is our priority.\n"
+            "Take care of yourself!\n\n"
+            "Questions? Reply with /help"
+        ),
+        "hi": (
+            "💡 <b>आज का स्वास्थ्य सुझाव</b>\n\n"
+            "{tip_text}\n\n"
+            "💙 <b>याद रखें:</b>\n"
+            "आपका स्वास्थ्य हमारी प्राथमिकता है।\n"
+            "अपना ध्यान रखें!\n\n"
+            "सवाल? /help भेजें"
+        ),
+        "mr": (
+            "💡 <b>आजची आरोग्य टीप</b>\n\n"
+            "{tip_text}\n\n"
+            "💙 <b>लक्षात ठेवा:</b>\n"
+            "तुमचे आरोग्य आमची प्राथमिकता आहे.\n"
+            "स्वतःची काळजी घ्या!\n\n"
+            "प्रश्न? /help पाठवा"
+        ),
+    },
+}
+
+
+def normalize_language(language: Optional[str]) -> str:
+    """Map a stored preference ("hi", "Hindi", None, ...) to a supported code"""
+    if not language:
+        return DEFAULT_LANGUAGE
+    code = str(language).strip().lower()
+    code = _LANGUAGE_ALIASES.get(code, code[:2])
+    return code if code in SUPPORTED_LANGUAGES else DEFAULT_LANGUAGE
+
+
+class CompiledTemplate:
+    """A template split once into (static text, field, format spec) chunks"""
+
+    __slots__ = ("name", "language", "parts", "fields", "static")
+
+    def __init__(self, name: str, language: str, text: str):
+        self.name = name
+        self.language = language
+        self.parts: Tuple[Tuple[str, Optional[str], str], ...] = tuple(
+            (literal, field, spec or "")
+            for literal, field, spec, _conversion in Formatter().parse(text)
+        )
+        self.fields = tuple(field for _, field, _ in self.parts if field)
+        # Fully static templates render to the same string every time
+        self.static = "".join(literal for literal, _, _ in self.parts) if not self.fields else None
+
+    def render(self, values: Dict[str, Any]) -> str:
+        if self.static is not None:
+            return self.static
+        out = []
+        for literal, field, spec in self.parts:
+            out.append(literal)
+            if field:
+                value = values[field]
+                out.append(format(value, spec) if spec else str(value))
+        return "".join(out)
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str, language: str = DEFAULT_LANGUAGE) -> CompiledTemplate:
+    """Compiled template for (name, language), falling back to English"""
+    variants = TEMPLATES.get(name)
+    if variants is None:
+        raise KeyError(f"Unknown message template: {name}")
+    language = normalize_language(language)
+    if language not in variants:
+        language = DEFAULT_LANGUAGE
+    return CompiledTemplate(name, language, variants[language])
+
+
+def render(template: str, language: Optional[str] = None, /, **values: Any) -> str:
+    """Render a template in the mother's preferred language"""
+    return get_template(template, normalize_language(language)).render(values)
@@ -0,0 +1,498 @@
+"""
+MatruRaksha AI - Notification Outbox
+Durable, idempotent delivery for outbound Telegram / SMS / email messages.
+
+Producers call `enqueue()` / `enqueue_many()`; each message carries a dedup key
+(mother, template, date) so re-running a job never sends twice. `OutboxWorker`
+claims due rows (`claim_outbox_batch` RPC, SKIP LOCKED), delivers them through
+the broadcast service's rate-limited senders (SMS and email as bulk provider
+calls), retries failures with exponential backoff and moves exhausted messages
+to the dead-letter status. A standing worker (`start_outbox_worker`) runs in
+the API and scheduler processes; producers in the same process wake it.
+
+Requires infra/supabase/add_notification_outbox.sql.
+"""
+
+import os
+import time
+import uuid
+import random
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    from backend.services.supabase_service import supabase as default_client
+    from backend.services.broadcast_service import NotificationDispatcher, TelegramBroadcaster, pump
+    from backend.services.http_client import close_async_client
+    from backend.services.email_service import send_email, send_email_batch
+    from backend.services.sms_service import SMS_ACCEPTED_STATUSES
+    from backend.utils import metrics
+except ImportError:
+    from services.supabase_service import supabase as default_client
+    from services.broadcast_service import NotificationDispatcher, TelegramBroadcaster, pump
+    from services.http_client import close_async_client
+    from services.email_service import send_email, send_email_batch
+    from services.sms_service import SMS_ACCEPTED_STATUSES
+    from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_TABLE = "notification_outbox"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "32"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+# How often the standing worker looks for due retries (new rows wake it immediately)
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+# How long producers trust a cached "outbox table exists" answer
+OUTBOX_CHECK_SECONDS = 300
+# Emergency alerts are claimed before any bulk traffic (ORDER BY priority DESC)
+PRIORITY_BULK = 0
+PRIORITY_EMERGENCY = 100
+ALERT_LATENCY_SLO_SECONDS = float(os.getenv("ALERT_LATENCY_SLO_SECONDS", "10"))
+OUTBOX_BACKOFF_BASE_SECONDS = 30
+OUTBOX_BACKOFF_MAX_SECONDS = 3600
+# Emergency rows are retried on a much shorter schedule than bulk traffic
+ALERT_BACKOFF_BASE_SECONDS = 2
+ALERT_BACKOFF_MAX_SECONDS = 60
+ENQUEUE_CHUNK_SIZE = 500
+
+CHANNELS = ("telegram", "sms", "email")
+
+
+def make_dedup_key(mother_id: Any, template: str, on_date: Optional[date] = None, channel: str = "") -> str:
+    """Idempotency key: one message per (mother, template, date[, channel])"""
+    on_date = on_date or date.today()
+    parts = [str(mother_id), template, on_date.isoformat()]
+    if channel:
+        parts.append(channel)
+    return ":".join(parts)
+
+
+def outbox_row(
+    channel: str,
+    recipient: Any,
+    text: str,
+    dedup_key: str,
+    mother_id: Any = None,
+    template: Optional[str] = None,
+    priority: int = PRIORITY_BULK,
+    subject: Optional[str] = None,
+    html: Optional[str] = None,
+    parse_mode: str = "HTML",
+    max_attempts: int = OUTBOX_MAX_ATTEMPTS
+) -> Dict[str, Any]:
+    if channel not in CHANNELS:
+        raise ValueError(f"Unknown channel: {channel}")
+    payload = {"text": text}
+    if channel == "telegram":
+        payload["parse_mode"] = parse_mode
+    if channel == "email":
+        payload.update({"subject": subject or "", "html": html or text})
+    return {
+        "dedup_key": dedup_key,
+        "channel": channel,
+        "recipient": str(recipient),
+        "payload": payload,
+        "mother_id": mother_id,
+        "template": template,
+        "priority": priority,
+        "max_attempts": max_attempts,
+    }
+
+
+def enqueue(channel: str, recipient: Any, text: str, dedup_key: str, client=None, **options: Any) -> None:
+    """Write one message to the outbox; a duplicate dedup key is silently ignored"""
+    enqueue_many([outbox_row(channel, recipient, text, dedup_key, **options)], client=client)
+
+
+def enqueue_many(rows: Iterable[Dict[str, Any]], client=None) -> int:
+    """
+    Bulk-insert outbox rows (built with `outbox_row`), ignoring duplicates.
+    Accepts any iterable, so large broadcasts are written in chunks.
+
+    Returns the number of rows actually inserted (duplicates are not counted).
+    """
+    client = client or default_client
+    total = 0
+    chunk: List[Dict[str, Any]] = []
+
+    def flush() -> None:
+        nonlocal total
+        if chunk:
+            # ignore_duplicates returns only the rows that were inserted
+            result = client.table(OUTBOX_TABLE).upsert(
+                chunk, on_conflict="dedup_key", ignore_duplicates=True
+            ).execute()
+            total += len(result.data or [])
+            chunk.clear()
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= ENQUEUE_CHUNK_SIZE:
+            flush()
+    flush()
+    metrics.increment("outbox.enqueued", total)
+    if total:
+        wake_outbox_worker()
+    return total
+
+
+def outbox_available(client=None) -> bool:
+    """True when the outbox table exists (migration applied)"""
+    client = client or default_client
+    if client is None:
+        return False
+    try:
+        client.table(OUTBOX_TABLE).select("id").limit(1).execute()
+        return True
+    except Exception as e:
+        logger.debug(f"Outbox unavailable: {e}")
+        return False
+
+
+_outbox_checked: Dict[str, Any] = {"at": 0.0, "ok": False}
+
+
+def outbox_ready() -> bool:
+    """`outbox_available` for per-message producers, cached for OUTBOX_CHECK_SECONDS"""
+    now = time.monotonic()
+    if now - _outbox_checked["at"] > OUTBOX_CHECK_SECONDS:
+        _outbox_checked.update(at=now, ok=outbox_available())
+    return _outbox_checked["ok"]
+
+
+# ==================== CLAIM / ACK ====================
+
+def claim_batch(worker_id: str, limit: int = OUTBOX_BATCH_SIZE, channels: Optional[List[str]] = None,
+                client=None) -> List[Dict[str, Any]]:
+    """Atomically claim due messages for this worker"""
+    client = client or default_client
+    result = client.rpc("claim_outbox_batch", {
+        "p_worker": worker_id,
+        "p_limit": limit,
+        "p_lease_seconds": OUTBOX_LEASE_SECONDS,
+        "p_channels": channels,
+    }).execute()
+    return result.data or []
+
+
+def record_alert_latency(source: str, occurred_at: datetime) -> float:
+    """End-to-end alert latency: triggering event -> provider accepted the message"""
+    if occurred_at.tzinfo is None:
+        occurred_at = occurred_at.replace(tzinfo=timezone.utc)
+    latency = (datetime.now(timezone.utc) - occurred_at).total_seconds()
+    metrics.observe_slo("alert.latency_seconds", latency, ALERT_LATENCY_SLO_SECONDS)
+    metrics.observe(f"alert.{source}.latency_seconds", latency)
+    if latency > ALERT_LATENCY_SLO_SECONDS:
+        logger.warning(f"🐢 Alert ({source}) delivered in {latency:.1f}s, over the {ALERT_LATENCY_SLO_SECONDS:.0f}s SLO")
+    return latency
+
+
+def _record_row_latency(row: Dict[str, Any]) -> None:
+    if (row.get("priority") or 0) < PRIORITY_EMERGENCY or not row.get("created_at"):
+        return
+    try:
+        created_at = datetime.fromisoformat(str(row["created_at"]).replace("Z", "+00:00"))
+    except ValueError:
+        return
+    record_alert_latency(row.get("template") or "alert", created_at)
+
+
+def backoff_seconds(attempts: int, priority: int = PRIORITY_BULK) -> float:
+    """Exponential backoff with jitter (short schedule for emergency rows)"""
+    if priority >= PRIORITY_EMERGENCY:
+        base, cap = ALERT_BACKOFF_BASE_SECONDS, ALERT_BACKOFF_MAX_SECONDS
+    else:
+        base, cap = OUTBOX_BACKOFF_BASE_SECONDS, OUTBOX_BACKOFF_MAX_SECONDS
+    delay = min(base * (2 ** max(attempts - 1, 0)), cap)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def mark_sent(row: Dict[str, Any], client=None) -> None:
+    mark_sent_many([row["id"]], client=client)
+
+
+def mark_sent_many(ids: List[int], client=None) -> None:
+    """Acknowledge a bulk-delivered group with one update"""
+    if not ids:
+        return
+    client = client or default_client
+    client.table(OUTBOX_TABLE).update({
+        "status": "sent",
+        "sent_at": datetime.now(timezone.utc).isoformat(),
+        "locked_by": None,
+        "last_error": None,
+    }).in_("id", ids).execute()
+
+
+def mark_failed(row: Dict[str, Any], error: str, client=None) -> str:
+    """Schedule a retry, or dead-letter the message once attempts are exhausted"""
+    client = client or default_client
+    attempts = row.get("attempts") or 1
+    if attempts >= (row.get("max_attempts") or OUTBOX_MAX_ATTEMPTS):
+        status = "dead"
+        update = {"status": "dead", "locked_by": None, "last_error": error[:500]}
+        metrics.increment(f"outbox.{row.get('channel')}.dead")
+        logger.error(f"☠️  Outbox message {row['id']} ({row.get('channel')}) dead-lettered: {error}")
+    else:
+        status = "pending"
+        delay = backoff_seconds(attempts, row.get("priority") or PRIORITY_BULK)
+        next_attempt = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        update = {
+            "status": "pending",
+            "locked_by": None,
+            "next_attempt_at": next_attempt.isoformat(),
+            "last_error": error[:500],
+        }
+    client.table(OUTBOX_TABLE).update(update).eq("id", row["id"]).execute()
+    return status
+
+
+def requeue_dead(ids: Optional[List[int]] = None, client=None) -> int:
+    """Move dead-lettered messages back to pending (all of them when ids is None)"""
+    client = client or default_client
+    query = client.table(OUTBOX_TABLE).update({
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": datetime.now(timezone.utc).isoformat(),
+    }).eq("status", "dead")
+    if ids:
+        query = query.in_("id", ids)
+    result = query.execute()
+    return len(result.data or [])
+
+
+def outbox_stats(client=None) -> Dict[str, int]:
+    """Message counts per status"""
+    client = client or default_client
+    stats = {}
+    for status in ("pending", "sending", "sent", "dead"):
+        result = client.table(OUTBOX_TABLE).select("id", count="exact").eq("status", status).limit(1).execute()
+        stats[status] = result.count or 0
+    return stats
+
+
+# ==================== DELIVERY ====================
+
+class OutboxWorker:
+    """Claims due outbox rows and delivers them through the rate-limited senders"""
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        concurrency: int = OUTBOX_CONCURRENCY,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        channels: Optional[List[str]] = None,
+        dispatcher: Optional[NotificationDispatcher] = None,
+        client=None
+    ):
+        self.worker_id = worker_id or f"outbox-{uuid.uuid4().hex[:8]}"
+        self.concurrency = max(1, concurrency)
+        self.batch_size = batch_size
+        self.channels = channels
+        # One provider attempt per outbox attempt: failures are retried by the
+        # outbox's own backoff, not by a second retry loop inside the sender
+        self.dispatcher = dispatcher or NotificationDispatcher(TelegramBroadcaster(max_retries=0))
+        self.client = client or default_client
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    async def _send(self, row: Dict[str, Any]) -> bool:
+        payload = row.get("payload") or {}
+        channel = row.get("channel")
+        if channel == "email":
+            result = await asyncio.to_thread(
+                send_email, row["recipient"], payload.get("subject", ""), payload.get("html") or payload.get("text", "")
+            )
+            return result.get("status") == "sent"
+        return await self.dispatcher.send({
+            "channel": channel,
+            "to": row["recipient"],
+            "text": payload.get("text", ""),
+            "parse_mode": payload.get("parse_mode", "HTML"),
+        })
+
+    async def deliver(self, row: Dict[str, Any]) -> bool:
+        try:
+            ok = await self._send(row)
+            error = "" if ok else "provider rejected message"
+        except Exception as e:
+            ok, error = False, str(e)
+
+        if ok:
+            await asyncio.to_thread(mark_sent, row, self.client)
+            _record_row_latency(row)
+        else:
+            await asyncio.to_thread(mark_failed, row, error, self.client)
+        return ok
+
+    async def _settle(self, rows: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Record per-recipient outcomes of a bulk call ("submitted" = accepted as part of a bulk request)"""
+        sent_ids = []
+        failed = 0
+        for row, result in zip(rows, results):
+            if result.get("status") in SMS_ACCEPTED_STATUSES:
+                sent_ids.append(row["id"])
+                _record_row_latency(row)
+            else:
+                failed += 1
+                await asyncio.to_thread(mark_failed, row, str(result.get("error") or "send failed"), self.client)
+        await asyncio.to_thread(mark_sent_many, sent_ids, self.client)
+        return {"sent": len(sent_ids), "failed": failed}
+
+    async def deliver_sms(self, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Group SMS rows by body so identical reminders go out as bulk calls.
+        SMS templates carry no per-mother fields (appointment reminders differ
+        only by slot and facility), so a group spans every recipient of a body.
+        """
+        if not rows:
+            return {"sent": 0, "failed": 0}
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault((row.get("payload") or {}).get("text", ""), []).append(row)
+
+        totals = {"sent": 0, "failed": 0}
+        for text, group in groups.items():
+            try:
+                by_phone = await self.dispatcher.send_sms_bulk([r["recipient"] for r in group], text)
+            except Exception as e:
+                by_phone = {}
+                logger.error(f"❌ Outbox bulk SMS error: {e}")
+            results = [by_phone.get(r["recipient"], {"status": "error", "error": "bulk send failed"}) for r in group]
+            counts = await self._settle(group, results)
+            totals["sent"] += counts["sent"]
+            totals["failed"] += counts["failed"]
+        return totals
+
+    async def deliver_email(self, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Send email rows through the provider's batch endpoint"""
+        if not rows:
+            return {"sent": 0, "failed": 0}
+        emails = []
+        for row in rows:
+            payload = row.get("payload") or {}
+            emails.append({
+                "to": row["recipient"],
+                "subject": payload.get("subject", ""),
+                "html": payload.get("html") or payload.get("text", ""),
+            })
+        try:
+            results = await asyncio.to_thread(send_email_batch, emails)
+        except Exception as e:
+            logger.error(f"❌ Outbox email batch error: {e}")
+            results = [{"status": "error", "error": str(e)} for _ in rows]
+        return await self._settle(rows, results)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Deliver everything currently due, batch by batch"""
+        totals = {"sent": 0, "failed": 0}
+        while True:
+            batch = await asyncio.to_thread(claim_batch, self.worker_id, self.batch_size, self.channels, self.client)
+            if not batch:
+                break
+            by_channel: Dict[str, List[Dict[str, Any]]] = {channel: [] for channel in CHANNELS}
+            for row in batch:
+                by_channel.setdefault(row.get("channel"), []).append(row)
+
+            # Telegram has no bulk API: concurrent single sends. SMS/email: bulk calls.
+            jobs = [self.deliver_sms(by_channel["sms"]), self.deliver_email(by_channel["email"])]
+            if by_channel["telegram"]:
+                jobs.append(pump(by_channel["telegram"], self.deliver,
+                                 min(self.concurrency, len(by_channel["telegram"])), "outbox"))
+            for result in await asyncio.gather(*jobs):
+                totals["sent"] += result["sent"]
+                totals["failed"] += result["failed"]
+        return totals
+
+    def wake(self) -> None:
+        """Deliver newly queued rows now instead of at the next poll (thread-safe)"""
+        loop, event = self._loop, self._wake
+        if loop is not None and event is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(event.set)
+
+    async def run_forever(self, poll_interval: float = OUTBOX_POLL_SECONDS,
+                          stop_event: Optional[asyncio.Event] = None) -> None:
+        """Keep draining the outbox until `stop_event` is set"""
+        logger.info(f"📮 Outbox worker {self.worker_id} started")
+        stop_event = stop_event or asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        try:
+            while not stop_event.is_set():
+                self._wake.clear()
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    logger.error(f"❌ Outbox worker error: {e}")
+                waiters = [asyncio.ensure_future(stop_event.wait()), asyncio.ensure_future(self._wake.wait())]
+                await asyncio.wait(waiters, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in waiters:
+                    waiter.cancel()
+        finally:
+            self._loop = None
+            self._wake = None
+        logger.info(f"📮 Outbox worker {self.worker_id} stopped")
+
+
+# ==================== STANDING WORKER ====================
+
+_worker: Optional[OutboxWorker] = None
+_worker_task: Optional[asyncio.Task] = None
+_worker_stop: Optional[asyncio.Event] = None
+
+
+async def start_outbox_worker(client=None) -> bool:
+    """
+    Run an OutboxWorker on the current event loop (API lifespan, scheduler).
+
+    Rows enqueued in this process wake it; rows from other processes and due
+    retries are picked up every OUTBOX_POLL_SECONDS. Returns False when the
+    outbox table is not installed.
+    """
+    global _worker, _worker_task, _worker_stop
+    if _worker_task is not None and not _worker_task.done():
+        return True
+    if not await asyncio.to_thread(outbox_available, client):
+        logger.warning("⚠️  Outbox table not found; outbox worker not started")
+        return False
+    _worker = OutboxWorker(client=client)
+    _worker_stop = asyncio.Event()
+    _worker_task = asyncio.create_task(_worker.run_forever(stop_event=_worker_stop))
+    return True
+
+
+async def stop_outbox_worker(timeout: float = 10.0) -> None:
+    global _worker, _worker_task, _worker_stop
+    if _worker_task is None:
+        return
+    _worker_stop.set()
+    _, pending = await asyncio.wait([_worker_task], timeout=timeout)
+    for task in pending:
+        task.cancel()
+    _worker, _worker_task, _worker_stop = None, None, None
+
+
+def outbox_worker_running() -> bool:
+    return _worker_task is not None and not _worker_task.done()
+
+
+def wake_outbox_worker() -> None:
+    """Nudge this process's standing worker, if any (safe from any thread)"""
+    if _worker is not None:
+        _worker.wake()
+
+
+def deliver_outbox(**options: Any) -> Dict[str, Any]:
+    """Blocking entry point for scheduler jobs: drain all due messages"""
+
+    async def _run() -> Dict[str, Any]:
+        try:
+            return await OutboxWorker(**options).run_once()
+        finally:
+            await close_async_client()
+
+    return asyncio.run(_run())
@@ -0,0 +1,142 @@
+"""
+MatruRaksha AI - Report Digest Service
+Per-mother pre-merged view of recent medical reports.
+
+Report metrics, concerns and recommendations are stored as JSON (sometimes as
+JSON strings) across several columns. Instead of decoding and merging them on
+every chat message, the merged result is kept in `mother_report_digests` and
+refreshed whenever a report's analysis completes or a report is deleted.
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    from backend.services.supabase_service import supabase as default_client
+except ImportError:
+    from services.supabase_service import supabase as default_client
+
+logger = logging.getLogger(__name__)
+
+DIGEST_TABLE = "mother_report_digests"
+DIGEST_REPORT_LIMIT = 10
+REPORT_COLUMNS = (
+    "analysis_summary, uploaded_at, created_at, health_metrics, "
+    "extracted_metrics, analysis_result, concerns, recommendations"
+)
+
+
+def _to_dict(value: Any) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            return parsed if isinstance(parsed, dict) else {}
+        except Exception:
+            return {}
+    return {}
+
+
+def _to_list(value: Any) -> List[Any]:
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            return parsed if isinstance(parsed, list) else [value]
+        except Exception:
+            return [value]
+    if value:
+        return [value]
+    return []
+
+
+def compute_digest(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge reports (newest first) into summaries, metrics, concerns and recommendations.
+    For a metric present in several reports the newest value wins.
+    """
+    summaries: List[Dict[str, str]] = []
+    metrics: Dict[str, Any] = {}
+    concerns: set = set()
+    recommendations: set = set()
+
+    # Walk oldest -> newest so newer reports overwrite older metric values
+    for r in reversed(reports):
+        for source in (
+            _to_dict(r.get("health_metrics")),
+            _to_dict(r.get("extracted_metrics")),
+            _to_dict(_to_dict(r.get("analysis_result")).get("extracted_data")),
+        ):
+            for key, val in source.items():
+                if val not in (None, "", "null"):
+                    metrics[key] = val
+
+        concerns.update(str(c) for c in _to_list(r.get("concerns")) if c)
+        recommendations.update(str(rec) for rec in _to_list(r.get("recommendations")) if rec)
+
+    for r in reports:
+        uploaded_at = r.get("uploaded_at") or r.get("created_at") or ""
+        summaries.append({"date": uploaded_at[:10], "summary": r.get("analysis_summary") or ""})
+
+    return {
+        "summaries": summaries,
+        "metrics": metrics,
+        "concerns": sorted(concerns),
+        "recommendations": sorted(recommendations),
+        "report_count": len(reports),
+    }
+
+
+def fetch_recent_reports(mother_id: Any, client=None, limit: int = DIGEST_REPORT_LIMIT) -> List[Dict[str, Any]]:
+    client = client or default_client
+    result = client.table("medical_reports") \
+        .select(REPORT_COLUMNS) \
+        .eq("mother_id", mother_id) \
+        .order("uploaded_at", desc=True) \
+        .limit(limit).execute()
+    return result.data or []
+
+
+def store_digest(mother_id: Any, digest: Dict[str, Any], client=None) -> None:
+    client = client or default_client
+    client.table(DIGEST_TABLE).upsert({
+        "mother_id": mother_id,
+        **digest,
+        "refreshed_at": datetime.now().isoformat(),
+    }, on_conflict="mother_id").execute()
+
+
+def refresh_digest(mother_id: Any, client=None) -> Optional[Dict[str, Any]]:
+    """Rebuild and store a mother's digest (call after analysis completes or a report is removed)"""
+    try:
+        digest = compute_digest(fetch_recent_reports(mother_id, client))
+        store_digest(mother_id, digest, client)
+        logger.info(f"🧾 Report digest refreshed for mother {mother_id} ({digest['report_count']} reports)")
+        return digest
+    except Exception as e:
+        logger.error(f"❌ Error refreshing report digest for mother {mother_id}: {e}")
+        return None
+
+
+def get_digest(mother_id: Any, client=None) -> Optional[Dict[str, Any]]:
+    """Stored digest, building it on first use for mothers that don't have one yet"""
+    client = client or default_client
+    try:
+        result = client.table(DIGEST_TABLE).select("*").eq("mother_id", mother_id).execute()
+        if result.data:
+            return result.data[0]
+    except Exception as e:
+        logger.debug(f"Report digest not available: {e}")
+        # Table missing - merge live without trying to store
+        return compute_digest(fetch_recent_reports(mother_id, client))
+
+    digest = compute_digest(fetch_recent_reports(mother_id, client))
+    try:
+        store_digest(mother_id, digest, client)
+    except Exception as e:
+        logger.debug(f"Could not store report digest: {e}")
+    return digest
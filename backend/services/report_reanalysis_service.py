@@ -0,0 +1,413 @@
+"""
+MatruRaksha AI - Report Re-analysis Service
+Batch re-processing of stored medical reports after a prompt or model change.
+
+Reports are streamed with keyset pagination on `medical_reports.id`, small image
+reports are packed several per Gemini request, every LLM call goes through a shared
+rate budget, and progress is checkpointed in `report_reanalysis_runs` so an
+interrupted run resumes from its last completed page. Reports that fail are
+recorded on the run and retried once the pass over all pages is done.
+"""
+
+import os
+import io
+import re
+import json
+import asyncio
+import logging
+from uuid import uuid4
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    from backend.services.supabase_service import supabase
+    from backend.services.report_service import (
+        GEMINI_MODEL,
+        gemini_client,
+        analyze_document_with_gemini,
+        apply_parsed_analysis,
+        build_report_update,
+        download_file_bytes_async,
+        load_pdf_pages,
+        new_analysis_result,
+        normalize_file_type,
+    )
+    from backend.services.report_digest_service import refresh_digest
+    from backend.utils.rate_limit import AsyncTokenBucket
+except ImportError:
+    from services.supabase_service import supabase
+    from services.report_service import (
+        GEMINI_MODEL,
+        gemini_client,
+        analyze_document_with_gemini,
+        apply_parsed_analysis,
+        build_report_update,
+        download_file_bytes_async,
+        load_pdf_pages,
+        new_analysis_result,
+        normalize_file_type,
+    )
+    from services.report_digest_service import refresh_digest
+    from utils.rate_limit import AsyncTokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Bump when the analysis prompt or model changes; reports already stamped with
+# this version are skipped by re-analysis runs
+ANALYSIS_VERSION = os.getenv("ANALYSIS_VERSION", f"{GEMINI_MODEL}-v1")
+
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+REANALYSIS_PAGE_SIZE = int(os.getenv("REANALYSIS_PAGE_SIZE", "50"))
+REANALYSIS_CONCURRENCY = int(os.getenv("REANALYSIS_CONCURRENCY", "4"))
+# Images up to this size are packed together, this many per request
+REANALYSIS_PACK_SIZE = int(os.getenv("REANALYSIS_PACK_SIZE", "4"))
+REANALYSIS_PACK_MAX_BYTES = int(os.getenv("REANALYSIS_PACK_MAX_BYTES", str(1_500_000)))
+
+RUNS_TABLE = "report_reanalysis_runs"
+REPORT_COLUMNS = "id, mother_id, file_url, file_type, file_name, analysis_version"
+MOTHER_COLUMNS = "id, name, age, gravida, parity, bmi, location"
+
+# One budget for every batch LLM call in this process
+llm_rate_limiter = AsyncTokenBucket(
+    rate=max(LLM_REQUESTS_PER_MINUTE, 1) / 60.0,
+    capacity=max(1, min(REANALYSIS_CONCURRENCY, LLM_REQUESTS_PER_MINUTE))
+)
+
+
+# ==================== CHECKPOINTS ====================
+
+def load_run(run_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch a run checkpoint"""
+    result = supabase.table(RUNS_TABLE).select("*").eq("run_id", run_id).execute()
+    return result.data[0] if result.data else None
+
+
+def save_checkpoint(run_id: str, **fields: Any) -> None:
+    """Persist run progress"""
+    fields["updated_at"] = datetime.now().isoformat()
+    supabase.table(RUNS_TABLE).update(fields).eq("run_id", run_id).execute()
+
+
+def start_run(run_id: Optional[str] = None, analysis_version: str = ANALYSIS_VERSION) -> Dict[str, Any]:
+    """Create a new run, or return the existing checkpoint so it can resume"""
+    if run_id:
+        existing = load_run(run_id)
+        if existing:
+            logger.info(f"🔁 Resuming re-analysis run {run_id} after report {existing.get('last_report_id')}")
+            if existing.get("status") != "running":
+                save_checkpoint(run_id, status="running")
+                existing["status"] = "running"
+            return existing
+
+    run = {
+        "run_id": run_id or str(uuid4()),
+        "analysis_version": analysis_version,
+        "status": "running",
+        "last_report_id": None,
+        "processed_count": 0,
+        "skipped_count": 0,
+        "failed_count": 0,
+        "failed_report_ids": [],
+        "started_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat(),
+    }
+    supabase.table(RUNS_TABLE).insert(run).execute()
+    logger.info(f"🆕 Started re-analysis run {run['run_id']} ({analysis_version})")
+    return run
+
+
+# ==================== REPORT STREAM ====================
+
+def iter_report_pages(after_id: Optional[str] = None, page_size: int = REANALYSIS_PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Yield pages of reports ordered by id, continuing after `after_id` (keyset pagination)"""
+    cursor = after_id
+    while True:
+        query = supabase.table("medical_reports").select(REPORT_COLUMNS).order("id").limit(page_size)
+        if cursor is not None:
+            query = query.gt("id", cursor)
+        rows = query.execute().data or []
+        if not rows:
+            return
+        yield rows
+        cursor = rows[-1]["id"]
+        if len(rows) < page_size:
+            return
+
+
+def load_reports(report_ids: List[Any]) -> List[Dict[str, Any]]:
+    """Reports by id (used to retry a run's failed reports)"""
+    if not report_ids:
+        return []
+    return supabase.table("medical_reports").select(REPORT_COLUMNS).in_("id", report_ids).order("id").execute().data or []
+
+
+def _load_mothers(mother_ids: List[Any]) -> Dict[str, Dict[str, Any]]:
+    ids = list({m for m in mother_ids if m is not None})
+    if not ids:
+        return {}
+    rows = supabase.table("mothers").select(MOTHER_COLUMNS).in_("id", ids).execute().data or []
+    return {str(row["id"]): row for row in rows}
+
+
+# ==================== PACKED ANALYSIS ====================
+
+def build_packed_prompt(items: List[Dict[str, Any]]) -> str:
+    """Prompt asking for one JSON object per attached report, in order"""
+    profiles = []
+    for index, item in enumerate(items):
+        mother = item["mother"]
+        profiles.append(
+            f"Report {index}: Mother age {mother.get('age')}, gravida {mother.get('gravida')}, "
+            f"parity {mother.get('parity')}, BMI {mother.get('bmi')}, location {mother.get('location')}"
+        )
+    profile_text = "\n".join(profiles)
+    return f"""
+You are a maternal health expert. {len(items)} medical report images follow, each from a different
+pregnant woman. Analyze each report independently - never mix findings between reports.
+
+**Profiles (same order as the images):**
+{profile_text}
+
+For every report return an object with:
+"report_index", "extracted_metrics" (hemoglobin, blood_pressure_systolic, blood_pressure_diastolic,
+blood_sugar, weight, other_findings - null when absent), "concerns" (list), "recommendations" (list),
+"risk_level" (low/moderate/high) and "risk_reasoning".
+
+Provide ONLY a JSON array of {len(items)} objects, no additional text.
+"""
+
+
+def _analyze_packed(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One Gemini call for several small image reports; returns results in item order"""
+    import PIL.Image
+
+    contents: List[Any] = [build_packed_prompt(items)]
+    for index, item in enumerate(items):
+        contents.append(f"Report {index}:")
+        contents.append(PIL.Image.open(io.BytesIO(item["file_bytes"])))
+
+    result = gemini_client.models.generate_content(model=GEMINI_MODEL, contents=contents)
+    ai_response = result.text or ""
+
+    json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
+    parsed = json.loads(json_match.group()) if json_match else []
+    by_index = {
+        entry.get("report_index"): entry
+        for entry in parsed
+        if isinstance(entry, dict)
+    }
+
+    results = []
+    for index in range(len(items)):
+        entry = by_index.get(index)
+        if entry is None:
+            raise ValueError(f"Packed response missing report {index}")
+        analysis = apply_parsed_analysis(new_analysis_result(), entry, json.dumps(entry))
+        analysis["analysis_mode"] = "packed"
+        results.append(analysis)
+    return results
+
+
+async def _analyze_single(item: Dict[str, Any]) -> Dict[str, Any]:
+    report = item["report"]
+    await llm_rate_limiter.acquire()
+    return await asyncio.to_thread(
+        analyze_document_with_gemini,
+        report.get("file_url") or "",
+        report.get("file_type") or "",
+        item["mother"],
+        item.get("file_bytes"),
+        item.get("pdf_pages")
+    )
+
+
+async def _analyze_pack(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Analyze a pack, falling back to one call per report if the packed answer is unusable"""
+    if len(items) == 1:
+        return [await _analyze_single(items[0])]
+    try:
+        await llm_rate_limiter.acquire()
+        return await asyncio.to_thread(_analyze_packed, items)
+    except Exception as e:
+        logger.warning(f"⚠️  Packed analysis failed ({e}); analyzing {len(items)} reports individually")
+        return [await _analyze_single(item) for item in items]
+
+
+async def _prepare_item(report: Dict[str, Any], mother: Dict[str, Any]) -> Dict[str, Any]:
+    item = {"report": report, "mother": mother, "file_bytes": None, "pdf_pages": None}
+    mime_type = normalize_file_type(report.get("file_type"))
+    if not report.get("file_url"):
+        return item
+    if mime_type.startswith("image/"):
+        try:
+            item["file_bytes"] = await download_file_bytes_async(report["file_url"])
+        except Exception as e:
+            logger.warning(f"⚠️  Could not download report {report.get('id')}: {e}")
+    elif mime_type == "application/pdf":
+        item["pdf_pages"] = await load_pdf_pages(report["file_url"])
+    return item
+
+
+def plan_packs(items: List[Dict[str, Any]], pack_size: int = REANALYSIS_PACK_SIZE) -> List[List[Dict[str, Any]]]:
+    """Group small images into packs; PDFs, large or undownloadable files go alone"""
+    packs: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    for item in items:
+        data = item.get("file_bytes")
+        packable = data is not None and len(data) <= REANALYSIS_PACK_MAX_BYTES
+        if not packable:
+            packs.append([item])
+            continue
+        current.append(item)
+        if len(current) >= pack_size:
+            packs.append(current)
+            current = []
+    if current:
+        packs.append(current)
+    return packs
+
+
+async def reanalyze_page(reports: List[Dict[str, Any]], analysis_version: str) -> Dict[str, Any]:
+    """Re-analyze one page of reports; returns processed/skipped counts and the failed report ids"""
+    counts: Dict[str, Any] = {"processed": 0, "skipped": 0, "failed_ids": []}
+    pending = [r for r in reports if r.get("analysis_version") != analysis_version]
+    counts["skipped"] = len(reports) - len(pending)
+    if not pending:
+        return counts
+
+    mothers = _load_mothers([r.get("mother_id") for r in pending])
+    semaphore = asyncio.Semaphore(max(REANALYSIS_CONCURRENCY, 1))
+
+    async def prepare(report: Dict[str, Any], mother: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            return await _prepare_item(report, mother)
+
+    jobs = []
+    for report in pending:
+        mother = mothers.get(str(report.get("mother_id")))
+        if not mother:
+            counts["skipped"] += 1
+            continue
+        jobs.append(prepare(report, mother))
+    # Downloads and PDF page extraction overlap, at most REANALYSIS_CONCURRENCY at a time
+    items = await asyncio.gather(*jobs)
+
+    async def run_pack(pack: List[Dict[str, Any]]) -> None:
+        async with semaphore:
+            try:
+                results = await _analyze_pack(pack)
+            except Exception as e:
+                logger.error(f"❌ Re-analysis failed for {len(pack)} report(s): {e}")
+                counts["failed_ids"].extend(item["report"]["id"] for item in pack)
+                return
+        for item, analysis_result in zip(pack, results):
+            report_id = item["report"]["id"]
+            if analysis_result.get("status") == "error":
+                counts["failed_ids"].append(report_id)
+                continue
+            update_data = build_report_update(analysis_result)
+            update_data["analysis_version"] = analysis_version
+            try:
+                await asyncio.to_thread(
+                    lambda: supabase.table("medical_reports").update(update_data).eq("id", report_id).execute()
+                )
+                counts["processed"] += 1
+            except Exception as e:
+                logger.error(f"❌ Could not store re-analysis for report {report_id}: {e}")
+                counts["failed_ids"].append(report_id)
+
+    await asyncio.gather(*(run_pack(pack) for pack in plan_packs(items)))
+
+    for mother_id in {item["report"].get("mother_id") for item in items}:
+        await asyncio.to_thread(refresh_digest, mother_id)
+    return counts
+
+
+async def run_reanalysis(
+    run_id: Optional[str] = None,
+    page_size: int = REANALYSIS_PAGE_SIZE,
+    max_reports: Optional[int] = None,
+    analysis_version: str = ANALYSIS_VERSION
+) -> Dict[str, Any]:
+    """
+    Re-analyze stored reports, resuming `run_id` if it already has a checkpoint.
+
+    The checkpoint advances only after a whole page is stored, so an interrupted
+    run repeats at most one page - and reports in it that already carry the
+    target `analysis_version` are skipped. Failed reports are kept in
+    `failed_report_ids` (`failed_count` is their number) and retried after
+    the last page, and again by every later resume of the run.
+    """
+    if not gemini_client:
+        return {"status": "error", "error": "Gemini not configured"}
+
+    run = await asyncio.to_thread(start_run, run_id, analysis_version)
+    run_id = run["run_id"]
+    analysis_version = run.get("analysis_version") or analysis_version
+    failed_ids: List[Any] = list(run.get("failed_report_ids") or [])
+    totals = {
+        "processed": run.get("processed_count") or 0,
+        "skipped": run.get("skipped_count") or 0,
+        "failed": len(failed_ids),
+    }
+    seen = 0
+
+    async def checkpoint(**fields: Any) -> None:
+        totals["failed"] = len(failed_ids)
+        await asyncio.to_thread(
+            save_checkpoint,
+            run_id,
+            processed_count=totals["processed"],
+            skipped_count=totals["skipped"],
+            failed_count=totals["failed"],
+            failed_report_ids=failed_ids,
+            **fields,
+        )
+
+    try:
+        pages = iter_report_pages(run.get("last_report_id"), page_size)
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                break
+            if max_reports is not None and seen >= max_reports:
+                break
+            if max_reports is not None:
+                page = page[:max_reports - seen]
+            seen += len(page)
+
+            counts = await reanalyze_page(page, analysis_version)
+            totals["processed"] += counts["processed"]
+            totals["skipped"] += counts["skipped"]
+            failed_ids.extend(i for i in counts["failed_ids"] if i not in failed_ids)
+
+            await checkpoint(last_report_id=page[-1]["id"])
+            logger.info(
+                f"📦 Re-analysis {run_id}: {totals['processed']} processed, "
+                f"{totals['skipped']} skipped, {totals['failed']} failed"
+            )
+
+        finished = max_reports is None or seen < max_reports
+        if finished and failed_ids:
+            logger.info(f"🔁 Re-analysis {run_id}: retrying {len(failed_ids)} failed report(s)")
+            retry = await asyncio.to_thread(load_reports, failed_ids)
+            counts = await reanalyze_page(retry, analysis_version)
+            # Reports deleted since, or stamped with this version by another run, are no longer failed
+            totals["processed"] += counts["processed"]
+            failed_ids[:] = counts["failed_ids"]
+
+        status = "completed" if finished else "paused"
+        await checkpoint(status=status)
+    except Exception as e:
+        logger.error(f"❌ Re-analysis run {run_id} stopped: {e}", exc_info=True)
+        await checkpoint(status="interrupted", last_error=str(e))
+        return {"status": "error", "run_id": run_id, "error": str(e), **totals}
+
+    logger.info(f"✅ Re-analysis run {run_id} {status}")
+    return {
+        "status": status,
+        "run_id": run_id,
+        "analysis_version": analysis_version,
+        **totals,
+        "failed_report_ids": failed_ids,
+    }
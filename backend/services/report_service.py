@@ -0,0 +1,572 @@
+"""
+MatruRaksha AI - Report Service
+In-process medical report analysis and health summaries.
+
+Shared by the HTTP routes (main.py, enhanced_api.py) and the Telegram bot, so the
+bot calls these functions directly instead of looping back over HTTP to its own API.
+"""
+
+import os
+import io
+import re
+import json
+import html
+import base64
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    from backend.services.supabase_service import supabase
+    from backend.services.http_client import get_async_client, get_sync_client
+    from backend.services.history_service import record_analysis
+    from backend.services.report_digest_service import refresh_digest
+    from backend.services.blob_store import is_blob_url, read_blob
+except ImportError:
+    from services.supabase_service import supabase
+    from services.http_client import get_async_client, get_sync_client
+    from services.history_service import record_analysis
+    from services.report_digest_service import refresh_digest
+    from services.blob_store import is_blob_url, read_blob
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = "gemini-2.5-flash"
+gemini_client = None
+try:
+    from google import genai
+    if GEMINI_API_KEY:
+        gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+except ImportError as e:
+    logger.warning(f"⚠️  Gemini not available for report analysis: {e}")
+
+# Telegram and the bot send file extensions; the analyzer works on MIME types
+EXTENSION_MIME_TYPES = {
+    "pdf": "application/pdf",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+}
+
+
+class MotherNotFoundError(LookupError):
+    """Raised when a report references a mother that does not exist"""
+
+
+def normalize_file_type(file_type: Optional[str]) -> str:
+    """Map bare extensions ("jpg", "pdf") to MIME types"""
+    value = (file_type or "").strip().lower()
+    return EXTENSION_MIME_TYPES.get(value.lstrip("."), value or "application/octet-stream")
+
+
+# ==================== GEMINI ANALYSIS ====================
+
+def build_analysis_prompt(mother_data: Dict) -> str:
+    """Prompt for analyzing a single report in the context of the mother's profile"""
+    return f"""
+You are a maternal health expert analyzing a medical report for a pregnant woman.
+
+**Mother's Profile:**
+- Name: {mother_data.get('name')}
+- Age: {mother_data.get('age')} years
+- Gravida: {mother_data.get('gravida')} (number of pregnancies)
+- Parity: {mother_data.get('parity')} (number of live births)
+- BMI: {mother_data.get('bmi')}
+- Location: {mother_data.get('location')}
+
+**Task:**
+Analyze the medical report and extract the following information in a structured format:
+
+1. **Key Health Metrics** (extract if present):
+   - Hemoglobin level (g/dL)
+   - Blood pressure (systolic/diastolic)
+   - Blood sugar/glucose level (mg/dL)
+   - Weight (kg)
+   - Any other vital signs
+
+2. **Health Concerns** (identify any abnormalities or risk factors):
+   - List any concerning values or conditions
+   - Rate severity: mild, moderate, severe
+
+3. **Conditions & Medications** (only if stated in the report):
+   - Diagnosed conditions (e.g. gestational diabetes, anemia)
+   - Medicines prescribed, with dose if shown
+
+4. **Recommendations**:
+   - What actions should be taken
+   - Any follow-up needed
+   - Dietary or lifestyle advice
+
+5. **Risk Assessment**:
+   - Overall risk level: low, moderate, or high
+   - Reasoning for the risk level
+
+**Output Format (JSON):**
+{{
+    "extracted_metrics": {{
+        "hemoglobin": <value or null>,
+        "blood_pressure_systolic": <value or null>,
+        "blood_pressure_diastolic": <value or null>,
+        "blood_sugar": <value or null>,
+        "weight": <value or null>,
+        "other_findings": "<any other important findings>"
+    }},
+    "concerns": [
+        "<concern 1>",
+        "<concern 2>"
+    ],
+    "recommendations": [
+        "<recommendation 1>",
+        "<recommendation 2>"
+    ],
+    "conditions": ["<diagnosed condition>"],
+    "medications": ["<medicine and dose>"],
+    "risk_level": "<low/moderate/high>",
+    "risk_reasoning": "<explanation>"
+}}
+
+Provide ONLY the JSON output, no additional text.
+"""
+
+
+def new_analysis_result() -> Dict[str, Any]:
+    """Empty analysis result in the shape stored in medical_reports.analysis_result"""
+    return {
+        "status": "completed",
+        "extracted_data": {},
+        "concerns": [],
+        "recommendations": [],
+        "risk_level": "normal",
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def apply_parsed_analysis(analysis_result: Dict[str, Any], parsed_data: Dict[str, Any], ai_response: str) -> Dict[str, Any]:
+    """Copy fields from a parsed Gemini JSON answer into an analysis result"""
+    analysis_result["extracted_data"] = parsed_data.get("extracted_metrics", {})
+    analysis_result["concerns"] = parsed_data.get("concerns", [])
+    analysis_result["recommendations"] = parsed_data.get("recommendations", [])
+    analysis_result["conditions"] = parsed_data.get("conditions", [])
+    analysis_result["medications"] = parsed_data.get("medications", [])
+    analysis_result["risk_level"] = parsed_data.get("risk_level", "normal")
+    analysis_result["risk_reasoning"] = parsed_data.get("risk_reasoning", "")
+    analysis_result["ai_analysis"] = ai_response
+    analysis_result["analyzed_with"] = "Google Gemini AI"
+    return analysis_result
+
+
+def decode_data_url(file_url: str) -> Optional[bytes]:
+    """Return the payload of a base64 data: URL (upload fallback storage)"""
+    if not file_url or not file_url.startswith("data:") or ";base64," not in file_url:
+        return None
+    return base64.b64decode(file_url.split(";base64,", 1)[1])
+
+
+def download_file_bytes(file_url: str) -> bytes:
+    """Fetch a report file over the pooled sync client (blob:// files are read locally)"""
+    inline = decode_data_url(file_url)
+    if inline is not None:
+        return inline
+    if is_blob_url(file_url):
+        return read_blob(file_url)
+    response = get_sync_client().get(file_url, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+
+async def download_file_bytes_async(file_url: str) -> bytes:
+    """Fetch a report file over the pooled async client (blob:// files are read locally)"""
+    inline = decode_data_url(file_url)
+    if inline is not None:
+        return inline
+    if is_blob_url(file_url):
+        return await asyncio.to_thread(read_blob, file_url)
+    response = await get_async_client().get(file_url, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+
+async def load_pdf_pages(file_url: str, file_bytes: Optional[bytes] = None) -> Optional[Dict[str, Any]]:
+    """
+    Text layer and rendered clinical pages of a PDF report (see document_analyzer).
+
+    Returns None when the file cannot be downloaded or parsed.
+    """
+    try:
+        try:
+            from backend.services.document_analyzer import PDF_CONTEXT_TEXT_CHARS, extract_pdf_pages
+        except ImportError:
+            from services.document_analyzer import PDF_CONTEXT_TEXT_CHARS, extract_pdf_pages
+
+        if file_bytes is None:
+            file_bytes = await download_file_bytes_async(file_url)
+        pdf_pages = await extract_pdf_pages(file_bytes)
+        pdf_pages["text"] = pdf_pages["text"][:PDF_CONTEXT_TEXT_CHARS]
+        return pdf_pages
+    except Exception as e:
+        logger.warning(f"⚠️  Could not read PDF report: {e}")
+        return None
+
+
+def build_pdf_contents(prompt: str, pdf_pages: Dict[str, Any]) -> List[Any]:
+    """Gemini contents for a PDF: the prompt, its text layer and the rendered pages"""
+    import PIL.Image
+
+    images = pdf_pages.get("images") or []
+    contents: List[Any] = [
+        prompt + f"\n\nThe report is a {len(pdf_pages.get('page_texts') or [])}-page PDF. "
+        "Its extracted text and its most relevant pages follow."
+    ]
+    if pdf_pages.get("text", "").strip():
+        contents.append(f"Extracted text:\n{pdf_pages['text']}")
+    for page_number, png_bytes in images:
+        contents.append(f"Page {page_number}:")
+        contents.append(PIL.Image.open(io.BytesIO(png_bytes)))
+    return contents
+
+
+def analyze_document_with_gemini(
+    file_url: str,
+    file_type: str,
+    mother_data: Dict,
+    file_bytes: Optional[bytes] = None,
+    pdf_pages: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Analyze medical document using Gemini AI.
+
+    PDFs are analyzed from `pdf_pages` (see load_pdf_pages); a PDF without readable
+    pages is reported as an error instead of being analyzed blind.
+    """
+
+    analysis_result = new_analysis_result()
+    file_type = normalize_file_type(file_type)
+
+    if not gemini_client:
+        logger.warning("⚠️  Gemini not available - returning basic analysis")
+        analysis_result["status"] = "pending_review"
+        analysis_result["extracted_data"] = {
+            "note": "AI analysis not available - manual review required"
+        }
+        return analysis_result
+
+    try:
+        logger.info(f"🤖 Analyzing document with Gemini AI: {file_url[:80]}")
+
+        prompt = build_analysis_prompt(mother_data)
+
+        # If it's an image, we can pass it directly to Gemini
+        if file_type.startswith('image/'):
+            try:
+                # Download the image unless the caller already has the bytes
+                if file_bytes is None:
+                    file_bytes = download_file_bytes(file_url)
+
+                import PIL.Image
+                image = PIL.Image.open(io.BytesIO(file_bytes))
+
+                result = gemini_client.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=[prompt, image]
+                )
+                ai_response = result.text
+
+            except Exception as img_error:
+                logger.error(f"Error processing image: {img_error}")
+                # Fallback to text-only analysis
+                result = gemini_client.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=prompt + "\n\nNote: The report image could not be loaded."
+                )
+                ai_response = result.text
+        elif file_type == "application/pdf":
+            if not pdf_pages or not (pdf_pages.get("images") or pdf_pages.get("text", "").strip()):
+                analysis_result["status"] = "error"
+                analysis_result["error"] = "PDF could not be read"
+                analysis_result["extracted_data"] = {
+                    "note": "PDF could not be read - manual review required"
+                }
+                return analysis_result
+
+            result = gemini_client.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=build_pdf_contents(prompt, pdf_pages)
+            )
+            ai_response = result.text
+        else:
+            analysis_result["status"] = "pending_review"
+            analysis_result["extracted_data"] = {
+                "note": f"Unsupported file type {file_type} - manual review required"
+            }
+            return analysis_result
+
+        logger.info(f"✅ Gemini response received: {len(ai_response)} characters")
+
+        # Extract JSON from response (sometimes Gemini wraps it in markdown)
+        json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+        if json_match:
+            apply_parsed_analysis(analysis_result, json.loads(json_match.group()), ai_response)
+            logger.info(f"✅ Analysis complete - Risk Level: {analysis_result['risk_level']}")
+        else:
+            # If JSON parsing fails, store raw response
+            analysis_result["ai_analysis"] = ai_response
+            analysis_result["extracted_data"] = {
+                "note": "Manual review needed - AI response format unexpected"
+            }
+            analysis_result["status"] = "pending_review"
+            logger.warning("⚠️  Could not parse Gemini response as JSON")
+
+    except Exception as e:
+        logger.error(f"❌ Gemini analysis error: {e}", exc_info=True)
+        analysis_result["status"] = "error"
+        analysis_result["error"] = str(e)
+        analysis_result["extracted_data"] = {
+            "note": "Analysis failed - manual review required"
+        }
+
+    return analysis_result
+
+
+# ==================== REPORT ANALYSIS ====================
+
+def build_report_update(analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Columns written to medical_reports once an analysis finishes"""
+    update_data = {
+        "analysis_status": analysis_result.get("status", "completed"),
+        "analysis_result": analysis_result,
+        "analyzed_at": datetime.now().isoformat()
+    }
+    extracted_data = analysis_result.get("extracted_data", {})
+    if extracted_data:
+        update_data["extracted_metrics"] = extracted_data
+    return update_data
+
+
+def build_analysis_notice(analysis_result: Dict[str, Any], file_name: Optional[str] = None) -> str:
+    """Telegram (HTML) notice for a finished analysis; AI-generated text is escaped"""
+    concerns = analysis_result.get("concerns", [])
+    risk_level = analysis_result.get("risk_level", "normal")
+    recommendations = analysis_result.get("recommendations", [])[:3]
+
+    concerns_text = "\n".join(f"• {html.escape(str(c))}" for c in concerns[:3])
+    recommendations_text = "\n".join(f"• {html.escape(str(r))}" for r in recommendations)
+    risk_emoji = "🔴" if risk_level == "high" else ("🟡" if risk_level == "moderate" else "🟢")
+
+    message = "📄 <b>Document Analysis Complete</b>\n\n"
+    if file_name:
+        message += f"📋 File: {html.escape(file_name)}\n"
+    message += f"{risk_emoji} Risk Level: <b>{html.escape(str(risk_level).upper())}</b>\n\n"
+    if concerns:
+        message += f"⚠️ <b>Concerns:</b>\n{concerns_text}\n\n"
+    if recommendations_text:
+        message += f"💡 <b>Recommendations:</b>\n{recommendations_text}\n\n"
+    message += "Please consult with your healthcare provider for detailed guidance."
+    return message
+
+
+def _notify_analysis(
+    mother_data: Dict[str, Any],
+    analysis_result: Dict[str, Any],
+    file_name: Optional[str] = None,
+    always: bool = False
+) -> None:
+    """Send a Telegram notice when the analysis flags risk or concerns (or always)"""
+    flagged = analysis_result.get("risk_level", "normal") in ["high", "moderate"] or analysis_result.get("concerns")
+    if not ((always or flagged) and mother_data.get("telegram_chat_id")):
+        return
+
+    try:
+        from services.telegram_service import telegram_service
+
+        telegram_service.send_message(
+            chat_id=mother_data["telegram_chat_id"],
+            message=build_analysis_notice(analysis_result, file_name)
+        )
+        logger.info("✅ Analysis result sent to Telegram")
+    except Exception as telegram_error:
+        logger.error(f"⚠️  Telegram notification failed: {telegram_error}")
+
+
+def _mark_report_failed(report_id: str, error_message: str) -> None:
+    supabase.table("medical_reports").update({
+        "analysis_status": "error",
+        "error_message": error_message
+    }).eq("id", report_id).execute()
+
+
+async def analyze_report(
+    report_id: str,
+    mother_id: str,
+    file_url: str,
+    file_type: str,
+    file_bytes: Optional[bytes] = None,
+    file_name: Optional[str] = None,
+    notify_always: bool = False
+) -> Dict[str, Any]:
+    """
+    Analyze a stored medical report and persist the result.
+
+    Args:
+        file_bytes: the file's contents when the caller already has them (uploads)
+        file_name: shown in the Telegram notice
+        notify_always: notify the mother even when nothing was flagged
+
+    Raises:
+        MotherNotFoundError: if the mother does not exist
+    """
+    logger.info(f"🔍 Analyzing report {report_id} for mother {mother_id}")
+
+    try:
+        # Supabase calls are blocking - keep them off the event loop too
+        mother_data = await asyncio.to_thread(fetch_mother, mother_id)
+        if not mother_data:
+            raise MotherNotFoundError(f"Mother {mother_id} not found")
+
+        # Update report status to processing (the returned row carries its upload time)
+        processing = await asyncio.to_thread(
+            lambda: supabase.table("medical_reports").update({
+                "analysis_status": "processing"
+            }).eq("id", report_id).execute()
+        )
+        uploaded_at = processing.data[0].get("uploaded_at") if processing.data else None
+
+        pdf_pages = None
+        mime_type = normalize_file_type(file_type)
+        if mime_type.startswith("image/") and file_bytes is None:
+            try:
+                file_bytes = await download_file_bytes_async(file_url)
+            except Exception as download_error:
+                logger.warning(f"⚠️  Could not download report file: {download_error}")
+        elif mime_type == "application/pdf":
+            pdf_pages = await load_pdf_pages(file_url, file_bytes)
+
+        # Gemini's client is blocking - keep it off the event loop
+        analysis_result = await asyncio.to_thread(
+            analyze_document_with_gemini, file_url, file_type, mother_data, file_bytes, pdf_pages
+        )
+
+        update_data = build_report_update(analysis_result)
+        await asyncio.to_thread(
+            lambda: supabase.table("medical_reports").update(update_data).eq("id", report_id).execute()
+        )
+        logger.info(f"✅ Report analysis completed: {analysis_result.get('status')}")
+
+        if analysis_result.get("status") == "completed":
+            await asyncio.to_thread(record_analysis, mother_id, analysis_result, report_id, uploaded_at)
+        await asyncio.to_thread(refresh_digest, mother_id)
+
+        await asyncio.to_thread(_notify_analysis, mother_data, analysis_result, file_name, notify_always)
+
+        return {
+            "success": True,
+            "message": "Report analyzed successfully",
+            "status": analysis_result.get("status"),
+            "risk_level": analysis_result.get("risk_level"),
+            "concerns": analysis_result.get("concerns", []),
+            "recommendations": analysis_result.get("recommendations", []),
+            "analysis": analysis_result
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Report analysis error: {e}", exc_info=True)
+        try:
+            await asyncio.to_thread(_mark_report_failed, report_id, str(e))
+        except Exception:
+            pass
+        raise
+
+
+# ==================== HEALTH SUMMARY ====================
+
+def fetch_timeline(mother_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+    """Latest health timeline events, tolerant of schema drift in the date column"""
+    for date_col in ["event_date", "date", "created_at"]:
+        try:
+            response = supabase.table("health_timeline")\
+                .select("*")\
+                .eq("mother_id", mother_id)\
+                .order(date_col, desc=True)\
+                .limit(limit)\
+                .execute()
+            logger.info(f"Successfully retrieved timeline using column: {date_col}")
+            return response.data or []
+        except Exception:
+            logger.debug(f"Column {date_col} not available, trying next...")
+            continue
+
+    # If all date columns failed, try without ordering
+    try:
+        response = supabase.table("health_timeline")\
+            .select("*")\
+            .eq("mother_id", mother_id)\
+            .limit(limit)\
+            .execute()
+        logger.info("Retrieved timeline without date ordering")
+        return response.data or []
+    except Exception as e:
+        logger.error(f"Error getting timeline (all methods failed): {e}")
+        return []
+
+
+def fetch_memories(mother_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Most recent context memories, via RPC when available"""
+    try:
+        response = supabase.rpc('get_relevant_memories', {
+            'mother_id_param': mother_id,
+            'limit_param': limit
+        }).execute()
+    except Exception:
+        response = supabase.table("context_memory")\
+            .select("*")\
+            .eq("mother_id", mother_id)\
+            .order("created_at", desc=True)\
+            .limit(limit)\
+            .execute()
+    return response.data or []
+
+
+def fetch_summary_rpc(mother_id: str) -> Any:
+    """Output of the get_health_summary SQL function, if it exists"""
+    try:
+        return supabase.rpc('get_health_summary', {
+            'mother_id_param': mother_id
+        }).execute().data
+    except Exception as rpc_error:
+        logger.warning(f"RPC function not available: {rpc_error}")
+        return {"message": "Summary function not available"}
+
+
+def fetch_mother(mother_id: str) -> Optional[Dict[str, Any]]:
+    mother_result = supabase.table("mothers").select("*").eq("id", mother_id).execute()
+    return mother_result.data[0] if mother_result.data else None
+
+
+async def _fetch_or_default(label: str, default: Any, func, *args: Any, **kwargs: Any) -> Any:
+    try:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    except Exception as e:
+        logger.warning(f"Could not retrieve {label}: {e}")
+        return default
+
+
+async def get_health_summary(mother_id: str) -> Dict[str, Any]:
+    """Comprehensive health summary used by /api/v1/summary and the bot's dashboard"""
+    # The Supabase client is blocking: run the independent lookups on worker
+    # threads, concurrently, so callers' timeouts can actually fire
+    summary_data, timeline, memories, mother = await asyncio.gather(
+        asyncio.to_thread(fetch_summary_rpc, mother_id),
+        _fetch_or_default("timeline", [], fetch_timeline, mother_id, limit=5),
+        _fetch_or_default("memories", [], fetch_memories, mother_id, limit=10),
+        _fetch_or_default("mother details", None, fetch_mother, mother_id),
+    )
+
+    return {
+        "success": True,
+        "mother": mother,
+        "summary": summary_data,
+        "recent_timeline": timeline,
+        "key_memories": memories
+    }
@@ -9,16 +9,23 @@ NOTE: All API keys and credentials must be set in .env file:
 - TWILIO_FROM_NUMBER: Twilio phone number (optional, legacy)
 """
 import os
-import requests
-from typing import Optional, Dict
+import httpx
+from typing import Optional, Dict, Iterable, List, Tuple
 import logging
 
+try:
+    from backend.services.http_client import get_sync_client
+except ImportError:
+    from services.http_client import get_sync_client
+
 logger = logging.getLogger(__name__)
 
 # Fast2SMS Configuration - API key loaded from environment
 # Get your free API key at https://www.fast2sms.com/
 FAST2SMS_API_KEY = (os.getenv("FAST2SMS_API_KEY") or "").strip()
 FAST2SMS_API_URL = "https://www.fast2sms.com/dev/bulkV2"
+# Numbers per bulkV2 call (comma-separated "numbers" field, same message body)
+FAST2SMS_BATCH_SIZE = int(os.getenv("FAST2SMS_BATCH_SIZE", "100"))
 
 # Legacy Twilio config (optional, kept for backward compatibility)
 # All credentials must be in .env file - never hardcode
@@ -26,6 +33,11 @@ TWILIO_ACCOUNT_SID = (os.getenv("TWILIO_ACCOUNT_SID") or "").strip()
 TWILIO_AUTH_TOKEN = (os.getenv("TWILIO_AUTH_TOKEN") or "").strip()
 TWILIO_FROM_NUMBER = (os.getenv("TWILIO_FROM_NUMBER") or "").strip()
 
+# A bulk request is acknowledged as a whole, not per number: recipients of a
+# multi-number call are "submitted" (delivery is in the provider's DLR for the
+# request_id) rather than individually confirmed as "sent"
+SMS_ACCEPTED_STATUSES = ("sent", "submitted")
+
 
 
 def send_sms(to_number: str, body: str) -> Dict[str, Optional[str]]:
@@ -78,14 +90,20 @@ def _send_via_fast2sms(to_number: str, body: str) -> Dict[str, Optional[str]]:
     - Works 9 AM to 9 PM for promotional content
     - Transactional route available with DLT registration
     """
+    # Normalize phone number for India
+    phone = _normalize_indian_number(to_number)
+    
+    if len(phone) != 10:
+        logger.error(f"❌ Invalid phone number format: {to_number} -> {phone}")
+        return {"status": "error", "error": f"Invalid phone number: {phone}"}
+    
+    logger.info(f"📤 Sending SMS via Fast2SMS to {phone[:4]}****")
+    return _fast2sms_request([phone], body)
+
+
+def _fast2sms_request(phones: List[str], body: str) -> Dict[str, Optional[str]]:
+    """One bulkV2 call for up to FAST2SMS_BATCH_SIZE normalized numbers"""
     try:
-        # Normalize phone number for India
-        phone = _normalize_indian_number(to_number)
-        
-        if len(phone) != 10:
-            logger.error(f"❌ Invalid phone number format: {to_number} -> {phone}")
-            return {"status": "error", "error": f"Invalid phone number: {phone}"}
-        
         # Fast2SMS Quick SMS API parameters
         headers = {
             "authorization": FAST2SMS_API_KEY,
@@ -95,14 +113,13 @@ def _send_via_fast2sms(to_number: str, body: str) -> Dict[str, Optional[str]]:
         payload = {
             "route": "q",  # Quick SMS route (free)
             "message": body,
-            "language": "english",
+            # Hindi/Marathi reminders are Devanagari and need the unicode encoding
+            "language": "english" if body.isascii() else "unicode",
             "flash": 0,
-            "numbers": phone
+            "numbers": ",".join(phones)
         }
         
-        logger.info(f"📤 Sending SMS via Fast2SMS to {phone[:4]}****")
-        
-        response = requests.post(
+        response = get_sync_client().post(
             FAST2SMS_API_URL,
             headers=headers,
             json=payload,
@@ -113,7 +130,7 @@ def _send_via_fast2sms(to_number: str, body: str) -> Dict[str, Optional[str]]:
         
         if response.status_code == 200 and result.get("return"):
             request_id = result.get("request_id", "")
-            logger.info(f"✅ SMS sent successfully! Request ID: {request_id}")
+            logger.info(f"✅ SMS sent to {len(phones)} number(s)! Request ID: {request_id}")
             return {
                 "status": "sent",
                 "provider": "fast2sms",
@@ -125,10 +142,10 @@ def _send_via_fast2sms(to_number: str, body: str) -> Dict[str, Optional[str]]:
             logger.error(f"❌ Fast2SMS error: {error_msg}")
             return {"status": "error", "provider": "fast2sms", "error": error_msg}
             
-    except requests.Timeout:
+    except httpx.TimeoutException:
         logger.error("❌ Fast2SMS request timed out")
         return {"status": "error", "provider": "fast2sms", "error": "Request timeout"}
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"❌ Fast2SMS request failed: {str(e)}")
         return {"status": "error", "provider": "fast2sms", "error": str(e)}
     except Exception as e:
@@ -136,6 +153,83 @@ def _send_via_fast2sms(to_number: str, body: str) -> Dict[str, Optional[str]]:
         return {"status": "error", "error": str(e)}
 
 
+def send_bulk_sms(to_numbers: Iterable[str], body: str) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Send the same message to many numbers.
+    
+    With Fast2SMS, numbers are sent comma-separated in chunks of
+    FAST2SMS_BATCH_SIZE, so 100 recipients cost one provider call.
+    Twilio has no bulk endpoint and is called per number.
+    
+    Returns:
+        Dict mapping each input number to a result. Numbers that shared a
+        provider call get "submitted" (or the call's error) with the call's
+        request_id and batch_size, not a per-number delivery status.
+    """
+    to_numbers = list(dict.fromkeys(str(n) for n in to_numbers if n))
+    if not FAST2SMS_API_KEY:
+        return {number: send_sms(number, body) for number in to_numbers}
+    
+    results: Dict[str, Dict[str, Optional[str]]] = {}
+    valid: Dict[str, List[str]] = {}
+    for number in to_numbers:
+        phone = _normalize_indian_number(number)
+        if len(phone) != 10:
+            logger.error(f"❌ Invalid phone number format: {number} -> {phone}")
+            results[number] = {"status": "error", "error": f"Invalid phone number: {phone}"}
+            continue
+        valid.setdefault(phone, []).append(number)
+    
+    phones = list(valid)
+    for i in range(0, len(phones), FAST2SMS_BATCH_SIZE):
+        chunk = phones[i:i + FAST2SMS_BATCH_SIZE]
+        logger.info(f"📤 Sending bulk SMS via Fast2SMS to {len(chunk)} numbers")
+        result = _fast2sms_request(chunk, body)
+        for phone in chunk:
+            for number in valid[phone]:
+                results[number] = _recipient_result(result, len(chunk))
+    return results
+
+
+def _recipient_result(chunk_result: Dict[str, Optional[str]], batch_size: int) -> Dict[str, Optional[str]]:
+    """One recipient's view of a bulk call's result"""
+    if batch_size == 1:
+        return dict(chunk_result)
+    result = {
+        "status": "submitted" if chunk_result.get("status") == "sent" else "error",
+        "provider": chunk_result.get("provider"),
+        "batch_size": batch_size,
+    }
+    if chunk_result.get("request_id"):
+        result["request_id"] = chunk_result["request_id"]
+    if result["status"] == "error":
+        result["error"] = f"bulk request failed: {chunk_result.get('error')}"
+    return result
+
+
+def send_sms_batch(messages: Iterable[Tuple[str, str]]) -> List[Dict[str, Optional[str]]]:
+    """
+    Send (to_number, body) pairs, grouping identical bodies into bulk calls.
+    
+    Returns:
+        One result per input pair, in input order
+    """
+    messages = list(messages)
+    by_body: Dict[str, List[str]] = {}
+    for number, body in messages:
+        by_body.setdefault(body, []).append(str(number))
+    
+    sent: Dict[Tuple[str, str], Dict[str, Optional[str]]] = {}
+    for body, numbers in by_body.items():
+        for number, result in send_bulk_sms(numbers, body).items():
+            sent[(number, body)] = result
+    
+    return [
+        sent.get((str(number), body), {"status": "error", "error": "No phone number"})
+        for number, body in messages
+    ]
+
+
 def _send_via_twilio(to_number: str, body: str) -> Dict[str, Optional[str]]:
     """
     Legacy Twilio SMS sending (paid, kept for backward compatibility).
@@ -144,7 +238,7 @@ def _send_via_twilio(to_number: str, body: str) -> Dict[str, Optional[str]]:
         url = f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json"
         data = {"To": to_number, "From": TWILIO_FROM_NUMBER, "Body": body}
         
-        resp = requests.post(
+        resp = get_sync_client().post(
             url, 
             data=data, 
             auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN), 
@@ -173,7 +267,7 @@ def check_sms_balance() -> Dict[str, any]:
     
     try:
         url = f"https://www.fast2sms.com/dev/wallet?authorization={FAST2SMS_API_KEY}"
-        response = requests.get(url, timeout=10)
+        response = get_sync_client().get(url, timeout=10)
         result = response.json()
         
         if result.get("return"):
@@ -4,6 +4,8 @@ Handles all Supabase database operations
 """
 
 import os
+import copy
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
@@ -21,21 +23,46 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+try:
+    from backend.services.cache_service import cache, TELEGRAM_MOTHERS_PREFIX, invalidate_telegram_mothers_cache
+    from backend.services.write_buffer import table_writer
+except ImportError:
+    from services.cache_service import cache, TELEGRAM_MOTHERS_PREFIX, invalidate_telegram_mothers_cache
+    from services.write_buffer import table_writer
 
-async def get_mothers_by_telegram_id(telegram_chat_id: str) -> List[Dict[str, Any]]:
-    """Return all mother profiles linked to a Telegram chat ID."""
+# Conversation rows are batched off the reply path (flushed by the API lifespan)
+chat_history_writer = table_writer("chat_histories", lambda: supabase)
+
+# How long a chat's profiles are reused between bot turns; registration, profile
+# edits, admin reassignments and history updates invalidate them sooner. The
+# cache is per process, so invalidation only reaches the worker that made the
+# change: under several workers others may serve a profile up to this old
+TELEGRAM_PROFILE_CACHE_SECONDS = int(os.getenv("TELEGRAM_PROFILE_CACHE_SECONDS", "300"))
+
+
+async def get_mothers_by_telegram_id(telegram_chat_id: str, use_cache: bool = True) -> List[Dict[str, Any]]:
+    """Return all mother profiles linked to a Telegram chat ID (cached per chat)."""
     if not telegram_chat_id:
         return []
 
+    cache_key = f"{TELEGRAM_MOTHERS_PREFIX}{telegram_chat_id}"
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            # Callers edit these dicts (e.g. user_data["active_mother"]); keep the cached ones intact
+            return copy.deepcopy(cached)
+
     try:
-        response = (
+        response = await asyncio.to_thread(
             supabase.table("mothers")
             .select("*")
             .eq("telegram_chat_id", str(telegram_chat_id))
             .order("created_at", desc=True)
-            .execute()
+            .execute
         )
-        return response.data or []
+        mothers = response.data or []
+        cache.set(cache_key, copy.deepcopy(mothers), ttl_seconds=TELEGRAM_PROFILE_CACHE_SECONDS)
+        return mothers
     except Exception as exc:
         logger.error(
             f"❌ Error fetching mothers by telegram_chat_id={telegram_chat_id}: {exc}",
@@ -59,14 +86,15 @@ async def get_recent_reports_for_mother(mother_id: str, limit: int = 5) -> List[
         return []
 
     try:
-        response = (
+        query = (
             supabase.table("medical_reports")
             .select("*")
             .eq("mother_id", str(mother_id))
             .order("uploaded_at", desc=True)
             .limit(limit)
-            .execute()
         )
+        # Off the event loop so it can overlap with other per-message work
+        response = await asyncio.to_thread(query.execute)
         return response.data or []
     except Exception as exc:
         logger.error(
@@ -98,7 +126,10 @@ class DatabaseService:
                         chosen = d
                         break
             if chosen:
-                supabase.table('mothers').update({'doctor_id': chosen.get('id')}).eq('id', mother_id).execute()
+                updated = supabase.table('mothers').update({'doctor_id': chosen.get('id')}).eq('id', mother_id).execute()
+                for row in updated.data or []:
+                    if row.get('telegram_chat_id'):
+                        invalidate_telegram_mothers_cache(row['telegram_chat_id'])
             return chosen
         except Exception:
             return None
@@ -138,7 +169,7 @@ class DatabaseService:
         intent_classification: Optional[str] = None,
         confidence_score: Optional[float] = None
     ) -> bool:
-        """Save chat conversation to database"""
+        """Queue chat conversation for a batched database write"""
         try:
             data = {
                 'mother_id': mother_id,
@@ -152,12 +183,7 @@ class DatabaseService:
                 'message_timestamp': datetime.now().isoformat()
             }
             
-            result = supabase.table('chat_histories').insert(data).execute()
-            
-            if result.data:
-                logger.info(f"✅ Chat history saved for mother {mother_id}")
-                return True
-            return False
+            return chat_history_writer.add(data)
             
         except Exception as e:
             logger.error(f"❌ Error saving chat history: {e}")
@@ -251,6 +277,11 @@ class DatabaseService:
 
     @staticmethod
     def get_mother_holistic_data(mother_id: Any) -> Dict[str, Any]:
+        # history_service imports this module's client, so import it lazily
+        try:
+            from backend.services.history_service import merge_legacy_history
+        except ImportError:
+            from services.history_service import merge_legacy_history
         try:
             # Fetch mother profile
             profile_resp = supabase.table('mothers').select('*').eq('id', mother_id).execute()
@@ -292,7 +323,8 @@ class DatabaseService:
             
             return {
                 'profile': profile,
-                'medical_history': profile.get('medical_history') or {},
+                # Small latest-values projection; legacy blob only for mothers not yet migrated
+                'medical_history': merge_legacy_history(profile.get('history_latest'), profile.get('medical_history')),
                 'risk_assessments': risks,
                 'recent_metrics': metrics,
                 'nutrition_plans': nutrition_plans,
@@ -324,7 +356,10 @@ class DatabaseService:
                         chosen = w
                         break
             if chosen:
-                supabase.table('mothers').update({'asha_worker_id': chosen.get('id')}).eq('id', mother_id).execute()
+                updated = supabase.table('mothers').update({'asha_worker_id': chosen.get('id')}).eq('id', mother_id).execute()
+                for row in updated.data or []:
+                    if row.get('telegram_chat_id'):
+                        invalidate_telegram_mothers_cache(row['telegram_chat_id'])
             return chosen
         except Exception:
             return None
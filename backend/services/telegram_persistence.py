@@ -0,0 +1,213 @@
+"""
+MatruRaksha AI - Telegram Conversation Persistence
+SQLite-backed python-telegram-bot persistence for bot conversation state.
+
+Registration progress (conversation state, `registration_data`, the
+`registration_active` flags) survives restarts and deploys. Everything is
+stored as compact JSON rows keyed by chat/user id with a last-seen time:
+- rows idle longer than TELEGRAM_STATE_TTL_HOURS are skipped on load and
+  deleted by `evict_idle`, which also drops them from the Application's
+  in-memory dicts, so memory stays bounded by recently active chats
+- `mothers_list` is not persisted and `active_mother` is persisted as its id
+  only; both are re-read from the per-chat profile cache
+
+State is loaded once at startup and the refresh hooks are no-ops, so this
+supports a single bot process only: under several workers (gunicorn -w N)
+each would keep, and overwrite, its own view of every conversation.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+TELEGRAM_STATE_PATH = os.getenv("TELEGRAM_STATE_PATH", os.path.join(BASE_DIR, ".telegram_state.sqlite3"))
+TELEGRAM_STATE_TTL_HOURS = float(os.getenv("TELEGRAM_STATE_TTL_HOURS", "72"))
+TELEGRAM_STATE_FLUSH_SECONDS = float(os.getenv("TELEGRAM_STATE_FLUSH_SECONDS", "30"))
+
+# Derived data that is cheap to rebuild and would bloat every row
+TRANSIENT_USER_KEYS = ("mothers_list",)
+# Full mother rows kept in user_data; only their id is persisted
+ID_ONLY_USER_KEYS = ("active_mother",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bot_state (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_bot_state_updated ON bot_state(updated_at);
+"""
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _compact_user_data(data: Dict[Any, Any]) -> Dict[Any, Any]:
+    compact = {k: v for k, v in data.items() if k not in TRANSIENT_USER_KEYS}
+    for key in ID_ONLY_USER_KEYS:
+        if isinstance(compact.get(key), dict):
+            compact[key] = {"id": compact[key].get("id")}
+    return compact
+
+
+class SQLitePersistence(BasePersistence):
+    """
+    python-telegram-bot persistence over one SQLite file.
+
+    Rows live in a single `bot_state` table: kind is "user", "chat" or
+    "conv:<handler name>", key is the id (or the JSON conversation key).
+    """
+
+    def __init__(
+        self,
+        path: str = TELEGRAM_STATE_PATH,
+        ttl_seconds: float = TELEGRAM_STATE_TTL_HOURS * 3600,
+        update_interval: float = TELEGRAM_STATE_FLUSH_SECONDS
+    ):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=True, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    # ==================== SQLITE HELPERS ====================
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl_seconds
+
+    def _load(self, kind: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, data FROM bot_state WHERE kind = ? AND updated_at >= ?",
+                (kind, self._cutoff()),
+            ).fetchall()
+        return {key: json.loads(data) for key, data in rows}
+
+    def _write(self, kind: str, key: str, value: Any) -> None:
+        with self._lock:
+            if value is None:
+                self._db.execute("DELETE FROM bot_state WHERE kind = ? AND key = ?", (kind, key))
+            else:
+                self._db.execute(
+                    "INSERT INTO bot_state (kind, key, data, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(kind, key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                    (kind, key, _dumps(value), time.time()),
+                )
+            self._db.commit()
+
+    def _delete_idle(self) -> Dict[str, list]:
+        """Delete idle rows; returns the user and chat ids that were removed"""
+        cutoff = self._cutoff()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT kind, key FROM bot_state WHERE updated_at < ? AND kind IN ('user', 'chat')",
+                (cutoff,),
+            ).fetchall()
+            self._db.execute("DELETE FROM bot_state WHERE updated_at < ?", (cutoff,))
+            self._db.commit()
+        removed: Dict[str, list] = {"user": [], "chat": []}
+        for kind, key in rows:
+            removed[kind].append(int(key))
+        return removed
+
+    # ==================== PERSISTENCE API ====================
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        rows = await asyncio.to_thread(self._load, "user")
+        return defaultdict(dict, {int(k): v for k, v in rows.items()})
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        rows = await asyncio.to_thread(self._load, "chat")
+        return defaultdict(dict, {int(k): v for k, v in rows.items()})
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def get_callback_data(self) -> Optional[Any]:
+        return None
+
+    async def get_conversations(self, name: str) -> Dict[Tuple, object]:
+        rows = await asyncio.to_thread(self._load, f"conv:{name}")
+        return {tuple(json.loads(key)): state for key, state in rows.items()}
+
+    async def update_conversation(self, name: str, key: Tuple, new_state: Optional[object]) -> None:
+        await asyncio.to_thread(self._write, f"conv:{name}", _dumps(list(key)), new_state)
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        await asyncio.to_thread(self._write, "user", str(user_id), _compact_user_data(data))
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        await asyncio.to_thread(self._write, "chat", str(chat_id), data)
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        pass
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        await asyncio.to_thread(self._write, "chat", str(chat_id), None)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        await asyncio.to_thread(self._write, "user", str(user_id), None)
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def flush(self) -> None:
+        with self._lock:
+            self._db.commit()
+
+    # ==================== EVICTION ====================
+
+    async def evict_idle(self, application) -> int:
+        """
+        Forget chats idle longer than the TTL, on disk and in the Application.
+        The registration handler keeps its in-memory state; its steps end the
+        conversation when they find the registration data gone.
+        """
+        removed = await asyncio.to_thread(self._delete_idle)
+        for user_id in removed["user"]:
+            application.drop_user_data(user_id)
+        for chat_id in removed["chat"]:
+            application.drop_chat_data(chat_id)
+        count = len(removed["user"]) + len(removed["chat"])
+        if count:
+            logger.info(f"🧹 Evicted {count} idle Telegram conversation states")
+        return count
+
+
+async def run_state_eviction(persistence: SQLitePersistence, application, interval_seconds: float = 3600) -> None:
+    """Evict idle conversation state every `interval_seconds` until cancelled"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await persistence.evict_idle(application)
+        except Exception as e:
+            logger.warning(f"⚠️  Telegram state eviction failed: {e}")
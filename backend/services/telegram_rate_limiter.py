@@ -0,0 +1,333 @@
+"""
+MatruRaksha AI - Telegram Outbound Rate Limiting
+Per-chat and global pacing for everything the bot sends.
+
+Telegram allows roughly one message per second per chat (short bursts are
+tolerated) and ~30 per second per bot; going over returns 429 with
+`retry_after`. One `TelegramSendLimiter` holds that budget for the whole process
+and is used by:
+- `ChatRateLimiter`, the python-telegram-bot rate limiter (handler replies/edits)
+- `ChatSendQueue`, a per-chat queue for background notifications that merges
+  messages waiting for the same chat into one send
+- the sync `send_telegram_text` path used by TelegramService and threads
+
+Reservations are taken under a plain lock and return a delay, so the same
+budget works from the event loop and from worker threads.
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from backend.services.http_client import get_async_client, get_sync_client
+    from backend.utils import metrics
+except ImportError:
+    from services.http_client import get_async_client, get_sync_client
+    from utils import metrics
+
+try:
+    from telegram.error import RetryAfter
+    from telegram.ext import BaseRateLimiter
+except ImportError:  # scheduler-only installs
+    RetryAfter = None
+    BaseRateLimiter = object
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_BOT_TOKEN = (os.getenv("TELEGRAM_BOT_TOKEN") or "").strip()
+TELEGRAM_MESSAGES_PER_SECOND = float(os.getenv("TELEGRAM_MESSAGES_PER_SECOND", "28"))
+TELEGRAM_PER_CHAT_INTERVAL = float(os.getenv("TELEGRAM_PER_CHAT_INTERVAL", "1.0"))
+# Messages a chat may receive back-to-back before per-chat spacing applies
+TELEGRAM_PER_CHAT_BURST = int(os.getenv("TELEGRAM_PER_CHAT_BURST", "3"))
+TELEGRAM_SEND_MAX_RETRIES = 3
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+# Chats whose pacing state is remembered (least recently used are forgotten)
+MAX_TRACKED_CHATS = 10000
+
+COALESCE_SEPARATOR = "\n\n"
+
+
+def retry_after_seconds(value: Any) -> float:
+    """retry_after may be an int or a timedelta depending on the PTB version"""
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class TelegramSendLimiter:
+    """
+    Global + per-chat send budget (GCRA: each key keeps a theoretical arrival
+    time; a send may run up to `burst` intervals ahead of it).
+    """
+
+    def __init__(
+        self,
+        messages_per_second: float = TELEGRAM_MESSAGES_PER_SECOND,
+        per_chat_interval: float = TELEGRAM_PER_CHAT_INTERVAL,
+        per_chat_burst: int = TELEGRAM_PER_CHAT_BURST
+    ):
+        self.global_interval = 1.0 / max(messages_per_second, 0.1)
+        self.global_tolerance = self.global_interval * (max(messages_per_second, 1.0) - 1)
+        self.chat_interval = per_chat_interval
+        self.chat_tolerance = per_chat_interval * max(per_chat_burst - 1, 0)
+        self._global_tat = 0.0
+        self._chat_tat: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, chat_id: Optional[Any] = None) -> float:
+        """Book one send and return how long to wait before making it"""
+        now = time.monotonic()
+        with self._lock:
+            start = max(now, self._global_tat - self.global_tolerance)
+            # The global slot is booked at the earliest free time, so one chat's
+            # backlog never holds up sends to other chats
+            self._global_tat = max(self._global_tat, start) + self.global_interval
+            if chat_id is not None:
+                key = str(chat_id)
+                chat_tat = self._chat_tat.pop(key, 0.0)
+                start = max(start, chat_tat - self.chat_tolerance)
+                self._chat_tat[key] = max(chat_tat, start) + self.chat_interval
+                while len(self._chat_tat) > MAX_TRACKED_CHATS:
+                    self._chat_tat.popitem(last=False)
+        delay = start - now
+        if delay > 0:
+            metrics.observe("telegram.limiter.wait_seconds", delay)
+        return max(delay, 0.0)
+
+    def penalize(self, retry_after: float, chat_id: Optional[Any] = None) -> None:
+        """Honour a 429: hold the chat (or the whole bot) for `retry_after` seconds"""
+        until = time.monotonic() + retry_after
+        metrics.increment("telegram.rate_limited")
+        with self._lock:
+            if chat_id is not None:
+                key = str(chat_id)
+                self._chat_tat[key] = max(self._chat_tat.get(key, 0.0), until + self.chat_tolerance)
+            else:
+                self._global_tat = max(self._global_tat, until + self.global_tolerance)
+
+    async def acquire(self, chat_id: Optional[Any] = None) -> None:
+        delay = self.reserve(chat_id)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def acquire_sync(self, chat_id: Optional[Any] = None) -> None:
+        delay = self.reserve(chat_id)
+        if delay:
+            time.sleep(delay)
+
+
+_limiter = TelegramSendLimiter()
+
+
+def get_send_limiter() -> TelegramSendLimiter:
+    """The process-wide Telegram send budget"""
+    return _limiter
+
+
+def _is_paced_endpoint(endpoint: str) -> bool:
+    return endpoint.startswith(("send", "edit", "copy", "forward")) and endpoint != "sendChatAction"
+
+
+class ChatRateLimiter(BaseRateLimiter):
+    """python-telegram-bot rate limiter backed by the shared send budget"""
+
+    def __init__(self, limiter: Optional[TelegramSendLimiter] = None, max_retries: int = TELEGRAM_SEND_MAX_RETRIES):
+        self.limiter = limiter or get_send_limiter()
+        self.max_retries = max_retries
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if not _is_paced_endpoint(endpoint):
+            return await callback(*args, **kwargs)
+
+        chat_id = (data or {}).get("chat_id")
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(chat_id)
+            try:
+                return await callback(*args, **kwargs)
+            except Exception as e:
+                if RetryAfter is None or not isinstance(e, RetryAfter) or attempt >= self.max_retries:
+                    raise
+                wait = retry_after_seconds(e.retry_after)
+                logger.warning(f"⏳ Telegram {endpoint} to {chat_id} rate limited, retrying in {wait}s")
+                self.limiter.penalize(wait, chat_id)
+
+
+def _api_url() -> str:
+    return f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+
+
+def _result(response) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+    """(result dict, retry_after) for a sendMessage response"""
+    if response.status_code == 200:
+        return {"status": "sent", "message_id": response.json().get("result", {}).get("message_id")}, None
+    if response.status_code == 429:
+        try:
+            return None, retry_after_seconds(response.json().get("parameters", {}).get("retry_after", 1))
+        except Exception:
+            return None, 1.0
+    try:
+        error = response.json().get("description", "Unknown error")
+    except Exception:
+        error = response.text[:200]
+    return {"status": "failed", "error": error}, None
+
+
+def send_telegram_text(chat_id: Any, text: str, parse_mode: Optional[str] = "HTML", timeout: float = 10) -> Dict[str, Any]:
+    """Blocking paced sendMessage for threads and scripts (retries on 429)"""
+    payload = {"chat_id": chat_id, "text": text}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    result: Dict[str, Any] = {"status": "failed", "error": "rate limited"}
+    for _ in range(TELEGRAM_SEND_MAX_RETRIES + 1):
+        _limiter.acquire_sync(chat_id)
+        with metrics.timer("telegram.api.send_seconds"):
+            response = get_sync_client().post(_api_url(), json=payload, timeout=timeout)
+        sent, retry_after = _result(response)
+        if retry_after is None:
+            return sent
+        _limiter.penalize(retry_after, chat_id)
+    return result
+
+
+async def send_telegram_text_async(chat_id: Any, text: str, parse_mode: Optional[str] = "HTML", timeout: float = 10) -> Dict[str, Any]:
+    """Paced sendMessage on the running event loop (retries on 429)"""
+    payload = {"chat_id": chat_id, "text": text}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    result: Dict[str, Any] = {"status": "failed", "error": "rate limited"}
+    for _ in range(TELEGRAM_SEND_MAX_RETRIES + 1):
+        await _limiter.acquire(chat_id)
+        with metrics.timer("telegram.api.send_seconds"):
+            response = await get_async_client().post(_api_url(), json=payload, timeout=timeout)
+        sent, retry_after = _result(response)
+        if retry_after is None:
+            return sent
+        _limiter.penalize(retry_after, chat_id)
+    return result
+
+
+class ChatSendQueue:
+    """
+    Per-chat outbound queue for background notifications.
+
+    Each chat gets a short-lived sender task; messages that pile up for a chat
+    while it waits for its send slot are merged (same parse mode, up to
+    Telegram's 4096-character limit) into one message. `submit` is thread-safe
+    and returns a concurrent Future with the send result.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[str, List[Tuple[str, Optional[str], Future]]] = {}
+        self._senders: Dict[str, asyncio.Task] = {}
+
+    def start(self) -> None:
+        """Bind to the running event loop (call from the API lifespan)"""
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        senders = list(self._senders.values())
+        if senders:
+            await asyncio.wait(senders, timeout=timeout)
+        self._loop = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and not self._loop.is_closed()
+
+    def submit(self, chat_id: Any, text: str, parse_mode: Optional[str] = "HTML") -> Future:
+        future: Future = Future()
+        if not self.running:
+            future.set_result(send_telegram_text(chat_id, text, parse_mode))
+            return future
+        self._loop.call_soon_threadsafe(self._enqueue, str(chat_id), text, parse_mode, future)
+        return future
+
+    async def send(self, chat_id: Any, text: str, parse_mode: Optional[str] = "HTML") -> Dict[str, Any]:
+        """Awaitable send: queued (and mergeable) on the queue's loop, direct elsewhere"""
+        if self.running and asyncio.get_running_loop() is self._loop:
+            future: Future = Future()
+            self._enqueue(str(chat_id), text, parse_mode, future)
+            return await asyncio.wrap_future(future)
+        return await send_telegram_text_async(chat_id, text, parse_mode)
+
+    def send_sync(self, chat_id: Any, text: str, parse_mode: Optional[str] = "HTML", timeout: float = 60) -> Dict[str, Any]:
+        """Blocking send for sync callers: queued when called off the loop, direct otherwise"""
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if self.running and not on_loop:
+            return self.submit(chat_id, text, parse_mode).result(timeout=timeout)
+        return send_telegram_text(chat_id, text, parse_mode)
+
+    def _enqueue(self, chat_id: str, text: str, parse_mode: Optional[str], future: Future) -> None:
+        self._pending.setdefault(chat_id, []).append((text, parse_mode, future))
+        if chat_id not in self._senders:
+            self._senders[chat_id] = asyncio.create_task(self._drain(chat_id))
+
+    def _take_batch(self, chat_id: str) -> Tuple[str, Optional[str], List[Future]]:
+        """Pop the next message plus any adjacent ones it can absorb"""
+        pending = self._pending[chat_id]
+        text, parse_mode, future = pending.pop(0)
+        futures = [future]
+        while pending:
+            next_text, next_mode, next_future = pending[0]
+            merged = f"{text}{COALESCE_SEPARATOR}{next_text}"
+            if next_mode != parse_mode or len(merged) > TELEGRAM_MAX_MESSAGE_LENGTH:
+                break
+            pending.pop(0)
+            text = merged
+            futures.append(next_future)
+        if len(futures) > 1:
+            metrics.increment("telegram.coalesced", len(futures) - 1)
+        return text, parse_mode, futures
+
+    async def _drain(self, chat_id: str) -> None:
+        try:
+            while self._pending.get(chat_id):
+                # Wait for the chat's slot first so late arrivals can still be merged
+                await _limiter.acquire(chat_id)
+                text, parse_mode, futures = self._take_batch(chat_id)
+                try:
+                    result = await self._send_reserved(chat_id, text, parse_mode)
+                except Exception as e:
+                    logger.error(f"❌ Telegram send to {chat_id} failed: {e}")
+                    result = {"status": "failed", "error": str(e)}
+                for future in futures:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self._pending.pop(chat_id, None)
+            self._senders.pop(chat_id, None)
+
+    async def _send_reserved(self, chat_id: str, text: str, parse_mode: Optional[str]) -> Dict[str, Any]:
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        with metrics.timer("telegram.api.send_seconds"):
+            response = await get_async_client().post(_api_url(), json=payload, timeout=10)
+        sent, retry_after = _result(response)
+        if retry_after is None:
+            return sent
+        _limiter.penalize(retry_after, chat_id)
+        return await send_telegram_text_async(chat_id, text, parse_mode)
+
+
+chat_send_queue = ChatSendQueue()
@@ -1,10 +1,23 @@
 # backend/services/telegram_service.py
-import requests
+import time
+import uuid
+import asyncio
 import logging
 from dotenv import load_dotenv
 import os
 from datetime import datetime
 
+try:
+    from backend.services.message_templates import render
+    from backend.services.telegram_rate_limiter import chat_send_queue
+    from backend.services.outbox_service import enqueue, outbox_ready
+    from backend.utils import metrics
+except ImportError:
+    from services.message_templates import render
+    from services.telegram_rate_limiter import chat_send_queue
+    from services.outbox_service import enqueue, outbox_ready
+    from utils import metrics
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -18,50 +31,82 @@ class TelegramService:
         if not self.bot_token:
             raise ValueError("TELEGRAM_BOT_TOKEN must be set in .env")
     
-    def send_message(self, chat_id, message, parse_mode="HTML"):
+    def _queue(self, chat_id, message, parse_mode, dedup_key):
+        """
+        Write the message to the notification outbox (retried with backoff by the
+        outbox worker). Returns None when the outbox is not installed.
         """
-        Send message via Telegram
+        if not outbox_ready():
+            return None
+        try:
+            enqueue(
+                "telegram", chat_id, message,
+                dedup_key or f"telegram:{chat_id}:{uuid.uuid4().hex}",
+                parse_mode=parse_mode
+            )
+        except Exception as e:
+            logger.warning(f"⚠️  Outbox enqueue failed, sending directly: {e}")
+            return None
+        metrics.increment("telegram.service.queued")
+        return {"status": "queued", "chat_id": chat_id}
+    
+    def _handle_result(self, chat_id, result, started):
+        metrics.observe("telegram.service.send_seconds", time.perf_counter() - started)
+        if result.get("status") == "sent":
+            logger.info(f"Telegram message sent to {chat_id}")
+            return {**result, "chat_id": chat_id}
+        logger.error(f"Telegram error: {result.get('error')}")
+        return result
+    
+    async def send_message_async(self, chat_id, message, parse_mode="HTML", dedup_key=None):
+        """
+        Send message via Telegram without blocking the event loop
+        
+        Queued in the notification outbox when it is installed; otherwise sent
+        through the pooled keep-alive client and the per-chat send queue.
+        
+        Returns:
+            {"status": "queued" | "sent", ...} or {"status": "failed", "error"}
+        """
+        queued = await asyncio.to_thread(self._queue, chat_id, message, parse_mode, dedup_key)
+        if queued:
+            return queued
+        started = time.perf_counter()
+        try:
+            result = await chat_send_queue.send(chat_id, message, parse_mode)
+            return self._handle_result(chat_id, result, started)
+        except Exception as e:
+            metrics.increment("telegram.service.errors")
+            logger.error(f"Telegram service error: {str(e)}")
+            return {"status": "failed", "error": str(e)}
+    
+    def send_message(self, chat_id, message, parse_mode="HTML", dedup_key=None):
+        """
+        Send message via Telegram (sync shim for the scheduler and worker threads)
         
         Args:
             chat_id: User's Telegram chat ID
             message: Message text
             parse_mode: HTML or Markdown formatting
+            dedup_key: Outbox idempotency key (defaults to a unique key)
         
         Returns:
-            Response from Telegram API
+            {"status": "queued"} when written to the outbox, else the Telegram API result
         """
+        queued = self._queue(chat_id, message, parse_mode, dedup_key)
+        if queued:
+            return queued
+        started = time.perf_counter()
         try:
-            payload = {
-                "chat_id": chat_id,
-                "text": message,
-                "parse_mode": parse_mode
-            }
-            
-            response = requests.post(
-                f"{self.api_url}/sendMessage",
-                json=payload,
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"Telegram message sent to {chat_id}")
-                return {
-                    "status": "sent",
-                    "message_id": response.json().get("result", {}).get("message_id"),
-                    "chat_id": chat_id
-                }
-            else:
-                logger.error(f"Telegram error: {response.text}")
-                return {
-                    "status": "failed",
-                    "error": response.json().get("description", "Unknown error")
-                }
-        
+            # Paced per chat and merged with other queued notifications for the chat
+            result = chat_send_queue.send_sync(chat_id, message, parse_mode)
+            return self._handle_result(chat_id, result, started)
         except Exception as e:
+            metrics.increment("telegram.service.errors")
             logger.error(f"Telegram service error: {str(e)}")
             return {"status": "failed", "error": str(e)}
     
-    def send_risk_alert(self, chat_id, mother_name, risk_status, risk_score):
+    def send_risk_alert(self, chat_id, mother_name, risk_status, risk_score, language="en"):
         """Send risk alert to mother via Telegram"""
         
         risk_emoji = {
@@ -72,64 +117,38 @@ class TelegramService:
         
         emoji = risk_emoji.get(risk_status, "⚠️")
         
-        message = f"""{emoji} <b>Health Alert for {mother_name}</b>
-
-<b>Risk Status:</b> {risk_status}
-<b>Risk Score:</b> {risk_score*100:.0f}%
-
-⏰ <b>Check-up Time!</b>
-Your latest health assessment shows {risk_status.lower()}.
-
-📋 <b>Next Steps:</b>
-• Contact your healthcare provider
-• Schedule an appointment if needed
-• Follow wellness recommendations
-
-💬 Reply to this message or use /help for more information.
-
-Stay healthy! 🤰"""
+        message = render(
+            "risk_alert",
+            language,
+            emoji=emoji,
+            mother_name=mother_name,
+            risk_status=risk_status,
+            risk_percent=f"{risk_score*100:.0f}",
+            risk_status_lower=risk_status.lower(),
+        )
         
         return self.send_message(chat_id, message)
     
-    def send_appointment_reminder(self, chat_id, mother_name, facility, appointment_date, appointment_time):
+    def send_appointment_reminder(self, chat_id, mother_name, facility, appointment_date, appointment_time, language="en"):
         """Send appointment reminder"""
         
-        message = f"""📅 <b>Appointment Reminder for {mother_name}</b>
-
-<b>Facility:</b> {facility}
-<b>Date:</b> {appointment_date}
-<b>Time:</b> {appointment_time}
-
-✅ <b>Please Remember:</b>
-• Arrive 10-15 minutes early
-• Bring any previous reports
-• Contact provider if you can't make it
-
-📞 <b>Contact Healthcare Provider:</b>
-If you need to reschedule, reply to this message.
-
-Your health matters! 💙"""
+        message = render(
+            "appointment_reminder",
+            language,
+            mother_name=mother_name,
+            facility=facility,
+            appointment_date=appointment_date,
+            appointment_time=appointment_time,
+        )
         
         return self.send_message(chat_id, message)
     
-    def send_medication_reminder(self, chat_id, medications):
+    def send_medication_reminder(self, chat_id, medications, language="en"):
         """Send medication reminder"""
         
         med_list = "\n".join([f"• <b>{m['name']}</b> - {m['dosage']} at {m['time']}" for m in medications])
         
-        message = f"""💊 <b>Medication Reminder</b>
-
-{med_list}
-
-⏰ <b>Important:</b>
-• Take medications on time
-• Don't skip doses
-• Report any side effects immediately
-
-📝 <b>Side Effects?</b>
-If experiencing unusual symptoms, reply with /emergency
-
-Stay consistent! 💪"""
+        message = render("medication_list_reminder", language, med_list=med_list)
         
         return self.send_message(chat_id, message)
     
@@ -219,15 +238,7 @@ Thank you for your service! 🙏"""
     def send_wellness_tip(self, chat_id, tip_text, language="en"):
         """Send daily wellness tip"""
         
-        message = f"""💡 <b>Daily Wellness Tip</b>
-
-{tip_text}
-
-💙 <b>Remember:</b>
-Your health is our priority.
-Take care of yourself!
-
-Questions? Reply with /help"""
+        message = render("wellness_tip", language, tip_text=tip_text)
         
         return self.send_message(chat_id, message)
     
@@ -301,17 +312,17 @@ Questions? Reply with /help"""
 # Initialize service
 telegram_service = TelegramService()
 
-def send_risk_alert(chat_id, mother_name, risk_status, risk_score):
+def send_risk_alert(chat_id, mother_name, risk_status, risk_score, language="en"):
     """Public wrapper"""
-    return telegram_service.send_risk_alert(chat_id, mother_name, risk_status, risk_score)
+    return telegram_service.send_risk_alert(chat_id, mother_name, risk_status, risk_score, language)
 
-def send_appointment_reminder(chat_id, mother_name, facility, appointment_date, appointment_time="10:00 AM"):
+def send_appointment_reminder(chat_id, mother_name, facility, appointment_date, appointment_time="10:00 AM", language="en"):
     """Public wrapper"""
-    return telegram_service.send_appointment_reminder(chat_id, mother_name, facility, appointment_date, appointment_time)
+    return telegram_service.send_appointment_reminder(chat_id, mother_name, facility, appointment_date, appointment_time, language)
 
-def send_medication_reminder(chat_id, medications):
+def send_medication_reminder(chat_id, medications, language="en"):
     """Public wrapper"""
-    return telegram_service.send_medication_reminder(chat_id, medications)
+    return telegram_service.send_medication_reminder(chat_id, medications, language)
 
 def send_nutrition_plan(chat_id, mother_name, plan_text, language="en"):
     """Public wrapper"""
@@ -323,4 +334,8 @@ def send_emergency_alert(chat_id, mother_name, symptoms, nearest_facility):
 
 def send_asha_notification(chat_id, asha_name, mother_name, priority, task_description):
     """Public wrapper"""
-    return telegram_service.send_asha_notification(chat_id, asha_name, mother_name, priority, task_description)
\ No newline at end of file
+    return telegram_service.send_asha_notification(chat_id, asha_name, mother_name, priority, task_description)
+
+async def send_message_async(chat_id, message, parse_mode="HTML"):
+    """Public wrapper"""
+    return await telegram_service.send_message_async(chat_id, message, parse_mode)
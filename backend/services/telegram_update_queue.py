@@ -0,0 +1,197 @@
+"""
+MatruRaksha AI - Telegram Update Queue
+Fast-ack webhook support: updates are queued and processed by a worker pool.
+
+The webhook validates and enqueues each update, then answers Telegram
+immediately, so slow handlers (LLM replies, report analysis) never make
+Telegram time out and redeliver. Each chat is pinned to one worker, so a
+chat's updates are processed in order while different chats run
+concurrently. Redelivered updates are dropped by `update_id`.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    from backend.utils import metrics
+except ImportError:
+    from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_UPDATE_WORKERS = int(os.getenv("TELEGRAM_UPDATE_WORKERS", "8"))
+TELEGRAM_UPDATE_QUEUE_SIZE = int(os.getenv("TELEGRAM_UPDATE_QUEUE_SIZE", "1000"))
+TELEGRAM_UPDATE_DEDUP_WINDOW = int(os.getenv("TELEGRAM_UPDATE_DEDUP_WINDOW", "5000"))
+
+QUEUED = "queued"
+DUPLICATE = "duplicate"
+FULL = "full"
+
+UpdateProcessor = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def update_chat_id(update: Dict[str, Any]) -> Optional[int]:
+    """Chat (or user) an update belongs to, read from the raw webhook JSON"""
+    for key in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        chat = (update.get(key) or {}).get("chat") or {}
+        if chat.get("id") is not None:
+            return chat["id"]
+    callback = update.get("callback_query") or {}
+    chat = (callback.get("message") or {}).get("chat") or {}
+    if chat.get("id") is not None:
+        return chat["id"]
+    for key in ("callback_query", "inline_query", "chosen_inline_result", "my_chat_member", "chat_member"):
+        sender = (update.get(key) or {}).get("from") or {}
+        if sender.get("id") is not None:
+            return sender["id"]
+    return None
+
+
+class UpdateQueue:
+    """Bounded per-worker queues; one worker per shard of chats"""
+
+    def __init__(
+        self,
+        process: UpdateProcessor,
+        workers: int = TELEGRAM_UPDATE_WORKERS,
+        max_size: int = TELEGRAM_UPDATE_QUEUE_SIZE,
+        dedup_window: int = TELEGRAM_UPDATE_DEDUP_WINDOW
+    ):
+        self.process = process
+        self.workers = max(1, workers)
+        self.per_worker_size = max(1, max_size // self.workers)
+        self.dedup_window = dedup_window
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+
+    def _shard(self, chat_id: Optional[int], update_id: Optional[int]) -> int:
+        key = chat_id if chat_id is not None else update_id
+        return hash(key) % self.workers if key is not None else 0
+
+    def _remember(self, update_id: int) -> bool:
+        """False if this update_id was already accepted recently"""
+        if update_id in self._seen:
+            self._seen.move_to_end(update_id)
+            return False
+        self._seen[update_id] = None
+        while len(self._seen) > self.dedup_window:
+            self._seen.popitem(last=False)
+        return True
+
+    def submit(self, update: Dict[str, Any]) -> str:
+        """Queue an update without waiting; returns QUEUED, DUPLICATE or FULL"""
+        update_id = update.get("update_id")
+        if update_id is not None and not self._remember(update_id):
+            metrics.increment("telegram.updates.duplicate")
+            return DUPLICATE
+
+        queue = self._queues[self._shard(update_chat_id(update), update_id)]
+        try:
+            queue.put_nowait((time.perf_counter(), update))
+        except asyncio.QueueFull:
+            # Forget it so Telegram's redelivery is accepted once there is room
+            if update_id is not None:
+                self._seen.pop(update_id, None)
+            metrics.increment("telegram.updates.rejected_full")
+            return FULL
+
+        metrics.increment("telegram.updates.queued")
+        return QUEUED
+
+    async def _worker(self, index: int) -> None:
+        queue = self._queues[index]
+        while True:
+            queued_at, update = await queue.get()
+            started = time.perf_counter()
+            metrics.observe("telegram.updates.queue_wait", started - queued_at)
+            try:
+                await self.process(update)
+                metrics.increment("telegram.updates.processed")
+            except Exception as e:
+                metrics.increment("telegram.updates.failed")
+                logger.error(f"❌ Update {update.get('update_id')} failed: {e}", exc_info=True)
+            finally:
+                finished = time.perf_counter()
+                metrics.observe("telegram.updates.processing", finished - started)
+                metrics.observe("telegram.updates.latency", finished - queued_at)
+                queue.task_done()
+
+    def start(self) -> None:
+        """Create the queues and workers on the running event loop"""
+        if self._tasks:
+            return
+        self._queues = [asyncio.Queue(maxsize=self.per_worker_size) for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"telegram-update-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"📥 Telegram update queue started ({self.workers} workers)")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let queued updates finish (up to `timeout`), then stop the workers"""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️  {self.depth()} Telegram updates still queued at shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("📥 Telegram update queue stopped")
+
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": bool(self._tasks),
+            "depth": self.depth(),
+            "capacity": self.per_worker_size * self.workers,
+            "depth_per_worker": [q.qsize() for q in self._queues],
+        }
+
+
+_update_queue: Optional[UpdateQueue] = None
+
+
+def start_update_queue(process: UpdateProcessor, **kwargs: Any) -> UpdateQueue:
+    """Create and start the process-wide update queue"""
+    global _update_queue
+    _update_queue = UpdateQueue(process, **kwargs)
+    _update_queue.start()
+    return _update_queue
+
+
+def get_update_queue() -> Optional[UpdateQueue]:
+    return _update_queue
+
+
+async def stop_update_queue(timeout: float = 10.0) -> None:
+    global _update_queue
+    if _update_queue is not None:
+        await _update_queue.stop(timeout)
+        _update_queue = None
+
+
+def update_queue_report() -> Dict[str, Any]:
+    """Queue depth, counters and latency summaries for the admin metrics endpoint"""
+    counters = metrics.snapshot()["counters"]
+    return {
+        "queue": _update_queue.status() if _update_queue else {"running": False, "depth": 0},
+        "counters": {
+            name.split("telegram.updates.", 1)[1]: value
+            for name, value in counters.items()
+            if name.startswith("telegram.updates.")
+        },
+        "queue_wait": metrics.summarize("telegram.updates.queue_wait"),
+        "processing": metrics.summarize("telegram.updates.processing"),
+        "latency": metrics.summarize("telegram.updates.latency"),
+    }
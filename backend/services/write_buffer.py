@@ -0,0 +1,238 @@
+"""
+MatruRaksha AI - Buffered Table Writer
+Batches append-only inserts (telegram_logs, chat_histories) off the reply path.
+
+`add()` only appends the row to an in-memory buffer; a background task inserts
+the buffer as multi-row inserts every TELEGRAM_LOG_FLUSH_SECONDS, or sooner
+once TELEGRAM_LOG_BATCH_SIZE rows are waiting, and a final flush runs on
+shutdown. Bot replies therefore never wait on database writes.
+
+When no writer is running on the current event loop (scheduler process,
+scripts, worker threads) rows are inserted directly, as before.
+
+A batch rejected for a data or constraint error (bad value, missing foreign
+key) is retried row by row and only the offending rows are dropped; other
+failures keep the rows for the next flush.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from backend.utils import metrics
+except ImportError:
+    from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_LOG_BATCH_SIZE = int(os.getenv("TELEGRAM_LOG_BATCH_SIZE", "100"))
+TELEGRAM_LOG_FLUSH_SECONDS = float(os.getenv("TELEGRAM_LOG_FLUSH_SECONDS", "2"))
+# Rows kept while the database is unreachable; the oldest are dropped beyond this
+TELEGRAM_LOG_MAX_PENDING = int(os.getenv("TELEGRAM_LOG_MAX_PENDING", "10000"))
+
+
+def _is_row_error(exc: Exception) -> bool:
+    """Postgres data exception (22xxx) or integrity violation (23xxx): retrying won't help"""
+    code = getattr(exc, "code", None)
+    return isinstance(code, str) and code[:2] in ("22", "23")
+
+
+def _uniform(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Bulk inserts need the same keys in every row; missing ones become NULL"""
+    keys = set()
+    for row in rows:
+        keys.update(row.keys())
+    return [{key: row.get(key) for key in keys} for row in rows]
+
+
+class BufferedTableWriter:
+    """Size/interval-flushed multi-row inserts into one table"""
+
+    def __init__(
+        self,
+        table: str,
+        client_factory: Callable[[], Any],
+        batch_size: int = TELEGRAM_LOG_BATCH_SIZE,
+        flush_interval: float = TELEGRAM_LOG_FLUSH_SECONDS,
+        max_pending: int = TELEGRAM_LOG_MAX_PENDING
+    ):
+        self.table = table
+        self.client_factory = client_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.batch_size, max_pending)
+        self._rows: List[Dict[str, Any]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def running(self) -> bool:
+        """True when called on the loop the flush task runs on"""
+        if self._task is None or self._task.done():
+            return False
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        client = self.client_factory()
+        if client is None:
+            raise RuntimeError("Supabase client not available")
+        client.table(self.table).insert(_uniform(rows)).execute()
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        """Buffer a row, or insert it directly when no writer runs on this loop"""
+        if not self.running:
+            try:
+                self._insert([row])
+                return True
+            except Exception as exc:
+                logger.error(f"❌ Failed to write {self.table} row: {exc}")
+                return False
+
+        self._rows.append(row)
+        metrics.increment(f"db_buffer.{self.table}.buffered")
+        if len(self._rows) > self.max_pending:
+            dropped = len(self._rows) - self.max_pending
+            del self._rows[:dropped]
+            metrics.increment(f"db_buffer.{self.table}.dropped", dropped)
+        if len(self._rows) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    async def _insert_chunk(self, chunk: List[Dict[str, Any]]) -> Tuple[int, int, Optional[Exception]]:
+        """
+        Insert a chunk; returns (rows written, rows rejected and dropped, error).
+
+        If the database rejects the chunk because of a bad row, it is retried
+        one row at a time so only the offending rows are lost. On any other
+        error, `chunk` is left holding the rows that still need writing.
+        """
+        try:
+            await asyncio.to_thread(self._insert, chunk)
+            return len(chunk), 0, None
+        except Exception as exc:
+            if not _is_row_error(exc):
+                return 0, 0, exc
+            logger.warning(f"⚠️  {self.table} batch rejected, retrying row by row: {exc}")
+
+        written = rejected = 0
+        while chunk:
+            try:
+                await asyncio.to_thread(self._insert, chunk[:1])
+                written += 1
+            except Exception as exc:
+                if not _is_row_error(exc):
+                    return written, rejected, exc
+                rejected += 1
+                metrics.increment(f"db_buffer.{self.table}.rejected")
+                logger.error(f"❌ Dropping {self.table} row rejected by the database: {exc}")
+            del chunk[0]
+        return written, rejected, None
+
+    async def flush(self) -> int:
+        """Insert everything buffered so far; unwritten rows are kept for the next flush"""
+        async with self._flush_lock:
+            rows, self._rows = self._rows, []
+            pending = len(rows)
+            written = 0
+            started = time.perf_counter()
+            while rows:
+                chunk, rows = rows[:self.batch_size], rows[self.batch_size:]
+                try:
+                    chunk_written, _, error = await self._insert_chunk(chunk)
+                except asyncio.CancelledError:
+                    # stop() cancels the flush task; leave the rows for its final flush
+                    self._rows[:0] = chunk + rows
+                    raise
+                written += chunk_written
+                if error is not None:
+                    self._rows[:0] = chunk + rows
+                    metrics.increment(f"db_buffer.{self.table}.flush_failed")
+                    logger.warning(
+                        f"⚠️  {self.table} flush failed, {len(chunk) + len(rows)} rows kept for retry: {error}"
+                    )
+                    break
+            if pending:
+                metrics.increment(f"db_buffer.{self.table}.written", written)
+                metrics.observe(f"db_buffer.{self.table}.flush_seconds", time.perf_counter() - started)
+            return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the flush task on the running event loop"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run(), name=f"write-buffer-{self.table}")
+
+    async def stop(self) -> None:
+        """Stop the flush task and write whatever is still buffered"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await self.flush()
+        if self._rows:
+            logger.warning(f"⚠️  {len(self._rows)} {self.table} rows lost at shutdown")
+        self._task = None
+        self._rows = []
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "pending": len(self._rows),
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+        }
+
+
+_writers: Dict[str, BufferedTableWriter] = {}
+
+
+def table_writer(table: str, client_factory: Callable[[], Any]) -> BufferedTableWriter:
+    """Process-wide writer for `table` (created on first use)"""
+    writer = _writers.get(table)
+    if writer is None:
+        writer = _writers[table] = BufferedTableWriter(table, client_factory)
+    return writer
+
+
+def start_table_writers() -> None:
+    """Start every registered writer on the running event loop"""
+    for writer in _writers.values():
+        writer.start()
+    if _writers:
+        logger.info(f"🗂️  Buffered writes enabled for {', '.join(sorted(_writers))}")
+
+
+async def stop_table_writers() -> None:
+    """Flush and stop every writer (call on shutdown)"""
+    for writer in _writers.values():
+        await writer.stop()
+
+
+def table_writer_report() -> Dict[str, Any]:
+    return {
+        table: {
+            **writer.status(),
+            "flush_seconds": metrics.summarize(f"db_buffer.{table}.flush_seconds"),
+        }
+        for table, writer in _writers.items()
+    }
@@ -8,12 +8,12 @@ document uploads, and AI-powered answers.
 import os
 import json
 import html
+import asyncio
 import logging
 from uuid import uuid4
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any, Tuple
 
-import aiohttp
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.constants import ParseMode
 from telegram.ext import (
@@ -35,7 +35,14 @@ try:
     )
     from backend.agents.orchestrator import route_message
     from backend.services.memory_service import save_chat_history
-    from backend.services.email_service import send_alert_email
+    from backend.services.cache_service import invalidate_telegram_mothers_cache
+    from backend.services.email_service import build_alert_email
+    from backend.services.alert_service import send_alert_async
+    from backend.services.report_service import analyze_report, get_health_summary
+    from backend.services.blob_store import (
+        fetch_to_blob, BlobTooLargeError, BlobFetchError, BlobStorageError, MIME_EXTENSIONS, REPORT_MAX_BYTES
+    )
+    from backend.utils.pipeline import Pipeline
 except ImportError:
     from services.supabase_service import (
         get_mothers_by_telegram_id,
@@ -45,7 +52,14 @@ except ImportError:
     )
     from agents.orchestrator import route_message
     from services.memory_service import save_chat_history
-    from services.email_service import send_alert_email
+    from services.cache_service import invalidate_telegram_mothers_cache
+    from services.email_service import build_alert_email
+    from services.alert_service import send_alert_async
+    from services.report_service import analyze_report, get_health_summary
+    from services.blob_store import (
+        fetch_to_blob, BlobTooLargeError, BlobFetchError, BlobStorageError, MIME_EXTENSIONS, REPORT_MAX_BYTES
+    )
+    from utils.pipeline import Pipeline
 
 logger = logging.getLogger(__name__)
 
@@ -55,18 +69,20 @@ logger = logging.getLogger(__name__)
  AWAITING_LANGUAGE, CONFIRM_REGISTRATION) = range(10)
 
 TELEGRAM_BOT_TOKEN = (os.getenv("TELEGRAM_BOT_TOKEN") or "").strip()
-# Use BACKEND_URL for production, fall back to BACKEND_API_BASE_URL, then localhost for dev
-BACKEND_API_BASE_URL = (
-    os.getenv("BACKEND_URL") or 
-    os.getenv("BACKEND_API_BASE_URL") or 
-    "http://localhost:8000"
-).strip().rstrip('/')
+
+# Report analysis and summaries run in-process (no HTTP loopback to our own API)
+SUMMARY_TIMEOUT_SECONDS = 25
+ANALYSIS_TIMEOUT_SECONDS = 60
 
 # Dashboard & summary configuration
 MAX_TIMELINE_EVENTS = 5
 MAX_MEMORIES = 5
 MAX_REPORTS = 5
 
+# Report analyses that outlived their upload handler; held so they are not
+# garbage-collected mid-run and so their failures get logged
+_analysis_tasks: set = set()
+
 # Language mapping for user input and callback codes
 LANG_MAP = {
     # Text inputs
@@ -79,6 +95,15 @@ LANG_MAP = {
     "mr": "mr",
 }
 
+def _analysis_done(task: "asyncio.Task") -> None:
+    _analysis_tasks.discard(task)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.error(f"❌ Background report analysis failed: {error}", exc_info=error)
+
+
 def _format_date(date_str: Optional[str]) -> str:
     if not date_str:
         return "N/A"
@@ -131,11 +156,42 @@ def _build_dashboard_keyboard(
 
     return InlineKeyboardMarkup(rows)
 
+async def resolve_mothers(
+    context: ContextTypes.DEFAULT_TYPE,
+    chat_id: Optional[str],
+    refresh: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Profiles linked to this chat and the active one, served from the per-chat cache."""
+    mothers = await get_mothers_by_telegram_id(chat_id, use_cache=not refresh) if chat_id else []
+    current_id = str((context.user_data.get("active_mother") or {}).get("id"))
+    active = next((m for m in mothers if str(m.get("id")) == current_id), None)
+    if active is None and mothers:
+        active = mothers[0]
+
+    context.user_data["mothers_list"] = mothers
+    if active:
+        context.user_data["active_mother"] = active
+    else:
+        context.user_data.pop("active_mother", None)
+    return mothers, active
+
+
+async def _ensure_active_mother(
+    context: ContextTypes.DEFAULT_TYPE,
+    chat_id: Optional[str],
+) -> Optional[Dict[str, Any]]:
+    """Active profile, re-read from the per-chat cache when only its id was persisted"""
+    mother = context.user_data.get("active_mother")
+    if mother and set(mother) == {"id"}:
+        _, mother = await resolve_mothers(context, chat_id)
+    return mother
+
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = str(update.effective_chat.id)
     context.user_data["chat_id"] = chat_id
 
-    mothers = await get_mothers_by_telegram_id(chat_id)
+    mothers, active = await resolve_mothers(context, chat_id)
     if not mothers:
         # Display the Telegram Chat ID prominently so the user can easily share it
         await update.message.reply_text(
@@ -146,8 +202,6 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "or tap the *Register Mother* button below.",
             parse_mode=ParseMode.MARKDOWN,
         )
-        context.user_data["mothers_list"] = []
-        context.user_data.pop("active_mother", None)
         keyboard = InlineKeyboardMarkup([
             [InlineKeyboardButton("🆕 Register Mother", callback_data="register_new")],
             [InlineKeyboardButton("📋 Copy My Chat ID", callback_data=f"copy_chat_id_{chat_id}")]
@@ -155,9 +209,6 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Ready to onboard a mother?", reply_markup=keyboard)
         return
 
-    context.user_data["mothers_list"] = mothers
-    active = context.user_data.get("active_mother") or mothers[0]
-    context.user_data["active_mother"] = active
     context.user_data["show_switch_panel"] = False
 
     await send_home_dashboard(update, context, mother=active, mothers=mothers, as_new_message=True)
@@ -184,14 +235,10 @@ async def send_home_dashboard(
     )
 
     if mothers is None:
-        if chat_id:
-            mothers = await get_mothers_by_telegram_id(chat_id)
-            context.user_data["mothers_list"] = mothers
-        else:
-            mothers = []
+        mothers, _ = await resolve_mothers(context, chat_id)
 
     if mother is None:
-        mother = context.user_data.get("active_mother") or (mothers[0] if mothers else None)
+        mother = await _ensure_active_mother(context, chat_id) or (mothers[0] if mothers else None)
 
     if not mother:
         await update.effective_chat.send_message(
@@ -287,6 +334,9 @@ async def handle_home_action(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await query.message.reply_text("Finish registration first or send /cancel.")
         return
 
+    # Only the active profile's id survives a restart; fill in the rest first
+    await _ensure_active_mother(context, context.user_data.get("chat_id") or str(query.message.chat.id))
+
     if action == "summary":
         await query.answer("Fetching summary…")
         await action_summary(update, context)
@@ -322,12 +372,13 @@ async def handle_home_action(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await query.answer()
 
 async def _perform_alert_send(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    pressed_at = datetime.now(timezone.utc)
     mother = context.user_data.get("active_mother")
     if not mother:
         await update.callback_query.message.reply_text("No active mother profile")
         return
     mother_id = mother.get("id")
-    profile = DatabaseService.get_mother_holistic_data(mother_id)
+    profile = await asyncio.to_thread(DatabaseService.get_mother_holistic_data, mother_id)
     asha = profile.get("asha_worker") or {}
     doctor = profile.get("doctor") or {}
     mother_data = profile.get("profile") or {}
@@ -335,41 +386,42 @@ async def _perform_alert_send(update: Update, context: ContextTypes.DEFAULT_TYPE
     mother_phone = mother_data.get("phone") or ""
     location = mother_data.get("location") or ""
     
-    sent_to = []
-    
-    # Send email to ASHA worker
-    asha_email = asha.get("email")
-    if asha_email:
-        result = send_alert_email(
-            to_email=asha_email,
-            recipient_name=asha.get("name", "ASHA Worker"),
-            recipient_role="ASHA Worker",
+    # ASHA worker and Doctor are alerted in parallel on the emergency lane
+    contacts = [
+        (asha, "ASHA Worker", "ASHA"),
+        (doctor, "Doctor", "Doctor"),
+    ]
+    sends = []
+    labels = []
+    for contact, role, label in contacts:
+        email = contact.get("email")
+        if not email:
+            continue
+        subject, body_html, body_text = build_alert_email(
+            to_email=email,
+            recipient_name=contact.get("name", role),
+            recipient_role=role,
             mother_name=mother_name,
             mother_id=str(mother_id),
             mother_phone=mother_phone,
             location=location,
             alert_type="emergency"
         )
-        if result.get("status") == "sent":
-            sent_to.append(f"ASHA: {asha.get('name')}")
-            logger.info(f"✅ Alert email sent to ASHA worker: {asha_email}")
+        sends.append(send_alert_async(
+            "email", email, body_text,
+            source="bot_alert",
+            mother_id=mother_id,
+            subject=subject,
+            html=body_html,
+            occurred_at=pressed_at
+        ))
+        labels.append((label, contact.get("name"), email))
     
-    # Send email to Doctor
-    doctor_email = doctor.get("email")
-    if doctor_email:
-        result = send_alert_email(
-            to_email=doctor_email,
-            recipient_name=doctor.get("name", "Doctor"),
-            recipient_role="Doctor",
-            mother_name=mother_name,
-            mother_id=str(mother_id),
-            mother_phone=mother_phone,
-            location=location,
-            alert_type="emergency"
-        )
+    sent_to = []
+    for (label, name, email), result in zip(labels, await asyncio.gather(*sends)):
         if result.get("status") == "sent":
-            sent_to.append(f"Doctor: {doctor.get('name')}")
-            logger.info(f"✅ Alert email sent to Doctor: {doctor_email}")
+            sent_to.append(f"{label}: {name}")
+            logger.info(f"✅ Alert email sent to {label}: {email}")
     
     cbq = update.callback_query
     if sent_to:
@@ -397,6 +449,7 @@ async def register_button_entry(update: Update, context: ContextTypes.DEFAULT_TY
         context.chat_data['agents_suspended'] = True
         await query.message.reply_text("Please enter your full name:")
     else:
+        context.user_data['registration_data'] = {}
         # Suspend agents and mark registration active
         context.chat_data['registration_active'] = True
         context.chat_data['agents_suspended'] = True
@@ -430,15 +483,11 @@ async def action_summary(update: Update, context: ContextTypes.DEFAULT_TYPE):
     summary_lines.append("")
 
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f"{BACKEND_API_BASE_URL}/api/v1/summary/{mother_id}"
-            timeout = aiohttp.ClientTimeout(total=25)
-            async with session.get(url, timeout=timeout) as resp:
-                if resp.status != 200:
-                    raise RuntimeError(f"Summary API returned {resp.status}")
-                summary_payload = await resp.json()
+        summary_payload = await asyncio.wait_for(
+            get_health_summary(mother_id), timeout=SUMMARY_TIMEOUT_SECONDS
+        )
     except Exception as exc:
-        logger.error(f"Summary endpoint failed: {exc}")
+        logger.error(f"Summary lookup failed: {exc}")
         summary_lines.append("⚠️ Unable to fetch latest summary right now. Please try again later.")
         await query.message.reply_text(
             "\n".join(summary_lines),
@@ -535,10 +584,7 @@ async def handle_switch_callback(update: Update, context: ContextTypes.DEFAULT_T
     mother_id = query.data.replace("switch_mother_", "", 1)
     chat_id = context.user_data.get("chat_id") or str(query.message.chat.id)
 
-    mothers = context.user_data.get("mothers_list")
-    if not mothers:
-        mothers = await get_mothers_by_telegram_id(chat_id)
-        context.user_data["mothers_list"] = mothers
+    mothers, _ = await resolve_mothers(context, chat_id)
 
     target = next((m for m in mothers if str(m.get("id")) == mother_id), None)
     if not target:
@@ -560,15 +606,7 @@ async def handle_document_upload(update: Update, context: ContextTypes.DEFAULT_T
     chat_id = str(update.effective_chat.id)
     context.user_data["chat_id"] = chat_id
 
-    mother = context.user_data.get("active_mother")
-    mothers = context.user_data.get("mothers_list")
-    if not mother:
-        if not mothers:
-            mothers = await get_mothers_by_telegram_id(chat_id)
-            context.user_data["mothers_list"] = mothers
-        if mothers:
-            mother = mothers[0]
-            context.user_data["active_mother"] = mother
+    mothers, mother = await resolve_mothers(context, chat_id)
 
     if not mother:
         await update.message.reply_text(
@@ -585,11 +623,18 @@ async def handle_document_upload(update: Update, context: ContextTypes.DEFAULT_T
 
     try:
         if document:
+            if (document.file_size or 0) > REPORT_MAX_BYTES:
+                await update.message.reply_text(
+                    f"❌ File is too large. Please upload files up to {REPORT_MAX_BYTES // (1024 * 1024)} MB."
+                )
+                return
             file_info = await context.bot.get_file(document.file_id)
             filename = document.file_name or f"document_{document.file_id}"
             file_type = filename.split(".")[-1].lower() if "." in filename else "unknown"
         elif photo:
-            largest_photo = max(photo, key=lambda p: p.file_size or 0)
+            # Telegram offers several resolutions; take the largest one within the cap
+            fitting = [p for p in photo if (p.file_size or 0) <= REPORT_MAX_BYTES] or [min(photo, key=lambda p: p.file_size or 0)]
+            largest_photo = max(fitting, key=lambda p: p.file_size or 0)
             file_info = await context.bot.get_file(largest_photo.file_id)
             filename = f"photo_{largest_photo.file_id}.jpg"
             file_type = "jpg"
@@ -609,9 +654,27 @@ async def handle_document_upload(update: Update, context: ContextTypes.DEFAULT_T
             parse_mode=ParseMode.MARKDOWN,
         )
 
-        file_url = file_info.file_path
-        if not file_url.startswith("http"):
-            file_url = f"https://api.telegram.org/file/bot{TELEGRAM_BOT_TOKEN}/{file_url}"
+        # The download URL embeds the bot token: stream the file into the blob
+        # store now and persist only the content address
+        download_url = file_info.file_path
+        if not download_url.startswith("http"):
+            download_url = f"https://api.telegram.org/file/bot{TELEGRAM_BOT_TOKEN}/{download_url}"
+        try:
+            stored = await fetch_to_blob(download_url)
+        except BlobTooLargeError as size_error:
+            await processing_msg.edit_text(f"❌ {size_error}. Please upload a smaller file.")
+            return
+        except (BlobFetchError, BlobStorageError) as store_error:
+            logger.error(f"❌ Could not store uploaded file: {store_error}")
+            await processing_msg.edit_text("❌ Could not save your file. Please try again in a moment.")
+            return
+
+        sniffed_type = MIME_EXTENSIONS.get(stored["mime_type"])
+        if not sniffed_type:
+            await processing_msg.edit_text("❌ This file does not look like a PDF or image. Please upload PDF or image files.")
+            return
+        file_type = sniffed_type
+        file_url = stored["url"]
 
         report_id = str(uuid4())
         insert_data = {
@@ -627,41 +690,41 @@ async def handle_document_upload(update: Update, context: ContextTypes.DEFAULT_T
             "created_at": datetime.now().isoformat(),
         }
 
-        supabase.table("medical_reports").insert(insert_data).execute()
+        await asyncio.to_thread(
+            lambda: supabase.table("medical_reports").insert(insert_data).execute()
+        )
 
+        # Run the analysis as its own task: if it outlives the timeout it keeps
+        # going in the background and still stores its result on the report
+        analysis_task = asyncio.create_task(
+            analyze_report(report_id, str(mother_id), file_url, file_type)
+        )
+        _analysis_tasks.add(analysis_task)
+        analysis_task.add_done_callback(_analysis_done)
         try:
-            async with aiohttp.ClientSession() as session:
-                analyze_url = f"{BACKEND_API_BASE_URL}/analyze-report"
-                payload = {
-                    "mother_id": str(mother_id),
-                    "report_id": report_id,
-                    "file_url": file_url,
-                    "file_type": file_type,
-                }
-                timeout = aiohttp.ClientTimeout(total=60)
-                async with session.post(analyze_url, json=payload, timeout=timeout) as resp:
-                    if resp.status == 200:
-                        analysis = await resp.json()
-                        concerns = analysis.get("concerns") or []
-                        risk_level = (analysis.get("risk_level") or "normal").upper()
-                        msg = (
-                            f"✅ *Document uploaded & analyzed!*\n\n"
-                            f"📄 File: {filename}\n"
-                            f"📊 Risk Level: {risk_level}\n"
-                        )
-                        if concerns:
-                            msg += "⚠️ Concerns:\n"
-                            for concern in concerns[:3]:
-                                msg += f"• {concern}\n"
-                        msg += "\nUse /start to refresh your dashboard."
-                        await processing_msg.edit_text(msg, parse_mode=ParseMode.MARKDOWN)
-                    else:
-                        await processing_msg.edit_text(
-                            "✅ Document uploaded!\n\n"
-                            "Analysis will continue in the background. "
-                            "Check back in a minute.",
-                            parse_mode=ParseMode.MARKDOWN,
-                        )
+            analysis = await asyncio.wait_for(
+                asyncio.shield(analysis_task), timeout=ANALYSIS_TIMEOUT_SECONDS
+            )
+            concerns = analysis.get("concerns") or []
+            risk_level = (analysis.get("risk_level") or "normal").upper()
+            msg = (
+                f"✅ *Document uploaded & analyzed!*\n\n"
+                f"📄 File: {filename}\n"
+                f"📊 Risk Level: {risk_level}\n"
+            )
+            if concerns:
+                msg += "⚠️ Concerns:\n"
+                for concern in concerns[:3]:
+                    msg += f"• {concern}\n"
+            msg += "\nUse /start to refresh your dashboard."
+            await processing_msg.edit_text(msg, parse_mode=ParseMode.MARKDOWN)
+        except asyncio.TimeoutError:
+            await processing_msg.edit_text(
+                "✅ Document uploaded!\n\n"
+                "Analysis will continue in the background. "
+                "Check back in a minute.",
+                parse_mode=ParseMode.MARKDOWN,
+            )
         except Exception as api_error:
             logger.error(f"Document analysis error: {api_error}")
             await processing_msg.edit_text(
@@ -700,8 +763,10 @@ async def receive_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await target.reply_text("Please choose a valid language: English, Hindi, or Marathi.")
         return AWAITING_LANGUAGE
 
-    context.user_data.setdefault('registration_data', {})
-    context.user_data['registration_data']['preferred_language'] = lang
+    data = await _registration_data(update, context)
+    if data is None:
+        return ConversationHandler.END
+    data['preferred_language'] = lang
 
     await target.reply_text("Processing your registration...")
     return await finalize_registration(target, context)
@@ -751,10 +816,28 @@ class MatruRakshaBot:
 MatruRakkshaBot = MatruRakshaBot
 
 # === Minimal registration step handlers (module-level) ===
+async def _registration_data(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[Dict[str, Any]]:
+    """
+    Answers collected so far, or None (after telling the user) when they are
+    gone: idle eviction drops user_data while the ConversationHandler still
+    remembers the step, so the step must end the conversation itself.
+    """
+    data = context.user_data.get('registration_data')
+    if data is not None:
+        return data
+    context.chat_data['registration_active'] = False
+    context.chat_data['agents_suspended'] = False
+    await update.effective_message.reply_text(
+        "⌛ Your registration session expired. Use /start to register again."
+    )
+    return None
+
 async def receive_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = (update.message.text or "").strip()
-    context.user_data.setdefault('registration_data', {})
-    context.user_data['registration_data']['name'] = None if text.lower() == "skip" else text
+    data = await _registration_data(update, context)
+    if data is None:
+        return ConversationHandler.END
+    data['name'] = None if text.lower() == "skip" else text
     await update.message.reply_text("Please enter your age (or type 'skip').")
     return AWAITING_AGE
 
@@ -764,32 +847,40 @@ async def receive_age(update: Update, context: ContextTypes.DEFAULT_TYPE):
         value = int(text)
     except Exception:
         value = None
-    context.user_data.setdefault('registration_data', {})
-    context.user_data['registration_data']['age'] = value
+    data = await _registration_data(update, context)
+    if data is None:
+        return ConversationHandler.END
+    data['age'] = value
     await update.message.reply_text("Please enter your phone number (or type 'skip').")
     return AWAITING_PHONE
 
 async def receive_phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = (update.message.text or "").strip()
     value = None if text.lower() == "skip" else text
-    context.user_data.setdefault('registration_data', {})
-    context.user_data['registration_data']['phone'] = value
+    data = await _registration_data(update, context)
+    if data is None:
+        return ConversationHandler.END
+    data['phone'] = value
     await update.message.reply_text("Please enter your due date in YYYY-MM-DD (or 'skip').")
     return AWAITING_DUE_DATE
 
 async def receive_due_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = (update.message.text or "").strip()
     value = None if text.lower() == "skip" else text
-    context.user_data.setdefault('registration_data', {})
-    context.user_data['registration_data']['due_date'] = value
+    data = await _registration_data(update, context)
+    if data is None:
+        return ConversationHandler.END
+    data['due_date'] = value
     await update.message.reply_text("Please enter your city/location (or 'skip').")
     return AWAITING_LOCATION
 
 async def receive_location(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = (update.message.text or "").strip()
     value = None if text.lower() == "skip" else text
-    context.user_data.setdefault('registration_data', {})
-    context.user_data['registration_data']['location'] = value
+    data = await _registration_data(update, context)
+    if data is None:
+        return ConversationHandler.END
+    data['location'] = value
     await update.message.reply_text("Please enter gravida (number of pregnancies, or 'skip').")
     return AWAITING_GRAVIDA
 
@@ -799,8 +890,10 @@ async def receive_gravida(update: Update, context: ContextTypes.DEFAULT_TYPE):
         value = int(text)
     except Exception:
         value = None
-    context.user_data.setdefault('registration_data', {})
-    context.user_data['registration_data']['gravida'] = value
+    data = await _registration_data(update, context)
+    if data is None:
+        return ConversationHandler.END
+    data['gravida'] = value
     await update.message.reply_text("Please enter parity (number of births, or 'skip').")
     return AWAITING_PARITY
 
@@ -810,8 +903,10 @@ async def receive_parity(update: Update, context: ContextTypes.DEFAULT_TYPE):
         value = int(text)
     except Exception:
         value = None
-    context.user_data.setdefault('registration_data', {})
-    context.user_data['registration_data']['parity'] = value
+    data = await _registration_data(update, context)
+    if data is None:
+        return ConversationHandler.END
+    data['parity'] = value
     await update.message.reply_text("Please enter BMI (e.g., 22.5, or 'skip').")
     return AWAITING_BMI
 
@@ -821,8 +916,10 @@ async def receive_bmi(update: Update, context: ContextTypes.DEFAULT_TYPE):
         value = float(text)
     except Exception:
         value = None
-    context.user_data.setdefault('registration_data', {})
-    context.user_data['registration_data']['bmi'] = value
+    data = await _registration_data(update, context)
+    if data is None:
+        return ConversationHandler.END
+    data['bmi'] = value
     # Prompt for language selection (text input acceptable)
     await update.message.reply_text("Choose your preferred language: English, Hindi, or Marathi. You can type the language name.")
     return AWAITING_LANGUAGE
@@ -873,7 +970,11 @@ async def finalize_registration(target, context: ContextTypes.DEFAULT_TYPE):
         else:
             msg = "✅ Registration saved!"
         await target.reply_text(msg)
-        mothers = await get_mothers_by_telegram_id(chat_id) if callable(get_mothers_by_telegram_id) else None
+        # The new profile becomes the active one
+        invalidate_telegram_mothers_cache(chat_id)
+        if mother:
+            context.user_data["active_mother"] = mother
+        mothers, mother = await resolve_mothers(context, chat_id)
         await send_home_dashboard(target, context, mother=mother, mothers=mothers, as_new_message=True)
     except Exception as exc:
         logger.error(f"Registration save failed: {exc}", exc_info=True)
@@ -892,6 +993,8 @@ async def confirm_registration(update: Update, context: ContextTypes.DEFAULT_TYP
     action = data.split('_', 1)[1] if data.startswith('confirm_') else data
     target = query.message
     if action in ('yes','accept','ok','confirm','y'):
+        if await _registration_data(update, context) is None:
+            return ConversationHandler.END
         await target.reply_text('Processing your registration...')
         return await finalize_registration(target, context)
     else:
@@ -928,55 +1031,56 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     # Store chat_id for later use
     context.user_data["chat_id"] = chat_id
     
-    # IMPORTANT: Use the active_mother from context if available, otherwise fetch and use first
-    mother = context.user_data.get("active_mother")
-    mothers = context.user_data.get("mothers_list")
+    # Stages run as soon as their inputs are ready: the report lookup and the
+    # query log overlap, and the reply never waits on a history write
+    async def mother_stage():
+        # IMPORTANT: Keep the active_mother from context if still linked, otherwise use the first profile
+        mothers, mother = await resolve_mothers(context, chat_id)
+        # Log which mother context is being used for debugging
+        if mother:
+            logger.info(f"📱 Processing message for mother: {mother.get('name')} (ID: {mother.get('id')})")
+        return mother
     
-    # If no active mother in context, fetch from database
-    if not mother:
-        try:
-            mothers = await get_mothers_by_telegram_id(chat_id) if callable(get_mothers_by_telegram_id) else []
-            context.user_data["mothers_list"] = mothers
-            if mothers:
-                mother = mothers[0]
-                context.user_data["active_mother"] = mother
-        except Exception:
-            mothers = []
-            mother = None
+    async def reports_stage(mother):
+        return await get_recent_reports_for_mother(mother.get('id')) if mother else []
     
-    # Log which mother context is being used for debugging
-    if mother:
-        logger.info(f"📱 Processing message for mother: {mother.get('name')} (ID: {mother.get('id')})")
+    async def log_query_stage(mother):
+        await save_chat_history((mother or {}).get('id'), "user_query", text, telegram_chat_id=chat_id)
     
-    try:
-        reports = await get_recent_reports_for_mother(mother.get('id')) if (mother and callable(get_recent_reports_for_mother)) else []
-    except Exception:
-        reports = []
-    
-    mother_context = mother or {"preferred_language": "en"}
-    mother_id = mother_context.get('id') if isinstance(mother_context, dict) else None
+    async def reply_stage(mother, reports):
+        mother_context = mother or {"preferred_language": "en"}
+        try:
+            reply = await route_message(text, mother_context, reports)
+            logger.info(f"✅ Agent reply generated successfully for: {text[:50]}")
+        except Exception as e:
+            logger.error(f"Routing error for message '{text}': {e}", exc_info=True)
+            reply = f"I'm having trouble processing that right now. Please try again."
+        return reply
     
-    try:
-        await save_chat_history(mother_id, "user_query", text, telegram_chat_id=chat_id)
-    except Exception:
-        pass
+    async def send_stage(reply):
+        try:
+            await update.message.reply_text(reply)
+            return True
+        except Exception as reply_error:
+            logger.error(f"Error sending reply: {reply_error}", exc_info=True)
+            try:
+                await update.message.reply_text("I'm here to help. Please try rephrasing your question or use /start for the menu.")
+            except:
+                pass
+            return False
     
-    try:
-        reply = await route_message(text, mother_context, reports)
-        logger.info(f"✅ Agent reply generated successfully for: {text[:50]}")
-    except Exception as e:
-        logger.error(f"Routing error for message '{text}': {e}", exc_info=True)
-        reply = f"I'm having trouble processing that right now. Please try again."
+    async def log_reply_stage(mother, reply, send):
+        if send:
+            await save_chat_history((mother or {}).get('id'), "agent_response", reply, telegram_chat_id=chat_id)
     
-    try:
-        await update.message.reply_text(reply)
-        try:
-            await save_chat_history(mother_id, "agent_response", reply, telegram_chat_id=chat_id)
-        except Exception:
-            pass
-    except Exception as reply_error:
-        logger.error(f"Error sending reply: {reply_error}", exc_info=True)
-        try:
-            await update.message.reply_text("I'm here to help. Please try rephrasing your question or use /start for the menu.")
-        except:
-            pass
+    pipeline = (
+        Pipeline("telegram.text")
+        .add("mother", mother_stage, default=None)
+        .add("reports", reports_stage, after=("mother",), default=[])
+        .add("log_query", log_query_stage, after=("mother",), default=None)
+        .add("reply", reply_stage, after=("mother", "reports"))
+        .add("send", send_stage, after=("reply",))
+        .add("log_reply", log_reply_stage, after=("mother", "reply", "send"), default=None)
+    )
+    await pipeline.run()
+    logger.debug(f"⏱️  Text reply spans: {pipeline.describe()} (critical path: {' → '.join(pipeline.critical_path())})")
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from services.lease_service import Lease, LeaseLost, LocalLeaseStore, check_lease, default_lease_store
+
+
+class MissingTableClient:
+    def table(self, name):
+        raise RuntimeError(f"relation {name} does not exist")
+
+
+def test_job_stops_at_next_check_after_losing_lease():
+    store = LocalLeaseStore()
+
+    async def scenario():
+        async with Lease(store, "job:daily", "replica-a", ttl_seconds=3) as lease:
+            assert lease.acquired
+            check_lease()
+            # Another replica takes over once our lease is gone
+            store.release("job:daily", "replica-a")
+            store.acquire("job:daily", "replica-b", 60)
+            await asyncio.sleep(1.2)
+            assert lease.lost.is_set()
+            # Sync jobs run in worker threads and must see the same lease
+            with pytest.raises(LeaseLost):
+                await asyncio.to_thread(check_lease)
+        check_lease()
+
+    asyncio.run(scenario())
+
+
+def test_shared_schedule_refuses_in_process_leases():
+    with pytest.raises(RuntimeError):
+        default_lease_store(MissingTableClient(), shared=True)
+    assert isinstance(default_lease_store(MissingTableClient(), shared=False), LocalLeaseStore)
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from utils.pipeline import Pipeline
+
+
+def run(pipeline):
+    return asyncio.run(pipeline.run())
+
+
+def test_stages_receive_dependency_results_in_order():
+    order = []
+
+    async def first():
+        order.append("first")
+        return 1
+
+    async def second(first):
+        order.append("second")
+        return first + 1
+
+    async def third(first, second):
+        order.append("third")
+        return first + second
+
+    pipeline = Pipeline("test.order").add("first", first).add("second", second, after=("first",))
+    pipeline.add("third", third, after=("first", "second"))
+
+    assert run(pipeline) == {"first": 1, "second": 2, "third": 3}
+    assert order == ["first", "second", "third"]
+
+
+def test_independent_stages_overlap():
+    async def root():
+        return None
+
+    async def slow(root):
+        await asyncio.sleep(0.2)
+
+    pipeline = Pipeline("test.overlap").add("root", root)
+    pipeline.add("a", slow, after=("root",)).add("b", slow, after=("root",))
+    run(pipeline)
+
+    (a_start, a_end), (b_start, b_end) = pipeline.spans["a"], pipeline.spans["b"]
+    assert a_start < b_end and b_start < a_end
+
+
+def test_failed_stage_uses_default():
+    async def broken():
+        raise RuntimeError("lookup failed")
+
+    async def consumer(broken):
+        return f"got {broken}"
+
+    pipeline = Pipeline("test.default").add("broken", broken, default="fallback")
+    pipeline.add("consumer", consumer, after=("broken",))
+
+    assert run(pipeline) == {"broken": "fallback", "consumer": "got fallback"}
+
+
+def test_dependency_failure_skips_dependents_only():
+    async def broken():
+        raise RuntimeError("no default")
+
+    async def dependent(broken):
+        return "unreachable"
+
+    async def independent():
+        return "ok"
+
+    pipeline = Pipeline("test.failure").add("broken", broken)
+    pipeline.add("dependent", dependent, after=("broken",)).add("independent", independent)
+
+    assert run(pipeline) == {"independent": "ok"}
+
+
+def test_critical_path_follows_latest_dependency():
+    async def root():
+        return None
+
+    async def fast(root):
+        return None
+
+    async def slow(root):
+        await asyncio.sleep(0.1)
+
+    async def join(fast, slow):
+        return None
+
+    pipeline = Pipeline("test.critical").add("root", root)
+    pipeline.add("fast", fast, after=("root",)).add("slow", slow, after=("root",))
+    pipeline.add("join", join, after=("fast", "slow"))
+    run(pipeline)
+
+    assert pipeline.critical_path() == ["root", "slow", "join"]
+
+
+def test_add_rejects_dependency_the_stage_does_not_accept():
+    async def mothers():
+        return []
+
+    async def reply(mother):
+        return mother
+
+    pipeline = Pipeline("test.mismatch").add("mothers", mothers)
+    with pytest.raises(ValueError):
+        pipeline.add("reply", reply, after=("mothers",))
+
+
+def test_add_rejects_unknown_dependency():
+    async def reply(mother):
+        return mother
+
+    with pytest.raises(ValueError):
+        Pipeline("test.unknown").add("reply", reply, after=("mother",))
@@ -0,0 +1,29 @@
+import pytest
+
+# scheduler.py talks to Supabase and the Bot API at import time
+pytest.importorskip("supabase")
+pytest.importorskip("dotenv")
+
+import scheduler
+
+
+MOTHERS = [
+    {"id": "m1", "name": "Asha", "telegram_chat_id": "101", "created_at": "2026-01-01T00:00:00+00:00"},
+    {"id": "m2", "name": "Meena", "telegram_chat_id": "102", "created_at": "2026-02-01T00:00:00+00:00"},
+]
+
+
+def test_weekly_assessments_count_every_mother(monkeypatch):
+    sent = []
+    monkeypatch.setattr(scheduler, "iter_cohort", lambda **filters: iter(MOTHERS))
+    monkeypatch.setattr(scheduler, "latest_risk_levels", lambda ids, client: {str(i): "moderate" for i in ids})
+
+    def broadcast(template, messages):
+        sent.append(list(messages))
+        return {"sent": len(sent[-1]), "failed": 0}
+
+    monkeypatch.setattr(scheduler, "send_telegram_broadcast", broadcast)
+
+    assert scheduler.run_weekly_assessments() == {"sent": 2, "failed": 0, "assessed": 2}
+    # One broadcast for the whole cohort
+    assert [[mother["id"] for mother, _ in batch] for batch in sent] == [["m1", "m2"]]
@@ -0,0 +1,69 @@
+import asyncio
+
+from services.write_buffer import BufferedTableWriter
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code):
+        super().__init__(f"postgres error {code}")
+        self.code = code
+
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+        self.rows = None
+
+    def insert(self, rows):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        self.client.calls += 1
+        if self.client.down:
+            raise ConnectionError("database unreachable")
+        if any(row.get("mother_id") == "missing" for row in self.rows):
+            raise FakeAPIError("23503")
+        self.client.stored.extend(self.rows)
+
+
+class FakeClient:
+    def __init__(self):
+        self.stored = []
+        self.calls = 0
+        self.down = False
+
+    def table(self, name):
+        return FakeTable(self)
+
+
+def run_flush(writer, rows):
+    async def scenario():
+        writer.start()
+        for row in rows:
+            writer.add(row)
+        written = await writer.flush()
+        pending = list(writer._rows)
+        writer._task.cancel()
+        return written, pending
+
+    return asyncio.run(scenario())
+
+
+def test_rejected_row_is_dropped_and_rest_of_batch_written():
+    client = FakeClient()
+    writer = BufferedTableWriter("telegram_logs", lambda: client, batch_size=10, flush_interval=60)
+    rows = [{"mother_id": "m1"}, {"mother_id": "missing"}, {"mother_id": "m2"}]
+
+    assert run_flush(writer, rows) == (2, [])
+    assert client.stored == [{"mother_id": "m1"}, {"mother_id": "m2"}]
+
+
+def test_transient_failure_keeps_rows_for_retry():
+    client = FakeClient()
+    client.down = True
+    writer = BufferedTableWriter("telegram_logs", lambda: client, batch_size=10, flush_interval=60)
+    rows = [{"mother_id": "m1"}, {"mother_id": "m2"}, {"mother_id": "m3"}]
+
+    assert run_flush(writer, rows) == (0, rows)
+    assert client.calls == 1
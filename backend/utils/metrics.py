@@ -0,0 +1,119 @@
+"""
+MatruRaksha AI - In-process Metrics
+Lightweight counters and timing histograms for throughput and latency reporting.
+
+Values live in memory per process and are exposed through `snapshot()`; nothing
+is exported to an external system.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+# Keep a bounded window of samples per timing metric
+MAX_SAMPLES = 2048
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_samples: Dict[str, List[float]] = {}
+_sample_counts: Dict[str, int] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    """Add `value` to a counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, value: float) -> None:
+    """Record one sample (e.g. a latency in seconds)"""
+    with _lock:
+        samples = _samples.setdefault(name, [])
+        samples.append(value)
+        if len(samples) > MAX_SAMPLES:
+            del samples[: len(samples) - MAX_SAMPLES]
+        _sample_counts[name] = _sample_counts.get(name, 0) + 1
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Time a block and record it under `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def percentile(name: str, pct: float) -> float:
+    """Percentile (0-100) over the recent samples of a timing metric"""
+    with _lock:
+        samples = sorted(_samples.get(name, []))
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(pct / 100.0 * (len(samples) - 1)))))
+    return samples[index]
+
+
+def summarize(name: str) -> Dict[str, Any]:
+    """Count, mean and p50/p95/p99 for a timing metric"""
+    with _lock:
+        samples = sorted(_samples.get(name, []))
+        total = _sample_counts.get(name, 0)
+    if not samples:
+        return {"count": total}
+
+    def pick(pct: float) -> float:
+        return samples[min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))]
+
+    return {
+        "count": total,
+        "mean": round(sum(samples) / len(samples), 4),
+        "p50": round(pick(50), 4),
+        "p95": round(pick(95), 4),
+        "p99": round(pick(99), 4),
+        "max": round(samples[-1], 4),
+    }
+
+
+def observe_slo(name: str, value: float, target: float) -> bool:
+    """Record a sample and count whether it met the `target` objective"""
+    observe(name, value)
+    met = value <= target
+    increment(f"{name}.slo_met" if met else f"{name}.slo_breached")
+    return met
+
+
+def slo_report(name: str, target: float) -> Dict[str, Any]:
+    """Latency summary plus the share of samples within `target`"""
+    with _lock:
+        met = _counters.get(f"{name}.slo_met", 0)
+        breached = _counters.get(f"{name}.slo_breached", 0)
+    total = met + breached
+    return {
+        **summarize(name),
+        "slo_seconds": target,
+        "within_slo": met,
+        "breached_slo": breached,
+        "compliance": round(met / total, 4) if total else None,
+    }
+
+
+def snapshot() -> Dict[str, Any]:
+    """All counters plus summaries of all timing metrics"""
+    with _lock:
+        counters = dict(_counters)
+        names = list(_samples.keys())
+    return {
+        "counters": counters,
+        "timings": {name: summarize(name) for name in names},
+    }
+
+
+def reset() -> None:
+    """Clear all metrics"""
+    with _lock:
+        _counters.clear()
+        _samples.clear()
+        _sample_counts.clear()
@@ -0,0 +1,132 @@
+"""
+MatruRaksha AI - Async Stage Pipeline
+Runs a small dependency graph of coroutines with per-stage timing spans.
+
+Each stage starts as soon as the stages it depends on have finished, so
+independent lookups and writes overlap and total latency is the critical
+path rather than the sum of all stages. Stage durations are recorded as
+`<name>.<stage>` timing metrics and the whole run as `<name>.total`.
+"""
+
+import time
+import asyncio
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from backend.utils import metrics
+except ImportError:
+    from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_NO_DEFAULT = object()
+
+StageFunc = Callable[..., Awaitable[Any]]
+
+
+class StageFailed(Exception):
+    """A stage (or one of its dependencies) failed and had no default"""
+
+
+class Pipeline:
+    """
+    Dependency-aware async stages.
+
+    `add(stage, func, after=(...))` registers a coroutine function that is
+    called with the results of its dependencies as keyword arguments. A stage
+    that raises uses its `default` if one was given; otherwise it fails and
+    so do the stages that depend on it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._stages: Dict[str, Tuple[StageFunc, Tuple[str, ...], Any]] = {}
+        self.spans: Dict[str, Tuple[float, float]] = {}
+
+    def add(self, stage: str, func: StageFunc, after: Sequence[str] = (), default: Any = _NO_DEFAULT) -> "Pipeline":
+        for dep in after:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{stage}' depends on unknown stage '{dep}'")
+
+        # Dependency results are passed by name, so a mismatch must fail here
+        # rather than as a TypeError on every run
+        params = inspect.signature(func).parameters
+        if not any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values()):
+            unknown = [dep for dep in after if dep not in params]
+            if unknown:
+                raise ValueError(f"Stage '{stage}' does not accept dependency results {unknown}")
+        missing = [
+            name for name, p in params.items()
+            if p.default is inspect.Parameter.empty
+            and p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+            and name not in after
+        ]
+        if missing:
+            raise ValueError(f"Stage '{stage}' needs {missing}, which are not among its dependencies")
+
+        self._stages[stage] = (func, tuple(after), default)
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every stage; returns {stage: result} for the stages that succeeded"""
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        self.spans = {}
+
+        async def run_stage(stage: str) -> Any:
+            func, after, default = self._stages[stage]
+            inputs = {}
+            for dep in after:
+                try:
+                    inputs[dep] = await tasks[dep]
+                except Exception as exc:
+                    raise StageFailed(f"{stage}: dependency '{dep}' failed") from exc
+
+            stage_start = time.perf_counter()
+            try:
+                return await func(**inputs)
+            except Exception as exc:
+                if default is _NO_DEFAULT:
+                    metrics.increment(f"{self.name}.{stage}.failed")
+                    raise
+                logger.warning(f"⚠️  {self.name} stage '{stage}' failed, using default: {exc}")
+                metrics.increment(f"{self.name}.{stage}.defaulted")
+                return default
+            finally:
+                stage_end = time.perf_counter()
+                self.spans[stage] = (stage_start - started, stage_end - started)
+                metrics.observe(f"{self.name}.{stage}", stage_end - stage_start)
+
+        # Stages are registered after their dependencies, so tasks exist before they are awaited
+        for stage in self._stages:
+            tasks[stage] = asyncio.create_task(run_stage(stage), name=f"{self.name}.{stage}")
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        metrics.observe(f"{self.name}.total", time.perf_counter() - started)
+        results: Dict[str, Any] = {}
+        for stage, task in tasks.items():
+            error = task.exception()
+            if error is None:
+                results[stage] = task.result()
+            elif not isinstance(error, StageFailed):
+                logger.error(f"❌ {self.name} stage '{stage}' failed: {error}", exc_info=error)
+        return results
+
+    def critical_path(self) -> List[str]:
+        """Stages on the longest dependency chain of the last run"""
+        path: List[str] = []
+        stage: Optional[str] = max(self.spans, key=lambda s: self.spans[s][1], default=None)
+        while stage is not None:
+            path.append(stage)
+            after = [dep for dep in self._stages[stage][1] if dep in self.spans]
+            stage = max(after, key=lambda s: self.spans[s][1], default=None)
+        return list(reversed(path))
+
+    def describe(self) -> str:
+        """One-line span summary for debug logs, e.g. `mother 0-12ms, reply 12-840ms`"""
+        return ", ".join(
+            f"{stage} {start * 1000:.0f}-{end * 1000:.0f}ms"
+            for stage, (start, end) in sorted(self.spans.items(), key=lambda item: item[1][0])
+        )
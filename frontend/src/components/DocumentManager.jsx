@@ -416,7 +416,11 @@ export default function DocumentManager({
                     {/* View Document Button */}
                     {doc.file_url && (
                       <a
-                        href={doc.file_url}
+                        href={
+                          doc.file_url.startsWith("blob://")
+                            ? `${API_URL}/reports/${doc.id}/file`
+                            : doc.file_url
+                        }
                         target="_blank"
                         rel="noopener noreferrer"
                         className="p-2 text-indigo-600 hover:bg-indigo-50 rounded-lg transition-colors"
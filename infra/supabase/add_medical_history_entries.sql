@@ -0,0 +1,130 @@
+-- =====================================================
+-- Append-only structured medical history
+-- Run this in Supabase SQL Editor
+--
+-- Replaces read-modify-write of mothers.medical_history with:
+--   * medical_history_entries   append-only per-metric / concern rows
+--   * mothers.history_latest    small precomputed "latest values" projection
+--   * mothers.history_version   optimistic-concurrency counter
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS public.medical_history_entries (
+  id BIGSERIAL PRIMARY KEY,
+  mother_id BIGINT NOT NULL REFERENCES public.mothers(id) ON DELETE CASCADE,
+  entry_type TEXT NOT NULL
+    CHECK (entry_type IN ('metric', 'concern', 'recommendation', 'condition', 'medication', 'note')),
+  key TEXT NOT NULL,               -- metric name, or normalized concern text
+  value TEXT,
+  numeric_value NUMERIC,           -- parsed value for metrics, when numeric
+  observed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  source_report_id TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_history_entries_mother_key
+  ON public.medical_history_entries(mother_id, entry_type, key, observed_at DESC);
+
+ALTER TABLE public.mothers
+  ADD COLUMN IF NOT EXISTS history_latest JSONB DEFAULT '{}'::jsonb,
+  ADD COLUMN IF NOT EXISTS history_version INT NOT NULL DEFAULT 0;
+
+
+-- Rebuild the projection from the entries table (bounded per key)
+CREATE OR REPLACE FUNCTION public.build_history_latest(p_mother_id BIGINT)
+RETURNS JSONB AS $$
+  SELECT jsonb_build_object(
+    'metrics', COALESCE((
+      SELECT jsonb_object_agg(key, jsonb_build_object('value', value, 'observed_at', observed_at))
+      FROM (
+        SELECT DISTINCT ON (key) key, value, observed_at
+        FROM public.medical_history_entries
+        WHERE mother_id = p_mother_id AND entry_type = 'metric'
+        ORDER BY key, observed_at DESC, id DESC
+      ) m
+    ), '{}'::jsonb),
+    'concerns', COALESCE((
+      SELECT jsonb_agg(value ORDER BY observed_at DESC)
+      FROM (
+        SELECT DISTINCT ON (key) key, value, observed_at
+        FROM public.medical_history_entries
+        WHERE mother_id = p_mother_id AND entry_type = 'concern'
+        ORDER BY key, observed_at DESC
+      ) c
+      WHERE observed_at > NOW() - INTERVAL '90 days'
+    ), '[]'::jsonb),
+    'conditions', COALESCE((
+      SELECT jsonb_agg(DISTINCT value) FROM public.medical_history_entries
+      WHERE mother_id = p_mother_id AND entry_type = 'condition'
+    ), '[]'::jsonb),
+    'medications', COALESCE((
+      SELECT jsonb_agg(DISTINCT value) FROM public.medical_history_entries
+      WHERE mother_id = p_mother_id AND entry_type = 'medication'
+    ), '[]'::jsonb),
+    'trend_analysis', (
+      SELECT value FROM public.medical_history_entries
+      WHERE mother_id = p_mother_id AND entry_type = 'note'
+      ORDER BY observed_at DESC, id DESC LIMIT 1
+    ),
+    'updated_at', NOW()
+  );
+$$ LANGUAGE sql STABLE;
+
+
+-- Atomically append entries and refresh the projection.
+-- The row lock on mothers serializes concurrent uploads for the same mother.
+CREATE OR REPLACE FUNCTION public.append_medical_history(p_mother_id BIGINT, p_entries JSONB)
+RETURNS JSONB AS $$
+DECLARE
+  v_latest JSONB;
+  v_version INT;
+  v_chat_id TEXT;
+BEGIN
+  PERFORM 1 FROM public.mothers WHERE id = p_mother_id FOR UPDATE;
+
+  INSERT INTO public.medical_history_entries
+    (mother_id, entry_type, key, value, numeric_value, observed_at, source_report_id)
+  SELECT p_mother_id,
+         e->>'entry_type',
+         e->>'key',
+         e->>'value',
+         NULLIF(e->>'numeric_value', '')::NUMERIC,
+         COALESCE((e->>'observed_at')::TIMESTAMPTZ, NOW()),
+         e->>'source_report_id'
+  FROM jsonb_array_elements(p_entries) AS e;
+
+  v_latest := public.build_history_latest(p_mother_id);
+
+  UPDATE public.mothers
+     SET history_latest = v_latest,
+         history_version = history_version + 1
+   WHERE id = p_mother_id
+  RETURNING history_version, telegram_chat_id INTO v_version, v_chat_id;
+
+  -- The caller uses these to schedule compaction and refresh the chat's
+  -- cached profiles without another read
+  RETURN v_latest || jsonb_build_object('history_version', v_version, 'telegram_chat_id', v_chat_id);
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Keep only the newest p_keep entries per (entry_type, key)
+CREATE OR REPLACE FUNCTION public.compact_medical_history(p_mother_id BIGINT, p_keep INT DEFAULT 20)
+RETURNS INT AS $$
+DECLARE
+  v_deleted INT;
+BEGIN
+  DELETE FROM public.medical_history_entries
+   WHERE id IN (
+     SELECT id FROM (
+       SELECT id, ROW_NUMBER() OVER (
+         PARTITION BY entry_type, key ORDER BY observed_at DESC, id DESC
+       ) AS rn
+       FROM public.medical_history_entries
+       WHERE mother_id = p_mother_id
+     ) ranked
+     WHERE rn > p_keep
+   );
+  GET DIAGNOSTICS v_deleted = ROW_COUNT;
+  RETURN v_deleted;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,18 @@
+-- =====================================================
+-- Per-mother digest of recent medical reports
+-- Run this in Supabase SQL Editor
+--
+-- Holds metrics, concerns and recommendations already merged from the
+-- latest reports, so context building does not decode every report's JSON
+-- on each message. Refreshed by the backend when an analysis completes.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS public.mother_report_digests (
+  mother_id BIGINT PRIMARY KEY REFERENCES public.mothers(id) ON DELETE CASCADE,
+  summaries JSONB NOT NULL DEFAULT '[]'::jsonb,        -- [{date, summary}], newest first
+  metrics JSONB NOT NULL DEFAULT '{}'::jsonb,          -- newest value per metric
+  concerns JSONB NOT NULL DEFAULT '[]'::jsonb,
+  recommendations JSONB NOT NULL DEFAULT '[]'::jsonb,
+  report_count INT NOT NULL DEFAULT 0,
+  refreshed_at TIMESTAMPTZ DEFAULT NOW()
+);
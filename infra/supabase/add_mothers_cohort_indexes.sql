@@ -0,0 +1,18 @@
+-- =====================================================
+-- Indexes for scheduler cohort queries
+-- Run this in Supabase SQL Editor
+--
+-- Scheduler jobs page through mothers with a Telegram chat id, and the daily
+-- milestone job selects mothers whose created_at falls in a pregnancy-week
+-- window (one range query per milestone week).
+-- =====================================================
+
+-- Milestone / pregnancy-week windows
+CREATE INDEX IF NOT EXISTS idx_mothers_created_at_telegram
+  ON public.mothers(created_at)
+  WHERE telegram_chat_id IS NOT NULL;
+
+-- Keyset paging over reachable mothers, optionally by language
+CREATE INDEX IF NOT EXISTS idx_mothers_telegram_language_id
+  ON public.mothers(preferred_language, id)
+  WHERE telegram_chat_id IS NOT NULL;
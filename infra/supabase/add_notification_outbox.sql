@@ -0,0 +1,72 @@
+-- =====================================================
+-- Transactional outbox for outbound notifications
+-- Run this in Supabase SQL Editor
+--
+-- Every Telegram / SMS / email message produced by a job is written here first
+-- with a dedup key (mother, template, date). Delivery workers claim due rows,
+-- send them, and record the outcome; failures back off and eventually move to
+-- the 'dead' status (dead-letter queue). Re-running a job never duplicates
+-- messages, and a crash mid-broadcast resumes from the pending rows.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS public.notification_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  dedup_key TEXT NOT NULL UNIQUE,
+  channel TEXT NOT NULL CHECK (channel IN ('telegram', 'sms', 'email')),
+  recipient TEXT NOT NULL,                 -- chat id, phone number or email
+  payload JSONB NOT NULL,                  -- {text, parse_mode, subject, html}
+  mother_id BIGINT,
+  template TEXT,
+  priority INT NOT NULL DEFAULT 0,         -- higher is delivered first
+  status TEXT NOT NULL DEFAULT 'pending'
+    CHECK (status IN ('pending', 'sending', 'sent', 'dead')),
+  attempts INT NOT NULL DEFAULT 0,
+  max_attempts INT NOT NULL DEFAULT 5,
+  next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  locked_by TEXT,
+  locked_at TIMESTAMPTZ,
+  last_error TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  sent_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbox_due
+  ON public.notification_outbox(priority DESC, next_attempt_at)
+  WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_outbox_sending
+  ON public.notification_outbox(locked_at)
+  WHERE status = 'sending';
+CREATE INDEX IF NOT EXISTS idx_outbox_dead
+  ON public.notification_outbox(created_at DESC)
+  WHERE status = 'dead';
+
+
+-- Claim up to p_limit due messages for one worker.
+-- SKIP LOCKED lets several workers claim concurrently without overlap;
+-- rows stuck in 'sending' past the lease (crashed worker) are reclaimed.
+CREATE OR REPLACE FUNCTION public.claim_outbox_batch(
+  p_worker TEXT,
+  p_limit INT DEFAULT 100,
+  p_lease_seconds INT DEFAULT 120,
+  p_channels TEXT[] DEFAULT NULL
+)
+RETURNS SETOF public.notification_outbox AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE public.notification_outbox o
+     SET status = 'sending',
+         locked_by = p_worker,
+         locked_at = NOW(),
+         attempts = o.attempts + 1
+   WHERE o.id IN (
+     SELECT id FROM public.notification_outbox
+      WHERE ((status = 'pending' AND next_attempt_at <= NOW())
+         OR (status = 'sending' AND locked_at < NOW() - make_interval(secs => p_lease_seconds)))
+        AND (p_channels IS NULL OR channel = ANY(p_channels))
+      ORDER BY priority DESC, next_attempt_at
+      LIMIT p_limit
+      FOR UPDATE SKIP LOCKED
+   )
+  RETURNING o.*;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,30 @@
+-- =====================================================
+-- Batch re-analysis of medical reports
+-- Run this in Supabase SQL Editor
+-- =====================================================
+
+-- Which prompt/model version produced the stored analysis
+ALTER TABLE public.medical_reports
+  ADD COLUMN IF NOT EXISTS analysis_version TEXT;
+
+-- Checkpoints for resumable re-analysis runs
+CREATE TABLE IF NOT EXISTS public.report_reanalysis_runs (
+  run_id TEXT PRIMARY KEY,
+  analysis_version TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'running'
+    CHECK (status IN ('running', 'paused', 'completed', 'interrupted')),
+  last_report_id TEXT,          -- keyset cursor: last medical_reports.id fully stored
+  processed_count INT NOT NULL DEFAULT 0,
+  skipped_count INT NOT NULL DEFAULT 0,
+  failed_count INT NOT NULL DEFAULT 0,
+  last_error TEXT,
+  started_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Reports that failed in a run; retried after the last page and on resume
+ALTER TABLE public.report_reanalysis_runs
+  ADD COLUMN IF NOT EXISTS failed_report_ids JSONB NOT NULL DEFAULT '[]'::jsonb;
+
+CREATE INDEX IF NOT EXISTS idx_report_reanalysis_runs_status
+  ON public.report_reanalysis_runs(status);
@@ -0,0 +1,17 @@
+-- =====================================================
+-- Scheduler job run state
+-- Run this in Supabase SQL Editor
+--
+-- The async job runner records the last scheduled slot of every job here,
+-- so a run missed while the scheduler was down is caught up on restart.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS public.scheduler_job_runs (
+  job_name TEXT PRIMARY KEY,
+  last_scheduled_for TIMESTAMPTZ,
+  last_started_at TIMESTAMPTZ,
+  last_finished_at TIMESTAMPTZ,
+  last_status TEXT,                        -- running / ok / failed
+  last_duration_seconds NUMERIC,
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
@@ -0,0 +1,55 @@
+-- =====================================================
+-- Scheduler leases and cohort shard buckets
+-- Run this in Supabase SQL Editor
+--
+-- Several scheduler replicas can run at once: each job (or job shard) is
+-- guarded by an expiring lease, so only one replica runs it, and a crashed
+-- replica's lease simply times out.
+--
+-- With SCHEDULER_SHARD_COUNT > 1 every replica runs every job for its own
+-- slice of mothers, selected by a stable hash bucket (0-1023) of the id.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS public.scheduler_leases (
+  name TEXT PRIMARY KEY,
+  holder TEXT NOT NULL,
+  expires_at TIMESTAMPTZ NOT NULL,
+  acquired_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+
+-- Take the lease if it is free, expired, or already ours (renewal).
+-- Returns TRUE when p_holder holds the lease afterwards.
+CREATE OR REPLACE FUNCTION public.acquire_scheduler_lease(
+  p_name TEXT,
+  p_holder TEXT,
+  p_ttl_seconds INT DEFAULT 300
+)
+RETURNS BOOLEAN AS $$
+DECLARE
+  v_holder TEXT;
+BEGIN
+  INSERT INTO public.scheduler_leases (name, holder, expires_at)
+  VALUES (p_name, p_holder, NOW() + make_interval(secs => p_ttl_seconds))
+  ON CONFLICT (name) DO UPDATE
+     SET holder = EXCLUDED.holder,
+         expires_at = EXCLUDED.expires_at,
+         acquired_at = CASE WHEN public.scheduler_leases.holder = EXCLUDED.holder
+                            THEN public.scheduler_leases.acquired_at ELSE NOW() END
+   WHERE public.scheduler_leases.expires_at < NOW()
+      OR public.scheduler_leases.holder = EXCLUDED.holder
+  RETURNING holder INTO v_holder;
+
+  RETURN COALESCE(v_holder = p_holder, FALSE);
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Stable hash bucket per mother for cohort sharding
+ALTER TABLE public.mothers
+  ADD COLUMN IF NOT EXISTS cohort_bucket SMALLINT
+  GENERATED ALWAYS AS (((hashint8(id)::BIGINT) & 1023)::SMALLINT) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_mothers_cohort_bucket_id
+  ON public.mothers(cohort_bucket, id)
+  WHERE telegram_chat_id IS NOT NULL;